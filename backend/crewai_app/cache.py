@@ -0,0 +1,269 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_BYTES = 1024 * 1024
+# Digests remembered per unchanged file, so one request (and the next, for stored files) hashes each file once
+DIGEST_MEMO_ITEMS = 1024
+
+_digest_memo: "OrderedDict[tuple, str]" = OrderedDict()
+_digest_lock = threading.Lock()
+
+
+def _file_key(path: str) -> tuple:
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+def remember_digest(path: str, digest: str):
+    """Record a digest computed elsewhere (e.g. while the file was uploaded)."""
+    key = _file_key(path)
+    with _digest_lock:
+        _digest_memo[key] = digest
+        _digest_memo.move_to_end(key)
+        while len(_digest_memo) > DIGEST_MEMO_ITEMS:
+            _digest_memo.popitem(last=False)
+
+
+def file_digest(path: str) -> str:
+    """
+    SHA-256 of a file's bytes, read in 1 MB chunks. Remembered while the
+    file's path, size, mtime and inode stay the same.
+    """
+    key = _file_key(path)
+    with _digest_lock:
+        digest = _digest_memo.get(key)
+        if digest is not None:
+            _digest_memo.move_to_end(key)
+            return digest
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    remember_digest(path, digest)
+    return digest
+
+
+def make_key(*parts: Any) -> str:
+    """Stable cache key from JSON-serialisable parts."""
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TieredCache:
+    """
+    Two-tier JSON cache: an in-process LRU in front of an on-disk store.
+
+    - memory tier: OrderedDict LRU bounded by `memory_items`
+    - disk tier: one JSON file per key under `disk_dir`, evicted oldest-used
+      first once the directory grows past `disk_max_bytes`
+    - optional `ttl_seconds`: entries older than this are treated as misses
+
+    Values must be JSON-serialisable. Setting memory_items=0 or
+    disk_dir=None disables that tier.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        memory_items: int = 256,
+        disk_dir: Optional[str] = None,
+        disk_max_bytes: int = 256 * 1024 * 1024,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.name = name
+        self.memory_items = max(0, memory_items)
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes: Optional[int] = None  # computed on first disk write
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+        }
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    # -------------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------------
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._expired(entry):
+                    self._memory.pop(key, None)
+                    if not self.disk_dir:  # otherwise counted when the disk copy is dropped
+                        self.counters["expired"] += 1
+                else:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return entry["value"]
+
+        entry = self._disk_get(key)
+        with self._lock:
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters["disk_hits"] += 1
+            self._memory_put(key, entry)
+        return entry["value"]
+
+    def put(self, key: str, value: Any):
+        entry = {"created_at": time.time(), "value": value}
+        with self._lock:
+            self._memory_put(key, entry)
+        self._disk_put(key, entry)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._memory.pop(key, None)
+        path = self._disk_path(key)
+        if path and os.path.exists(path):
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+                with self._lock:
+                    if self._disk_bytes is not None:
+                        self._disk_bytes -= size
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.counters,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes or 0,
+            }
+
+    def log_stats(self):
+        s = self.stats()
+        logger.info(
+            f"🗃️ {self.name} cache: memory_hits={s['memory_hits']} disk_hits={s['disk_hits']} "
+            f"misses={s['misses']} expired={s['expired']} "
+            f"evictions(memory={s['memory_evictions']}, disk={s['disk_evictions']}) "
+            f"entries={s['memory_entries']} disk={s['disk_bytes'] / (1024 * 1024):.1f} MB"
+        )
+
+    # -------------------------------------------------------------------------
+    # Memory tier (caller holds the lock)
+    # -------------------------------------------------------------------------
+    def _expired(self, entry: Dict[str, Any]) -> bool:
+        return self.ttl_seconds is not None and time.time() - entry["created_at"] > self.ttl_seconds
+
+    def _memory_put(self, key: str, entry: Dict[str, Any]):
+        if not self.memory_items:
+            return
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+            self.counters["memory_evictions"] += 1
+
+    # -------------------------------------------------------------------------
+    # Disk tier
+    # -------------------------------------------------------------------------
+    def _disk_path(self, key: str) -> Optional[str]:
+        if not self.disk_dir:
+            return None
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _disk_get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._disk_path(key)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"{self.name} cache: dropping unreadable entry {path}: {e}")
+            self.delete(key)
+            return None
+
+        if self._expired(entry):
+            self.delete(key)
+            with self._lock:
+                self.counters["expired"] += 1
+            return None
+
+        # Touch so the disk tier evicts least-recently-used entries first
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry
+
+    def _disk_put(self, key: str, entry: Dict[str, Any]):
+        path = self._disk_path(key)
+        if not path:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if self._disk_bytes is None:
+                total = sum(size for _, _, size in self._scan_disk())
+                with self._lock:
+                    self._disk_bytes = total
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+            with self._lock:
+                self._disk_bytes += os.path.getsize(path) - old_size
+        except OSError as e:
+            logger.warning(f"{self.name} cache: failed to write {path}: {e}")
+            return
+
+        if self._disk_bytes > self.disk_max_bytes:
+            self._evict_disk()
+
+    def _scan_disk(self):
+        """Yield (mtime, path, size) for every entry on disk."""
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield st.st_mtime, path, st.st_size
+
+    def _evict_disk(self):
+        """Remove least-recently-used files until the store is under 90% of its cap."""
+        target = int(self.disk_max_bytes * 0.9)
+        entries = sorted(self._scan_disk())
+        total = sum(size for _, _, size in entries)
+        evicted = 0
+        for _, path, size in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._disk_bytes = total
+            self.counters["disk_evictions"] += evicted
+        if evicted:
+            logger.info(f"🧹 {self.name} cache: evicted {evicted} disk entries (now {total / (1024 * 1024):.1f} MB)")
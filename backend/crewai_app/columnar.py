@@ -0,0 +1,800 @@
+"""
+Columnar copies of uploaded workbooks.
+
+Each .xlsx is converted once, keyed by content hash, into one directory of
+.npy files per column: numbers, booleans and datetimes as typed arrays,
+text as int32 codes into a per-column dictionary, anything mixed as a
+pickled object array. Readers memory-map only the columns they ask for,
+so the inspector and the sandbox never parse the XML again for a workbook
+they have seen. The original file stays the source of truth: every reader
+falls back to it when the store is missing, stale or cannot answer.
+
+ColumnarSheet.frame() rebuilds what pd.read_excel(path, sheet_name=...)
+returns: sheet row 1 is the header, blank rows in between stay as NaN
+rows, and columns the typed arrays can't reproduce exactly (mixed types,
+text that pandas would parse as numbers or NA) go through pandas' own
+TextParser. Inside the sandbox, read_excel() stands in for pd.read_excel.
+"""
+import os
+import json
+import time
+import uuid
+import shutil
+import logging
+import zipfile
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait as wait_futures
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from .cache import file_digest
+from .xlsx_stream import XlsxWorkbook, CellError, SharedStringRef, column_names
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Columnar store settings (override via env)
+# -----------------------------------------------------------------------------
+COLUMNAR_STORE = os.getenv("COLUMNAR_STORE", "1").lower() in ("1", "true", "yes")
+COLUMNAR_DIR = os.getenv(
+    "COLUMNAR_DIR",
+    os.path.join(tempfile.gettempdir(), "excel_transformer_cache", "columnar"),
+)
+# Total size of all stores; least-recently-used workbooks are removed past it
+COLUMNAR_MAX_MB = int(os.getenv("COLUMNAR_MAX_MB", "2048"))
+# Background conversion processes
+COLUMNAR_WORKERS = int(os.getenv("COLUMNAR_WORKERS", "1"))
+# How long /transform waits for a conversion before executing against the .xlsx
+COLUMNAR_WAIT_SECONDS = float(os.getenv("COLUMNAR_WAIT_SECONDS", "30"))
+# Conversions queued or running at once; files past it are read from the .xlsx
+COLUMNAR_MAX_QUEUED = int(os.getenv("COLUMNAR_MAX_QUEUED", "8"))
+
+# Bump when the on-disk layout changes; older stores are ignored and re-converted
+COLUMNAR_VERSION = 1
+
+# Rows buffered per column before they are packed into typed arrays
+_CHUNK_ROWS = 65536
+_MANIFEST = "manifest.json"
+
+# pandas' datetime resolution for Python datetimes (us on pandas 3, ns before)
+_DATETIME_DTYPE = pd.Series([datetime(2000, 1, 1)]).dtype
+
+# read_excel arguments the store answers; anything else goes to pandas
+_READ_EXCEL_ARGS = {"sheet_name", "header", "usecols", "nrows", "engine"}
+_READ_EXCEL_ENGINES = (None, "openpyxl")
+
+
+# -----------------------------------------------------------------------------
+# Conversion
+# -----------------------------------------------------------------------------
+def _cell_kind(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, CellError) or value == "":
+        return None
+    if isinstance(value, (SharedStringRef, str)):
+        return "string"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, datetime):
+        return "datetime"
+    return "object"
+
+
+def _is_null(value: Any) -> bool:
+    return value is None or isinstance(value, CellError) or value == ""
+
+
+class _ColumnBuilder:
+    """Packs one column's cells into typed chunks as rows stream in."""
+
+    def __init__(self):
+        self.chunks: List[tuple] = []  # (kind, payload, length)
+        self.kinds = set()
+        self.codes: Dict[Any, int] = {}  # SharedStringRef index or inline text -> code
+        self.refs = set()  # SharedStringRefs inside mixed-type chunks
+
+    def add_chunk(self, values: tuple):
+        kinds = {k for k in map(_cell_kind, values) if k is not None}
+        n = len(values)
+        if not kinds:
+            self.chunks.append(("empty", None, n))
+            return
+        if kinds <= {"int", "float"} and kinds != {"int"}:
+            kinds = {"float"}
+        self.kinds |= kinds
+        kind = next(iter(kinds)) if len(kinds) == 1 else "object"
+        try:
+            if kind == "int":
+                mask = np.fromiter((_is_null(v) for v in values), dtype=bool, count=n)
+                data = np.array([0 if _is_null(v) else v for v in values], dtype=np.int64)
+                payload = (data, mask)
+            elif kind == "float":
+                payload = np.array([np.nan if _is_null(v) else v for v in values], dtype=np.float64)
+            elif kind == "bool":
+                mask = np.fromiter((_is_null(v) for v in values), dtype=bool, count=n)
+                payload = (np.array([False if _is_null(v) else v for v in values], dtype=bool), mask)
+            elif kind == "datetime":
+                payload = np.array([None if _is_null(v) else v for v in values], dtype="datetime64[us]")
+            elif kind == "string":
+                codes = self.codes
+                payload = np.array(
+                    [-1 if _is_null(v) else codes.setdefault(v, len(codes)) for v in values], dtype=np.int32
+                )
+            else:
+                payload = [None if _is_null(v) else v for v in values]
+        except (OverflowError, ValueError, TypeError):
+            kind = "object"
+            self.kinds.add("object")
+            payload = [None if _is_null(v) else v for v in values]
+        if kind == "object":
+            self.refs.update(v for v in payload if isinstance(v, SharedStringRef))
+        self.chunks.append((kind, payload, n))
+
+    def column_kind(self) -> str:
+        if not self.kinds:
+            return "empty"
+        if len(self.kinds) == 1:
+            return next(iter(self.kinds))
+        if self.kinds <= {"int", "float"}:
+            return "float"
+        return "object"
+
+    def finish(self, strings: Dict[int, str]) -> Dict[str, np.ndarray]:
+        """Concatenate the chunks into the column's arrays (strings: SharedStringRef index -> text)."""
+        kind = self.column_kind()
+        dictionary, remap = self._dictionary(strings)
+        parts = []
+        for chunk_kind, payload, n in self.chunks:
+            if kind == "object":
+                parts.append(self._objects(chunk_kind, payload, n, dictionary, remap, strings))
+            elif chunk_kind == "empty":
+                parts.append(_null_part(kind, n))
+            elif kind == "float" and chunk_kind == "int":
+                data, mask = payload
+                values = data.astype(np.float64)
+                values[mask] = np.nan
+                parts.append(values)
+            elif kind == "string":
+                parts.append(np.where(payload >= 0, remap[payload], -1).astype(np.int32))
+            else:
+                parts.append(payload)
+
+        if kind == "empty":
+            return {}
+        if kind in ("int", "bool"):
+            return {
+                "values": np.concatenate([p[0] for p in parts]),
+                "mask": np.concatenate([p[1] for p in parts]),
+            }
+        if kind == "string":
+            encoded = [text.encode("utf-8") for text in dictionary]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(b) for b in encoded], out=offsets[1:])
+            return {
+                "codes": np.concatenate(parts),
+                "dict_offsets": offsets,
+                "dict_data": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            }
+        if kind == "object":
+            values = np.empty(sum(len(p) for p in parts), dtype=object)
+            values[:] = [v for p in parts for v in p]
+            return {"objects": values}
+        return {"values": np.concatenate(parts)}
+
+    def _dictionary(self, strings: Dict[int, str]):
+        """Distinct texts in first-seen order, and old code -> new code (shared and inline copies merge)."""
+        position: Dict[str, int] = {}
+        remap = np.empty(len(self.codes), dtype=np.int32)
+        for key, code in self.codes.items():
+            text = strings.get(key, "") if isinstance(key, SharedStringRef) else key
+            if text not in position:
+                position[text] = len(position)
+            remap[code] = position[text]
+        return list(position), remap
+
+    @staticmethod
+    def _objects(chunk_kind, payload, n, dictionary, remap, strings) -> List[Any]:
+        """One chunk as Python values, for a column whose chunks disagree on type."""
+        if chunk_kind == "empty":
+            return [None] * n
+        if chunk_kind in ("int", "bool"):
+            data, mask = payload
+            return [None if m else v for v, m in zip(data.tolist(), mask.tolist())]
+        if chunk_kind == "float":
+            return [None if v != v else v for v in payload.tolist()]
+        if chunk_kind == "datetime":
+            return [None if v is None else v for v in payload.astype(object).tolist()]
+        if chunk_kind == "string":
+            return [None if c < 0 else dictionary[remap[c]] for c in payload.tolist()]
+        return [strings.get(v, "") if isinstance(v, SharedStringRef) else v for v in payload]
+
+
+def _null_part(kind: str, n: int):
+    if kind in ("int", "bool"):
+        return np.zeros(n, dtype=np.int64 if kind == "int" else bool), np.ones(n, dtype=bool)
+    if kind == "datetime":
+        return np.full(n, np.datetime64("NaT"), dtype="datetime64[us]")
+    if kind == "string":
+        return np.full(n, -1, dtype=np.int32)
+    return np.full(n, np.nan)
+
+
+def _json_name(value: Any) -> Any:
+    """Header cell as stored in the manifest, or raises TypeError if JSON can't hold it exactly."""
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    raise TypeError(type(value).__name__)
+
+
+def _read_sheet(wb: XlsxWorkbook, index: int) -> Dict[str, Any]:
+    """Stream one sheet into column builders, keeping blank rows where pd.read_excel keeps them."""
+    header: List[Any] = []
+    builders: List[_ColumnBuilder] = []
+    blank: List[int] = []
+    chunk: List[list] = []
+    first_row = None
+    rows = 0  # data rows so far (sheet rows 2..)
+
+    def flush():
+        if not chunk:
+            return
+        width = max((len(r) for r in chunk), default=0)
+        while len(builders) < width:
+            builder = _ColumnBuilder()
+            done = rows - len(chunk)
+            if done:
+                builder.add_chunk((None,) * done)
+            builders.append(builder)
+        padded = [r + [None] * (len(builders) - len(r)) for r in chunk]
+        for builder, values in zip(builders, zip(*padded)):
+            builder.add_chunk(values)
+        chunk.clear()
+
+    for row_number, values in wb.iter_raw_rows(index, numbered=True):
+        first_row = first_row or row_number
+        if row_number == 1:
+            header = values
+            continue
+        while rows < row_number - 2:
+            blank.append(rows)
+            chunk.append([])
+            rows += 1
+            if len(chunk) >= _CHUNK_ROWS:
+                flush()
+        chunk.append(values)
+        rows += 1
+        if len(chunk) >= _CHUNK_ROWS:
+            flush()
+    flush()
+    return {"header": header, "builders": builders, "blank": blank, "rows": rows, "first_row": first_row}
+
+
+def _header_value(value: Any) -> Any:
+    if isinstance(value, CellError) or value == "":
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)  # pandas' openpyxl reader does the same
+    return value
+
+
+def convert(path: str, digest: Optional[str] = None) -> Optional[str]:
+    """
+    Write the columnar store for an .xlsx file if it doesn't exist yet and
+    return its directory. None for files that aren't .xlsx packages.
+    """
+    if not zipfile.is_zipfile(path):
+        return None
+    digest = digest or file_digest(path)
+    target = store_dir(digest)
+    if _load_manifest(target) is not None:
+        _touch(target)
+        return target
+
+    started = time.perf_counter()
+    os.makedirs(COLUMNAR_DIR, exist_ok=True)
+    tmp = os.path.join(COLUMNAR_DIR, f".{digest}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+    os.makedirs(tmp)
+    try:
+        with XlsxWorkbook(path) as wb:
+            sheets = [(name, _read_sheet(wb, i)) for i, (name, _) in enumerate(wb.sheets)]
+            needed = set()
+            for _, sheet in sheets:
+                needed.update(v for v in sheet["header"] if isinstance(v, SharedStringRef))
+                for builder in sheet["builders"]:
+                    needed.update(k for k in builder.codes if isinstance(k, SharedStringRef))
+                    needed.update(builder.refs)
+            needed = sorted(needed)
+            resolved = wb.resolve_shared_strings([[SharedStringRef(i) for i in needed]])[0] if needed else []
+            strings = dict(zip(needed, resolved))
+
+        manifest = {
+            "version": COLUMNAR_VERSION,
+            "digest": digest,
+            "source_bytes": os.path.getsize(path),
+            "sheets": [],
+        }
+        for index, (name, sheet) in enumerate(sheets):
+            manifest["sheets"].append(_write_sheet(tmp, index, name, sheet, strings))
+            sheet["builders"] = None  # free the chunks as we go
+        manifest["bytes"] = _tree_bytes(tmp)
+        manifest["seconds"] = round(time.perf_counter() - started, 3)
+        with open(os.path.join(tmp, _MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        try:
+            os.rename(tmp, target)
+        except OSError:
+            # Another process finished the same workbook first
+            shutil.rmtree(tmp, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    logger.info(
+        f"🧊 Columnar store for {os.path.basename(path)} ({digest[:12]}): {len(sheets)} sheets, "
+        f"{manifest['bytes'] / (1024 * 1024):.1f} MB in {manifest['seconds']:.2f}s"
+    )
+    evict(keep=target)
+    return target
+
+
+def _write_sheet(root: str, index: int, name: str, sheet: Dict[str, Any], strings: Dict[int, str]) -> Dict[str, Any]:
+    directory = os.path.join(root, f"s{index}")
+    os.makedirs(directory)
+    header = [_header_value(strings.get(v, "") if isinstance(v, SharedStringRef) else v) for v in sheet["header"]]
+    width = max(len(header), len(sheet["builders"]))
+    names = column_names(header, width)
+    # Duplicate headers were renamed (x, x.1): usecols by name goes to the file
+    renamed = any(h not in (None, n) for h, n in zip(header, names))
+    try:
+        names = [_json_name(n) for n in names]
+        exact_header = True
+    except TypeError:
+        names = [str(n) for n in names]
+        exact_header = False  # e.g. a date in the header row: read_excel goes to the file
+
+    columns = []
+    for i, column in enumerate(names):
+        builder = sheet["builders"][i] if i < len(sheet["builders"]) else None
+        arrays = builder.finish(strings) if builder is not None else {}
+        kind = builder.column_kind() if builder is not None else "empty"
+        for part, array in arrays.items():
+            np.save(os.path.join(directory, f"c{i}.{part}.npy"), array, allow_pickle=(part == "objects"))
+        columns.append({"name": column, "kind": kind, "parts": sorted(arrays)})
+
+    if sheet["blank"]:
+        np.save(os.path.join(directory, "blank.npy"), np.array(sheet["blank"], dtype=np.int64))
+    return {
+        "name": name,
+        "index": index,
+        "rows": sheet["rows"],
+        "first_row": sheet["first_row"],
+        "blank_rows": len(sheet["blank"]),
+        "exact_header": exact_header,
+        "renamed_headers": renamed,
+        "columns": columns,
+    }
+
+
+def _tree_bytes(directory: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(directory) for f in files
+    )
+
+
+# -----------------------------------------------------------------------------
+# Cache directory
+# -----------------------------------------------------------------------------
+def store_dir(digest: str) -> str:
+    return os.path.join(COLUMNAR_DIR, digest)
+
+
+def _load_manifest(directory: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(directory, _MANIFEST), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == COLUMNAR_VERSION else None
+
+
+def _touch(directory: str):
+    try:
+        os.utime(os.path.join(directory, _MANIFEST), None)
+    except OSError:
+        pass
+
+
+_evict_lock = threading.Lock()
+
+
+def evict(keep: Optional[str] = None):
+    """Remove least-recently-used stores until the total is under 90% of COLUMNAR_MAX_MB."""
+    with _evict_lock:
+        entries = []
+        try:
+            names = os.listdir(COLUMNAR_DIR)
+        except OSError:
+            return
+        for name in names:
+            directory = os.path.join(COLUMNAR_DIR, name)
+            if name.startswith("."):
+                # A conversion in progress, or left behind by one that died
+                try:
+                    if time.time() - os.path.getmtime(directory) > 3600:
+                        shutil.rmtree(directory, ignore_errors=True)
+                except OSError:
+                    pass
+                continue
+            manifest = _load_manifest(directory)
+            try:
+                used = os.path.getmtime(os.path.join(directory, _MANIFEST))
+            except OSError:
+                used = 0
+            size = manifest["bytes"] if manifest else _tree_bytes(directory)
+            entries.append((manifest is not None, used, directory, size))
+
+        total = sum(size for *_, size in entries)
+        target = int(COLUMNAR_MAX_MB * 1024 * 1024 * 0.9)
+        evicted = 0
+        # Stale versions and half-written stores first, then oldest use
+        for valid, _, directory, size in sorted(entries):
+            if total <= target and valid:
+                continue
+            if directory == keep and valid:
+                continue
+            shutil.rmtree(directory, ignore_errors=True)
+            total -= size
+            evicted += 1
+        if evicted:
+            logger.info(f"🧹 Columnar store: evicted {evicted} workbooks (now {total / (1024 * 1024):.1f} MB)")
+
+
+def open_store(digest: str) -> Optional["ColumnarStore"]:
+    """The store for a content hash, or None if it hasn't been converted (or was evicted)."""
+    directory = store_dir(digest)
+    manifest = _load_manifest(directory)
+    if manifest is None:
+        return None
+    _touch(directory)
+    return ColumnarStore(directory, manifest)
+
+
+# -----------------------------------------------------------------------------
+# Reading
+# -----------------------------------------------------------------------------
+class ColumnarStore:
+    """One converted workbook."""
+
+    def __init__(self, directory: str, manifest: Optional[Dict[str, Any]] = None):
+        self.directory = directory
+        self.manifest = manifest or _load_manifest(directory)
+        if self.manifest is None:
+            raise FileNotFoundError(f"No columnar store in {directory}")
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return [s["name"] for s in self.manifest["sheets"]]
+
+    def sheet(self, key: Any = 0) -> "ColumnarSheet":
+        """Sheet by position or name, like read_excel's sheet_name."""
+        sheets = self.manifest["sheets"]
+        if isinstance(key, int) and not isinstance(key, bool):
+            return ColumnarSheet(self.directory, sheets[key])
+        for sheet in sheets:
+            if sheet["name"] == key:
+                return ColumnarSheet(self.directory, sheet)
+        raise ValueError(f"Worksheet named '{key}' not found")
+
+
+class ColumnarSheet:
+    """Memory-mapped columns of one sheet; arrays are read-only views of the files."""
+
+    def __init__(self, directory: str, meta: Dict[str, Any]):
+        self.meta = meta
+        self.name = meta["name"]
+        self.rows = meta["rows"]
+        self.directory = os.path.join(directory, f"s{meta['index']}")
+        self.columns = {c["name"]: (i, c) for i, c in enumerate(meta["columns"])}
+
+    @property
+    def names(self) -> List[Any]:
+        return [c["name"] for c in self.meta["columns"]]
+
+    def kind(self, name: Any) -> str:
+        return self.columns[name][1]["kind"]
+
+    def arrays(self, name: Any) -> Dict[str, np.ndarray]:
+        """The stored arrays of one column, memory-mapped (object columns are unpickled)."""
+        i, column = self.columns[name]
+        arrays = {}
+        for part in column["parts"]:
+            path = os.path.join(self.directory, f"c{i}.{part}.npy")
+            if part == "objects":
+                arrays[part] = np.load(path, allow_pickle=True)
+            else:
+                arrays[part] = np.load(path, mmap_mode="r")
+        return arrays
+
+    def dictionary(self, arrays: Dict[str, np.ndarray]) -> np.ndarray:
+        """A text column's distinct values as an object array, indexed by code."""
+        offsets = np.asarray(arrays["dict_offsets"])
+        data = bytes(arrays["dict_data"])
+        values = np.empty(len(offsets) - 1, dtype=object)
+        values[:] = [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+        return values
+
+    def blank_rows(self) -> np.ndarray:
+        """Data-row positions that are blank in the sheet (pd.read_excel keeps them as NaN rows)."""
+        if not self.meta["blank_rows"]:
+            return np.empty(0, dtype=np.int64)
+        return np.load(os.path.join(self.directory, "blank.npy"))
+
+    def values(self, name: Any, nrows: Optional[int] = None) -> np.ndarray:
+        """Raw cell values of a column as an object array, None for empty cells."""
+        kind = self.kind(name)
+        n = self.rows if nrows is None else min(nrows, self.rows)
+        arrays = self.arrays(name)
+        out = np.empty(n, dtype=object)
+        if kind == "empty":
+            return out
+        if kind == "object":
+            out[:] = arrays["objects"][:n]
+        elif kind == "string":
+            codes = np.asarray(arrays["codes"][:n])
+            present = codes >= 0
+            out[present] = self.dictionary(arrays)[codes[present]]
+        elif kind in ("int", "bool"):
+            present = ~np.asarray(arrays["mask"][:n])
+            out[present] = np.asarray(arrays["values"][:n])[present].tolist()
+        elif kind == "float":
+            data = np.asarray(arrays["values"][:n])
+            present = ~np.isnan(data)
+            out[present] = data[present].tolist()
+        else:  # datetime
+            data = np.asarray(arrays["values"][:n])
+            present = ~np.isnat(data)
+            out[present] = data[present].astype(object)
+        return out
+
+    def series(self, name: Any, nrows: Optional[int] = None) -> pd.Series:
+        """One column as pd.read_excel would return it."""
+        kind = self.kind(name)
+        n = self.rows if nrows is None else min(nrows, self.rows)
+        if n == 0:
+            return pd.Series([], dtype=object, name=name)  # no data rows: pandas can't infer anything
+        arrays = self.arrays(name)
+        if kind == "empty":
+            return pd.Series(np.full(n, np.nan), name=name)
+        if kind == "float":
+            # np.array copies out of the mapping: scripts get a writable frame
+            data = np.array(arrays["values"][:n])
+            if np.isfinite(data).all() and np.array_equal(data, np.floor(data)):
+                # pandas reads whole-number cells as ints
+                if np.abs(data).max() < 2 ** 63:
+                    return pd.Series(data.astype(np.int64), name=name)
+                # Past int64 they stay Python ints, which pandas keeps as uint64 or object
+                return _parse_column(np.array([int(v) for v in data], dtype=object)).rename(name)
+            return pd.Series(data, name=name)
+        if kind == "int":
+            data = np.array(arrays["values"][:n])
+            mask = np.asarray(arrays["mask"][:n])
+            if mask.any():
+                data = data.astype(np.float64)
+                data[mask] = np.nan
+            return pd.Series(data, name=name)
+        if kind == "datetime":
+            return pd.Series(np.array(arrays["values"][:n]), name=name).astype(_DATETIME_DTYPE)
+        if kind == "bool" and not np.asarray(arrays["mask"][:n]).any():
+            return pd.Series(np.array(arrays["values"][:n]), name=name)
+        if kind == "string":
+            # Parse the distinct values the way read_excel parses cells; if they all
+            # stay text, the column is those texts (NA markers become NaN)
+            dictionary = self.dictionary(arrays)
+            parsed = _parse_column(dictionary) if len(dictionary) else pd.Series([], dtype=object)
+            if len(dictionary) == 0 or pd.api.types.is_string_dtype(parsed.dtype):
+                lookup = np.empty(len(dictionary) + 1, dtype=object)
+                lookup[:-1] = parsed.to_numpy(dtype=object, na_value=np.nan)
+                lookup[-1] = np.nan
+                codes = np.asarray(arrays["codes"][:n])
+                return pd.Series(lookup[codes], name=name)  # code -1 picks the trailing NaN
+        # bool with gaps, mixed types, numeric-looking text: let pandas decide
+        return _parse_column(self.values(name, n)).rename(name)
+
+    def frame(self, usecols: Optional[List[Any]] = None, nrows: Optional[int] = None) -> pd.DataFrame:
+        """pd.read_excel(path, sheet_name=<this sheet>, usecols=..., nrows=...) from the store."""
+        names = self.names
+        if not names:
+            return pd.DataFrame()  # empty sheet
+        if usecols is not None:
+            if all(isinstance(c, int) and not isinstance(c, bool) for c in usecols):
+                wanted = {names[i] for i in usecols}
+            elif all(isinstance(c, str) for c in usecols) and not self.meta["renamed_headers"]:
+                missing = [c for c in usecols if c not in self.columns]
+                if missing:
+                    raise KeyError(missing)
+                wanted = set(usecols)
+            else:
+                raise TypeError("usecols")
+            names = [n for n in names if n in wanted]
+        return pd.DataFrame({n: self.series(n, nrows) for n in names}, columns=names)
+
+
+def _parse_column(values: np.ndarray) -> pd.Series:
+    """Type inference of pandas' Excel reader (TextParser) for one column of cell values."""
+    cells = [["" if v is None else v] for v in values]
+    return TextParser(cells, header=None, skip_blank_lines=False).read()[0]
+
+
+# -----------------------------------------------------------------------------
+# Background ingestion
+# -----------------------------------------------------------------------------
+_mp = multiprocessing.get_context("spawn")
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+# Submitted conversions that haven't finished. Its own lock: shutdown() cancels (and so runs
+# the done callbacks) while holding _executor_lock
+_queued = 0
+_queued_lock = threading.Lock()
+
+
+def _convert_job(path: str) -> Optional[Dict[str, str]]:
+    if not os.path.exists(path):
+        return None  # the request that queued it is gone
+    digest = file_digest(path)
+    directory = convert(path, digest)
+    return {"digest": digest, "directory": directory} if directory else None
+
+
+def _job_done(future):
+    global _queued
+    with _queued_lock:
+        _queued -= 1
+
+
+def ingest(paths: List[str]) -> Dict[str, Any]:
+    """
+    Start converting each .xlsx in a background process; returns {path: future}.
+    Paths past COLUMNAR_MAX_QUEUED pending conversions are left out.
+    """
+    global _executor, _queued
+    if not COLUMNAR_STORE:
+        return {}
+    paths = [path for path in paths if zipfile.is_zipfile(path)]
+    ingestion = {}
+    with _executor_lock:
+        if _executor is None and paths:
+            _executor = ProcessPoolExecutor(max_workers=max(1, COLUMNAR_WORKERS), mp_context=_mp)
+        for path in paths:
+            if path in ingestion:
+                continue
+            with _queued_lock:
+                if _queued >= COLUMNAR_MAX_QUEUED:
+                    logger.info(f"🧊 Columnar queue full - {os.path.basename(path)} will be read from the .xlsx")
+                    continue
+                _queued += 1
+            ingestion[path] = _executor.submit(_convert_job, path)
+            ingestion[path].add_done_callback(_job_done)
+    return ingestion
+
+
+def wait(ingestion: Dict[str, Any], timeout: float = COLUMNAR_WAIT_SECONDS) -> Dict[str, str]:
+    """{path: store directory} for the conversions that finish within timeout."""
+    if not ingestion:
+        return {}
+    wait_futures(list(ingestion.values()), timeout=timeout)
+    stores = {}
+    for path, future in ingestion.items():
+        if not future.done():
+            logger.info(f"🧊 Columnar store for {os.path.basename(path)} not ready - reading the .xlsx")
+            continue
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.warning(f"⚠️ Columnar conversion failed for {path}: {e}")
+            continue
+        if result:
+            stores[path] = result["directory"]
+    return stores
+
+
+def lookup(paths: List[str]) -> Dict[str, str]:
+    """{path: store directory} for paths whose content has already been converted."""
+    if not COLUMNAR_STORE:
+        return {}
+    stores = {}
+    for path in paths:
+        try:
+            store = open_store(file_digest(path))
+        except OSError:
+            continue
+        if store is not None:
+            stores[path] = store.directory
+    return stores
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+# -----------------------------------------------------------------------------
+# pd.read_excel stand-in for the sandbox
+# -----------------------------------------------------------------------------
+_stores: Dict[str, str] = {}
+_read_stats = {"columnar": 0, "fallback": 0}
+_original_read_excel = None
+
+
+def set_stores(stores: Optional[Dict[str, str]]):
+    """Map file paths (as the script will open them) to store directories for the next run."""
+    _stores.clear()
+    _stores.update({os.path.realpath(p): d for p, d in (stores or {}).items()})
+    _read_stats.update(columnar=0, fallback=0)
+
+
+def read_stats() -> Dict[str, int]:
+    return dict(_read_stats)
+
+
+def read_excel(io, sheet_name=0, **kwargs):
+    """pd.read_excel, served from the columnar store when the file has one and the arguments allow."""
+    directory = None
+    if isinstance(io, (str, os.PathLike)) and _stores:
+        directory = _stores.get(os.path.realpath(os.fspath(io)))
+    if (
+        directory is not None
+        and set(kwargs) <= _READ_EXCEL_ARGS
+        and kwargs.get("header", 0) == 0
+        and kwargs.get("engine") in _READ_EXCEL_ENGINES
+    ):
+        try:
+            frames = _read_from_store(io, directory, sheet_name, kwargs)
+            _read_stats["columnar"] += 1
+            return frames
+        except Exception:
+            pass  # whatever the store can't answer, the file can
+    if directory is not None:
+        _read_stats["fallback"] += 1
+    return _original_read_excel(io, sheet_name=sheet_name, **kwargs)
+
+
+def _read_from_store(io, directory: str, sheet_name: Any, kwargs: Dict[str, Any]):
+    store = ColumnarStore(directory)
+    usecols, nrows = kwargs.get("usecols"), kwargs.get("nrows")
+    if usecols is not None and not isinstance(usecols, (list, tuple)):
+        raise TypeError("usecols")
+    if nrows is not None and not (isinstance(nrows, int) and nrows >= 0):
+        raise TypeError("nrows")
+
+    def one(key):
+        sheet = store.sheet(key)
+        # nrows=0 has its own corner cases in pandas, and is cheap to read anyway
+        if not sheet.meta["exact_header"] or nrows == 0:
+            return _original_read_excel(io, sheet_name=key, **kwargs)
+        return sheet.frame(list(usecols) if usecols is not None else None, nrows)
+
+    if sheet_name is None:
+        return {name: one(name) for name in store.sheet_names}
+    if isinstance(sheet_name, list):
+        return {key: one(key) for key in sheet_name}
+    return one(sheet_name)
+
+
+def install_read_excel():
+    """Replace pandas.read_excel with read_excel() for the life of this process."""
+    global _original_read_excel
+    if _original_read_excel is None:
+        _original_read_excel = pd.read_excel
+        pd.read_excel = read_excel
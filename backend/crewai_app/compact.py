@@ -0,0 +1,304 @@
+"""
+Token-budgeted rendering of inspection results for the LLM.
+
+inspect_files() returns a rich dict; the agents only need enough of it to
+write correct code. This module encodes it as:
+
+- "json":    the full dict, pretty-printed (the original tool output)
+- "compact": minified JSON with columns and preview as positional arrays,
+             sample values dropped where the preview already shows them, and
+             long cell strings cut short
+- "table":   pipe-separated text, the smallest encoding
+
+If the output is over `token_budget`, detail is removed in steps - preview
+rows, sheet previews, cell length, per-column detail and finally the number
+of columns listed - until it fits. The emitted text always reports its
+estimated token count and which steps were applied.
+"""
+import os
+import json
+from typing import Any, Dict, List, Optional
+
+from .inspection import NumpyEncoder
+
+# -----------------------------------------------------------------------------
+# Output settings (override via env or per tool call)
+# -----------------------------------------------------------------------------
+# "json" keeps the original tool output; deployments opt in to "compact" or "table"
+INSPECTOR_OUTPUT_FORMAT = os.getenv("INSPECTOR_OUTPUT_FORMAT", "json")
+INSPECTOR_TOKEN_BUDGET = int(os.getenv("INSPECTOR_TOKEN_BUDGET", "8000"))  # 0 = no budget
+INSPECTOR_MAX_CELL_CHARS = int(os.getenv("INSPECTOR_MAX_CELL_CHARS", "80"))
+
+OUTPUT_FORMATS = ("json", "compact", "table")
+
+# Roughly 4 characters per token for English text, JSON and code
+CHARS_PER_TOKEN = 4
+
+# Degradation steps, least to most lossy. Each level overrides the previous one.
+_LEVELS: List[Dict[str, Any]] = [
+    {"name": "full", "preview_rows": 5, "cell_chars": None, "sheet_preview": True,
+     "sheet_columns": True, "profile_samples": 5, "column_detail": True, "max_columns": None},
+    {"name": "preview_rows=3", "preview_rows": 3, "cell_chars": 40, "profile_samples": 3},
+    {"name": "no_sheet_previews", "preview_rows": 2, "cell_chars": 24, "sheet_preview": False, "profile_samples": 0},
+    {"name": "no_sheet_columns", "preview_rows": 1, "cell_chars": 16, "sheet_columns": False},
+    {"name": "no_preview", "preview_rows": 0, "column_detail": False, "max_columns": 200},
+    {"name": "max_columns=60", "max_columns": 60},
+    {"name": "max_columns=20", "max_columns": 20},
+]
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _levels():
+    """Yield the cumulative settings for each degradation level."""
+    settings: Dict[str, Any] = {}
+    for level in _LEVELS:
+        settings = {**settings, **level}
+        yield dict(settings)
+
+
+def _cell(value: Any, limit: Optional[int]) -> Any:
+    if isinstance(value, str) and limit and len(value) > limit:
+        return value[:limit - 1] + "…"
+    return value
+
+
+def _row(record: Dict[str, Any], names: List[str], limit: Optional[int]) -> List[Any]:
+    return [_cell(record.get(name, ""), limit) for name in names]
+
+
+# -----------------------------------------------------------------------------
+# Compact dict (shared by the "compact" and "table" encodings)
+# -----------------------------------------------------------------------------
+def _compact_file(file_result: Dict[str, Any], s: Dict[str, Any]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {"path": file_result.get("original_path"), "status": file_result.get("status")}
+    resolved = file_result.get("resolved_path")
+    if resolved and resolved != out["path"]:
+        out["resolved_path"] = resolved
+    # Error messages are listed once, in the top-level "errors"
+    if file_result.get("status") != "success":
+        return out
+
+    out["metadata"] = file_result.get("metadata", {})
+    limit = s["cell_chars"]
+
+    columns = file_result.get("columns", [])
+    shown = columns if s["max_columns"] is None else columns[:s["max_columns"]]
+    names = [c["name"] for c in shown]
+    if s["column_detail"]:
+        out["columns"] = [[c["name"], c["dtype"], c.get("non_null_count")] for c in shown]
+    else:
+        out["columns"] = [[c["name"], c["dtype"]] for c in shown]
+    if len(shown) < len(columns):
+        out["columns_omitted"] = len(columns) - len(shown)
+
+    preview = file_result.get("preview", [])[:s["preview_rows"]]
+    if preview:
+        out["preview"] = [_row(r, names, limit) for r in preview]
+    # sample_values are the first preview rows; only keep them when the preview is gone
+    elif s["column_detail"]:
+        out["samples"] = {c["name"]: [_cell(v, limit) for v in c.get("sample_values", [])] for c in shown}
+
+    # A single sheet is fully described by metadata/columns/preview
+    sheets = file_result.get("sheets") or []
+    if len(sheets) > 1:
+        out["sheets"] = [_compact_sheet(sheet, s) for sheet in sheets]
+
+    profile = file_result.get("profile")
+    if profile:
+        out["profile"] = _compact_profile(profile, s)
+    return out
+
+
+def _compact_sheet(sheet: Dict[str, Any], s: Dict[str, Any]) -> Dict[str, Any]:
+    if sheet.get("skipped"):
+        return {"name": sheet["name"], "skipped": True}
+    out = {
+        "name": sheet["name"],
+        "rows": sheet.get("rows"),
+        "cols": sheet.get("column_count"),
+        "source": sheet.get("row_count_source"),
+    }
+    # The first sheet's columns and preview are already at file level
+    if sheet.get("index") == 0:
+        return out
+    columns = sheet.get("columns", [])
+    if s["max_columns"] is not None:
+        columns = columns[:s["max_columns"]]
+    if s["sheet_columns"]:
+        out["columns"] = [[c["name"], c["dtype"]] for c in columns]
+    if s["sheet_preview"] and sheet.get("preview"):
+        names = [c["name"] for c in columns]
+        out["preview"] = [_row(r, names, s["cell_chars"]) for r in sheet["preview"]]
+    return out
+
+
+def _compact_profile(profile: Dict[str, Any], s: Dict[str, Any]) -> Dict[str, Any]:
+    if "error" in profile:
+        return profile
+    out = {k: profile.get(k) for k in ("rows_profiled", "complete", "stopped_by")}
+    columns = profile.get("columns", [])
+    if s["max_columns"] is not None:
+        columns = columns[:s["max_columns"]]
+    out["columns"] = [
+        [
+            c["name"], c["null_rate"], c["distinct_approx"],
+            _cell(c["min"], s["cell_chars"]), _cell(c["max"], s["cell_chars"]), c["types"],
+            [_cell(v, s["cell_chars"]) for v in c["sample_values"][:s["profile_samples"]]],
+        ]
+        for c in columns
+    ]
+    return out
+
+
+def _compact(results: Dict[str, Any], s: Dict[str, Any]) -> Dict[str, Any]:
+    out = {
+        "success": results.get("success"),
+        "files_inspected": results.get("files_inspected"),
+        "errors": results.get("errors", []),
+        "fields": {
+            "columns": ["name", "dtype", "non_null_count"] if s["column_detail"] else ["name", "dtype"],
+            "preview": "rows in column order",
+        },
+        "files": [_compact_file(f, s) for f in results.get("files", [])],
+    }
+    if any("profile" in f for f in out["files"]):
+        out["fields"]["profile"] = ["name", "null_rate", "distinct_approx", "min", "max", "types", "sample"]
+    return out
+
+
+# -----------------------------------------------------------------------------
+# Text table encoding
+# -----------------------------------------------------------------------------
+def _text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return str(value).lower()
+    if not isinstance(value, str):
+        value = json.dumps(value, cls=NumpyEncoder, ensure_ascii=False)
+    return value.replace("|", "/").replace("\r", " ").replace("\n", " ")
+
+
+def _table(data: Dict[str, Any]) -> str:
+    lines = [f"success={_text(data['success'])} files_inspected={data['files_inspected']} errors={len(data['errors'])}"]
+    lines.extend(f"error: {_text(e)}" for e in data["errors"])
+
+    for n, f in enumerate(data["files"], 1):
+        lines.append(f"## FILE {n}: {f['path']} [{f['status']}]")
+        if f.get("resolved_path"):
+            lines.append(f"resolved_path: {f['resolved_path']}")
+        if "metadata" not in f:
+            continue
+        m = f["metadata"]
+        lines.append(
+            f"format={m.get('format', 'xlsx')} rows={m.get('rows')} columns={m.get('columns')} "
+            f"sheets={m.get('sheet_count', 1)} size={m.get('file_size')} "
+            f"row_count_source={m.get('row_count_source', 'preview')}"
+        )
+        if m.get("read_options"):
+            lines.append("read_options: " + " ".join(f"{k}={v!r}" for k, v in m["read_options"].items()))
+        lines.append("columns: " + " | ".join(
+            f"{_text(c[0])}:{c[1]}" + (f"({c[2]})" if len(c) > 2 else "") for c in f["columns"]
+        ))
+        if f.get("columns_omitted"):
+            lines.append(f"(+{f['columns_omitted']} more columns not listed)")
+        if f.get("preview"):
+            lines.append("preview:")
+            lines.append(" | ".join(_text(c[0]) for c in f["columns"]))
+            lines.extend(" | ".join(_text(v) for v in row) for row in f["preview"])
+        for name, values in (f.get("samples") or {}).items():
+            lines.append(f"sample {_text(name)}: " + ", ".join(_text(v) for v in values))
+        for sheet in f.get("sheets", []):
+            if sheet.get("skipped"):
+                lines.append(f"- sheet {sheet['name']}: not indexed")
+                continue
+            lines.append(f"- sheet {sheet['name']}: {sheet['rows']} rows x {sheet['cols']} cols ({sheet['source']})")
+            if sheet.get("columns"):
+                lines.append("  columns: " + " | ".join(f"{_text(c[0])}:{c[1]}" for c in sheet["columns"]))
+            for row in sheet.get("preview", []):
+                lines.append("  " + " | ".join(_text(v) for v in row))
+        profile = f.get("profile")
+        if profile:
+            if "error" in profile:
+                lines.append(f"profile: error {profile['error']}")
+                continue
+            lines.append(
+                f"profile: rows={profile['rows_profiled']} complete={_text(profile['complete'])}"
+                + (f" stopped_by={profile['stopped_by']}" if profile.get("stopped_by") else "")
+            )
+            for name, null_rate, distinct, lo, hi, types, sample in profile["columns"]:
+                line = f"- {_text(name)}: null={null_rate} distinct~{distinct} min={_text(lo)} max={_text(hi)} types=" + ",".join(
+                    f"{k}:{v}" for k, v in types.items()
+                )
+                if sample:
+                    line += " sample=" + ", ".join(_text(v) for v in sample)
+                lines.append(line)
+    return "\n".join(lines)
+
+
+# -----------------------------------------------------------------------------
+# Public entry point
+# -----------------------------------------------------------------------------
+def _encode(results: Dict[str, Any], output_format: str, s: Dict[str, Any], report: Dict[str, Any]) -> str:
+    data = _compact(results, s)
+    if output_format == "table":
+        body = _table(data)
+        trailer = f"# output: format=table estimated_tokens={report['estimated_tokens']}"
+        if report.get("budget"):
+            trailer += f" budget={report['budget']}"
+        if report.get("degraded"):
+            trailer += " degraded=" + ",".join(report["degraded"])
+        if report.get("over_budget"):
+            trailer += " over_budget=true"
+        return f"{body}\n{trailer}"
+    data["output"] = report
+    return json.dumps(data, cls=NumpyEncoder, separators=(",", ":"), ensure_ascii=False)
+
+
+def _render(results: Dict[str, Any], output_format: str, s: Dict[str, Any], report: Dict[str, Any]) -> str:
+    """_encode() with report["estimated_tokens"] set to the size of the text it appears in."""
+    text = _encode(results, output_format, s, report)
+    # The count is part of the text, so re-render until it stops changing (one extra digit at most)
+    for _ in range(3):
+        tokens = estimate_tokens(text)
+        if tokens == report["estimated_tokens"]:
+            break
+        report["estimated_tokens"] = tokens
+        text = _encode(results, output_format, s, report)
+    return text
+
+
+def render_inspection(
+    results: Dict[str, Any],
+    output_format: Optional[str] = None,
+    token_budget: Optional[int] = None,
+) -> str:
+    """Encode inspect_files() results for the LLM in the given format and token budget."""
+    output_format = (output_format or INSPECTOR_OUTPUT_FORMAT).lower()
+    if output_format not in OUTPUT_FORMATS:
+        output_format = "compact"
+    budget = INSPECTOR_TOKEN_BUDGET if token_budget is None else token_budget
+
+    # Input errors (no file list) have no files to shrink
+    if output_format == "json" or "files" not in results:
+        return json.dumps(results, indent=2, cls=NumpyEncoder)
+
+    degraded: List[str] = []
+    text = ""
+    for s in _levels():
+        if s["cell_chars"] is None:
+            s["cell_chars"] = INSPECTOR_MAX_CELL_CHARS
+        if s["name"] != "full":
+            degraded.append(s["name"])
+        report: Dict[str, Any] = {"format": output_format, "estimated_tokens": 0, "budget": budget or None}
+        if degraded:
+            report["degraded"] = list(degraded)
+        text = _render(results, output_format, s, report)
+        if not budget or report["estimated_tokens"] <= budget:
+            return text
+
+    report["over_budget"] = True
+    return _render(results, output_format, s, report)
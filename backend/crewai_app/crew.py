@@ -1,14 +1,26 @@
 import os
 import yaml
 import logging
+import threading
 from typing import Any, Dict
 
 from crewai import Agent, Crew, Process, Task, LLM
 from crewai.project import CrewBase, agent, crew, task
+from backend.log_config import CREW_VERBOSE
 from .custom_tool import excel_data_inspector_tool
+from .llm_governor import GovernedLLM
+from .llm_provider import LLMSettings, llm_settings
 
 logger = logging.getLogger(__name__)
 
+# LLM clients are stateless between calls, so one per provider setting (model, key,
+# endpoint) is shared by every agent and crew in the process; its calls go through llm_governor
+_llm_cache: Dict[LLMSettings, LLM] = {}
+_llm_lock = threading.Lock()
+
+# Stream completions so /transform/stream can forward tokens as they arrive (0 = one response per call)
+LLM_STREAM = os.getenv("LLM_STREAM", "1").lower() in ("1", "true", "yes")
+
 @CrewBase
 class CsvOrganiser:
     """CsvOrganiser crew - loads configs from YAML files and creates agents/tasks."""
@@ -16,14 +28,17 @@ class CsvOrganiser:
     agents_config_path: str = os.path.join(os.path.dirname(__file__), "config", "agents.yaml")
     tasks_config_path: str = os.path.join(os.path.dirname(__file__), "config", "tasks.yaml")
 
-    def __init__(self):
+    def __init__(self, preinspected: bool = False):
+        # preinspected: crewmain.run inspects the files itself and passes the result
+        # as the {inspection} input, so the generator needs no tool call
+        self.preinspected = preinspected
         self.agents_config = self._load_yaml(self.agents_config_path) or {}
         self.tasks_config = self._load_yaml(self.tasks_config_path) or {}
         logger.info("CsvOrganiser initialized with agents/tasks configs")
 
-        # 🔎 Debug logging of YAML
-        logger.debug(f"Loaded agents config: {self.agents_config}")
-        logger.debug(f"Loaded tasks config: {self.tasks_config}")
+        # 🔎 Debug logging of YAML (formatted only when DEBUG is on for this logger)
+        logger.debug("Loaded agents config: %s", self.agents_config)
+        logger.debug("Loaded tasks config: %s", self.tasks_config)
 
     def _load_yaml(self, path: str) -> Dict[str, Any]:
         if not os.path.exists(path):
@@ -44,8 +59,8 @@ class CsvOrganiser:
             role=agent_conf.get("role", "Data Analyst"),
             goal=agent_conf.get("goal", "Generate scripts from ACTUAL Excel files or return clear errors if files are invalid."),
             backstory=agent_conf.get("backstory", "You work ONLY with actual file data from JSON inspection. You return clear errors when files cannot be processed."),
-            verbose=True,
-            tools=[excel_data_inspector_tool],
+            verbose=CREW_VERBOSE,
+            tools=[] if self.preinspected else [excel_data_inspector_tool],
             llm=self._get_llm(),
             max_iter=agent_conf.get("max_iter", 3),
             max_execution_time=600,
@@ -70,7 +85,7 @@ class CsvOrganiser:
             role=agent_conf.get("role", "Reviewer"),
             goal=agent_conf.get("goal", "Check the generated script for accuracy using JSON inspection data."),
             backstory=agent_conf.get("backstory", "You validate correctness of generated scripts against JSON file structures."),
-            verbose=True,
+            verbose=CREW_VERBOSE,
             llm=self._get_llm(),
             max_iter=agent_conf.get("max_iter", 2),
             max_execution_time=600,
@@ -82,36 +97,39 @@ class CsvOrganiser:
     def _get_llm(self):
         llm_config = self.agents_config.get("default_llm", {}) or {}
 
-        # Get API key from env or config
-        env_api_key = os.getenv("GEMINI_API_KEY")
-        final_api_key = env_api_key
+        # Provider, model, key and endpoint from LLM_PROVIDER and friends (see llm_provider.py)
+        settings = llm_settings(llm_config.get("model"))
+        logger.debug(f"🔑 API Key ({settings.key_source}): {'SET' if settings.api_key else 'MISSING'}")
 
-        logger.info(f"🔑 Env API Key: {'SET' if env_api_key else 'MISSING'}")
-        logger.info(f"🔑 Final API Key: {'SET' if final_api_key else 'MISSING'}")
+        with _llm_lock:
+            cached = _llm_cache.get(settings)
+            if cached is not None:
+                return cached
 
-        model = (
-            llm_config.get("model")
-            or os.getenv("LLM_MODEL")
-            or "gemini/gemini-2.5-flash"
-        )
+            if not settings.api_key:
+                logger.warning(f"❌ {settings.key_source} not found!")
 
-        if "/" not in model and model.startswith("gemini"):
-            model = f"gemini/{model}"
+            logger.info(f"🔑 Using API Key: {settings.api_key[:10]}..." if settings.api_key else "❌ MISSING")
+            logger.info(f"🤖 Using Model: {settings.model} ({settings.provider}"
+                        + (f" at {settings.base_url})" if settings.base_url else ")"))
 
-        if not final_api_key:
-            logger.warning("❌ GEMINI_API_KEY not found!")
-        
-        logger.info(f"🔑 Using API Key: {final_api_key[:10]}..." if final_api_key else "❌ MISSING")
-        logger.info(f"🤖 Using Model: {model}")
+            llm = GovernedLLM(
+                model=settings.model,
+                api_key=settings.api_key,
+                base_url=settings.base_url,
+                stream=LLM_STREAM,
+            )
+            _llm_cache[settings] = llm
+            return llm
 
-        return LLM(
-            model=model,
-            api_key=final_api_key,   # ✅ USE final_api_key
-        )
+    def _task_conf(self, name: str) -> Dict[str, Any]:
+        if self.preinspected:
+            return self.tasks_config.get(f"{name}_preinspected") or self.tasks_config.get(name, {})
+        return self.tasks_config.get(name, {})
 
     @task
     def script_generation_task(self) -> Task:
-        task_conf = self.tasks_config.get("script_generation_task", {})
+        task_conf = self._task_conf("script_generation_task")
         logger.info(f"📝 Creating script_generation_task with JSON inspection requirement")
         return Task(
             description=task_conf.get("description", "Generate a draft script from Excel files using JSON inspection."),
@@ -122,7 +140,7 @@ class CsvOrganiser:
 
     @task
     def validation_task(self) -> Task:
-        task_conf = self.tasks_config.get("validation_task", {})
+        task_conf = self._task_conf("validation_task")
         logger.info(f"📝 Creating validation_task with JSON-aware validation")
         return Task(
             description=task_conf.get("description", "Validate the generated script for accuracy against JSON inspection data."),
@@ -132,6 +150,40 @@ class CsvOrganiser:
             execution_timeout=900,
         )
 
+    def static_validation_task(self) -> Task:
+        """
+        Validator-only task for the split flow: fixes a generated script given
+        the static check findings. Not a @task, so crew() doesn't include it.
+        """
+        task_conf = self.tasks_config.get("static_validation_task", {})
+        return Task(
+            description=task_conf.get("description", "Fix these problems in the script:\n{findings}\n\nScript:\n{script}"),
+            expected_output=task_conf.get("expected_output", "A validated final Python script."),
+            agent=self.validator(),
+            output_file="final_script.py",
+            execution_timeout=900,
+        )
+
+    def generation_crew(self) -> Crew:
+        """script_generator only - its output goes to the static check instead of the validator."""
+        return Crew(
+            agents=[self.script_generator()],
+            tasks=[self.script_generation_task()],
+            process=Process.sequential,
+            verbose=CREW_VERBOSE,
+            max_rounds=1,
+        )
+
+    def validation_crew(self) -> Crew:
+        """validator only, run when the static check finds problems."""
+        return Crew(
+            agents=[self.validator()],
+            tasks=[self.static_validation_task()],
+            process=Process.sequential,
+            verbose=CREW_VERBOSE,
+            max_rounds=1,
+        )
+
     @crew
     def crew(self) -> Crew:
         """Creates the CsvOrganiser crew"""
@@ -139,6 +191,6 @@ class CsvOrganiser:
             agents=getattr(self, "agents", []),
             tasks=getattr(self, "tasks", []),
             process=Process.sequential,
-            verbose=True,
+            verbose=CREW_VERBOSE,
             max_rounds=1,
         )
\ No newline at end of file
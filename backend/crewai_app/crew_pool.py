@@ -0,0 +1,194 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from crewai import Crew
+from crewai.agents.agent_builder.utilities.base_token_process import TokenProcess
+
+from .crew import CsvOrganiser
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Crew pool settings (override via env)
+# -----------------------------------------------------------------------------
+# Idle crews kept for reuse; busier moments build extra crews that are dropped afterwards
+CREW_POOL_SIZE = int(os.getenv("CREW_POOL_SIZE", "4"))
+# Re-stat agents.yaml / tasks.yaml on every checkout and rebuild crews when they change
+CREW_CONFIG_RELOAD = os.getenv("CREW_CONFIG_RELOAD", "1").lower() in ("1", "true", "yes")
+# Default for requests that don't choose: inspect in crewmain.run and pass the result to the
+# tasks (1), or let the generator agent call the inspector tool itself (0)
+CREW_PREINSPECT = os.getenv("CREW_PREINSPECT", "1").lower() in ("1", "true", "yes")
+# Default for requests that don't choose: check the generated script statically and only run
+# the LLM validator when that finds problems (1), or always run generator + validator (0)
+CREW_STATIC_CHECK = os.getenv("CREW_STATIC_CHECK", "1").lower() in ("1", "true", "yes")
+# Let concurrent requests with the same file contents, prompt and options share one crew run
+CREW_COALESCE = os.getenv("CREW_COALESCE", "1").lower() in ("1", "true", "yes")
+
+# Crew kinds: "full" = generator + validator, "generate" = generator only, "validate" = validator only
+CREW_KINDS = ("full", "generate", "validate")
+
+
+def _default_factory() -> Crew:
+    return CsvOrganiser().crew()
+
+
+def _factory(kind: str, preinspect: bool) -> Callable[[], Crew]:
+    def build() -> Crew:
+        organiser = CsvOrganiser(preinspected=preinspect)
+        if kind == "generate":
+            return organiser.generation_crew()
+        if kind == "validate":
+            return organiser.validation_crew()
+        return organiser.crew()
+    return build
+
+
+class CrewPool:
+    """
+    Prebuilt CsvOrganiser crews, reused across requests.
+
+    Crew.kickoff() writes the request's inputs into the crew's tasks, so a
+    crew is checked out by one request at a time. Building one re-reads the
+    YAML, creates agents, tasks and the LLM client; with the pool that only
+    happens at warm-up, when traffic exceeds the idle crews, or when the
+    config files change on disk.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Crew] = _default_factory,
+        max_idle: int = CREW_POOL_SIZE,
+        config_paths: Optional[List[str]] = None,
+        reload: bool = CREW_CONFIG_RELOAD,
+    ):
+        self.factory = factory
+        self.max_idle = max(0, max_idle)
+        self.config_paths = config_paths or [
+            CsvOrganiser.agents_config_path,
+            CsvOrganiser.tasks_config_path,
+        ]
+        self.reload = reload
+        self._idle: List[Crew] = []
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._stamp = self._config_stamp()
+        self.builds = 0
+        self.reuses = 0
+
+    # -------------------------------------------------------------------------
+    # Config change detection
+    # -------------------------------------------------------------------------
+    def _config_stamp(self) -> Tuple:
+        stamp = []
+        for path in self.config_paths:
+            try:
+                st = os.stat(path)
+                stamp.append((path, st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamp.append((path, None, None))
+        return tuple(stamp)
+
+    def _check_reload(self):
+        """Drop idle crews if the YAML changed; crews in use are discarded on return."""
+        if not self.reload:
+            return
+        stamp = self._config_stamp()
+        with self._lock:
+            if stamp == self._stamp:
+                return
+            self._stamp = stamp
+            self._generation += 1
+            dropped = len(self._idle)
+            self._idle.clear()
+        logger.info(f"♻️ Crew config changed on disk - dropped {dropped} idle crews, rebuilding on demand")
+
+    # -------------------------------------------------------------------------
+    # Checkout / return
+    # -------------------------------------------------------------------------
+    def _build(self) -> Crew:
+        started = time.perf_counter()
+        crew = self.factory()
+        with self._lock:
+            self.builds += 1
+        logger.info(f"🏗️ Built crew in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return crew
+
+    def warm(self, count: Optional[int] = None):
+        """Build crews up front so the first requests don't pay for it."""
+        count = self.max_idle if count is None else min(count, self.max_idle)
+        self._check_reload()
+        with self._lock:
+            missing = count - len(self._idle)
+            generation = self._generation
+        built = [self._build() for _ in range(max(0, missing))]
+        with self._lock:
+            if generation == self._generation:
+                self._idle.extend(built[: self.max_idle - len(self._idle)])
+        logger.info(f"🏗️ Crew pool warm: {len(self._idle)} idle crews")
+
+    def acquire(self) -> Tuple[Crew, int]:
+        """Take a crew for exclusive use; hand it back with release()."""
+        self._check_reload()
+        with self._lock:
+            crew = self._idle.pop() if self._idle else None
+            generation = self._generation
+            if crew is not None:
+                self.reuses += 1
+        if crew is None:
+            crew = self._build()
+        _reset_run_state(crew)
+        return crew, generation
+
+    def release(self, crew: Crew, generation: int):
+        with self._lock:
+            if generation == self._generation and len(self._idle) < self.max_idle:
+                self._idle.append(crew)
+
+    @contextmanager
+    def checkout(self):
+        """Exclusive use of a crew for one kickoff."""
+        crew, generation = self.acquire()
+        try:
+            yield crew
+        finally:
+            self.release(crew, generation)
+
+    def stats(self):
+        with self._lock:
+            return {"idle": len(self._idle), "builds": self.builds, "reuses": self.reuses}
+
+
+def _reset_run_state(crew: Crew):
+    """Clear what a previous kickoff left on the crew's agents and tasks."""
+    for agent in crew.agents:
+        agent.tools_results = []        # every tool result of every run otherwise accumulates
+        agent._times_executed = 0       # retry counter, never reset by crewai
+        agent._token_process = TokenProcess()  # so usage_metrics cover this run only
+    for task in crew.tasks:
+        task.output = None
+
+
+_pools: Dict[Tuple[str, bool], CrewPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_crew_pool(preinspect: Optional[bool] = None, kind: Optional[str] = None) -> CrewPool:
+    """
+    Pool for a crew kind and inspection mode. Defaults: CREW_PREINSPECT, and
+    "generate" when CREW_STATIC_CHECK is on, else "full".
+    """
+    preinspect = CREW_PREINSPECT if preinspect is None else preinspect
+    kind = kind or ("generate" if CREW_STATIC_CHECK else "full")
+    if kind not in CREW_KINDS:
+        raise ValueError(f"Unknown crew kind: {kind}")
+    if kind == "validate":
+        preinspect = False  # the static validation task always gets {inspection}
+    with _pools_lock:
+        pool = _pools.get((kind, preinspect))
+        if pool is None:
+            pool = _pools[(kind, preinspect)] = CrewPool(factory=_factory(kind, preinspect))
+        return pool
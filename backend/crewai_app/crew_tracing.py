@@ -0,0 +1,204 @@
+"""
+Spans for what happens inside a crew kickoff: each task, each agent
+execution, each LLM call (one agent iteration) and each tool call.
+
+crewai runs agents on its own threads, where the request's trace context
+is not set, so the spans are built from crewai's event bus (start/finish
+event pairs) and routed to the request by agent id: trace_crew(crew) binds
+the current trace and span to that crew's agents for one kickoff. Spans
+are recorded in the `span` histogram even without a trace.
+
+LLM calls carry prompt_tokens / completion_tokens: the provider's usage
+as counted by crewai for the agent when the response reports it, otherwise
+estimated from the text (tokens_source says which).
+"""
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from crewai.events import crewai_event_bus
+from crewai.events.types.agent_events import (
+    AgentExecutionCompletedEvent,
+    AgentExecutionErrorEvent,
+    AgentExecutionStartedEvent,
+)
+from crewai.events.types.llm_events import LLMCallCompletedEvent, LLMCallFailedEvent, LLMCallStartedEvent
+from crewai.events.types.task_events import TaskCompletedEvent, TaskFailedEvent, TaskStartedEvent
+from crewai.events.types.tool_usage_events import ToolUsageErrorEvent, ToolUsageFinishedEvent, ToolUsageStartedEvent
+
+from backend.metrics import metrics
+from backend.tracing import current_span, current_trace, record
+from .compact import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class _Binding:
+    """Trace, parent span and open spans of one agent during one kickoff."""
+
+    def __init__(self, agent, trace, parent):
+        self.agent = agent
+        self.role = (agent.role or "").strip()
+        self.trace = trace
+        self.parent = parent
+        self.open: Dict[str, List[Dict[str, Any]]] = {}  # span name -> stack of starts
+        self.iterations = 0
+        self.lock = threading.Lock()
+
+    def start(self, name: str, **attrs):
+        with self.lock:
+            self.open.setdefault(name, []).append({"started": time.perf_counter(), **attrs})
+
+    def finish(self, name: str, **attrs):
+        with self.lock:
+            stack = self.open.get(name)
+            if not stack:
+                return
+            opened = stack.pop()
+        started = opened.pop("started")
+        record(
+            name, started, time.perf_counter() - started,
+            trace=self.trace, parent=self.parent, labels={"agent": self.role},
+            agent=self.role, **opened, **attrs,
+        )
+
+
+_bindings: Dict[str, _Binding] = {}
+_bindings_lock = threading.Lock()
+
+
+def _binding(agent_id: Any) -> Optional[_Binding]:
+    if agent_id is None:
+        return None
+    with _bindings_lock:
+        return _bindings.get(str(agent_id))
+
+
+@contextmanager
+def trace_crew(crew):
+    """Record the spans of `crew`'s agents under the current trace and span until the block exits."""
+    trace, parent = current_trace(), current_span()
+    bindings = {str(agent.id): _Binding(agent, trace, parent) for agent in crew.agents}
+    with _bindings_lock:
+        _bindings.update(bindings)
+    try:
+        yield
+    finally:
+        with _bindings_lock:
+            for agent_id, binding in bindings.items():
+                if _bindings.get(agent_id) is binding:
+                    del _bindings[agent_id]
+
+
+def _task_agent_id(task: Any) -> Optional[str]:
+    agent = getattr(task, "agent", None)
+    return getattr(agent, "id", None)
+
+
+def _task_name(task: Any) -> Optional[str]:
+    return getattr(task, "name", None)
+
+
+# -----------------------------------------------------------------------------
+# Event handlers
+# -----------------------------------------------------------------------------
+def _on_task_started(source, event: TaskStartedEvent):
+    binding = _binding(_task_agent_id(event.task))
+    if binding:
+        binding.start("task", task=_task_name(event.task))
+
+
+def _on_task_finished(source, event):
+    binding = _binding(_task_agent_id(event.task))
+    if binding:
+        binding.finish("task", status="failed" if isinstance(event, TaskFailedEvent) else "ok")
+
+
+def _on_agent_started(source, event: AgentExecutionStartedEvent):
+    binding = _binding(event.agent.id)
+    if binding:
+        binding.iterations = 0
+        binding.start("agent")
+
+
+def _on_agent_finished(source, event):
+    binding = _binding(event.agent.id)
+    if binding:
+        status = "failed" if isinstance(event, AgentExecutionErrorEvent) else "ok"
+        binding.finish("agent", status=status, iterations=binding.iterations)
+
+
+def _usage(agent) -> tuple:
+    process = getattr(agent, "_token_process", None)
+    return (getattr(process, "prompt_tokens", 0), getattr(process, "completion_tokens", 0))
+
+
+def _text_tokens(messages: Any) -> int:
+    if isinstance(messages, str):
+        return estimate_tokens(messages)
+    return sum(estimate_tokens(str(m.get("content") or "")) for m in messages or [] if isinstance(m, dict))
+
+
+def _on_llm_started(source, event: LLMCallStartedEvent):
+    binding = _binding(event.agent_id)
+    if binding:
+        binding.iterations += 1
+        binding.start(
+            "llm_call", iteration=binding.iterations,
+            _usage=_usage(binding.agent), _estimate=_text_tokens(event.messages),
+        )
+
+
+def _on_llm_finished(source, event):
+    binding = _binding(event.agent_id)
+    if binding is None:
+        return
+    with binding.lock:
+        stack = binding.open.get("llm_call") or [{}]
+        opened = stack[-1]
+        before, estimate = opened.pop("_usage", (0, 0)), opened.pop("_estimate", 0)
+    prompt, completion = (after - b for after, b in zip(_usage(binding.agent), before))
+    tokens_source = "usage"
+    if not (prompt or completion):
+        response = getattr(event, "response", None)
+        prompt, completion, tokens_source = estimate, estimate_tokens(str(response or "")), "estimate"
+    if isinstance(event, LLMCallFailedEvent):
+        binding.finish("llm_call", status="failed", error=str(event.error)[:200])
+        return
+    metrics.incr("llm.tokens", prompt, kind="prompt")
+    metrics.incr("llm.tokens", completion, kind="completion")
+    binding.finish("llm_call", status="ok", prompt_tokens=prompt, completion_tokens=completion, tokens_source=tokens_source)
+
+
+def _on_tool_started(source, event: ToolUsageStartedEvent):
+    binding = _binding(event.agent_id)
+    if binding:
+        binding.start("tool", tool=event.tool_name)
+
+
+def _on_tool_finished(source, event):
+    binding = _binding(event.agent_id)
+    if binding:
+        if isinstance(event, ToolUsageErrorEvent):
+            binding.finish("tool", status="failed")
+        else:
+            binding.finish("tool", status="ok", from_cache=bool(getattr(event, "from_cache", False)))
+
+
+for _event_type, _handler in (
+    (TaskStartedEvent, _on_task_started),
+    (TaskCompletedEvent, _on_task_finished),
+    (TaskFailedEvent, _on_task_finished),
+    (AgentExecutionStartedEvent, _on_agent_started),
+    (AgentExecutionCompletedEvent, _on_agent_finished),
+    (AgentExecutionErrorEvent, _on_agent_finished),
+    (LLMCallStartedEvent, _on_llm_started),
+    (LLMCallCompletedEvent, _on_llm_finished),
+    (LLMCallFailedEvent, _on_llm_finished),
+    (ToolUsageStartedEvent, _on_tool_started),
+    (ToolUsageFinishedEvent, _on_tool_finished),
+    (ToolUsageErrorEvent, _on_tool_finished),
+):
+    crewai_event_bus.register_handler(_event_type, _handler)
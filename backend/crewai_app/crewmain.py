@@ -6,11 +6,24 @@ from dotenv import load_dotenv
 dotenv_path = os.path.join(os.path.dirname(__file__), "..", "..", ".env")
 load_dotenv(dotenv_path)
 
+import time
 import warnings
 import traceback
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from .crew import CsvOrganiser
+from backend.tracing import span
+from .cache import file_digest, make_key
+from .crew_pool import CREW_COALESCE, CREW_PREINSPECT, CREW_STATIC_CHECK, get_crew_pool
+from .compact import render_inspection
+from .crew_tracing import trace_crew
+from .progress import listen, schema_summary
+from .custom_tool import inspect_files
+from .llm_governor import INTERACTIVE, crew_priority
+from .llm_provider import cache_tag, llm_settings
+from .script_cache import normalize_prompt, script_cache, script_cache_key, templatize, render
+from .singleflight import SingleFlight
+from .static_check import check_script, format_findings
 
 import logging
 
@@ -18,6 +31,12 @@ warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
 logger = logging.getLogger(__name__)
 
+# Crew checkout runs here while the request thread inspects the files
+_setup_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="crew-setup")
+
+# In-flight crew runs shared by identical concurrent requests
+crew_runs = SingleFlight("Crew")
+
 def _sanitize_output(result_obj):
     """
     Extract clean Python code from a CrewAI result.
@@ -32,9 +51,57 @@ def _sanitize_output(result_obj):
 
     return code.strip()
 
-def run(prompt: str, file_paths: list):
+def _kickoff(crew, inputs: dict, stage: str) -> str:
+    """
+    Run a crew and return its sanitized script; an agent's ERROR: reply is raised.
+    The kickoff is timed as span `stage`, with the crew's token totals, and its
+    tasks, agents, LLM and tool calls as child spans.
+    """
+    with span(stage) as attrs, trace_crew(crew):
+        # Pooled crews keep counting across kickoffs, so this run's usage is the difference
+        before = crew.calculate_usage_metrics()
+        output = crew.kickoff(inputs=inputs)
+        after = crew.calculate_usage_metrics()
+        attrs["prompt_tokens"] = after.prompt_tokens - before.prompt_tokens
+        attrs["completion_tokens"] = after.completion_tokens - before.completion_tokens
+    with span("sanitize_output"):
+        script = _sanitize_output(output)
+
+    # Check if the result is an error message
+    if script.strip().upper().startswith('ERROR:'):
+        logger.error(f"❌ Agent returned error: {script}")
+        raise Exception(script)
+    return script
+
+
+def run(
+    prompt: str,
+    file_paths: list,
+    use_cache: bool = True,
+    preinspect: bool = None,
+    static_check: bool = None,
+    on_event=None,
+    priority: str = INTERACTIVE,
+):
     """
     Entry point for the crew. Called from FastAPI (main.py).
+    With use_cache, a validated script previously generated for the same
+    schema and prompt is returned without running the crew; use_cache=False
+    forces a fresh crew run.
+    With preinspect (default CREW_PREINSPECT) the inspection done here is
+    passed to the tasks as {inspection}, so the generator writes code on its
+    first turn instead of calling the inspector tool; a failed inspection
+    stops the run before any LLM call. preinspect=False keeps the tool-call flow.
+    With static_check (default CREW_STATIC_CHECK) the generated script is
+    checked by static_check.check_script and the LLM validator only runs
+    when that reports errors; static_check=False always runs both agents.
+    on_event(kind, data), if given, is called as the run progresses:
+    "inspection" (schema summary), "cache_hit", "static_check" and the agent
+    and token events listed in progress.py.
+    priority ("interactive" or "batch") orders this run's LLM calls against
+    other requests' when llm_governor is queueing them.
+    With CREW_COALESCE, a request identical to one already running waits for
+    that run's script instead of starting another (see singleflight.py).
     """
     # Defensive checks
     if not isinstance(file_paths, list):
@@ -52,9 +119,42 @@ def run(prompt: str, file_paths: list):
         raise Exception(error_msg)
 
     # DEBUG: Check API key before crew execution
-    api_key = os.getenv("GEMINI_API_KEY")
-    logger.info(f"🔑 API Key before crew: {'LOADED' if api_key else 'MISSING'}")
+    settings = llm_settings()
+    logger.info(f"🔑 API Key before crew ({settings.provider}): {'LOADED' if settings.api_key else 'MISSING'}")
 
+    preinspect = CREW_PREINSPECT if preinspect is None else preinspect
+    static_check = CREW_STATIC_CHECK if static_check is None else static_check
+    if not CREW_COALESCE:
+        return _run_crew(prompt, file_paths, use_cache, preinspect, static_check, on_event, priority)
+
+    # Concurrent requests for the same file contents, prompt and options share one run.
+    # Its script comes back with placeholders for the paths, filled in with each caller's own.
+    key = make_key(
+        "run", [file_digest(path) for path in file_paths], normalize_prompt(prompt),
+        cache_tag(), use_cache, preinspect, static_check,
+    )
+    # A coalesced caller's span covers its wait; the run's own spans go to the leader's trace
+    with span("crew_run"):
+        template = crew_runs.do(
+            key,
+            lambda emit: templatize(
+                _run_crew(prompt, file_paths, use_cache, preinspect, static_check, emit, priority), file_paths
+            ),
+            on_event,
+        )
+    return render(template, file_paths)
+
+
+def _run_crew(
+    prompt: str,
+    file_paths: list,
+    use_cache: bool,
+    preinspect: bool,
+    static_check: bool,
+    on_event=None,
+    priority: str = INTERACTIVE,
+) -> str:
+    """Inspect, look up the script cache, and run the crew(s); see run()."""
     inputs = {
         "prompt": prompt,
         "files": file_paths,
@@ -62,21 +162,112 @@ def run(prompt: str, file_paths: list):
         "current_year": str(datetime.now().year),
     }
 
-    logger.info("Launching CsvOrganiser crew with inputs:")
+    logger.info(f"Launching CsvOrganiser crew ({'preinspected' if preinspect else 'inspector tool'} mode) with inputs:")
     logger.info("files (list): %s", inputs["files"])
 
+    # Check out a crew (a build if the pool is cold) in parallel with the inspection.
+    # It is only waited for once the script cache has missed.
+    pool = get_crew_pool(preinspect, kind="generate" if static_check else "full")
+    setup = _setup_executor.submit(pool.acquire)
     try:
-        result = CsvOrganiser().crew().kickoff(inputs=inputs)
-        script = _sanitize_output(result)
-        
-        # Check if the result is an error message
-        if script.strip().upper().startswith('ERROR:'):
-            logger.error(f"❌ Agent returned error: {script}")
-            raise Exception(script)
+        started = time.perf_counter()
+        with span("inspection", files=len(file_paths)) as attrs:
+            inspection = inspect_files(file_paths)
+            attrs["ok"] = bool(inspection.get("success"))
+        if on_event is not None:
+            on_event("inspection", schema_summary(inspection))
+
+        # Script cache: schema fingerprint + normalized prompt -> validated script.
+        # A bypass skips the lookup but still refreshes the entry with the new result.
+        cache_key = None
+        if inspection.get("success"):
+            cache_key = script_cache_key(inspection, prompt, cache_tag())
+            if use_cache:
+                with span("script_cache") as attrs:
+                    cached = script_cache.get(cache_key)
+                    attrs["hit"] = cached is not None
+                script_cache.log_stats()
+                if cached is not None:
+                    logger.info(f"⚡ Script cache hit ({cache_key[:12]}) - skipping crew execution")
+                    if on_event is not None:
+                        on_event("cache_hit", {"key": cache_key[:12]})
+                    return render(cached, file_paths)
+            else:
+                logger.info("Script cache bypassed for this request")
+
+        if preinspect:
+            if not inspection.get("success"):
+                errors = inspection.get("errors") or [inspection.get("error", "unknown error")]
+                error_msg = f"ERROR: File inspection failed - {'; '.join(errors)}"
+                logger.error(f"❌ {error_msg} (no LLM call made)")
+                raise Exception(error_msg)
+            inputs["inspection"] = render_inspection(inspection)
+
+        with span("crew_checkout"):
+            crew, _ = setup.result()
+        logger.info(f"⏱️ Inspection + crew setup: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        try:
+            with listen(crew, on_event), crew_priority(crew, priority):
+                script = _kickoff(crew, inputs, "generation")
+
+            if static_check:
+                script = _validate(script, inputs, inspection, file_paths, on_event, priority)
+
+            if cache_key is not None:
+                script_cache.put(cache_key, templatize(script, file_paths))
+
+            return script
             
+        except Exception as e:
+            error_details = traceback.format_exc()
+            logger.error(f"Error running crew: {str(e)}\n\n{error_details}")
+            raise Exception(f"An error occurred while running the crew: {str(e)}")
+    finally:
+        # A cache hit or failed inspection returns without waiting for the checkout:
+        # drop it if it hasn't started, otherwise hand the crew back when it is ready
+        if not setup.cancel():
+            setup.add_done_callback(lambda done: _return_crew(pool, done))
+
+
+def _return_crew(pool, setup) -> None:
+    try:
+        crew, generation = setup.result()
+    except Exception:
+        return  # the build failed - nothing to hand back
+    pool.release(crew, generation)
+
+
+def _validate(
+    script: str, inputs: dict, inspection: dict, file_paths: list, on_event=None, priority: str = INTERACTIVE
+) -> str:
+    """Static check of a generated script; the LLM validator runs only if it reports errors."""
+    started = time.perf_counter()
+    with span("static_check") as attrs:
+        report = check_script(script, inspection, file_paths)
+        attrs["ok"] = report["ok"]
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if on_event is not None:
+        on_event("static_check", {"ok": report["ok"], "findings": report["findings"]})
+    if report["ok"]:
+        logger.info(f"✅ Static check passed in {elapsed_ms:.1f} ms - skipping LLM validation")
+        for finding in report["findings"]:
+            logger.info(f"   {finding['severity']}: {finding['message']}")
         return script
-        
-    except Exception as e:
-        error_details = traceback.format_exc()
-        logger.error(f"Error running crew: {str(e)}\n\n{error_details}")
-        raise Exception(f"An error occurred while running the crew: {str(e)}")
\ No newline at end of file
+
+    findings = format_findings(report["findings"])
+    logger.info(f"🔎 Static check found problems in {elapsed_ms:.1f} ms - running LLM validator:\n{findings}")
+    validation_inputs = {
+        **inputs,
+        "script": script,
+        "findings": findings,
+        "inspection": inputs.get("inspection") or render_inspection(inspection),
+    }
+    with get_crew_pool(kind="validate").checkout() as validation_crew:
+        with listen(validation_crew, on_event), crew_priority(validation_crew, priority):
+            script = _kickoff(validation_crew, validation_inputs, "validation")
+
+    recheck = check_script(script, inspection, file_paths)
+    if not recheck["ok"]:
+        logger.warning(f"⚠️ Validated script still has static findings:\n{format_findings(recheck['findings'])}")
+    return script
@@ -1,33 +1,45 @@
 import os
-import pandas as pd
-import json
+import copy
 from crewai.tools import tool
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
 import tempfile
 
-import numpy as np
-
-# Add this custom JSON encoder function at the top of the file, after imports
-class NumpyEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, (np.integer, np.int64, np.int32)):
-            return int(obj)
-        elif isinstance(obj, (np.floating, np.float64, np.float32)):
-            return float(obj)
-        elif isinstance(obj, np.ndarray):
-            return obj.tolist()
-        elif pd.isna(obj):
-            return None
-        return super().default(obj)
+from .cache import file_digest
+from .compact import render_inspection
+from .inspection import INSPECT_NROWS, cache_key, inspection_cache
+from .inspection_pool import inspect_many
+from .profiling import PROFILE_MAX_ROWS, PROFILE_MAX_SECONDS
 
 logger = logging.getLogger(__name__)
 
-@tool("Excel Data Inspector Tool")
-def excel_data_inspector_tool(file_paths: List[str]) -> str:
+def _record_success(results: Dict[str, Any], file_result: Dict[str, Any], inspected: Dict[str, Any]):
+    file_result["status"] = "success"
+    # A copy: the cache keeps the same dict and hands it to every later hit
+    file_result.update(copy.deepcopy(inspected))
+    results["files_inspected"] += 1
+    logger.info(f"✅ Successfully inspected: {file_result['resolved_path']}")
+
+
+def _record_error(file_result: Dict[str, Any], error_msg: str):
+    logger.error(error_msg)
+    file_result["status"] = "error"
+    file_result["error"] = error_msg
+
+
+def inspect_files(
+    file_paths: List[str],
+    workers: Optional[int] = None,
+    profile: bool = False,
+    profile_max_rows: Optional[int] = None,
+    profile_max_seconds: Optional[float] = None,
+) -> Dict[str, Any]:
     """
-    Inspect each provided Excel file and return JSON structure.
-    CRITICAL: If files are not found, return explicit error to halt the process.
+    Inspect each provided Excel file and return the inspection results dict
+    (files / errors / success). Shared by the crew tool and crewmain.run.
+    Cache misses are parsed in parallel (see inspection_pool); results keep
+    the order of file_paths. `profile` adds a full-column profile per file,
+    bounded by the row/time budget.
     """
     results = {
         "files_inspected": 0,
@@ -37,10 +49,19 @@ def excel_data_inspector_tool(file_paths: List[str]) -> str:
     }
 
     if not file_paths or not isinstance(file_paths, list):
-        return json.dumps({"error": "A list of file paths must be provided.", "success": False})
+        return {"error": "A list of file paths must be provided.", "success": False}
 
     logger.info(f"🔍 Inspecting {len(file_paths)} files: {file_paths}")
 
+    params = {"nrows": INSPECT_NROWS}
+    if profile:
+        params.update(
+            profile=True,
+            profile_max_rows=PROFILE_MAX_ROWS if profile_max_rows is None else int(profile_max_rows),
+            profile_max_seconds=PROFILE_MAX_SECONDS if profile_max_seconds is None else float(profile_max_seconds),
+        )
+    to_inspect = []  # (file_result, digest) still needing a parse
+
     for path in file_paths:
         original_path = path
         resolved_path = None
@@ -81,50 +102,45 @@ def excel_data_inspector_tool(file_paths: List[str]) -> str:
             logger.error(error_msg)
             file_result["status"] = "not_found"
             file_result["error"] = error_msg
-            results["errors"].append(error_msg)
             results["files"].append(file_result)
             continue  # Continue to check other files
 
         file_result["resolved_path"] = resolved_path
+        results["files"].append(file_result)
 
         try:
-            logger.info(f"📖 Reading Excel file: {resolved_path}")
-            df = pd.read_excel(resolved_path, engine="openpyxl", nrows=10)
-            
-            # File metadata
-            file_result["status"] = "success"
-            file_result["metadata"] = {
-                "rows": df.shape[0],
-                "columns": df.shape[1],
-                "file_size": os.path.getsize(resolved_path) if os.path.exists(resolved_path) else 0
-            }
-            
-            # Column information
-            file_result["columns"] = [
-                {
-                    "name": str(col),
-                    "dtype": str(df[col].dtype),
-                    "non_null_count": df[col].count(),
-                    "sample_values": df[col].head(3).fillna('').tolist()
-                }
-                for col in df.columns
-            ]
-            
-            # Preview data
-            preview_data = df.head().where(pd.notna(df), None)
-            file_result["preview"] = preview_data.fillna('').to_dict('records')
-            
-            results["files_inspected"] += 1
-            logger.info(f"✅ Successfully inspected: {resolved_path}")
-
+            digest = file_digest(resolved_path)
         except Exception as e:
-            error_msg = f"❌ Error reading {resolved_path}: {str(e)}"
-            logger.exception(error_msg)
-            file_result["status"] = "error"
-            file_result["error"] = error_msg
-            results["errors"].append(error_msg)
+            _record_error(file_result, f"❌ Error reading {resolved_path}: {str(e)}")
+            continue
 
-        results["files"].append(file_result)
+        cached = inspection_cache.get(cache_key(digest, params))
+        if cached is not None:
+            logger.info(f"🗃️ Inspection cache hit for {resolved_path} ({digest[:12]})")
+            _record_success(results, file_result, cached)
+        else:
+            to_inspect.append((file_result, digest))
+
+    # Parse cache misses - fanned out over a process pool when there are several
+    if to_inspect:
+        for file_result, _ in to_inspect:
+            logger.info(f"📖 Reading Excel file: {file_result['resolved_path']}")
+        # The digest is passed along (not part of the cache key) so a columnar store can be found
+        outcomes = inspect_many(
+            [(fr["resolved_path"], {**params, "digest": digest}) for fr, digest in to_inspect], workers=workers
+        )
+
+        for (file_result, digest), (status, value) in zip(to_inspect, outcomes):
+            if status == "ok":
+                inspection_cache.put(cache_key(digest, params), value)
+                _record_success(results, file_result, value)
+            else:
+                _record_error(file_result, f"❌ Error reading {file_result['resolved_path']}: {value}")
+
+    # Errors in upload order, regardless of which files finished first
+    results["errors"] = [fr["error"] for fr in results["files"] if fr.get("error")]
+
+    inspection_cache.log_stats()
 
     # Set overall success based on whether any files were successfully inspected
     results["success"] = results["files_inspected"] > 0
@@ -134,4 +150,33 @@ def excel_data_inspector_tool(file_paths: List[str]) -> str:
     if not results["success"] and results["errors"]:
         logger.error("❌ NO files could be inspected. Halting process.")
     
-    return json.dumps(results, indent=2, cls=NumpyEncoder)
\ No newline at end of file
+    return results
+
+
+@tool("Excel Data Inspector Tool")
+def excel_data_inspector_tool(
+    file_paths: List[str],
+    profile: bool = False,
+    profile_max_rows: Optional[int] = None,
+    profile_max_seconds: Optional[float] = None,
+    output_format: Optional[str] = None,
+    token_budget: Optional[int] = None,
+) -> str:
+    """
+    Inspect each provided Excel file and return JSON structure.
+    CRITICAL: If files are not found, return explicit error to halt the process.
+    Set profile=True to scan every row of the first sheet and get, per column,
+    the null rate, approximate distinct count, min/max, type mix and a random
+    sample. profile_max_rows / profile_max_seconds cap that scan.
+    output_format is "json" (full pretty JSON, the default unless
+    INSPECTOR_OUTPUT_FORMAT says otherwise), "compact" (minified JSON, columns
+    and preview rows as arrays) or "table" (plain text); token_budget caps the
+    size of compact and table output, dropping detail until it fits.
+    """
+    results = inspect_files(
+        file_paths,
+        profile=profile,
+        profile_max_rows=profile_max_rows,
+        profile_max_seconds=profile_max_seconds,
+    )
+    return render_inspection(results, output_format=output_format, token_budget=token_budget)
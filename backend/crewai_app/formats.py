@@ -0,0 +1,213 @@
+"""
+Input formats other than .xlsx: detection and the fast inspection paths.
+
+detect_format() goes by the first bytes - a zip package is .xlsx, an OLE2
+compound file is .xls, "PAR1" is Parquet - and treats anything else as
+delimited text (tab-separated when the name says so). The extension alone
+is never trusted, so a CSV saved as "report.xlsx" still reads.
+
+Delimited files: sniff_delimited() works out the encoding (BOM, then
+UTF-8, then cp1252/latin-1) and delimiter from the first SNIFF_BYTES, and
+read_delimited() parses only the header and preview rows. The row count is
+exact when the whole file fit in the sample, otherwise estimated from the
+file size and the bytes per record sampled at both ends.
+
+Parquet: the row count and schema come from the footer metadata and the
+preview from the first row group, so the rest of the file is never read.
+Needs pyarrow, which is optional.
+
+Both report the pandas arguments they used as "read_options", which the
+crew passes on to pd.read_csv.
+"""
+import io
+import os
+import csv
+import codecs
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # optional - only needed for Parquet inputs
+    pq = None
+
+# Bytes sampled to sniff encoding/delimiter and estimate the row count
+SNIFF_BYTES = int(os.getenv("INSPECTOR_SNIFF_KB", "64")) * 1024
+
+DELIMITED = ("csv", "tsv")
+DELIMITERS = ",;\t|"
+FALLBACK_ENCODINGS = ("utf-8", "cp1252", "latin-1")
+
+_XLSX_MAGIC = b"PK\x03\x04"
+_XLS_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+_PARQUET_MAGIC = b"PAR1"
+_TAB_EXTENSIONS = (".tsv", ".tab")
+
+
+def detect_format(resolved_path: str) -> str:
+    """'xlsx', 'xls', 'parquet', 'csv' or 'tsv', from the file's first bytes."""
+    with open(resolved_path, "rb") as f:
+        head = f.read(8)
+    if head.startswith(_XLSX_MAGIC):
+        return "xlsx"
+    if head.startswith(_XLS_MAGIC):
+        return "xls"
+    if head.startswith(_PARQUET_MAGIC):
+        return "parquet"
+    return "tsv" if resolved_path.lower().endswith(_TAB_EXTENSIONS) else "csv"
+
+
+# -----------------------------------------------------------------------------
+# Delimited text
+# -----------------------------------------------------------------------------
+def _decode(raw: bytes, encoding: str, partial: bool) -> Optional[str]:
+    """raw decoded, allowing a multi-byte character cut off at the end of a sample; None if it isn't this encoding."""
+    try:
+        return raw.decode(encoding)
+    except UnicodeDecodeError as e:
+        if partial and e.start >= len(raw) - 3:
+            try:
+                return raw[:e.start].decode(encoding)
+            except UnicodeDecodeError:
+                return None
+        return None
+
+
+def _sniff_encoding(raw: bytes, partial: bool) -> Tuple[str, str]:
+    """(encoding, decoded sample)."""
+    if raw.startswith(codecs.BOM_UTF8):
+        candidates = ("utf-8-sig",)
+    elif raw.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        candidates = ("utf-16",)
+    else:
+        candidates = FALLBACK_ENCODINGS
+    for encoding in candidates:
+        text = _decode(raw, encoding, partial)
+        if text is not None:
+            return encoding, text
+    return "latin-1", raw.decode("latin-1")  # every byte is valid latin-1
+
+
+def _sniff_delimiter(text: str, fmt: str) -> str:
+    default = "\t" if fmt == "tsv" else ","
+    first_line = text.split("\n", 1)[0]
+    if fmt == "tsv" and "\t" in first_line:
+        return "\t"
+    try:
+        return csv.Sniffer().sniff(text, delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        # Sniffer wants a consistent count per line; settle for the most common candidate in the header
+        counts = {d: first_line.count(d) for d in DELIMITERS}
+        best = max(counts, key=counts.get)
+        return best if counts[best] else default
+
+
+def _count_records(text: str, sep: str) -> int:
+    return sum(1 for r in csv.reader(io.StringIO(text, newline=""), delimiter=sep) if any(r))
+
+
+def _tail_sample(resolved_path: str, file_size: int, encoding: str, sep: str) -> Tuple[int, int]:
+    """(bytes, records) of the whole records in the last SNIFF_BYTES; (0, 0) if they overlap the head sample."""
+    if file_size < 2 * SNIFF_BYTES or encoding == "utf-16":  # utf-16 can't be cut at an arbitrary byte
+        return 0, 0
+    with open(resolved_path, "rb") as f:
+        f.seek(file_size - SNIFF_BYTES)
+        raw = f.read(SNIFF_BYTES)
+    start = raw.find(b"\n") + 1  # skip the record cut off at the start
+    raw = raw[start:]
+    if not start or not raw:
+        return 0, 0
+    return len(raw), _count_records(raw.decode(encoding, errors="replace"), sep)
+
+
+def sniff_delimited(resolved_path: str, fmt: str = "csv") -> Dict[str, Any]:
+    """
+    Encoding, delimiter and row count of a delimited file from its first
+    SNIFF_BYTES (and last, for the estimate). Records are counted with the
+    csv module, so quoted line breaks don't throw the estimate off.
+    """
+    file_size = os.path.getsize(resolved_path)
+    with open(resolved_path, "rb") as f:
+        raw = f.read(SNIFF_BYTES)
+    whole_file = len(raw) >= file_size
+    encoding, text = _sniff_encoding(raw, partial=not whole_file)
+    if not whole_file and "\n" in text:
+        text = text[:text.rindex("\n") + 1]  # whole records only
+    sep = _sniff_delimiter(text, fmt)
+
+    data_records = max(_count_records(text, sep) - 1, 0)
+    if whole_file:
+        rows, source = data_records, "exact"
+    else:
+        header_bytes = len(text.split("\n", 1)[0].encode(encoding)) + 1
+        sample_bytes = len(text.encode(encoding)) - header_bytes
+        per_record = sample_bytes / data_records if data_records else 0
+        # Records near the end are often longer (growing ids, later dates) - sample both ends.
+        # Average the two ends' record sizes: pooled, the end with more (shorter) records would dominate
+        tail_bytes, tail_records = _tail_sample(resolved_path, file_size, encoding, sep)
+        if tail_records:
+            tail_per_record = tail_bytes / tail_records
+            per_record = (per_record + tail_per_record) / 2 if per_record else tail_per_record
+        rows = round((file_size - header_bytes) / per_record) if per_record else 0
+        source = "estimate"
+
+    return {
+        "rows": rows,
+        "row_count_source": source,
+        "read_options": {"sep": sep, "encoding": encoding},
+    }
+
+
+def read_delimited(resolved_path: str, nrows: int, fmt: str = "csv") -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Header and first `nrows` data rows, with the sniffed size and read options."""
+    info = sniff_delimited(resolved_path, fmt)
+    df = pd.read_csv(resolved_path, nrows=nrows, **info["read_options"])
+    return df, info
+
+
+def iter_delimited_rows(resolved_path: str, fmt: str, max_rows: int, chunk_rows: int = 10_000) -> Iterator[pd.DataFrame]:
+    """The file as raw frames: the column names as the first row, then up to max_rows + 1 typed data rows."""
+    options = sniff_delimited(resolved_path, fmt)["read_options"]
+    yield pd.DataFrame([list(pd.read_csv(resolved_path, nrows=0, **options).columns)])
+    with pd.read_csv(resolved_path, nrows=max_rows + 1, chunksize=chunk_rows, **options) as reader:
+        yield from reader
+
+
+# -----------------------------------------------------------------------------
+# Parquet
+# -----------------------------------------------------------------------------
+def _parquet_file(resolved_path: str):
+    if pq is None:
+        raise ImportError("Reading Parquet files needs pyarrow (pip install pyarrow)")
+    return pq.ParquetFile(resolved_path)
+
+
+def read_parquet(resolved_path: str, nrows: int) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """First `nrows` rows from the first row group; the row count from the footer."""
+    pf = _parquet_file(resolved_path)
+    meta = pf.metadata
+    if meta.num_row_groups:
+        batch = next(pf.iter_batches(batch_size=max(nrows, 1), row_groups=[0]), None)
+        df = batch.to_pandas() if batch is not None else pf.schema_arrow.empty_table().to_pandas()
+    else:
+        df = pf.schema_arrow.empty_table().to_pandas()
+    return df.head(nrows), {
+        "rows": meta.num_rows,
+        "row_count_source": "metadata",
+        "row_groups": meta.num_row_groups,
+        "read_options": {},
+    }
+
+
+def iter_parquet_rows(resolved_path: str, max_rows: int, batch_rows: int = 10_000) -> Iterator[pd.DataFrame]:
+    """The file as raw frames: the column names as the first row, then up to max_rows + 1 data rows."""
+    pf = _parquet_file(resolved_path)
+    yield pd.DataFrame([pf.schema_arrow.names])
+    remaining = max_rows + 1  # one past the cap, so the profiler can tell it stopped early
+    for batch in pf.iter_batches(batch_size=batch_rows):
+        if remaining <= 0:
+            break
+        df = batch.to_pandas().head(remaining)
+        remaining -= len(df)
+        yield pd.DataFrame(df.to_numpy(dtype=object))
@@ -0,0 +1,230 @@
+import os
+import json
+import logging
+import tempfile
+import zipfile
+from datetime import date, datetime, time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .cache import TieredCache, make_key
+from .columnar import COLUMNAR_STORE, open_store
+from .formats import DELIMITED, detect_format, read_delimited, read_parquet
+from .profiling import profile_columnar, profile_file
+from .xlsx_stream import XlsxWorkbook, read_preview, rows_to_dataframe
+
+logger = logging.getLogger(__name__)
+
+# Rows read per file for column profiling / preview
+INSPECT_NROWS = 10
+PREVIEW_ROWS = 5
+
+# Bump when the shape of inspect_file() output changes so stale cache entries are ignored
+INSPECTION_VERSION = 5
+
+# "stream" reads .xlsx previews with xlsx_stream; "pandas" always uses pd.read_excel (Excel inputs only)
+INSPECTOR_PREVIEW_ENGINE = os.getenv("INSPECTOR_PREVIEW_ENGINE", "stream")
+
+# Workbook index: data rows shown per sheet, and sheets indexed before the rest are listed by name only
+SHEET_PREVIEW_ROWS = int(os.getenv("INSPECTOR_SHEET_PREVIEW_ROWS", "3"))
+INSPECTOR_MAX_SHEETS = int(os.getenv("INSPECTOR_MAX_SHEETS", "50"))
+
+# -----------------------------------------------------------------------------
+# Inspection cache (content hash + parameters -> per-file inspection result)
+# -----------------------------------------------------------------------------
+INSPECTION_CACHE_DIR = os.getenv(
+    "INSPECTION_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "excel_transformer_cache", "inspection"),
+)
+INSPECTION_CACHE_MEMORY_ITEMS = int(os.getenv("INSPECTION_CACHE_MEMORY_ITEMS", "256"))
+INSPECTION_CACHE_DISK_MB = int(os.getenv("INSPECTION_CACHE_DISK_MB", "256"))
+
+inspection_cache = TieredCache(
+    "Inspection",
+    memory_items=INSPECTION_CACHE_MEMORY_ITEMS,
+    disk_dir=INSPECTION_CACHE_DIR if INSPECTION_CACHE_DISK_MB > 0 else None,
+    disk_max_bytes=INSPECTION_CACHE_DISK_MB * 1024 * 1024,
+)
+
+
+class NumpyEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, (np.integer, np.int64, np.int32)):
+            return int(obj)
+        elif isinstance(obj, (np.floating, np.float64, np.float32)):
+            return float(obj)
+        elif isinstance(obj, np.ndarray):
+            return obj.tolist()
+        elif isinstance(obj, (pd.Timestamp, datetime, date, time)):
+            return obj.isoformat()
+        elif isinstance(obj, pd.Timedelta):
+            return str(obj)
+        elif pd.isna(obj):
+            return None
+        return super().default(obj)
+
+
+def to_json_safe(value: Any) -> Any:
+    """Round-trip through NumpyEncoder so the value holds only plain JSON types."""
+    return json.loads(json.dumps(value, cls=NumpyEncoder))
+
+
+def read_head(resolved_path: str, nrows: int) -> pd.DataFrame:
+    """
+    First `nrows` data rows of the first sheet. .xlsx files go through the
+    streaming reader; anything else (or a file it cannot parse) falls back to
+    pd.read_excel, which picks the engine for .xls itself.
+    """
+    if INSPECTOR_PREVIEW_ENGINE == "stream" and zipfile.is_zipfile(resolved_path):
+        try:
+            return read_preview(resolved_path, nrows)
+        except Exception as e:
+            logger.warning(f"Streaming preview failed for {resolved_path}, falling back to pandas: {e}")
+    return pd.read_excel(resolved_path, nrows=nrows)
+
+
+def _sheet_entry(sheet: Dict[str, Any]) -> Dict[str, Any]:
+    """Workbook index entry: size, column names/dtypes and a small preview, read the way pd.read_excel reads the sheet."""
+    if sheet.get("skipped"):
+        return {"name": sheet["name"], "index": sheet["index"], "skipped": True}
+
+    df = rows_to_dataframe(sheet["head"])
+    df.columns = [str(c) for c in df.columns]
+    return {
+        "name": sheet["name"],
+        "index": sheet["index"],
+        "rows": sheet["rows"],
+        "columns": [
+            # dtype of the preview values only - a handful of cells, not the sheet
+            {"name": name, "dtype": str(dtype)}
+            for name, dtype in zip(df.columns, df.dtypes)
+        ],
+        "column_count": sheet["columns"],
+        "row_count_source": sheet["source"],
+        "dimension": sheet["ref"],
+        "preview": df.where(pd.notna(df), None).fillna('').to_dict('records'),
+    }
+
+
+def index_workbook(resolved_path: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Every sheet of an .xlsx file with its true size, columns and a bounded
+    preview, read without building DataFrames. None for other formats or
+    when the package cannot be indexed.
+    """
+    if INSPECTOR_PREVIEW_ENGINE != "stream" or not zipfile.is_zipfile(resolved_path):
+        return None
+    try:
+        with XlsxWorkbook(resolved_path) as wb:
+            return [_sheet_entry(s) for s in wb.index(SHEET_PREVIEW_ROWS, INSPECTOR_MAX_SHEETS)]
+    except Exception as e:
+        logger.warning(f"Workbook index failed for {resolved_path}: {e}")
+        return None
+
+
+def inspect_file(
+    resolved_path: str,
+    nrows: int = INSPECT_NROWS,
+    profile: bool = False,
+    profile_max_rows: Optional[int] = None,
+    profile_max_seconds: Optional[float] = None,
+    digest: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Read the head of one file and return its metadata, column info and
+    preview, plus a per-sheet index for .xlsx files. CSV/TSV and Parquet go
+    through formats.py, which reads only the rows the preview needs; the
+    output has the same shape for every format. With `profile` the first
+    sheet is also profiled in full: from its columnar store when `digest`
+    (the file's content hash) has one, otherwise streamed from the file
+    (see profiling.profile_file). Raises on read errors - the caller records
+    them per file.
+    """
+    fmt = detect_format(resolved_path)
+    sheets = None
+    info: Dict[str, Any] = {}
+    if fmt in DELIMITED:
+        df, info = read_delimited(resolved_path, nrows, fmt)
+    elif fmt == "parquet":
+        df, info = read_parquet(resolved_path, nrows)
+    else:
+        df = read_head(resolved_path, nrows)
+        sheets = index_workbook(resolved_path)
+
+    result: Dict[str, Any] = {}
+
+    # File metadata - rows/columns are the first sheet's true size when the
+    # workbook could be indexed, the sniffed or footer count for text and
+    # Parquet files, otherwise the size of the preview read
+    first = sheets[0] if sheets else None
+    if first:
+        rows, source = first["rows"], first["row_count_source"]
+    elif info:
+        rows, source = info["rows"], info["row_count_source"]
+    else:
+        rows, source = df.shape[0], "preview"
+    result["metadata"] = {
+        "format": fmt,
+        "rows": rows,
+        "columns": max(first["column_count"], df.shape[1]) if first else df.shape[1],
+        "row_count_source": source,
+        "sheet_count": len(sheets) if sheets else 1,
+        "file_size": os.path.getsize(resolved_path) if os.path.exists(resolved_path) else 0,
+        # pandas arguments the file was read with (sep/encoding for text files)
+        "read_options": info.get("read_options", {}),
+    }
+
+    # Column information
+    result["columns"] = [
+        {
+            "name": str(col),
+            "dtype": str(df[col].dtype),
+            "non_null_count": df[col].count(),
+            "sample_values": df[col].head(3).fillna('').tolist()
+        }
+        for col in df.columns
+    ]
+
+    # Preview data
+    preview_data = df.head(PREVIEW_ROWS).where(pd.notna(df), None)
+    result["preview"] = preview_data.fillna('').to_dict('records')
+
+    # Workbook index (all sheets)
+    if sheets:
+        result["sheets"] = sheets
+
+    # Full-column profile - optional and best effort, the head read above already succeeded
+    if profile:
+        try:
+            sheet = _columnar_sheet(digest)
+            if sheet is not None:
+                result["profile"] = profile_columnar(sheet, profile_max_rows, profile_max_seconds)
+            else:
+                result["profile"] = profile_file(resolved_path, profile_max_rows, profile_max_seconds)
+        except Exception as e:
+            logger.warning(f"Profiling failed for {resolved_path}: {e}")
+            result["profile"] = {"error": str(e)}
+
+    return to_json_safe(result)
+
+
+def _columnar_sheet(digest: Optional[str]):
+    """
+    First sheet of the file's columnar store, if there is one and its header
+    is the first non-empty row as profile_file() assumes. The head and index
+    above stay on the streaming reader so the inspection (and the script
+    cache key built from its dtypes) doesn't depend on whether a store exists.
+    """
+    if not (COLUMNAR_STORE and digest):
+        return None
+    store = open_store(digest)
+    if store is None:
+        return None
+    sheet = store.sheet(0)
+    return sheet if sheet.meta["first_row"] == 1 else None
+
+
+def cache_key(digest: str, params: Dict[str, Any]) -> str:
+    return make_key("inspect", INSPECTION_VERSION, digest, params)
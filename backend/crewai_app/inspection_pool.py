@@ -0,0 +1,172 @@
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from typing import Any, Dict, List, Optional, Tuple
+
+from .inspection import inspect_file
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Parallel inspection settings (override via env)
+# -----------------------------------------------------------------------------
+INSPECTOR_WORKERS = int(os.getenv("INSPECTOR_WORKERS", str(min(4, os.cpu_count() or 1))))
+INSPECTOR_FILE_TIMEOUT = float(os.getenv("INSPECTOR_FILE_TIMEOUT", "120"))
+
+_POLL_SECONDS = 0.02
+# Spawned workers re-import pandas etc.; that start-up is not charged to any file
+_WARMUP_TIMEOUT = 120
+# After the pool fails to start, files are inspected inline for this long before trying again
+_RETRY_SECONDS = 300
+
+# "spawn" works everywhere (incl. Windows) and is safe to start from a threaded server
+_mp = multiprocessing.get_context("spawn")
+# One pool of INSPECTOR_WORKERS processes shared by every request. The lock
+# is held only to start or replace it; _generation changes each time, so a
+# batch can tell its files were lost when another batch's timeout killed it.
+_pool = None
+_generation = 0
+_failed_at: Optional[float] = None
+_pool_lock = threading.Lock()
+# Files in flight across all batches, so a file starts as soon as it is
+# submitted and its timeout doesn't count time spent queued behind others
+_slots = threading.BoundedSemaphore(max(1, INSPECTOR_WORKERS))
+
+
+def _get_pool() -> Tuple[Any, int]:
+    """The shared pool and its generation, started on first use. The pool is None while it can't be started."""
+    global _pool, _generation, _failed_at
+    with _pool_lock:
+        if _pool is not None:
+            return _pool, _generation
+        if _failed_at is not None and time.monotonic() - _failed_at < _RETRY_SECONDS:
+            return None, _generation
+        logger.info(f"🧵 Starting inspection pool with {INSPECTOR_WORKERS} worker processes")
+        started = time.monotonic()
+        pool = _mp.Pool(INSPECTOR_WORKERS)
+        try:
+            pool.map_async(_ping, range(INSPECTOR_WORKERS), chunksize=1).get(_WARMUP_TIMEOUT)
+        except Exception as e:
+            pool.terminate()
+            pool.join()
+            _failed_at = time.monotonic()
+            logger.warning(f"⚠️ Inspection pool failed to start ({e!r}); inspecting files inline")
+            return None, _generation
+        _pool, _failed_at = pool, None
+        _generation += 1
+        logger.info(f"🧵 Inspection pool ready in {time.monotonic() - started:.2f}s")
+        return _pool, _generation
+
+
+def _ping(_):
+    return os.getpid()
+
+
+def _terminate_pool():
+    global _pool
+    if _pool is not None:
+        _pool.terminate()
+        _pool.join()
+    _pool = None
+
+
+def _replace_pool(generation: int):
+    """Kill the pool if it is still `generation`; the next _get_pool() starts a fresh one."""
+    with _pool_lock:
+        if generation == _generation:
+            _terminate_pool()
+
+
+def shutdown_pool():
+    with _pool_lock:
+        _terminate_pool()
+
+
+def _inspect_serial(jobs: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, Any]]:
+    results = []
+    for path, params in jobs:
+        try:
+            results.append(("ok", inspect_file(path, **params)))
+        except Exception as e:
+            logger.debug(f"Inspection of {path} failed", exc_info=True)
+            results.append(("error", str(e)))
+    return results
+
+
+def inspect_many(
+    jobs: List[Tuple[str, Dict[str, Any]]],
+    workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> List[Tuple[str, Any]]:
+    """
+    Run inspect_file(path, **params) for each job and return, in input order,
+    ("ok", result) or ("error", message) per job.
+
+    With more than one job and more than one worker the files are parsed in
+    the shared process pool, at most `workers` of this batch's at a time. A
+    file is submitted only when a worker is free, so its timeout counts from
+    when a worker picks it up; a file that overruns it is reported as an
+    error and the pool is replaced to kill the stuck worker. Files lost with
+    the old pool (this batch's or another's) are run again. If the pool
+    can't be started the files are inspected inline.
+    """
+    workers = INSPECTOR_WORKERS if workers is None else workers
+    timeout = INSPECTOR_FILE_TIMEOUT if timeout is None else timeout
+    workers = max(1, min(workers, INSPECTOR_WORKERS, len(jobs)))
+
+    if workers == 1:
+        return _inspect_serial(jobs)
+
+    results: List[Optional[Tuple[str, Any]]] = [None] * len(jobs)
+    pending = list(range(len(jobs)))
+    in_flight: Dict[int, Tuple[Any, float, int]] = {}
+    try:
+        while pending or in_flight:
+            pool, generation = _get_pool()
+            if pool is None:
+                rest = sorted(in_flight) + pending
+                for idx, outcome in zip(rest, _inspect_serial([jobs[i] for i in rest])):
+                    results[idx] = outcome
+                break
+
+            while pending and len(in_flight) < workers and _slots.acquire(blocking=False):
+                idx = pending.pop(0)
+                path, params = jobs[idx]
+                in_flight[idx] = (pool.apply_async(inspect_file, (path,), params), time.monotonic(), generation)
+
+            timed_out, lost = [], []
+            for idx, (async_result, started, submitted_to) in list(in_flight.items()):
+                if async_result.ready():
+                    del in_flight[idx]
+                    _slots.release()
+                    try:
+                        results[idx] = ("ok", async_result.get())
+                    except Exception as e:
+                        results[idx] = ("error", str(e))
+                elif submitted_to != generation:
+                    # Its worker went down with a replaced pool; run it again
+                    del in_flight[idx]
+                    _slots.release()
+                    lost.append(idx)
+                elif time.monotonic() - started > timeout:
+                    timed_out.append(idx)
+            pending = lost + pending
+
+            if timed_out:
+                for idx in timed_out:
+                    del in_flight[idx]
+                    _slots.release()
+                    msg = f"Inspection timed out after {timeout:.0f}s"
+                    logger.error(f"❌ {jobs[idx][0]}: {msg}")
+                    results[idx] = ("error", msg)
+                # Kill the stuck worker(s); files still running elsewhere are retried on the new pool
+                _replace_pool(generation)
+            elif pending or in_flight:
+                time.sleep(_POLL_SECONDS)
+    finally:
+        for _ in in_flight:
+            _slots.release()
+
+    return results
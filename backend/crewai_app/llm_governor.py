@@ -0,0 +1,311 @@
+"""
+Process-wide governor for LLM calls.
+
+Every completion made by the crews (through GovernedLLM) and by the
+/test-* endpoints goes through one LLMGovernor, which:
+
+- keeps two token buckets, requests per minute and tokens per minute, so a
+  burst is spread out instead of running into the provider's quotas;
+- caps the number of calls in progress;
+- serves waiting calls by priority - interactive requests before batch
+  jobs - and in arrival order within a priority;
+- retries 429 and 5xx responses with jittered exponential backoff, honouring
+  Retry-After; a 429 also holds back every other call for the delay, since
+  the quota is shared.
+
+Token use is estimated from the prompt (characters / 4) plus
+LLM_OUTPUT_TOKENS before a call, and corrected with the reply's length after.
+"""
+import os
+import time
+import heapq
+import random
+import logging
+import threading
+import itertools
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from crewai import LLM
+
+from backend.metrics import metrics
+from .compact import estimate_tokens
+from .llm_provider import record
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Governor settings (override via env; 0 disables a limit)
+# -----------------------------------------------------------------------------
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000"))
+# Reply size assumed when reserving tokens for a call
+LLM_OUTPUT_TOKENS = int(os.getenv("LLM_OUTPUT_TOKENS", "2048"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_SECONDS = float(os.getenv("LLM_BACKOFF_SECONDS", "1"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "60"))
+# Longest a call may wait for its turn before failing
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "300"))
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = {INTERACTIVE: 0, BATCH: 1}
+
+# Provider statuses worth retrying: timeouts, quota, server errors, overload
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504, 529}
+
+
+class LLMQueueTimeout(Exception):
+    """Raised when a call waited LLM_QUEUE_TIMEOUT_SECONDS without getting a turn."""
+
+
+class TokenBucket:
+    """Refills `per_minute` units a minute, up to one minute's worth. per_minute <= 0 = unlimited."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.rate = self.capacity / 60.0
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken (a call bigger than the bucket waits for a full one)."""
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float, now: float):
+        """Remove `amount`; negative amounts give units back. The level may go below zero (debt)."""
+        if self.unlimited:
+            return
+        self._refill(now)
+        self.level = min(self.capacity, self.level - amount)
+
+    def available(self) -> Optional[int]:
+        if self.unlimited:
+            return None
+        self._refill(time.monotonic())
+        return int(self.level)
+
+
+def _status_of(exc: BaseException) -> Optional[int]:
+    """HTTP status of a provider error, looking through wrapped exceptions (crewai re-raises them)."""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        status = getattr(exc, "status_code", None)
+        if isinstance(status, int):
+            return status
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+        try:
+            value = headers.get("retry-after") or headers.get("Retry-After")
+            if value is not None:
+                return float(value)
+        except (AttributeError, TypeError, ValueError):
+            pass
+        exc = exc.__cause__ or exc.__context__
+    return None
+
+
+class LLMGovernor:
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        requests_per_minute: int = LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_seconds: float = LLM_BACKOFF_SECONDS,
+        backoff_max_seconds: float = LLM_BACKOFF_MAX_SECONDS,
+        queue_timeout: float = LLM_QUEUE_TIMEOUT_SECONDS,
+    ):
+        self.max_concurrency = max_concurrency
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max(0, max_retries)
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._queue = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+        self._active = 0
+        self._paused_until = 0.0
+        self._local = threading.local()  # calls made while holding a turn (crewai retries) pass through
+
+    # -------------------------------------------------------------------------
+    # Turns
+    # -------------------------------------------------------------------------
+    def _acquire(self, tokens: int, priority: str):
+        ticket = (PRIORITIES.get(priority, PRIORITIES[INTERACTIVE]), next(self._seq))
+        started = time.monotonic()
+        deadline = started + self.queue_timeout if self.queue_timeout > 0 else None
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = None
+                    if self._queue[0] == ticket and (self.max_concurrency <= 0 or self._active < self.max_concurrency):
+                        wait = max(
+                            self.requests.wait_time(1, now),
+                            self.tokens.wait_time(tokens, now),
+                            self._paused_until - now,
+                        )
+                        if wait <= 0:
+                            break
+                    if deadline is not None:
+                        if now >= deadline:
+                            metrics.incr("llm.queue_timeouts")
+                            raise LLMQueueTimeout(
+                                f"LLM call waited {now - started:.0f}s for a turn "
+                                f"({len(self._queue)} queued, {self._active} running)"
+                            )
+                        wait = deadline - now if wait is None else min(wait, deadline - now)
+                    self._cond.wait(wait)
+            except BaseException:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+                raise
+            heapq.heappop(self._queue)
+            self._active += 1
+            self.requests.take(1, now)
+            self.tokens.take(tokens, now)
+            self._cond.notify_all()  # the next in line may be able to go too
+        waited = time.monotonic() - started
+        metrics.observe("llm.queue_wait", waited, priority=priority)
+        if waited > 1:
+            logger.info(f"🚦 LLM call ({priority}) waited {waited:.1f}s for its turn")
+
+    def _release(self, correction: int = 0):
+        with self._cond:
+            self._active -= 1
+            self.tokens.take(correction, time.monotonic())
+            self._cond.notify_all()
+
+    def _pause(self, seconds: float):
+        """Hold back every call for `seconds` (the provider said the shared quota is used up)."""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Exponential delay with equal jitter, at least the provider's Retry-After."""
+        delay = min(self.backoff_max_seconds, self.backoff_seconds * (2 ** attempt))
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        return max(delay, retry_after or 0.0)
+
+    # -------------------------------------------------------------------------
+    # Calls
+    # -------------------------------------------------------------------------
+    def call(self, fn: Callable[[], Any], prompt_tokens: int = 0, priority: str = INTERACTIVE) -> Any:
+        """Run fn() - one LLM completion - when the limits allow, retrying 429s and 5xx."""
+        if getattr(self._local, "held", False):
+            return fn()
+        reserved = prompt_tokens + LLM_OUTPUT_TOKENS
+        for attempt in range(self.max_retries + 1):
+            self._acquire(reserved, priority)
+            self._local.held = True
+            try:
+                result = fn()
+            except Exception as e:
+                self._local.held = False
+                self._release()
+                status = _status_of(e)
+                metrics.incr("llm.errors")
+                if status not in RETRYABLE_STATUSES or attempt == self.max_retries:
+                    raise
+                delay = self.backoff(attempt, _retry_after(e))
+                if status == 429:
+                    metrics.incr("llm.rate_limited")
+                    self._pause(delay)
+                metrics.incr("llm.retries")
+                logger.warning(f"⏳ LLM call got HTTP {status}, retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            self._local.held = False
+            used = prompt_tokens + estimate_tokens(result if isinstance(result, str) else str(result))
+            self._release(used - reserved)
+            metrics.incr("llm.calls")
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            queued = {name: 0 for name in PRIORITIES}
+            by_rank = {rank: name for name, rank in PRIORITIES.items()}
+            for rank, _ in self._queue:
+                queued[by_rank[rank]] += 1
+            return {
+                "active": self._active,
+                "max_concurrency": self.max_concurrency or None,
+                "queued": queued,
+                "requests_available": self.requests.available(),
+                "tokens_available": self.tokens.available(),
+                "paused_seconds": round(max(0.0, self._paused_until - time.monotonic()), 1),
+            }
+
+
+llm_governor = LLMGovernor()
+
+# -----------------------------------------------------------------------------
+# Crew integration
+# -----------------------------------------------------------------------------
+# Agents run on crewai's own threads, so a request's priority is found by agent id
+_agent_priorities: Dict[str, str] = {}
+_priorities_lock = threading.Lock()
+
+
+@contextmanager
+def crew_priority(crew, priority: str):
+    """LLM calls by `crew`'s agents wait with this priority until the block exits."""
+    ids = [str(agent.id) for agent in crew.agents]
+    with _priorities_lock:
+        for agent_id in ids:
+            _agent_priorities[agent_id] = priority
+    try:
+        yield
+    finally:
+        with _priorities_lock:
+            for agent_id in ids:
+                _agent_priorities.pop(agent_id, None)
+
+
+def _messages_tokens(messages: Any) -> int:
+    if isinstance(messages, str):
+        return estimate_tokens(messages)
+    return sum(estimate_tokens(str(m.get("content") or "")) for m in messages or [] if isinstance(m, dict))
+
+
+class GovernedLLM(LLM):
+    """crewai LLM whose calls go through llm_governor (and are recorded with LLM_RECORD_FILE)."""
+
+    def call(self, messages, *args, **kwargs):
+        task = kwargs.get("from_task")
+        agent = kwargs.get("from_agent") or getattr(task, "agent", None)
+        with _priorities_lock:
+            priority = _agent_priorities.get(str(getattr(agent, "id", None)), INTERACTIVE)
+        result = llm_governor.call(
+            lambda: super(GovernedLLM, self).call(messages, *args, **kwargs),
+            prompt_tokens=_messages_tokens(messages),
+            priority=priority,
+        )
+        record(messages, result)
+        return result
@@ -0,0 +1,128 @@
+"""
+Which LLM the crews and the /test-* endpoints talk to.
+
+LLM_PROVIDER picks one of PROVIDERS:
+
+- gemini (default): Google AI Studio, key in GEMINI_API_KEY;
+- openai: the OpenAI API, key in OPENAI_API_KEY;
+- local: any OpenAI-compatible server at LLM_BASE_URL - vLLM, Ollama, or
+  the stand-in in benchmarks/llm_server.py, which replays recorded replies
+  with a set latency and token rate so the service can be load-tested
+  without a provider.
+
+LLM_MODEL, LLM_API_KEY and LLM_BASE_URL override the provider's defaults.
+Everything goes through LiteLLM, so a model is "<prefix>/<name>"; a bare
+name gets the provider's prefix.
+
+With LLM_RECORD_FILE set, every completion the crews make is appended to
+that file (JSON lines of messages and reply) for the stand-in to replay.
+"""
+import os
+import json
+import logging
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from litellm import completion as litellm_completion
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Provider settings (override via env)
+# -----------------------------------------------------------------------------
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini").strip().lower()
+LLM_MODEL = os.getenv("LLM_MODEL")
+LLM_API_KEY = os.getenv("LLM_API_KEY")
+LLM_BASE_URL = os.getenv("LLM_BASE_URL")
+# Append every crew completion here (JSON lines) for benchmarks/llm_server.py --recordings
+LLM_RECORD_FILE = os.getenv("LLM_RECORD_FILE")
+
+
+class Provider(NamedTuple):
+    name: str
+    default_model: str
+    key_env: Optional[str] = None        # env var holding the API key
+    base_url: Optional[str] = None       # None = LiteLLM's default endpoint for the prefix
+    placeholder_key: Optional[str] = None  # sent when the server doesn't check keys
+
+
+PROVIDERS: Dict[str, Provider] = {
+    "gemini": Provider("gemini", "gemini/gemini-2.5-flash", key_env="GEMINI_API_KEY"),
+    "openai": Provider("openai", "openai/gpt-4o-mini", key_env="OPENAI_API_KEY"),
+    "local": Provider("local", "openai/stand-in", base_url="http://127.0.0.1:8001/v1", placeholder_key="local"),
+}
+
+
+class LLMSettings(NamedTuple):
+    provider: str
+    model: str
+    api_key: Optional[str]
+    base_url: Optional[str]
+
+    @property
+    def key_source(self) -> str:
+        """Where the API key should come from, for error messages."""
+        if LLM_API_KEY:
+            return "LLM_API_KEY"
+        return PROVIDERS[self.provider].key_env or "LLM_API_KEY"
+
+
+def get_provider(name: Optional[str] = None) -> Provider:
+    name = (name or LLM_PROVIDER).strip().lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown LLM_PROVIDER '{name}' (expected one of: {', '.join(PROVIDERS)})")
+    return PROVIDERS[name]
+
+
+def llm_settings(config_model: Optional[str] = None, provider: Optional[str] = None) -> LLMSettings:
+    """
+    Model, key and endpoint for the selected provider. config_model (the
+    agents.yaml default_llm model) is used only if it is one of this
+    provider's models, so the Gemini default there doesn't follow a switch
+    to another provider.
+    """
+    p = get_provider(provider)
+    prefix = p.default_model.split("/", 1)[0] + "/"
+    if config_model and config_model.startswith(prefix):
+        model = config_model
+    else:
+        model = LLM_MODEL or p.default_model
+    if "/" not in model:
+        model = prefix + model
+    api_key = LLM_API_KEY or (os.getenv(p.key_env) if p.key_env else None) or p.placeholder_key
+    return LLMSettings(p.name, model, api_key, LLM_BASE_URL or p.base_url)
+
+
+def cache_tag() -> str:
+    """Identifies the configured model in cache keys, so providers never share cached scripts."""
+    settings = llm_settings()
+    return f"{settings.provider}:{settings.model}"
+
+
+def completion(messages: List[Dict[str, Any]], settings: Optional[LLMSettings] = None, **kwargs) -> Any:
+    """One LiteLLM completion against the configured provider (for direct calls outside the crews)."""
+    settings = settings or llm_settings()
+    if settings.base_url:
+        kwargs.setdefault("base_url", settings.base_url)
+    return litellm_completion(model=settings.model, api_key=settings.api_key, messages=messages, **kwargs)
+
+
+# -----------------------------------------------------------------------------
+# Recording
+# -----------------------------------------------------------------------------
+_record_lock = threading.Lock()
+
+
+def record(messages: Any, response: Any):
+    """Append one completion to LLM_RECORD_FILE (no-op when unset)."""
+    if not LLM_RECORD_FILE or not isinstance(response, str):
+        return
+    line = json.dumps({"messages": messages, "response": response}, ensure_ascii=False, default=str)
+    try:
+        with _record_lock:
+            directory = os.path.dirname(os.path.abspath(LLM_RECORD_FILE))
+            os.makedirs(directory, exist_ok=True)
+            with open(LLM_RECORD_FILE, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    except OSError as e:
+        logger.warning(f"⚠️ Could not record LLM response to {LLM_RECORD_FILE}: {e}")
@@ -0,0 +1,441 @@
+"""
+Full-column profiling in bounded memory.
+
+Streams every row of the first sheet once and keeps a fixed-size summary
+per column: null rate, approximate distinct count (HyperLogLog), min/max,
+type mix and a reservoir sample. Work stops at a row or time budget and the
+result says whether the whole sheet was covered. profile_columnar() builds
+the same summary from a columnar store (see columnar.py) with array
+operations, under the same sketches and budgets.
+"""
+import os
+import math
+import time
+import random
+import struct
+import hashlib
+import zipfile
+from datetime import date, datetime, time as dt_time
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .formats import DELIMITED, detect_format, iter_delimited_rows, iter_parquet_rows
+from .xlsx_stream import XlsxWorkbook, SharedStringRef, column_names
+
+# -----------------------------------------------------------------------------
+# Profiling budgets (override via env or per call)
+# -----------------------------------------------------------------------------
+PROFILE_MAX_ROWS = int(os.getenv("PROFILE_MAX_ROWS", "1000000"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "30"))
+PROFILE_SAMPLE_SIZE = int(os.getenv("PROFILE_SAMPLE_SIZE", "10"))
+
+# 2^12 registers: ~1.6% standard error in 4 KB per column
+HLL_PRECISION = 12
+
+# Check the clock every N rows rather than every row
+_TIME_CHECK_ROWS = 1000
+# Rows per block when profiling a columnar store (the clock is checked between blocks)
+_COLUMNAR_BLOCK_ROWS = 262144
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(x: int) -> int:
+    """splitmix64 finaliser - spreads small/sequential ints over 64 bits."""
+    x = (x + 0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+def _mix64_array(x: np.ndarray) -> np.ndarray:
+    """_mix64() over a uint64 array (numpy integer arithmetic wraps like the masks above)."""
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    """int.bit_length() over a uint64 array."""
+    x = x.copy()
+    length = np.zeros(len(x), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = x >= (np.uint64(1) << np.uint64(shift))
+        length[big] += shift
+        x[big] >>= np.uint64(shift)
+    return length + (x > 0)
+
+
+def _hash_array(values: np.ndarray, kind: str) -> np.ndarray:
+    """_hash64() for a typed column of non-null values; text columns are hashed by dictionary code."""
+    if kind == "bool":
+        return _mix64_array(values.astype(np.uint64) + np.uint64(2))
+    if kind == "float":
+        values = values + 0.0  # -0.0 is 0.0
+        whole = (values == np.floor(values)) & (np.abs(values) < 2.0 ** 63)
+        bits = values.view(np.uint64).copy()
+        bits[whole] = values[whole].astype(np.int64).view(np.uint64)  # 3.0 and 3 are the same value
+        return _mix64_array(bits)
+    if kind == "datetime":
+        return _mix64_array(values.view(np.int64).view(np.uint64) ^ np.uint64(0x4441544554494D45))
+    if kind == "string":
+        return _mix64_array(values.astype(np.int64).view(np.uint64) ^ np.uint64(0x5348415245445354))
+    return _mix64_array(values.astype(np.int64).view(np.uint64))
+
+
+def _hash64(value: Any) -> int:
+    """Stable 64-bit hash (str hashes are salted per process, so text goes through blake2b)."""
+    if isinstance(value, SharedStringRef):
+        # Excel stores each distinct string once, so the index identifies it
+        return _mix64(int(value) ^ 0x5348415245445354)
+    if isinstance(value, bool):
+        return _mix64(2 + value)
+    if isinstance(value, int):
+        return _mix64(value & _MASK64)
+    if isinstance(value, float):
+        if value.is_integer() and abs(value) < 2 ** 63:
+            return _mix64(int(value) & _MASK64)  # 3.0 and 3 are the same value
+        return _mix64(struct.unpack("<Q", struct.pack("<d", value))[0])
+    if isinstance(value, datetime):
+        seconds = value.toordinal() * 86400 + value.hour * 3600 + value.minute * 60 + value.second
+        return _mix64((seconds * 1000000 + value.microsecond) ^ 0x4441544554494D45)
+    if isinstance(value, date):
+        return _mix64(value.toordinal() ^ 0x44415445)
+    if isinstance(value, dt_time):
+        return _mix64((value.hour * 3600 + value.minute * 60 + value.second) * 1000000 + value.microsecond)
+    text = str(value)
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class HyperLogLog:
+    """Approximate distinct counter with 2^precision one-byte registers."""
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.p = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+
+    def add_hash(self, h: int):
+        idx = h >> (64 - self.p)
+        rest = (h << self.p) & _MASK64
+        rank = 64 - self.p + 1 if rest == 0 else 64 - rest.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def add_hashes(self, hashes: np.ndarray):
+        """add_hash() for an array of uint64 hashes."""
+        if not len(hashes):
+            return
+        idx = (hashes >> np.uint64(64 - self.p)).astype(np.intp)
+        rest = hashes << np.uint64(self.p)
+        rank = np.where(rest == 0, 64 - self.p + 1, 64 - _bit_length(rest) + 1).astype(np.uint8)
+        np.maximum.at(np.frombuffer(self.registers, dtype=np.uint8), idx, rank)
+
+    def count(self) -> int:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting for small cardinalities
+        return int(round(estimate))
+
+
+def _kind(value: Any) -> str:
+    if isinstance(value, (SharedStringRef, str)):
+        return "string"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, datetime):
+        return "datetime"
+    if isinstance(value, dt_time):
+        return "time"
+    if isinstance(value, date):
+        return "date"
+    return type(value).__name__
+
+
+# Kinds whose values are ordered against each other for min/max
+_ORDER_GROUP = {"int": "number", "float": "number", "datetime": "datetime", "date": "date", "time": "time"}
+
+
+class ColumnProfile:
+    """Constant-size running summary of one column."""
+
+    def __init__(self, name: str, sample_size: int, rng: random.Random):
+        self.name = name
+        self.nulls = 0
+        self.values = 0
+        self.types: Dict[str, int] = {}
+        self.hll = HyperLogLog()
+        self.ranges: Dict[str, List[Any]] = {}  # order group -> [min, max]
+        self.sample: List[Any] = []
+        self.sample_size = sample_size
+        self._rng = rng
+
+    def add(self, value: Any):
+        if value is None or value == "":
+            self.nulls += 1
+            return
+        self.values += 1
+        kind = _kind(value)
+        self.types[kind] = self.types.get(kind, 0) + 1
+        self.hll.add_hash(_hash64(value))
+
+        group = _ORDER_GROUP.get(kind)
+        if group:
+            bounds = self.ranges.get(group)
+            if bounds is None:
+                self.ranges[group] = [value, value]
+            elif value < bounds[0]:
+                bounds[0] = value
+            elif value > bounds[1]:
+                bounds[1] = value
+
+        # Reservoir sampling (Algorithm R) over non-null values
+        if len(self.sample) < self.sample_size:
+            self.sample.append(value)
+        else:
+            j = self._rng.randrange(self.values)
+            if j < self.sample_size:
+                self.sample[j] = value
+
+    def summary(self, rows: int) -> Dict[str, Any]:
+        dominant = max(self.types, key=self.types.get) if self.types else None
+        bounds = self.ranges.get(_ORDER_GROUP.get(dominant, ""), [None, None])
+        return {
+            "name": self.name,
+            "null_count": self.nulls,
+            "null_rate": round(self.nulls / rows, 4) if rows else 0.0,
+            "distinct_approx": min(self.hll.count(), self.values),
+            "min": bounds[0],
+            "max": bounds[1],
+            "types": dict(sorted(self.types.items(), key=lambda kv: -kv[1])),
+            "sample_values": self.sample,
+        }
+
+
+def _pandas_rows(resolved_path: str, max_rows: int) -> Iterator[List[Any]]:
+    """Non-empty rows of the first sheet (or the table) for formats the stream reader doesn't handle."""
+    fmt = detect_format(resolved_path)
+    if fmt in DELIMITED:
+        frames = iter_delimited_rows(resolved_path, fmt, max_rows)
+    elif fmt == "parquet":
+        frames = iter_parquet_rows(resolved_path, max_rows)
+    else:
+        frames = [pd.read_excel(resolved_path, header=None, nrows=max_rows + 1)]
+    for df in frames:
+        for row in df.itertuples(index=False, name=None):
+            values = [None if pd.isna(v) else (v.item() if isinstance(v, np.generic) else v) for v in row]
+            if any(v is not None and v != "" for v in values):
+                yield values
+
+
+def profile_file(
+    resolved_path: str,
+    max_rows: Optional[int] = None,
+    max_seconds: Optional[float] = None,
+    sample_size: int = PROFILE_SAMPLE_SIZE,
+) -> Dict[str, Any]:
+    """
+    Profile every column of the first sheet (header = first non-empty row).
+    Memory per column is fixed by the sketch and sample sizes, whatever the
+    sheet length; shared strings are tracked by index and only the sampled
+    ones are read back.
+    """
+    max_rows = PROFILE_MAX_ROWS if max_rows is None else max_rows
+    max_seconds = PROFILE_MAX_SECONDS if max_seconds is None else max_seconds
+
+    started = time.monotonic()
+    rng = random.Random(0)  # same file -> same sample
+    wb = XlsxWorkbook(resolved_path) if zipfile.is_zipfile(resolved_path) else None
+    try:
+        rows = wb.iter_raw_rows(0) if wb is not None else _pandas_rows(resolved_path, max_rows)
+        header = next(rows, None) or []
+        if wb is not None:
+            header = wb.resolve_shared_strings([header])[0]
+        columns = [ColumnProfile(str(name), sample_size, rng) for name in column_names(header, len(header))]
+
+        profiled = 0
+        stopped_by = None
+        for values in rows:
+            if profiled >= max_rows:
+                stopped_by = "rows"
+                break
+            if profiled % _TIME_CHECK_ROWS == 0 and profiled and time.monotonic() - started > max_seconds:
+                stopped_by = "time"
+                break
+            if len(values) > len(columns):
+                # Columns with no header cell: earlier rows count as nulls
+                for i in range(len(columns), len(values)):
+                    col = ColumnProfile(f"Unnamed: {i}", sample_size, rng)
+                    col.nulls = profiled
+                    columns.append(col)
+            for i, col in enumerate(columns):
+                col.add(values[i] if i < len(values) else None)
+            profiled += 1
+        rows.close()
+
+        summaries = [col.summary(profiled) for col in columns]
+        if wb is not None and summaries:
+            samples = wb.resolve_shared_strings([s["sample_values"] for s in summaries])
+            for summary, sample in zip(summaries, samples):
+                summary["sample_values"] = sample
+    finally:
+        if wb is not None:
+            wb.close()
+
+    return {
+        "rows_profiled": profiled,
+        "complete": stopped_by is None,
+        "stopped_by": stopped_by,
+        "seconds": round(time.monotonic() - started, 3),
+        "budget": {"max_rows": max_rows, "max_seconds": max_seconds},
+        "columns": summaries,
+    }
+
+
+class _ArrayProfile:
+    """ColumnProfile for one typed column of a columnar store, fed in blocks of non-null values."""
+
+    def __init__(self, name: str, kind: str, sample_size: int):
+        self.name = name
+        self.kind = kind
+        self.nulls = 0
+        self.values = 0
+        self.whole = 0  # float cells holding whole numbers (int cells in the sheet)
+        self.hll = HyperLogLog()
+        self.bounds: List[Any] = [None, None]
+        self.sample_size = sample_size
+        self._rng = np.random.default_rng(0)  # same file -> same sample
+        # Uniform sample: the values with the smallest random keys seen so far
+        self._keys = np.empty(0)
+        self._positions = np.empty(0, dtype=np.int64)
+        self._sample: Optional[np.ndarray] = None
+
+    def add(self, values: np.ndarray, positions: np.ndarray, nulls: int):
+        self.nulls += nulls
+        count = len(values)
+        if not count:
+            return
+        self.values += count
+        if self.kind == "float":
+            self.whole += int(np.count_nonzero(values == np.floor(values)))
+        if self.kind in ("int", "float", "datetime"):
+            low, high = values.min().item(), values.max().item()
+            if self.bounds[0] is None or low < self.bounds[0]:
+                self.bounds[0] = low
+            if self.bounds[1] is None or high > self.bounds[1]:
+                self.bounds[1] = high
+        self.hll.add_hashes(_hash_array(values, self.kind))
+
+        keys = np.concatenate([self._keys, self._rng.random(count)])
+        positions = np.concatenate([self._positions, positions])
+        sample = values if self._sample is None else np.concatenate([self._sample, values])
+        if len(keys) > self.sample_size:
+            keep = np.argpartition(keys, self.sample_size - 1)[:self.sample_size]
+            keys, positions, sample = keys[keep], positions[keep], sample[keep]
+        self._keys, self._positions, self._sample = keys, positions, sample
+
+    def summary(self, rows: int) -> Dict[str, Any]:
+        types = {self.kind: self.values} if self.values else {}
+        if self.kind == "float" and self.values:
+            types = {k: v for k, v in (("int", self.whole), ("float", self.values - self.whole)) if v}
+            types = dict(sorted(types.items(), key=lambda kv: -kv[1]))
+        sample = [] if self._sample is None else [self._sample[i].item() for i in np.argsort(self._positions)]
+        return {
+            "name": self.name,
+            "null_count": self.nulls,
+            "null_rate": round(self.nulls / rows, 4) if rows else 0.0,
+            "distinct_approx": min(self.hll.count(), self.values),
+            "min": self.bounds[0],
+            "max": self.bounds[1],
+            "types": types,
+            "sample_values": sample,
+        }
+
+
+def profile_columnar(
+    sheet,
+    max_rows: Optional[int] = None,
+    max_seconds: Optional[float] = None,
+    sample_size: int = PROFILE_SAMPLE_SIZE,
+) -> Dict[str, Any]:
+    """
+    profile_file() output for a columnar.ColumnarSheet whose header is sheet
+    row 1. Reads the memory-mapped arrays in blocks of rows, with the same
+    sketches and budgets as profile_file(); only mixed-type columns go value
+    by value.
+    """
+    max_rows = PROFILE_MAX_ROWS if max_rows is None else max_rows
+    max_seconds = PROFILE_MAX_SECONDS if max_seconds is None else max_seconds
+    started = time.monotonic()
+
+    # profile_file() skips blank rows, the store keeps them
+    keep = np.ones(sheet.rows, dtype=bool)
+    keep[sheet.blank_rows()] = False
+    positions = np.flatnonzero(keep)
+    stopped_by = "rows" if len(positions) > max_rows else None
+    positions = positions[:max_rows]
+
+    columns = []
+    for name in sheet.names:
+        kind = sheet.kind(name)
+        if kind == "object":
+            profile = ColumnProfile(str(name), sample_size, random.Random(0))
+            columns.append((kind, profile, {"objects": sheet.values(name)}))
+        else:
+            profile = _ArrayProfile(str(name), kind, sample_size)
+            columns.append((kind, profile, sheet.arrays(name) if kind != "empty" else {}))
+
+    rows = 0
+    for start in range(0, len(positions), _COLUMNAR_BLOCK_ROWS):
+        if start and time.monotonic() - started > max_seconds:
+            stopped_by = "time"
+            break
+        block = positions[start:start + _COLUMNAR_BLOCK_ROWS]
+        for kind, profile, arrays in columns:
+            if kind == "empty":
+                profile.add(np.empty(0), block, len(block))
+            elif kind == "object":
+                for value in arrays["objects"][block]:
+                    profile.add(value)
+            elif kind == "string":
+                codes = np.asarray(arrays["codes"])[block]
+                present = codes >= 0
+                profile.add(codes[present], block[present], len(block) - int(present.sum()))
+            else:
+                data = np.asarray(arrays["values"])[block]
+                if kind in ("int", "bool"):
+                    present = ~np.asarray(arrays["mask"])[block]
+                elif kind == "float":
+                    present = ~np.isnan(data)
+                else:
+                    present = ~np.isnat(data)
+                profile.add(data[present], block[present], len(block) - int(present.sum()))
+        rows += len(block)
+
+    summaries = []
+    for kind, profile, arrays in columns:
+        summary = profile.summary(rows)
+        if kind == "string" and summary["sample_values"]:
+            dictionary = sheet.dictionary(arrays)
+            summary["sample_values"] = [dictionary[c] for c in summary["sample_values"]]
+        summaries.append(summary)
+
+    return {
+        "rows_profiled": rows,
+        "complete": stopped_by is None,
+        "stopped_by": stopped_by,
+        "seconds": round(time.monotonic() - started, 3),
+        "budget": {"max_rows": max_rows, "max_seconds": max_seconds},
+        "columns": summaries,
+        "source": "columnar",
+    }
@@ -0,0 +1,109 @@
+"""
+Progress events of a crew run, for callers that stream them to the client.
+
+crewai reports agent starts/finishes and streamed LLM chunks on one
+process-wide event bus. Crews are pooled and checked out by one request at
+a time, so an event is routed to the request by the id of the agent that
+raised it: listen(crew, on_event) subscribes that crew's agents for the
+duration of a kickoff.
+
+on_event(kind, data) is called on the crew's thread with:
+
+- "agent_started":  {"agent": role, "task": task name}
+- "token":          {"agent": role, "text": chunk}  (with LLM_STREAM on)
+- "agent_finished": {"agent": role, "output": the agent's final answer}
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from crewai.events import crewai_event_bus
+from crewai.events.types.agent_events import AgentExecutionCompletedEvent, AgentExecutionStartedEvent
+from crewai.events.types.llm_events import LLMStreamChunkEvent
+
+logger = logging.getLogger(__name__)
+
+EventCallback = Callable[[str, Dict[str, Any]], None]
+
+# agent id -> callback of the request running that agent
+_listeners: Dict[str, EventCallback] = {}
+_listeners_lock = threading.Lock()
+
+
+def _deliver(agent_id: Any, kind: str, data: Dict[str, Any]):
+    with _listeners_lock:
+        callback = _listeners.get(str(agent_id))
+    if callback is None:
+        return
+    try:
+        callback(kind, data)
+    except Exception as e:
+        logger.debug(f"Progress listener failed on {kind}: {e}")
+
+
+def _task_name(task: Any) -> Optional[str]:
+    if task is None:
+        return None
+    return getattr(task, "name", None) or (getattr(task, "description", "") or "")[:80]
+
+
+def _on_agent_started(source: Any, event: AgentExecutionStartedEvent):
+    _deliver(event.agent.id, "agent_started", {"agent": event.agent.role.strip(), "task": _task_name(event.task)})
+
+
+def _on_agent_finished(source: Any, event: AgentExecutionCompletedEvent):
+    _deliver(event.agent.id, "agent_finished", {"agent": event.agent.role.strip(), "output": event.output})
+
+
+def _on_chunk(source: Any, event: LLMStreamChunkEvent):
+    if event.chunk and event.agent_id is not None:
+        _deliver(event.agent_id, "token", {"agent": (event.agent_role or "").strip(), "text": event.chunk})
+
+
+crewai_event_bus.register_handler(AgentExecutionStartedEvent, _on_agent_started)
+crewai_event_bus.register_handler(AgentExecutionCompletedEvent, _on_agent_finished)
+crewai_event_bus.register_handler(LLMStreamChunkEvent, _on_chunk)
+
+
+@contextmanager
+def listen(crew, on_event: Optional[EventCallback]):
+    """Send the progress events of `crew`'s agents to on_event until the block exits."""
+    if on_event is None:
+        yield
+        return
+    ids = [str(agent.id) for agent in crew.agents]
+    with _listeners_lock:
+        for agent_id in ids:
+            _listeners[agent_id] = on_event
+    try:
+        yield
+    finally:
+        with _listeners_lock:
+            for agent_id in ids:
+                if _listeners.get(agent_id) is on_event:
+                    del _listeners[agent_id]
+
+
+def schema_summary(inspection: Dict[str, Any]) -> Dict[str, Any]:
+    """Short description of inspect_files() results: per file its sheets, row count and columns."""
+    files = []
+    for file_result in inspection.get("files", []):
+        metadata = file_result.get("metadata") or {}
+        summary = {
+            "path": file_result.get("original_path"),
+            "status": file_result.get("status"),
+            "rows": metadata.get("rows"),
+            "columns": [[c["name"], c["dtype"]] for c in file_result.get("columns", [])],
+        }
+        sheets = file_result.get("sheets") or []
+        if len(sheets) > 1:
+            summary["sheets"] = [
+                {"name": s["name"], "rows": s.get("rows"), "columns": s.get("column_count")} for s in sheets
+            ]
+        files.append(summary)
+    return {
+        "success": bool(inspection.get("success")),
+        "errors": inspection.get("errors") or ([inspection["error"]] if inspection.get("error") else []),
+        "files": files,
+    }
@@ -0,0 +1,108 @@
+import os
+import re
+import logging
+import tempfile
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+from .cache import TieredCache, file_digest, make_key
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Script cache settings (override via env)
+# -----------------------------------------------------------------------------
+SCRIPT_CACHE_DIR = os.getenv(
+    "SCRIPT_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "excel_transformer_cache", "scripts"),
+)
+SCRIPT_CACHE_MEMORY_ITEMS = int(os.getenv("SCRIPT_CACHE_MEMORY_ITEMS", "128"))
+SCRIPT_CACHE_DISK_MB = int(os.getenv("SCRIPT_CACHE_DISK_MB", "64"))
+SCRIPT_CACHE_TTL_SECONDS = float(os.getenv("SCRIPT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+script_cache = TieredCache(
+    "Script",
+    memory_items=SCRIPT_CACHE_MEMORY_ITEMS,
+    disk_dir=SCRIPT_CACHE_DIR if SCRIPT_CACHE_DISK_MB > 0 else None,
+    disk_max_bytes=SCRIPT_CACHE_DISK_MB * 1024 * 1024,
+    ttl_seconds=SCRIPT_CACHE_TTL_SECONDS if SCRIPT_CACHE_TTL_SECONDS > 0 else None,
+)
+
+_CONFIG_DIR = os.path.join(os.path.dirname(__file__), "config")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Unicode-normalise and collapse whitespace. Case is kept - column names are case-sensitive."""
+    prompt = unicodedata.normalize("NFKC", prompt or "")
+    return re.sub(r"\s+", " ", prompt).strip()
+
+
+def schema_fingerprint(inspection: Dict[str, Any]) -> List[Any]:
+    """
+    Format, read options, column names and dtypes per file, plus per sheet
+    when the inspection lists sheets, in upload order - a script that reads
+    a semicolon CSV can't serve the same columns in an .xlsx. Paths, sizes,
+    row counts and sample values are left out so the same layout uploaded
+    again maps to the same key.
+    """
+    fingerprint = []
+    for file_result in inspection.get("files", []):
+        metadata = file_result.get("metadata") or {}
+        entry = [
+            [metadata.get("format"), metadata.get("read_options")],
+            [[c.get("name"), c.get("dtype")] for c in file_result.get("columns", [])],
+        ]
+        for sheet in file_result.get("sheets") or []:
+            entry.append([sheet.get("name"), [[c.get("name"), c.get("dtype")] for c in sheet.get("columns", [])]])
+        fingerprint.append(entry)
+    return fingerprint
+
+
+def _config_version() -> List[str]:
+    """Digest of the agent/task YAML so prompt changes invalidate cached scripts."""
+    digests = []
+    for name in ("agents.yaml", "tasks.yaml"):
+        path = os.path.join(_CONFIG_DIR, name)
+        digests.append(file_digest(path) if os.path.exists(path) else "")
+    return digests
+
+
+def script_cache_key(inspection: Dict[str, Any], prompt: str, model: Optional[str] = None) -> str:
+    return make_key("script", _config_version(), model, schema_fingerprint(inspection), normalize_prompt(prompt))
+
+
+# -----------------------------------------------------------------------------
+# File path placeholders - cached scripts are stored path-independent
+# -----------------------------------------------------------------------------
+def _path_variants(path: str):
+    """(placeholder suffix, text) pairs for how a path can appear in generated code."""
+    variants = [("", path)]
+    escaped = path.replace("\\", "\\\\")
+    if escaped != path:
+        variants.append(("_ESC", escaped))
+    forward = path.replace("\\", "/")
+    if forward != path:
+        variants.append(("_FWD", forward))
+    return variants
+
+
+def templatize(script: str, file_paths: List[str]) -> str:
+    """Replace this request's file paths with __INPUT_FILE_<i>__ placeholders."""
+    replacements = []
+    for i, path in enumerate(file_paths):
+        for suffix, text in _path_variants(path):
+            replacements.append((text, f"__INPUT_FILE_{i}{suffix}__"))
+    # Longest first so a path never clobbers a longer one that contains it
+    for text, placeholder in sorted(replacements, key=lambda r: len(r[0]), reverse=True):
+        script = script.replace(text, placeholder)
+    return script
+
+
+def render(template: str, file_paths: List[str]) -> str:
+    """Inverse of templatize() for a new set of file paths."""
+    for i, path in enumerate(file_paths):
+        for suffix, text in _path_variants(path):
+            template = template.replace(f"__INPUT_FILE_{i}{suffix}__", text)
+        # Variants the new path doesn't have (e.g. no backslashes) fall back to the raw path
+        template = re.sub(rf"__INPUT_FILE_{i}_(?:ESC|FWD)__", lambda _: path, template)
+    return template
@@ -0,0 +1,134 @@
+"""
+In-flight coalescing of identical crew runs.
+
+Requests with the same key (file content hashes, normalized prompt and
+run options) that arrive while a run for that key is in progress wait for
+that run instead of starting their own. The run executes on its own
+thread, so a waiter that gives up - a cancelled job, a disconnected
+client - does not stop it for the others, and its result or exception is
+handed to every waiter.
+
+A caller's on_event listener receives the run's progress events, the ones
+emitted before it joined first. The run's thread gets the leader's context
+(contextvars), so its timing spans land in the leader's trace.
+"""
+import time
+import logging
+import contextvars
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+EventCallback = Callable[[str, Dict[str, Any]], None]
+
+
+class _Flight:
+    def __init__(self, key: str):
+        self.key = key
+        self.future: Future = Future()
+        self.started = time.perf_counter()
+        self.waiters = 0
+        self.events: List[tuple] = []
+        self.listeners: List[EventCallback] = []
+        self.lock = threading.Lock()
+
+    def emit(self, kind: str, data: Dict[str, Any]):
+        with self.lock:
+            self.events.append((kind, data))
+            listeners = list(self.listeners)
+        for listener in listeners:
+            try:
+                listener(kind, data)
+            except Exception as e:
+                logger.debug(f"Coalesced run listener failed on {kind}: {e}")
+
+    def attach(self, listener: Optional[EventCallback]):
+        if listener is None:
+            return
+        # Replay under the lock so no event is missed or delivered twice
+        with self.lock:
+            for kind, data in self.events:
+                try:
+                    listener(kind, data)
+                except Exception as e:
+                    logger.debug(f"Coalesced run listener failed on {kind}: {e}")
+            self.listeners.append(listener)
+
+    def detach(self, listener: Optional[EventCallback]):
+        with self.lock:
+            if listener in self.listeners:
+                self.listeners.remove(listener)
+
+
+class SingleFlight:
+    """Runs fn once per key among concurrent callers; see the module docstring."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    def do(self, key: str, fn: Callable[[EventCallback], Any], on_event: Optional[EventCallback] = None,
+           timeout: Optional[float] = None) -> Any:
+        """
+        Return fn(emit)'s result, running it only if no call with this key is
+        in flight. fn reports progress through emit. Raises what fn raised,
+        or TimeoutError if the shared run takes longer than `timeout`.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight(key)
+                self.runs += 1
+            else:
+                self.coalesced += 1
+            flight.waiters += 1
+
+        if leader:
+            context = contextvars.copy_context()
+            threading.Thread(
+                target=context.run, args=(self._execute, flight, fn), name=f"{self.name}-flight", daemon=True
+            ).start()
+        else:
+            logger.info(
+                f"🔗 {self.name}: joined in-flight run {key[:12]} "
+                f"({flight.waiters} waiting, started {time.perf_counter() - flight.started:.1f}s ago)"
+            )
+
+        flight.attach(on_event)
+        try:
+            return flight.future.result(timeout)
+        finally:
+            flight.detach(on_event)
+            with self._lock:
+                flight.waiters -= 1
+
+    def _execute(self, flight: _Flight, fn: Callable[[EventCallback], Any]):
+        try:
+            result = fn(flight.emit)
+        except BaseException as e:
+            with self._lock:
+                self.failures += 1
+                del self._flights[flight.key]
+            flight.future.set_exception(e)
+        else:
+            # Later callers start a new run (or hit the script cache)
+            with self._lock:
+                del self._flights[flight.key]
+            flight.future.set_result(result)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "coalesced": self.coalesced,
+                "failures": self.failures,
+                "in_flight": len(self._flights),
+                "waiting": sum(f.waiters for f in self._flights.values()),
+            }
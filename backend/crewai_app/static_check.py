@@ -0,0 +1,259 @@
+"""
+Deterministic checks on a generated script, run before (or instead of) the
+LLM validation pass.
+
+check_script() compiles the script and walks its AST for:
+- syntax errors
+- banned modules and calls (shelling out, network, eval/exec, deleting files)
+- spreadsheet reads of files that were not uploaded, and uploads never referenced
+- column names that are neither in the inspected schema nor created by the script
+
+Findings are plain dicts so they can be logged, cached and shown to the
+validator agent as-is. Only "error" findings make the script fail the check;
+a false positive just means the LLM validator runs, as it always used to.
+"""
+import ast
+import difflib
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+ERROR = "error"
+WARNING = "warning"
+
+BANNED_MODULES = {
+    "subprocess", "socket", "requests", "urllib", "http", "ftplib", "smtplib",
+    "ctypes", "multiprocessing", "pty", "telnetlib", "paramiko",
+    "backend",  # the server's own code, sandbox worker included
+}
+BANNED_CALLS = {
+    "eval", "exec", "compile", "__import__", "breakpoint", "input",
+    "os.system", "os.popen", "os.remove", "os.unlink", "os.rmdir", "os.removedirs",
+    "os.kill", "os.fork", "os.execv", "os.execvp", "os.spawnl", "os.spawnv",
+    "shutil.rmtree", "shutil.move",
+}
+
+SPREADSHEET_EXTENSIONS = (".xlsx", ".xlsm", ".xls", ".csv", ".tsv", ".tab", ".txt", ".parquet")
+READ_FUNCTIONS = {"read_excel", "read_csv", "read_table", "read_parquet", "ExcelFile", "load_workbook"}
+
+# Keyword arguments whose string values name existing columns
+_COLUMN_KWARGS = {"on", "left_on", "right_on", "by", "subset", "index", "values", "id_vars", "value_vars"}
+_EXCEL_RANGE = re.compile(r"[A-Za-z]{1,3}(:[A-Za-z]{1,3})?(\s*,\s*[A-Za-z]{1,3}(:[A-Za-z]{1,3})?)*")
+
+
+def _finding(severity: str, code: str, message: str, node: Optional[ast.AST] = None) -> Dict[str, Any]:
+    return {"severity": severity, "code": code, "message": message, "line": getattr(node, "lineno", None)}
+
+
+def _dotted_name(node: ast.AST) -> str:
+    """pd.read_excel -> 'pd.read_excel', os.path.join -> 'os.path.join'."""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+def _strings(node: Optional[ast.AST]) -> List[ast.Constant]:
+    """String constants in a value or a list/tuple/set of values."""
+    if node is None:
+        return []
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return [node]
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        return [s for elt in node.elts for s in _strings(elt)]
+    return []
+
+
+def _norm_path(path: str) -> str:
+    return os.path.normcase(os.path.normpath(path.replace("\\", "/")))
+
+
+def schema_columns(inspection: Dict[str, Any]) -> Set[str]:
+    """Every column (and sheet) name in the inspection: file-level, per sheet and profiled."""
+    names: Set[str] = set()
+    for file_result in inspection.get("files", []):
+        names.update(str(c.get("name")) for c in file_result.get("columns", []))
+        for sheet in file_result.get("sheets") or []:
+            names.add(str(sheet.get("name")))  # wb["Sheet"], read_excel(sheet_name=None)["Sheet"]
+            names.update(str(c.get("name")) for c in sheet.get("columns", []))
+        profile = file_result.get("profile") or {}
+        names.update(str(c.get("name")) for c in profile.get("columns", []))
+    return names
+
+
+class _Visitor(ast.NodeVisitor):
+    def __init__(self):
+        self.imports: List[tuple] = []        # (module, node)
+        self.calls: List[tuple] = []          # (dotted name, node)
+        self.read_paths: List[ast.Constant] = []
+        self.column_reads: List[ast.Constant] = []
+        self.created: Set[str] = set()
+        self.constants: Set[str] = set()
+        self.dict_names: Set[str] = set()     # variables holding plain dicts
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            self.imports.append((alias.name, node))
+
+    def visit_ImportFrom(self, node):
+        if node.module:
+            self.imports.append((node.module, node))
+            for alias in node.names:
+                self.calls.append((f"{node.module}.{alias.name}", node))
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, str):
+            self.constants.add(node.value)
+
+    def visit_Call(self, node):
+        name = _dotted_name(node.func)
+        self.calls.append((name, node))
+        short = name.rsplit(".", 1)[-1]
+
+        if short in READ_FUNCTIONS and node.args:
+            self.read_paths.extend(
+                s for s in _strings(node.args[0]) if s.value.lower().endswith(SPREADSHEET_EXTENSIONS)
+            )
+
+        for kw in node.keywords:
+            if kw.arg == "usecols":
+                # "A:C" style Excel letter ranges are positions, not names
+                self.column_reads.extend(s for s in _strings(kw.value) if not _EXCEL_RANGE.fullmatch(s.value))
+            elif kw.arg in _COLUMN_KWARGS and short not in READ_FUNCTIONS and short != "DataFrame":
+                self.column_reads.extend(_strings(kw.value))
+            elif kw.arg == "columns" and short == "rename" and isinstance(kw.value, ast.Dict):
+                self.column_reads.extend(k for k in kw.value.keys if isinstance(k, ast.Constant) and isinstance(k.value, str))
+                self.created.update(v.value for v in kw.value.values if isinstance(v, ast.Constant) and isinstance(v.value, str))
+            elif kw.arg == "columns" and short in ("DataFrame", "drop", "reindex"):
+                # Constructing/reshaping - names are defined (or dropped) here, not looked up
+                self.created.update(s.value for s in _strings(kw.value))
+            elif kw.arg in ("name", "value_name", "var_name", "column"):
+                self.created.update(s.value for s in _strings(kw.value))
+            elif kw.arg is not None and short in ("assign", "agg", "aggregate"):
+                self.created.add(kw.arg)  # df.assign(new=...) / named aggregation
+
+        # df.groupby("col"), df.sort_values("col"), df.drop_duplicates("col") ...
+        if short in ("groupby", "sort_values", "drop_duplicates", "set_index", "pivot", "melt") and node.args:
+            self.column_reads.extend(_strings(node.args[0]))
+        # df.insert(loc, "new", value)
+        if short == "insert" and len(node.args) >= 2:
+            self.created.update(s.value for s in _strings(node.args[1]))
+        self.generic_visit(node)
+
+    def visit_Subscript(self, node):
+        base = _dotted_name(node.value)
+        if base in self.dict_names or base.startswith(("os.", "sys.")):
+            self.generic_visit(node)
+            return
+        key = node.slice
+        if isinstance(key, ast.Tuple) and len(key.elts) == 2 and base.endswith(("loc", "at")):
+            key = key.elts[1]  # df.loc[rows, "col"]
+        names = _strings(key)
+        if isinstance(node.ctx, ast.Store):
+            self.created.update(s.value for s in names)
+        else:
+            self.column_reads.extend(names)
+        self.generic_visit(node)
+
+    def visit_Assign(self, node):
+        # df.columns = ["a", "b"]
+        is_dict = isinstance(node.value, (ast.Dict, ast.DictComp)) or (
+            isinstance(node.value, ast.Call) and _dotted_name(node.value.func) == "dict"
+        )
+        for target in node.targets:
+            if isinstance(target, ast.Attribute) and target.attr == "columns":
+                self.created.update(s.value for s in _strings(node.value))
+            elif isinstance(target, ast.Name) and is_dict:
+                self.dict_names.add(target.id)
+        self.generic_visit(node)
+
+
+def check_script(
+    script: str,
+    inspection: Optional[Dict[str, Any]] = None,
+    file_paths: Optional[Iterable[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Statically check a generated script. Returns
+    {"ok": bool, "findings": [...], "stats": {...}}; ok is False when any
+    finding has severity "error".
+    """
+    findings: List[Dict[str, Any]] = []
+    try:
+        tree = ast.parse(script)
+        compile(tree, "<generated>", "exec")
+    except SyntaxError as e:
+        findings.append({"severity": ERROR, "code": "syntax", "message": f"{e.msg}", "line": e.lineno})
+        return {"ok": False, "findings": findings, "stats": {}}
+
+    v = _Visitor()
+    v.visit(tree)
+
+    # Banned constructs
+    for module, node in v.imports:
+        if module.split(".")[0] in BANNED_MODULES:
+            findings.append(_finding(ERROR, "banned_import", f"Import of '{module}' is not allowed", node))
+    for name, node in v.calls:
+        if name in BANNED_CALLS:
+            findings.append(_finding(ERROR, "banned_call", f"Call to '{name}' is not allowed", node))
+
+    # Files: every read targets an upload, every upload is used
+    if file_paths is not None:
+        inputs = {_norm_path(p): p for p in file_paths}
+        for const in v.read_paths:
+            if _norm_path(const.value) not in inputs:
+                findings.append(_finding(ERROR, "unknown_file", f"Reads '{const.value}', which is not one of the input files", const))
+        referenced = {_norm_path(c) for c in v.constants}
+        for norm, original in inputs.items():
+            if norm not in referenced:
+                findings.append(_finding(ERROR, "unused_file", f"Input file '{original}' is never referenced"))
+
+    # Columns: looked-up names must exist in the schema or be created by the script
+    known: Set[str] = set()
+    if inspection is not None and inspection.get("success"):
+        known = schema_columns(inspection) | v.created
+        reported: Set[str] = set()
+        for const in v.column_reads:
+            name = const.value
+            if name in known or name in reported or name.lower().endswith(SPREADSHEET_EXTENSIONS):
+                continue
+            reported.add(name)
+            close = difflib.get_close_matches(name, sorted(known), n=1, cutoff=0.75)
+            hint = f" - did you mean '{close[0]}'?" if close else ""
+            findings.append(_finding(ERROR, "unknown_column", f"Column '{name}' is not in the inspected files{hint}", const))
+    elif inspection is not None:
+        findings.append(_finding(WARNING, "no_schema", "Inspection failed, column names were not checked"))
+
+    return {
+        "ok": not any(f["severity"] == ERROR for f in findings),
+        "findings": findings,
+        "stats": {
+            "column_reads": len(v.column_reads),
+            "known_columns": len(known),
+            "file_reads": len(v.read_paths),
+        },
+    }
+
+
+def read_paths(script: str) -> List[str]:
+    """Distinct spreadsheet paths the script reads, in order of first use ([] if it doesn't parse)."""
+    try:
+        tree = ast.parse(script)
+    except SyntaxError:
+        return []
+    v = _Visitor()
+    v.visit(tree)
+    return list(dict.fromkeys(const.value for const in v.read_paths))
+
+
+def format_findings(findings: List[Dict[str, Any]]) -> str:
+    """One line per finding, for logs and the validator prompt."""
+    if not findings:
+        return "No problems found."
+    return "\n".join(
+        f"- [{f['severity']}] {f['code']}" + (f" (line {f['line']})" if f.get("line") else "") + f": {f['message']}"
+        for f in findings
+    )
@@ -0,0 +1,480 @@
+"""
+Streaming reader for .xlsx headers, previews and sheet sizes.
+
+Reads the sheet XML straight out of the zip with iterparse, stops after the
+requested number of rows, and resolves only the shared strings those rows
+reference - the workbook is never materialised as an openpyxl object.
+Sheet sizes come from each sheet's <dimension> record, or a byte-level scan
+for <row> tags when a writer left that record out.
+"""
+import re
+import zipfile
+import posixpath
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+from xml.etree.ElementTree import iterparse
+
+import pandas as pd
+from pandas.errors import EmptyDataError
+from pandas.io.parsers import TextParser
+
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+# Built-in number formats that Excel renders as dates/times
+_BUILTIN_DATE_FORMATS = set(range(14, 23)) | set(range(27, 37)) | set(range(45, 48)) | set(range(50, 59))
+_EPOCH_1900 = datetime(1899, 12, 30)
+_EPOCH_1904 = datetime(1904, 1, 1)
+
+_ROW_TAG = re.compile(rb"<(?:[A-Za-z_][\w.-]*:)?row[\s/>]")
+_SCAN_CHUNK_BYTES = 1024 * 1024
+
+
+class SharedStringRef(int):
+    """Marker for a cell value that is an index into sharedStrings.xml."""
+
+
+class CellError(str):
+    """Text of an error cell (#N/A, #DIV/0!, ...); pd.read_excel reads these as NaN."""
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _column_index(ref: str) -> int:
+    """'C12' -> 2"""
+    idx = 0
+    for ch in ref:
+        if "A" <= ch <= "Z":
+            idx = idx * 26 + (ord(ch) - 64)
+        elif "a" <= ch <= "z":
+            idx = idx * 26 + (ord(ch) - 96)
+        else:
+            break
+    return idx - 1
+
+
+def _row_index(ref: str) -> int:
+    """'C12' -> 12"""
+    digits = "".join(ch for ch in ref if ch.isdigit())
+    return int(digits) if digits else 0
+
+
+def _parse_dimension(ref: Optional[str]) -> Optional[Tuple[int, int]]:
+    """
+    'A1:J300001' -> (300001 rows, 10 columns), counted from A1 as
+    pd.read_excel counts them. None for a missing or single-cell ref.
+    """
+    if not ref or ":" not in ref:
+        return None
+    first, last = ref.split(":", 1)
+    rows, columns = _row_index(last), _column_index(last) + 1
+    if rows < _row_index(first) or columns <= _column_index(first) or rows <= 0:
+        return None
+    return rows, columns
+
+
+def _is_date_format(code: str) -> bool:
+    # Drop quoted literals, escaped chars and [colour]/[condition] blocks, keep elapsed-time [h]/[mm]/[ss]
+    code = re.sub(r'"[^"]*"|\\.|_.|\*.', "", code)
+    code = re.sub(r"\[(?![hms]+\])[^\]]*\]", "", code, flags=re.IGNORECASE)
+    return bool(re.search(r"[dmyhs]", code, flags=re.IGNORECASE))
+
+
+class XlsxWorkbook:
+    """Lightweight view of an .xlsx package: sheet list, date styles, 1904 flag."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.zf = zipfile.ZipFile(path)
+        self.names = set(self.zf.namelist())
+        self.sheets: List[Tuple[str, str]] = []  # (sheet name, zip member)
+        self.date1904 = False
+        self._date_styles: Optional[Set[int]] = None
+        self._load_workbook()
+
+    def close(self):
+        self.zf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # -------------------------------------------------------------------------
+    # Package structure
+    # -------------------------------------------------------------------------
+    def _load_workbook(self):
+        rels = {}
+        rels_path = "xl/_rels/workbook.xml.rels"
+        if rels_path in self.names:
+            for _, elem in iterparse(self.zf.open(rels_path)):
+                if _local(elem.tag) == "Relationship":
+                    target = elem.get("Target", "")
+                    if target.startswith("/"):
+                        target = target.lstrip("/")
+                    else:
+                        target = posixpath.normpath(posixpath.join("xl", target))
+                    rels[elem.get("Id")] = target
+
+        for _, elem in iterparse(self.zf.open("xl/workbook.xml")):
+            tag = _local(elem.tag)
+            if tag == "workbookPr":
+                self.date1904 = elem.get("date1904") in ("1", "true")
+            elif tag == "sheet":
+                rid = elem.get(f"{{{_REL_NS}}}id")
+                target = rels.get(rid)
+                if target and target in self.names:
+                    self.sheets.append((elem.get("name"), target))
+
+        if not self.sheets:
+            raise ValueError(f"No worksheets found in {self.path}")
+
+    def sheet_member(self, sheet: Any = 0) -> Tuple[str, str]:
+        """Resolve a sheet index or name to (name, zip member)."""
+        if isinstance(sheet, int):
+            return self.sheets[sheet]
+        for name, member in self.sheets:
+            if name == sheet:
+                return name, member
+        raise ValueError(f"Worksheet named '{sheet}' not found")
+
+    @property
+    def date_styles(self) -> Set[int]:
+        """Indexes into cellXfs whose number format displays as a date/time."""
+        if self._date_styles is None:
+            self._date_styles = set()
+            if "xl/styles.xml" in self.names:
+                custom_formats: Dict[int, str] = {}
+                in_cell_xfs = False
+                xf_index = 0
+                with self.zf.open("xl/styles.xml") as stream:
+                    for event, elem in iterparse(stream, events=("start", "end")):
+                        tag = _local(elem.tag)
+                        if event == "start":
+                            if tag == "cellXfs":
+                                in_cell_xfs = True
+                            continue
+                        if tag == "numFmt":
+                            custom_formats[int(elem.get("numFmtId", -1))] = elem.get("formatCode", "")
+                        elif tag == "xf" and in_cell_xfs:
+                            fmt_id = int(elem.get("numFmtId", 0))
+                            if fmt_id in _BUILTIN_DATE_FORMATS or (
+                                fmt_id in custom_formats and _is_date_format(custom_formats[fmt_id])
+                            ):
+                                self._date_styles.add(xf_index)
+                            xf_index += 1
+                        elif tag == "cellXfs":
+                            break
+        return self._date_styles
+
+    # -------------------------------------------------------------------------
+    # Cells and rows
+    # -------------------------------------------------------------------------
+    def _from_serial(self, value: float) -> Any:
+        """Excel serial -> datetime (or time for fractions of a day), as openpyxl does."""
+        epoch = _EPOCH_1904 if self.date1904 else _EPOCH_1900
+        day, fraction = divmod(value, 1)
+        diff = timedelta(milliseconds=round(fraction * 86400 * 1000))
+        if 0 <= value < 1 and diff.days == 0:
+            return (datetime.min + diff).time()
+        if 0 < value < 60 and not self.date1904:
+            day += 1  # Excel's fictitious 1900-02-29
+        return epoch + timedelta(days=day) + diff
+
+    def _cell_value(self, cell) -> Any:
+        cell_type = cell.get("t", "n")
+        value = None
+        for child in cell:
+            tag = _local(child.tag)
+            if tag == "v":
+                value = child.text
+            elif tag == "is":
+                return "".join(t.text or "" for t in child.iter() if _local(t.tag) == "t")
+
+        if value is None:
+            return None
+        if cell_type == "s":
+            return SharedStringRef(int(value))
+        if cell_type == "e":
+            return CellError(value)
+        if cell_type == "str":
+            return value
+        if cell_type == "b":
+            return value == "1"
+        if cell_type == "d":
+            return datetime.fromisoformat(value)
+
+        number = float(value) if ("." in value or "E" in value or "e" in value) else int(value)
+        style = cell.get("s")
+        if style is not None and int(style) in self.date_styles:
+            return self._from_serial(number)
+        return number
+
+    def iter_raw_rows(self, sheet: Any = 0, numbered: bool = False):
+        """
+        Yield each non-empty row of a sheet as a list of cell values, with
+        shared strings left as SharedStringRef indexes. Parsing is lazy, so
+        breaking out of the loop stops reading the sheet XML. With `numbered`
+        each item is (1-based sheet row number, values) instead.
+        """
+        _, member = self.sheet_member(sheet)
+        row_number = 0
+        sheet_data = None
+        with self.zf.open(member) as stream:
+            for event, elem in iterparse(stream, events=("start", "end")):
+                if event == "start":
+                    if sheet_data is None and _local(elem.tag) == "sheetData":
+                        sheet_data = elem
+                    continue
+                if _local(elem.tag) != "row":
+                    continue
+                ref = elem.get("r")
+                row_number = int(ref) if ref and ref.isdigit() else row_number + 1
+                values: List[Any] = []
+                for position, cell in enumerate(c for c in elem if _local(c.tag) == "c"):
+                    ref = cell.get("r")
+                    col = _column_index(ref) if ref else position
+                    value = self._cell_value(cell)
+                    if value is None:
+                        continue
+                    if col >= len(values):
+                        values.extend([None] * (col + 1 - len(values)))
+                    values[col] = value
+                # Drop the row from the tree too, or the emptied elements pile up under
+                # <sheetData>. The parser runs ahead, so it is the first child, not the last.
+                elem.clear()
+                if sheet_data is not None and len(sheet_data) and sheet_data[0] is elem:
+                    del sheet_data[0]
+                if any(v is not None and v != "" for v in values):
+                    yield (row_number, values) if numbered else values
+
+    def iter_sheet_rows(self, sheet: Any = 0):
+        """
+        Rows from sheet row 1 on, as pd.read_excel reads them: a row with no
+        values comes through as [] so title and blank rows keep their place.
+        Shared strings are left as SharedStringRef indexes.
+        """
+        expected = 1
+        for row_number, values in self.iter_raw_rows(sheet, numbered=True):
+            while expected < row_number:
+                yield []
+                expected += 1
+            yield values
+            expected = row_number + 1
+
+    def resolve_shared_strings(self, rows: List[List[Any]]) -> List[List[Any]]:
+        """Replace SharedStringRef markers, reading sharedStrings.xml only as far as needed."""
+        needed = {v for row in rows for v in row if isinstance(v, SharedStringRef)}
+        if not needed:
+            return rows
+
+        strings: Dict[int, str] = {}
+        last_needed = max(needed)
+        member = "xl/sharedStrings.xml"
+        if member in self.names:
+            index = 0
+            table = None
+            with self.zf.open(member) as stream:
+                for event, elem in iterparse(stream, events=("start", "end")):
+                    if event == "start":
+                        if table is None and _local(elem.tag) == "sst":
+                            table = elem
+                        continue
+                    if _local(elem.tag) != "si":
+                        continue
+                    if index in needed:
+                        # Skip phonetic (rPh) runs, keep plain and rich-text runs
+                        parts = []
+                        for child in elem:
+                            tag = _local(child.tag)
+                            if tag == "t":
+                                parts.append(child.text or "")
+                            elif tag == "r":
+                                parts.extend(t.text or "" for t in child if _local(t.tag) == "t")
+                        strings[index] = "".join(parts)
+                    elem.clear()
+                    if table is not None and len(table) and table[0] is elem:
+                        del table[0]  # as in iter_raw_rows()
+                    if index >= last_needed:
+                        break
+                    index += 1
+
+        return [
+            [strings.get(v, "") if isinstance(v, SharedStringRef) else v for v in row]
+            for row in rows
+        ]
+
+    def resolve_shared_strings_many(self, groups: List[List[List[Any]]]) -> List[List[List[Any]]]:
+        """resolve_shared_strings() over several row lists with a single sharedStrings pass."""
+        resolved = self.resolve_shared_strings([row for rows in groups for row in rows])
+        out, start = [], 0
+        for rows in groups:
+            out.append(resolved[start:start + len(rows)])
+            start += len(rows)
+        return out
+
+    def read_rows(self, nrows: int, sheet: Any = 0) -> List[List[Any]]:
+        """First `nrows` sheet rows (blank ones included) with shared strings resolved."""
+        rows = []
+        if nrows > 0:
+            for values in self.iter_sheet_rows(sheet):
+                rows.append(values)
+                if len(rows) >= nrows:
+                    break
+        return self.resolve_shared_strings(rows)
+
+    # -------------------------------------------------------------------------
+    # Sheet sizes
+    # -------------------------------------------------------------------------
+    def sheet_dimension(self, sheet: Any = 0) -> Optional[str]:
+        """The sheet's <dimension ref>, which writers put before <sheetData>."""
+        _, member = self.sheet_member(sheet)
+        with self.zf.open(member) as stream:
+            for _, elem in iterparse(stream, events=("start",)):
+                tag = _local(elem.tag)
+                if tag == "dimension":
+                    return elem.get("ref")
+                if tag == "sheetData":
+                    break
+        return None
+
+    def count_row_tags(self, sheet: Any = 0) -> int:
+        """
+        Number of <row> elements in the sheet, counted on the raw XML bytes
+        without building elements. Rows that only carry formatting are
+        included, so this is an upper bound on rows with values.
+        """
+        _, member = self.sheet_member(sheet)
+        count = 0
+        carry = b""
+        with self.zf.open(member) as stream:
+            for chunk in iter(lambda: stream.read(_SCAN_CHUNK_BYTES), b""):
+                buf = carry + chunk
+                # A tag never spans a '<', so cutting at the last one keeps every match whole
+                cut = buf.rfind(b"<")
+                if cut <= 0:
+                    carry = buf
+                    continue
+                count += len(_ROW_TAG.findall(buf, 0, cut))
+                carry = buf[cut:]
+        count += len(_ROW_TAG.findall(carry))
+        return count
+
+    def sheet_size(self, sheet: Any, head: List[List[Any]], complete: bool) -> Dict[str, Any]:
+        """
+        Data rows (header excluded) and columns of a sheet. `head` is its
+        first rows from sheet row 1; `complete` means the read reached the end of
+        the sheet, so the count is already exact. Otherwise the <dimension>
+        record is used when it is present and consistent with `head`, with
+        count_row_tags() as the fallback.
+        """
+        head_width = max((len(r) for r in head), default=0)
+        ref = self.sheet_dimension(sheet)
+        dims = _parse_dimension(ref)
+
+        if complete:
+            total_rows, columns, source = len(head), 0, "preview"
+        elif dims and dims[0] >= len(head):
+            total_rows, columns = dims
+            source = "dimension"
+        else:
+            total_rows, columns = self.count_row_tags(sheet), 0
+            source = "row_scan"
+
+        return {
+            "rows": max(total_rows - 1, 0),
+            "columns": max(columns, head_width),
+            "source": source,
+            "ref": ref,
+        }
+
+    def index(self, preview_rows: int, max_sheets: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Name, size, header and first `preview_rows` data rows of each sheet,
+        with one sharedStrings pass for all of them. Sheets past `max_sheets`
+        are listed by name only.
+        """
+        limit = len(self.sheets) if max_sheets is None else max_sheets
+        heads, complete = [], []
+        for i in range(min(limit, len(self.sheets))):
+            rows = []
+            # One row past the preview tells whether the sheet has more
+            for values in self.iter_sheet_rows(i):
+                rows.append(values)
+                if len(rows) > preview_rows + 1:
+                    break
+            complete.append(len(rows) <= preview_rows + 1)
+            heads.append(rows)
+
+        sheets = []
+        for i, rows in enumerate(self.resolve_shared_strings_many(heads)):
+            sheets.append({
+                "name": self.sheets[i][0],
+                "index": i,
+                **self.sheet_size(i, rows, complete[i]),
+                "head": rows[:preview_rows + 1],
+            })
+        for i in range(len(heads), len(self.sheets)):
+            sheets.append({"name": self.sheets[i][0], "index": i, "skipped": True})
+        return sheets
+
+
+def column_names(header: List[Any], width: int) -> List[Any]:
+    """Mimic pd.read_excel header handling: Unnamed: i for blanks, .1/.2 suffixes for duplicates."""
+    names = []
+    seen: Dict[Any, int] = {}
+    for i in range(width):
+        name = header[i] if i < len(header) else None
+        if name is None or name == "":
+            name = f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _excel_cell(value: Any) -> Any:
+    """A cell as pandas' openpyxl reader passes it to TextParser."""
+    if value is None:
+        return ""
+    if isinstance(value, CellError):
+        return float("nan")
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def rows_to_dataframe(rows: List[List[Any]], nrows: Optional[int] = None) -> pd.DataFrame:
+    """
+    Sheet rows from row 1 -> the DataFrame pd.read_excel(header=0, nrows=nrows)
+    builds from them. The cells go through pandas' own TextParser, so header
+    names, NA markers and numeric-looking text come out as pandas reads them.
+    """
+    data = []
+    for row in rows:
+        cells = [_excel_cell(v) for v in row]
+        while cells and isinstance(cells[-1], str) and cells[-1] == "":
+            cells.pop()
+        data.append(cells)
+    while data and not data[-1]:
+        data.pop()
+    if not data:
+        return pd.DataFrame()
+    width = max(len(r) for r in data)
+    data = [r + [""] * (width - len(r)) for r in data]
+    try:
+        return TextParser(data, header=0, nrows=nrows, skip_blank_lines=False).read(nrows=nrows)
+    except EmptyDataError:
+        return pd.DataFrame()
+
+
+def read_preview(path: str, nrows: int, sheet: Any = 0) -> pd.DataFrame:
+    """Equivalent of pd.read_excel(path, sheet_name=sheet, nrows=nrows) for .xlsx files."""
+    with XlsxWorkbook(path) as wb:
+        return rows_to_dataframe(wb.read_rows(nrows + 1, sheet), nrows)
@@ -0,0 +1,273 @@
+"""
+Upload-once file store, so many prompts can reuse the same workbooks.
+
+POST /files keeps each upload on disk under its SHA-256, which is the file
+ID; /transform and /transform/stream take file_ids in place of uploads. A
+client that already knows a file's hash asks first and skips the upload if
+the server has it. Files already stored hash to the same ID, so a second
+upload of the same bytes is dropped as soon as it has been read.
+
+Each file is <FILE_STORE_DIR>/<file_id><ext> next to <file_id>.json (the
+original name, size and upload time); the .json's mtime is the last use. A
+request holds its files (acquire/release) so they are never removed under
+it. Files unused for FILE_TTL_SECONDS are removed, and the least recently
+used go first while the store is over FILE_STORE_MAX_MB. sweep() runs after
+every upload and at most once a minute when files are used.
+"""
+import os
+import re
+import json
+import time
+import logging
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.crewai_app.cache import remember_digest
+from backend.uploads import upload_suffix
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# File store settings (override via env)
+# -----------------------------------------------------------------------------
+FILE_STORE_DIR = os.getenv(
+    "FILE_STORE_DIR",
+    os.path.join(tempfile.gettempdir(), "excel_transformer_cache", "files"),
+)
+# Stored files not used for this long are removed
+FILE_TTL_SECONDS = int(os.getenv("FILE_TTL_SECONDS", "3600"))
+# Least recently used files are evicted above this size
+FILE_STORE_MAX_MB = int(os.getenv("FILE_STORE_MAX_MB", "4096"))
+
+SWEEP_INTERVAL_SECONDS = 60
+# Partial uploads (temp files) older than this were left by a request that died
+STALE_UPLOAD_SECONDS = 3600
+
+_FILE_ID = re.compile(r"^[0-9a-f]{64}$")
+
+
+class UnknownFile(Exception):
+    """Raised for a file ID the store doesn't have: never uploaded, expired or evicted."""
+
+
+class FileInUse(Exception):
+    """Raised when deleting a file a request is still using."""
+
+
+class FileStore:
+    def __init__(
+        self,
+        directory: str = FILE_STORE_DIR,
+        ttl_seconds: int = FILE_TTL_SECONDS,
+        max_bytes: int = FILE_STORE_MAX_MB * 1024 * 1024,
+    ):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._held: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._last_sweep = 0.0
+        os.makedirs(self.directory, exist_ok=True)
+
+    # -------------------------------------------------------------------------
+    # Entries
+    # -------------------------------------------------------------------------
+    def _meta_path(self, file_id: str) -> str:
+        return os.path.join(self.directory, f"{file_id}.json")
+
+    def _load(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """The entry for file_id, or None if it is malformed, unknown or its data is gone."""
+        if not isinstance(file_id, str) or not _FILE_ID.match(file_id):
+            return None
+        try:
+            with open(self._meta_path(file_id), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        path = os.path.join(self.directory, meta.get("stored_as", ""))
+        return {**meta, "path": path} if os.path.isfile(path) else None
+
+    def _touch(self, file_id: str):
+        try:
+            os.utime(self._meta_path(file_id), None)
+        except OSError:
+            pass
+
+    def _info(self, meta: Dict[str, Any]) -> Dict[str, Any]:
+        """What clients see: no server paths."""
+        try:
+            last_used = os.path.getmtime(self._meta_path(meta["file_id"]))
+        except OSError:
+            last_used = meta["uploaded_at"]
+        return {
+            "file_id": meta["file_id"],
+            "filename": meta["filename"],
+            "bytes": meta["bytes"],
+            "uploaded_at": meta["uploaded_at"],
+            "expires_at": round(last_used + self.ttl_seconds, 3),
+        }
+
+    def _remove(self, file_id: str, stored_as: Optional[str] = None):
+        # Data first: a .json without its data reads as unknown, never the other way round
+        if stored_as:
+            try:
+                os.remove(os.path.join(self.directory, stored_as))
+            except OSError:
+                pass
+        try:
+            os.remove(self._meta_path(file_id))
+        except OSError:
+            pass
+
+    # -------------------------------------------------------------------------
+    # API
+    # -------------------------------------------------------------------------
+    def info(self, file_id: str) -> Optional[Dict[str, Any]]:
+        meta = self._load(file_id)
+        return self._info(meta) if meta else None
+
+    def add(self, temp_path: str, file_id: str, filename: str) -> Tuple[Dict[str, Any], bool]:
+        """
+        Store an upload written to temp_path (in self.directory) under its
+        hash. Returns (info, stored) - stored is False when the file was
+        already there, in which case the copy is dropped.
+        """
+        with self._lock:
+            meta = self._load(file_id)
+            if meta is not None:
+                os.remove(temp_path)
+                self._touch(file_id)
+                return self._info(meta), False
+
+            stored_as = file_id + upload_suffix(filename)
+            meta = {
+                "file_id": file_id,
+                "filename": filename,
+                "stored_as": stored_as,
+                "bytes": os.path.getsize(temp_path),
+                "uploaded_at": round(time.time(), 3),
+            }
+            path = os.path.join(self.directory, stored_as)
+            os.replace(temp_path, path)
+            # Read-only: a stored file is shared by every request that names its ID
+            os.chmod(path, 0o444)
+            tmp_meta = self._meta_path(file_id) + ".tmp"
+            with open(tmp_meta, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp_meta, self._meta_path(file_id))
+        remember_digest(path, file_id)
+        self.sweep(keep=file_id)
+        return self._info(meta), True
+
+    def acquire(self, file_ids: List[str]) -> List[str]:
+        """Paths of the given files, held until release(). Raises UnknownFile for any the store doesn't have."""
+        with self._lock:
+            entries = []
+            for file_id in file_ids:
+                meta = self._load(file_id)
+                if meta is None:
+                    raise UnknownFile(f"Unknown file ID: {file_id} (never uploaded, expired or evicted - upload it again)")
+                entries.append(meta)
+            for meta in entries:
+                self._held[meta["file_id"]] = self._held.get(meta["file_id"], 0) + 1
+                self._touch(meta["file_id"])
+        if time.monotonic() - self._last_sweep > SWEEP_INTERVAL_SECONDS:
+            self.sweep()
+        return [meta["path"] for meta in entries]
+
+    def release(self, file_ids: List[str]):
+        with self._lock:
+            for file_id in file_ids:
+                count = self._held.get(file_id, 0) - 1
+                if count > 0:
+                    self._held[file_id] = count
+                else:
+                    self._held.pop(file_id, None)
+                # The TTL counts from the end of the last use
+                self._touch(file_id)
+
+    def delete(self, file_id: str) -> bool:
+        """Remove a file; False if the store doesn't have it. Raises FileInUse while a request holds it."""
+        with self._lock:
+            meta = self._load(file_id)
+            if meta is None:
+                return False
+            if self._held.get(file_id):
+                raise FileInUse(f"File {file_id} is in use by a running request.")
+            self._remove(file_id, meta["stored_as"])
+            return True
+
+    def sweep(self, keep: Optional[str] = None):
+        """Remove expired files, then the least recently used while over max_bytes. Held files (and `keep`) stay."""
+        with self._lock:
+            self._last_sweep = time.monotonic()
+            now = time.time()
+            try:
+                names = os.listdir(self.directory)
+            except OSError:
+                return
+            entries, data_files = [], {}
+            for name in names:
+                path = os.path.join(self.directory, name)
+                stem, _, ext = name.partition(".")
+                if not _FILE_ID.match(stem):
+                    # A partial upload, or one left behind by a request that died
+                    try:
+                        if now - os.path.getmtime(path) > STALE_UPLOAD_SECONDS:
+                            os.remove(path)
+                    except OSError:
+                        pass
+                    continue
+                if ext != "json":
+                    data_files[name] = stem
+                    continue
+                meta = self._load(stem)
+                try:
+                    used = os.path.getmtime(path)
+                except OSError:
+                    continue
+                entries.append((meta is not None, used, stem, meta))
+
+            total = sum(meta["bytes"] for valid, _, _, meta in entries if valid)
+            known = {meta["stored_as"] for valid, _, _, meta in entries if valid}
+            removed = 0
+            # Broken entries first, then oldest use
+            for valid, used, file_id, meta in sorted(entries, key=lambda e: (e[0], e[1])):
+                if valid and (file_id == keep or self._held.get(file_id) or (now - used <= self.ttl_seconds and total <= self.max_bytes)):
+                    continue
+                self._remove(file_id, meta["stored_as"] if valid else None)
+                if valid:
+                    total -= meta["bytes"]
+                removed += 1
+            # Data whose .json is gone (removed by hand, or a crash mid-write)
+            for name in data_files:
+                if name not in known:
+                    try:
+                        if now - os.path.getmtime(os.path.join(self.directory, name)) > STALE_UPLOAD_SECONDS:
+                            os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+            if removed:
+                logger.info(f"🧹 File store: removed {removed} files (now {total / (1024 * 1024):.1f} MB)")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            held = len(self._held)
+        files, total = 0, 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            names = []
+        for name in names:
+            stem, _, ext = name.partition(".")
+            if _FILE_ID.match(stem) and ext != "json":
+                files += 1
+                try:
+                    total += os.path.getsize(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+        return {"files": files, "bytes": total, "held": held}
+
+
+file_store = FileStore()
@@ -0,0 +1,273 @@
+import os
+import json
+import time
+import uuid
+import queue
+import shutil
+import logging
+import tempfile
+import threading
+import traceback
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Job queue settings (override via env)
+# -----------------------------------------------------------------------------
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "50"))
+# When set, job metadata and uploads live here and queued jobs survive a restart
+JOB_STORE_DIR = os.getenv("JOB_STORE_DIR") or None
+# How long finished jobs (and their results) are kept around
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "86400"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+
+class QueueFull(Exception):
+    """Raised when the job queue is at JOB_QUEUE_MAX pending jobs."""
+
+
+class JobQueue:
+    """
+    Bounded worker pool for crew runs.
+
+    Jobs are accepted by submit() and executed by `workers` background
+    threads calling runner(prompt, file_paths, **options). With a store_dir every job
+    gets its own directory holding job.json and its uploaded files, so
+    queued/running jobs are re-queued when the process restarts.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[str, List[str]], Any],
+        workers: int = JOB_WORKERS,
+        max_queue: int = JOB_QUEUE_MAX,
+        store_dir: Optional[str] = JOB_STORE_DIR,
+        retention_seconds: int = JOB_RETENTION_SECONDS,
+    ):
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.store_dir = store_dir
+        self.retention_seconds = retention_seconds
+
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+    def start(self):
+        if self._threads:
+            return
+        if self.store_dir:
+            os.makedirs(self.store_dir, exist_ok=True)
+            self._restore()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        logger.info(
+            f"🧵 Job queue started: {self.workers} workers, max {self.max_queue} pending, "
+            f"persistence {'at ' + self.store_dir if self.store_dir else 'disabled'}"
+        )
+
+    def shutdown(self, wait: bool = False):
+        for _ in self._threads:
+            self._queue.put(None)
+        if wait:
+            for t in self._threads:
+                t.join()
+        self._threads = []
+
+    # -------------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------------
+    def new_job_dir(self, job_id: str) -> str:
+        """Directory that holds a job's uploaded files."""
+        if self.store_dir:
+            path = os.path.join(self.store_dir, job_id, "files")
+            os.makedirs(path, exist_ok=True)
+            return path
+        return tempfile.mkdtemp(prefix=f"job-{job_id}-")
+
+    def check_capacity(self):
+        if self.pending_count() >= self.max_queue:
+            raise QueueFull(f"Job queue is full ({self.max_queue} pending jobs). Retry later.")
+
+    def submit(
+        self,
+        job_id: str,
+        prompt: str,
+        file_paths: List[str],
+        files_dir: str,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        with self._lock:
+            self._purge_expired()
+            pending = sum(1 for j in self._jobs.values() if j["status"] not in FINISHED_STATES)
+            if pending >= self.max_queue:
+                raise QueueFull(f"Job queue is full ({self.max_queue} pending jobs). Retry later.")
+            job = {
+                "job_id": job_id,
+                "status": QUEUED,
+                "prompt": prompt,
+                "files": file_paths,
+                "files_dir": files_dir,
+                "options": options or {},
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+            }
+            self._jobs[job_id] = job
+            self._persist(job)
+        self._queue.put(job_id)
+        logger.info(f"📥 Job {job_id} queued ({len(file_paths)} files)")
+        return self.status(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        info = {
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "created_at": job["created_at"],
+            "started_at": job["started_at"],
+            "finished_at": job["finished_at"],
+        }
+        if job["status"] == QUEUED:
+            info["position"] = self._position(job_id)
+        if job["status"] == FAILED:
+            info["error"] = job["error"]
+        return info
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if j["status"] not in FINISHED_STATES)
+
+    @staticmethod
+    def new_job_id() -> str:
+        return uuid.uuid4().hex
+
+    # -------------------------------------------------------------------------
+    # Internals
+    # -------------------------------------------------------------------------
+    def _position(self, job_id: str) -> int:
+        with self._lock:
+            queued = sorted(
+                (j for j in self._jobs.values() if j["status"] == QUEUED),
+                key=lambda j: j["created_at"],
+            )
+        for i, j in enumerate(queued):
+            if j["job_id"] == job_id:
+                return i + 1
+        return 0
+
+    def _worker(self):
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                return
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job["status"] != QUEUED:
+                    continue
+                job["status"] = RUNNING
+                job["started_at"] = time.time()
+                self._persist(job)
+
+            logger.info(f"▶️ Job {job_id} started")
+            try:
+                result = self.runner(job["prompt"], job["files"], **job.get("options", {}))
+                with self._lock:
+                    job["status"] = SUCCEEDED
+                    job["result"] = result
+                logger.info(f"✅ Job {job_id} succeeded in {time.time() - job['started_at']:.1f}s")
+            except Exception as e:
+                logger.error(f"❌ Job {job_id} failed: {e}\n{traceback.format_exc()}")
+                with self._lock:
+                    job["status"] = FAILED
+                    job["error"] = str(e)
+            finally:
+                with self._lock:
+                    job["finished_at"] = time.time()
+                    self._persist(job)
+                self._remove_files(job)
+
+    def _remove_files(self, job: Dict[str, Any]):
+        files_dir = job.get("files_dir")
+        if files_dir and os.path.isdir(files_dir):
+            shutil.rmtree(files_dir, ignore_errors=True)
+            logger.info(f"Removed job files: {files_dir}")
+
+    def _purge_expired(self):
+        """Drop finished jobs older than the retention window. Caller holds the lock."""
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            job_id for job_id, j in self._jobs.items()
+            if j["status"] in FINISHED_STATES and (j["finished_at"] or 0) < cutoff
+        ]
+        for job_id in expired:
+            self._jobs.pop(job_id, None)
+            if self.store_dir:
+                shutil.rmtree(os.path.join(self.store_dir, job_id), ignore_errors=True)
+
+    def _job_file(self, job_id: str) -> str:
+        return os.path.join(self.store_dir, job_id, "job.json")
+
+    def _persist(self, job: Dict[str, Any]):
+        """Write job.json atomically. Caller holds the lock."""
+        if not self.store_dir:
+            return
+        path = self._job_file(job["job_id"])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(job, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Failed to persist job {job['job_id']}: {e}")
+
+    def _restore(self):
+        """Reload persisted jobs; anything not finished is queued again."""
+        loaded = []
+        for job_id in os.listdir(self.store_dir):
+            path = self._job_file(job_id)
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    loaded.append(json.load(f))
+            except Exception as e:
+                logger.warning(f"Skipping unreadable job file {path}: {e}")
+
+        restored = 0
+        with self._lock:
+            for job in sorted(loaded, key=lambda j: j["created_at"]):
+                self._jobs[job["job_id"]] = job
+                if job["status"] not in FINISHED_STATES:
+                    job["status"] = QUEUED
+                    job["started_at"] = None
+                    self._persist(job)
+                    self._queue.put(job["job_id"])
+                    restored += 1
+            self._purge_expired()
+        if restored:
+            logger.info(f"♻️ Re-queued {restored} persisted jobs from {self.store_dir}")
@@ -0,0 +1,245 @@
+"""
+Logging setup for the API process.
+
+Request threads never write log output themselves: the root logger has a
+single QueueHandler, and a QueueListener thread passes records on to the
+console and to a log file that rotates by size and by time. If the queue
+fills up (the disk cannot keep up) records are dropped and counted rather
+than blocking requests.
+
+LOG_PROFILE picks the defaults: "development" logs everything at DEBUG to
+the file and keeps crew verbose output on; "production" logs at INFO,
+quiets crewai and LiteLLM and turns crew verbosity off. Levels of single
+loggers come from LOG_LEVELS and can be changed at runtime (set_level,
+used by the /admin/log-levels endpoint).
+"""
+import os
+import time
+import atexit
+import queue
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from typing import Dict, Optional
+
+from backend.metrics import metrics
+
+# -----------------------------------------------------------------------------
+# Logging settings (override via env)
+# -----------------------------------------------------------------------------
+LOG_PROFILE = os.getenv("LOG_PROFILE", "development").lower()
+PRODUCTION = LOG_PROFILE == "production"
+
+# Root and console levels; unset = the profile's (DEBUG/INFO in development, INFO/WARNING in production)
+LOG_LEVEL = os.getenv("LOG_LEVEL")
+LOG_CONSOLE_LEVEL = os.getenv("LOG_CONSOLE_LEVEL")
+LOG_FILE = os.getenv("LOG_FILE", os.path.join(os.getcwd(), "logs", "backend.log"))
+# The file rolls over when it reaches LOG_MAX_BYTES (0 = no size limit) or at LOG_ROTATE_WHEN
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN", "midnight")
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "7"))
+# Records waiting for the writer thread; beyond this new records are dropped
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Per-logger levels on top of the profile's, e.g. "crewai=INFO,backend.sandbox=DEBUG"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+
+# crewai's agent/crew verbose output (printed to the console on the request path)
+CREW_VERBOSE = os.getenv("CREW_VERBOSE", "0" if PRODUCTION else "1").lower() in ("1", "true", "yes")
+
+# Root and console levels per profile, then the levels of noisy or chatty loggers
+PROFILES = {
+    "development": {"root": "DEBUG", "console": "INFO"},
+    "production": {"root": "INFO", "console": "WARNING"},
+}
+PROFILE_LEVELS = {
+    "development": {
+        "crewai": "DEBUG",
+        "backend.crewai_app": "DEBUG",
+        "httpx": "WARNING",
+        "httpcore": "WARNING",
+        "LiteLLM": "INFO",
+    },
+    "production": {
+        "crewai": "WARNING",
+        "backend.crewai_app": "INFO",
+        "httpx": "WARNING",
+        "httpcore": "WARNING",
+        "LiteLLM": "WARNING",
+        "urllib3": "WARNING",
+    },
+}
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+ROOT = "root"
+
+
+class SizedTimedRotatingFileHandler(TimedRotatingFileHandler):
+    """
+    Rolls the file over at the `when` interval and also whenever it grows past
+    max_bytes. Files rolled over by size within one interval get .1, .2, ...
+    after the interval's date suffix; backup_count limits them all together.
+    """
+
+    def __init__(self, filename: str, when: str = "midnight", backup_count: int = 0, max_bytes: int = 0,
+                 encoding: Optional[str] = "utf-8"):
+        super().__init__(filename, when=when, backupCount=backup_count, encoding=encoding, delay=True)
+        self.max_bytes = max_bytes
+
+    def shouldRollover(self, record) -> int:
+        if super().shouldRollover(record):
+            return 1
+        if self.max_bytes <= 0:
+            return 0
+        if self.stream is None:
+            self.stream = self._open()
+        self.stream.seek(0, 2)
+        return int(self.stream.tell() + len(self.format(record)) + 1 >= self.max_bytes)
+
+    def rotation_filename(self, default_name: str) -> str:
+        name, n = default_name, 0
+        while os.path.exists(name):
+            n += 1
+            name = f"{default_name}.{n}"
+        return super().rotation_filename(name)
+
+    def getFilesToDelete(self):
+        # Oldest first by modification time - by name, "<date>" would sort before its own ".1", ".2"
+        backup_count, self.backupCount = self.backupCount, 0
+        try:
+            files = super().getFilesToDelete()
+        finally:
+            self.backupCount = backup_count
+        files.sort(key=os.path.getmtime)
+        return files[:max(0, len(files) - backup_count)]
+
+    def doRollover(self):
+        rollover_at = self.rolloverAt
+        super().doRollover()
+        if time.time() < rollover_at:
+            # A size rollover: keep the time schedule
+            self.rolloverAt = rollover_at
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full instead of blocking."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            metrics.incr("log.dropped")
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+_profile = LOG_PROFILE
+_configured: Dict[str, str] = {}  # logger name -> level set through LOG_LEVELS or set_level
+_lock = threading.Lock()
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _logger(name: str) -> logging.Logger:
+    return logging.getLogger() if name in (ROOT, "") else logging.getLogger(name)
+
+
+def configure_logging(
+    profile: str = LOG_PROFILE,
+    log_file: str = LOG_FILE,
+    level: Optional[str] = None,
+    console_level: Optional[str] = None,
+    levels: str = LOG_LEVELS,
+):
+    """
+    Send all records through the queue to the console and the rotating log
+    file. Replaces the root logger's handlers; calling it again reconfigures.
+    """
+    global _listener, _queue_handler, _profile
+    defaults = PROFILES.get(profile, PROFILES["development"])
+    level = (level or LOG_LEVEL or defaults["root"]).upper()
+    console_level = (console_level or LOG_CONSOLE_LEVEL or defaults["console"]).upper()
+    shutdown_logging()
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    console = logging.StreamHandler()
+    console.setLevel(console_level)
+    console.setFormatter(formatter)
+    handlers = [console]
+    if log_file:
+        os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+        file_handler = SizedTimedRotatingFileHandler(
+            log_file, when=LOG_ROTATE_WHEN, backup_count=LOG_BACKUP_COUNT, max_bytes=LOG_MAX_BYTES
+        )
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+
+    with _lock:
+        log_queue = queue.Queue(LOG_QUEUE_SIZE if LOG_QUEUE_SIZE > 0 else 0)
+        _queue_handler = DroppingQueueHandler(log_queue)
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_queue_handler)
+        root.setLevel(level)
+
+        _profile = profile
+        _configured.clear()
+        for name, logger_level in {**PROFILE_LEVELS.get(profile, {}), **_parse_levels(levels)}.items():
+            _logger(name).setLevel(logger_level)
+            _configured[name] = logger_level
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+
+
+def shutdown_logging():
+    """Write out the queued records and stop the writer thread."""
+    global _listener
+    with _lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def set_level(name: str, level: str) -> Dict[str, object]:
+    """Set logger `name`'s level ("root" for the root logger); raises ValueError for an unknown level."""
+    level = level.strip().upper()
+    if not isinstance(logging.getLevelName(level), int):
+        raise ValueError(f"Unknown log level: {level}")
+    with _lock:
+        _logger(name).setLevel(level)
+        if name not in (ROOT, ""):
+            _configured[name] = level
+    logging.getLogger(__name__).warning(f"🔧 Log level of {name or ROOT} set to {level}")
+    return get_levels()
+
+
+def get_levels() -> Dict[str, object]:
+    with _lock:
+        loggers = {name: logging.getLevelName(_logger(name).level) for name in sorted(_configured)}
+        dropped = _queue_handler.dropped if _queue_handler is not None else 0
+    return {
+        "profile": _profile,
+        ROOT: logging.getLevelName(logging.getLogger().level),
+        "loggers": loggers,
+        "dropped": dropped,
+    }
+
+
+# Records still queued at exit are written out
+atexit.register(shutdown_logging)
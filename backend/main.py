@@ -1,53 +1,146 @@
+# First: times every import after it for the startup report (see warmup.py)
+from backend.warmup import WARMUP_WAIT_SECONDS, warmup
+
 import os
-import tempfile
+import hmac
+import time
+import hashlib
+import shutil
+import asyncio
 import logging
 import traceback
 import inspect
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+
+# .env before any settings are read; crewai, LiteLLM and pandas load in the background (see _warm_up)
+load_dotenv(os.path.join(os.path.dirname(__file__), "..", ".env"))
 
-from fastapi import FastAPI, UploadFile, Form, File
+from fastapi import FastAPI, UploadFile, Form, File, Header
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
-
-try:
-    from backend.crewai_app.crewmain import run
-except Exception as e:
-    run = None
-    logging.getLogger(__name__).warning(
-        f"Could not import 'run' from backend.crewai_app.crewmain: {e}"
-    )
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from typing import Callable, List, Optional
+
+from backend.uploads import (
+    MAX_UPLOAD_REQUEST_BYTES,
+    UploadLimitMiddleware,
+    UploadTooLarge,
+    save_upload,
+)
+from backend.log_config import PRODUCTION, configure_logging, get_levels, set_level
+from backend.memory_monitor import PeakRSSMonitor
+from backend.metrics import metrics
+from backend.streaming import SSE_HEADERS, EventStream
+from backend.tracing import span, start_trace
+from backend.file_store import FileInUse, UnknownFile, file_store
+from backend.jobs import JobQueue, QueueFull, SUCCEEDED, FAILED
+from backend.sandbox import SANDBOX_WARM, SandboxUnavailable, sandbox_pool
+from backend.partition import execute_script
+from backend.crewai_app.script_cache import templatize, render
+from backend.crewai_app.static_check import read_paths
+
+# Set by the warm-up stages below
+columnar = None
+run = None
+crew_runs = None
+get_crew_pool = None
+llm_governor = None
+completion = None
+llm_settings = None
+script_cache = None
+BATCH = None
 
 # -----------------------------------------------------------------------------
 # Logging configuration
 # -----------------------------------------------------------------------------
 # Console: INFO-level only (so terminal isn’t spammed)
 # File: DEBUG-level (so you can check full trace later in logs/backend.log)
-log_dir = os.path.join(os.getcwd(), "logs")
-os.makedirs(log_dir, exist_ok=True)
-log_file = os.path.join(log_dir, "backend.log")
-
-logging.basicConfig(
-    level=logging.DEBUG,  # root logger
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(),                # console
-        logging.FileHandler(log_file, mode="a", encoding="utf-8")  # file
-    ]
-)
+# Both are written by a background thread; LOG_PROFILE=production logs less (see log_config.py)
+configure_logging()
 
-logging.getLogger("crewai").setLevel(logging.DEBUG)
-logging.getLogger("backend.crewai_app").setLevel(logging.DEBUG)
+logger = logging.getLogger("backend.main")
 
-# Silence noisy libs in console
-logging.getLogger("httpx").setLevel(logging.WARNING)
-logging.getLogger("httpcore").setLevel(logging.WARNING)
-logging.getLogger("LiteLLM").setLevel(logging.INFO)
+# Token for the /admin endpoints (X-Admin-Token header); without one they are open in development only
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
 
-logger = logging.getLogger("backend.main")
+# -----------------------------------------------------------------------------
+# Warm-up: heavy imports and pools, on a background thread once the app starts
+# -----------------------------------------------------------------------------
+def _load_columnar():
+    global columnar
+    from backend.crewai_app import columnar as columnar_module  # pandas, numpy
+    columnar = columnar_module
+
+
+def _load_crew():
+    global run, crew_runs, get_crew_pool, llm_governor, completion, llm_settings, script_cache, BATCH
+    from backend.crewai_app.crewmain import run, crew_runs  # crewai, LiteLLM (and the .env load)
+    from backend.crewai_app.crew_pool import get_crew_pool
+    from backend.crewai_app.llm_governor import BATCH, llm_governor
+    from backend.crewai_app.llm_provider import completion, llm_settings
+    from backend.crewai_app.script_cache import script_cache
+
+    # Gauges read on each /metrics report
+    # runs = crew executions started, coalesced = requests that waited for one instead
+    metrics.gauges("coalescing", crew_runs.stats)
+    metrics.gauges("llm_governor", llm_governor.stats)
+    metrics.gauges("script_cache", script_cache.stats)
+
+
+def _warm_crew_pool():
+    get_crew_pool().warm()
+
+
+warmup.stage("data", _load_columnar)
+warmup.stage("crew", _load_crew)
+# Crews are built on first use if this fails
+warmup.stage("crew_pool", _warm_crew_pool, required=False)
+if SANDBOX_WARM:
+    warmup.stage("sandbox", sandbox_pool.warm)
+
+
+async def _await_warmup(stage: str) -> Optional[JSONResponse]:
+    """None once warm-up `stage` has run; otherwise the 503 response to send."""
+    if not await run_in_threadpool(warmup.wait, stage, WARMUP_WAIT_SECONDS):
+        return JSONResponse(
+            status_code=503,
+            headers={"Retry-After": "5"},
+            content={"status": "error", "error": f"Server is still starting up ({stage}); retry shortly."},
+        )
+    error = warmup.error(stage)
+    if error:
+        return JSONResponse(status_code=503, content={"status": "error", "error": f"Server failed to start: {error}"})
+    return None
 
 # -----------------------------------------------------------------------------
-# FastAPI app setup
+# Job queue + FastAPI app setup
 # -----------------------------------------------------------------------------
-app = FastAPI()
+def _run_job(prompt: str, file_paths: List[str], **options):
+    warmup.wait("crew", WARMUP_WAIT_SECONDS)
+    if run is None:
+        raise Exception("Server misconfiguration: crew runner 'run' not available.")
+    # Queued jobs give way to interactive requests when LLM calls are rate-limited
+    return run(prompt, file_paths, priority=BATCH, **options)
+
+
+job_queue = JobQueue(runner=_run_job)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    job_queue.start()
+    # Serve /health right away; /ready reports when the warm-up is done
+    warmup.start()
+    yield
+    job_queue.shutdown()
+    sandbox_pool.shutdown()
+    if columnar is not None:
+        columnar.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -57,45 +150,167 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Reject oversized uploads from Content-Length before the body is parsed
+app.add_middleware(UploadLimitMiddleware)
+
 # -----------------------------------------------------------------------------
-# Endpoint
+# Endpoints
 # -----------------------------------------------------------------------------
+async def _save_uploads(
+    files: List[UploadFile], saved_files: List[str], dir: Optional[str] = None, digests: Optional[List[str]] = None
+):
+    """
+    Stream each upload to disk, appending paths to saved_files as they are
+    written so the caller can clean up after a partial failure. With a
+    `digests` list, each file's SHA-256 is computed while it is written
+    and appended to it.
+    """
+    total_bytes = 0
+    for file in files:
+        filename = getattr(file, "filename", None) or "upload"
+        hasher = hashlib.sha256() if digests is not None else None
+        path, written = await save_upload(file, dir=dir, hasher=hasher)
+        saved_files.append(path)
+        if hasher is not None:
+            digests.append(hasher.hexdigest())
+        total_bytes += written
+        if total_bytes > MAX_UPLOAD_REQUEST_BYTES:
+            raise UploadTooLarge(
+                f"Uploads exceed the {MAX_UPLOAD_REQUEST_BYTES // (1024 * 1024)} MB per-request limit."
+            )
+        logger.info(f"Saved temporary file: {path} (original: {filename}, {written} bytes)")
+
+
+def _after_conversion(ingestion: dict, path: str, action: Callable[[], None], cancel: bool = True):
+    """
+    Run action now, or once the columnar conversion started for path has
+    finished. With cancel, a conversion that hasn't started is dropped instead.
+    """
+    future = ingestion.get(path)
+    if future is None or (cancel and future.cancel()):
+        action()
+    else:
+        future.add_done_callback(lambda _: action())
+
+
+def _finish_inputs(ingestion: dict, saved_files: List[str], stored: List[tuple]):
+    """
+    Remove this request's uploads and release its stored files ((file_id, path)
+    pairs), each only once no conversion is reading it. Stored files are
+    worth converting for later requests, so their conversions are not cancelled.
+    """
+    for path in saved_files:
+        _after_conversion(ingestion, path, lambda path=path: _remove_temp_files([path]))
+    for file_id, path in stored:
+        _after_conversion(ingestion, path, lambda file_id=file_id: file_store.release([file_id]), cancel=False)
+
+
+def _remove_temp_files(saved_files: List[str]):
+    for path in saved_files:
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+                logger.info(f"Removed temporary file: {path}")
+        except Exception as e:
+            logger.error(f"Error deleting temp file {path}: {e}")
+
+
+def _parse_file_ids(file_ids: Optional[List[str]]) -> List[str]:
+    """file_ids form values: repeated fields, comma-separated, or both."""
+    return [i.strip().lower() for value in file_ids or [] for i in value.split(",") if i.strip()]
+
+
 @app.post("/transform")
-async def transform(prompt: str = Form(...), files: Optional[List[UploadFile]] = File(None)):
-    if not files:
+async def transform(
+    prompt: str = Form(...),
+    files: Optional[List[UploadFile]] = File(None),
+    file_ids: Optional[List[str]] = Form(None),
+    bypass_cache: bool = Form(False),
+    preinspect: Optional[bool] = Form(None),
+    static_check: Optional[bool] = Form(None),
+    execute: bool = Form(False),
+    debug: bool = Form(False),
+):
+    """
+    Inputs are uploads, IDs from POST /files, or both (stored files first).
+    With debug, the response carries the request's per-stage timing breakdown under "timings".
+    """
+    file_ids = _parse_file_ids(file_ids)
+    if not files and not file_ids:
         return {"error": "No files uploaded."}
 
+    not_ready = await _await_warmup("crew")
+    if not_ready is not None:
+        return not_ready
     if run is None:
         return {"status": "error", "error": "Server misconfiguration: crew runner 'run' not available."}
 
+    with start_trace("transform") as trace:
+        response = await _transform(prompt, files or [], file_ids, bypass_cache, preinspect, static_check, execute)
+    if debug and isinstance(response, dict):
+        response["timings"] = trace.breakdown()
+    return response
+
+
+async def _transform(prompt, files, file_ids, bypass_cache, preinspect, static_check, execute):
     saved_files = []
+    stored = []
+    ingestion = {}
+    started = time.perf_counter()
+    rss_monitor = PeakRSSMonitor().start()
     try:
-        logger.info(f"Processing {len(files)} Excel files with prompt: {prompt[:120]}")
-
-        # Save files and verify they exist
-        for file in files:
-            filename = getattr(file, "filename", None) or "upload.xlsx"
-            tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx")
-            content = await file.read()
-            tmp.write(content)
-            tmp.flush()
-            tmp.close()
-            saved_files.append(tmp.name)
-            logger.info(f"Saved temporary Excel file: {tmp.name} (original: {filename})")
+        logger.info(f"Processing {len(file_ids) + len(files)} files with prompt: {prompt[:120]}")
+
+        # Stored files are held until the request (and their conversion) ends; uploads are streamed to
+        # disk in bounded chunks (never hold a whole workbook in memory)
+        with span("upload", files=len(files), stored=len(file_ids)):
+            input_paths = file_store.acquire(file_ids)
+            stored = list(zip(file_ids, input_paths))
+            await _save_uploads(files, saved_files)
+            input_paths += saved_files
 
         # Verify files exist before calling crew
-        for path in saved_files:
+        for path in input_paths:
             if not os.path.exists(path):
                 raise Exception(f"Temporary file not created: {path}")
 
+        # Columnar copies, converted while the crew works: for the sandbox when the script is run, and
+        # always for stored files, which later requests reuse (they usually have one already)
+        ingestion = columnar.ingest(input_paths if execute else [path for _, path in stored])
+
         logger.info("Starting crew execution...")
-        result = run(prompt, saved_files)
+        # The crew run is synchronous and slow - keep it off the event loop
+        with span("crew"):
+            result = await run_in_threadpool(
+                run, prompt, input_paths, use_cache=not bypass_cache, preinspect=preinspect, static_check=static_check
+            )
 
         if inspect.isawaitable(result):
             result = await result
 
         logger.info("Crew execution completed successfully")
-        return {"status": "success", "script": result}
+        # Nothing reaches the client before the script; compare with /transform/stream
+        metrics.observe("transform.first_meaningful_byte", time.perf_counter() - started)
+        response = {"status": "success", "script": result}
+        if execute:
+            # Run the script on the uploads while they are still on disk
+            try:
+                with span("columnar_wait"):
+                    stores = await run_in_threadpool(columnar.wait, ingestion)
+                with span("execution"):
+                    response["execution"] = await run_in_threadpool(execute_script, result, input_paths, columnar=stores)
+            except SandboxUnavailable as e:
+                logger.error(f"❌ Sandbox unavailable: {e}")
+                response["execution"] = {"status": "unavailable", "error": str(e)}
+        return response
+
+    except UploadTooLarge as e:
+        logger.warning(f"❌ Upload rejected: {e}")
+        return JSONResponse(status_code=413, content={"status": "error", "error": str(e)})
+
+    except UnknownFile as e:
+        logger.warning(f"❌ {e}")
+        return JSONResponse(status_code=404, content={"status": "error", "error": str(e)})
 
     except Exception as e:
         logger.error(f"Error during transformation: {e}")
@@ -103,28 +318,411 @@ async def transform(prompt: str = Form(...), files: Optional[List[UploadFile]] =
         # Return detailed error for frontend display
         return {"status": "error", "error": str(e), "details": traceback.format_exc()}
     finally:
-        for path in saved_files:
-            try:
-                if os.path.exists(path):
-                    os.remove(path)
-                    logger.info(f"Removed temporary file: {path}")
-            except Exception as e:
-                logger.error(f"Error deleting temp file {path}: {e}")
+        _finish_inputs(ingestion, saved_files, stored)
+        rss_monitor.stop()
+        logger.info(f"📈 /transform {rss_monitor.summary()}")
+
+
+@app.post("/transform/stream")
+async def transform_stream(
+    prompt: str = Form(...),
+    files: Optional[List[UploadFile]] = File(None),
+    file_ids: Optional[List[str]] = Form(None),
+    bypass_cache: bool = Form(False),
+    preinspect: Optional[bool] = Form(None),
+    static_check: Optional[bool] = Form(None),
+    execute: bool = Form(False),
+    debug: bool = Form(False),
+):
+    """
+    /transform as Server-Sent Events: upload, inspection (schema summary),
+    cache_hit, agent_started, token, agent_finished, static_check, script,
+    execution, then done - or error. With debug, done carries "timings".
+    Takes uploads and/or file_ids like /transform.
+    """
+    files = files or []
+    file_ids = _parse_file_ids(file_ids)
+    if not files and not file_ids:
+        return JSONResponse(status_code=400, content={"status": "error", "error": "No files uploaded."})
+
+    not_ready = await _await_warmup("crew")
+    if not_ready is not None:
+        return not_ready
+    if run is None:
+        return JSONResponse(status_code=500, content={"status": "error", "error": "Server misconfiguration: crew runner 'run' not available."})
+
+    stream = EventStream("transform_stream")
+    saved_files = []
+    held = []
+    try:
+        logger.info(f"Streaming {len(file_ids) + len(files)} files with prompt: {prompt[:120]}")
+        input_paths = file_store.acquire(file_ids)
+        held = file_ids
+        stored = list(zip(file_ids, input_paths))
+        await _save_uploads(files, saved_files)
+
+        infos = [file_store.info(file_id) or {} for file_id in file_ids]
+        stream.emit("upload", {"files": [
+            {"name": info.get("filename"), "bytes": info.get("bytes"), "file_id": file_id}
+            for file_id, info in zip(file_ids, infos)
+        ] + [
+            {"name": getattr(f, "filename", None), "bytes": os.path.getsize(path)} for f, path in zip(files, saved_files)
+        ]})
+        input_paths += saved_files
+        ingestion = columnar.ingest(input_paths if execute else [path for _, path in stored])
+    except UnknownFile as e:
+        logger.warning(f"❌ {e}")
+        return JSONResponse(status_code=404, content={"status": "error", "error": str(e)})
+    except UploadTooLarge as e:
+        _remove_temp_files(saved_files)
+        file_store.release(held)
+        logger.warning(f"❌ Upload rejected: {e}")
+        return JSONResponse(status_code=413, content={"status": "error", "error": str(e)})
+    except Exception as e:
+        _remove_temp_files(saved_files)
+        file_store.release(held)
+        logger.error(f"Error preparing streamed transform: {e}")
+        return JSONResponse(status_code=500, content={"status": "error", "error": str(e)})
+
+    options = {"use_cache": not bypass_cache, "preinspect": preinspect, "static_check": static_check}
+    # The worker owns the inputs: uploads stay on disk (and stored files held) until the crew is done, even if the client leaves
+    worker = asyncio.create_task(
+        run_in_threadpool(_stream_transform, stream, prompt, input_paths, options, execute, ingestion, debug,
+                          saved_files, stored)
+    )
+    _stream_workers.add(worker)
+    worker.add_done_callback(_stream_workers.discard)
+    return StreamingResponse(stream.events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+# Running /transform/stream workers, referenced so they are not garbage-collected mid-run
+_stream_workers = set()
+
+
+def _stream_transform(
+    stream: EventStream, prompt: str, input_paths: List[str], options: dict, execute: bool, ingestion,
+    debug: bool = False, saved_files: Optional[List[str]] = None, stored: Optional[List[tuple]] = None,
+):
+    """Runs the crew for /transform/stream; removes saved_files and releases the stored files when done."""
+    rss_monitor = PeakRSSMonitor().start()
+    try:
+        with start_trace("transform_stream") as trace:
+            with span("crew"):
+                script = run(prompt, input_paths, on_event=stream.emit, **options)
+            stream.emit("script", {"script": script})
+            if execute:
+                try:
+                    with span("columnar_wait"):
+                        stores = columnar.wait(ingestion)
+                    with span("execution"):
+                        execution = execute_script(script, input_paths, columnar=stores)
+                except SandboxUnavailable as e:
+                    logger.error(f"❌ Sandbox unavailable: {e}")
+                    execution = {"status": "unavailable", "error": str(e)}
+                stream.emit("execution", execution)
+        done = {"status": "success"}
+        if debug:
+            done["timings"] = trace.breakdown()
+        stream.emit("done", done)
+    except Exception as e:
+        logger.error(f"Error during streamed transformation: {e}")
+        logger.error(traceback.format_exc())
+        metrics.incr("transform_stream.errors")
+        stream.emit("error", {"status": "error", "error": str(e)})
+    finally:
+        _finish_inputs(ingestion, saved_files or [], stored or [])
+        stream.close()
+        rss_monitor.stop()
+        logger.info(f"📈 /transform/stream {rss_monitor.summary()}")
+
+
+metrics.gauges("file_store", file_store.stats)
+
+
+@app.post("/files")
+async def upload_files(
+    files: Optional[List[UploadFile]] = File(None),
+    file_ids: Optional[List[str]] = Form(None),
+):
+    """
+    Store files for reuse across prompts; their IDs (the SHA-256 of the
+    content) go to /transform as file_ids. Send file_ids alone to ask which
+    hashes the server already has - only the "missing" ones need uploading.
+    A file the server already has is dropped once read and reported as "exists".
+    """
+    results, missing = [], []
+    for file_id in _parse_file_ids(file_ids):
+        info = file_store.info(file_id)
+        if info is None:
+            missing.append(file_id)
+        else:
+            results.append({**info, "status": "exists"})
+
+    saved_files, digests = [], []
+    try:
+        await _save_uploads(files or [], saved_files, dir=file_store.directory, digests=digests)
+        for file, digest in zip(files or [], digests):
+            filename = getattr(file, "filename", None) or "upload"
+            info, stored = await run_in_threadpool(file_store.add, saved_files[0], digest, filename)
+            saved_files.pop(0)  # moved into the store (or dropped as a duplicate)
+            results.append({**info, "status": "stored" if stored else "exists"})
+            metrics.incr("files.stored" if stored else "files.deduplicated")
+            logger.info(f"📦 {'Stored' if stored else 'Already stored'}: {filename} as {digest[:12]}")
+        return {"status": "success", "files": results, "missing": missing}
+
+    except UploadTooLarge as e:
+        logger.warning(f"❌ Upload rejected: {e}")
+        return JSONResponse(status_code=413, content={"status": "error", "error": str(e)})
+    except Exception as e:
+        logger.error(f"Error storing files: {e}")
+        logger.error(traceback.format_exc())
+        return JSONResponse(status_code=500, content={"status": "error", "error": str(e)})
+    finally:
+        _remove_temp_files(saved_files)
+
+
+@app.get("/files/{file_id}")
+async def get_file(file_id: str):
+    info = file_store.info(file_id.lower())
+    if info is None:
+        return JSONResponse(status_code=404, content={"status": "error", "error": f"Unknown file ID: {file_id}"})
+    return info
+
+
+@app.delete("/files/{file_id}")
+async def delete_file(file_id: str):
+    try:
+        deleted = file_store.delete(file_id.lower())
+    except FileInUse as e:
+        return JSONResponse(status_code=409, content={"status": "error", "error": str(e)})
+    if not deleted:
+        return JSONResponse(status_code=404, content={"status": "error", "error": f"Unknown file ID: {file_id}"})
+    return {"status": "success", "file_id": file_id.lower()}
+
+
+@app.get("/health")
+async def health():
+    """Liveness: the process is serving. Cheap - no warm-up needed."""
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness: 200 once the warm-up has finished, 503 while it runs or if it failed. Carries the startup report."""
+    if warmup.ready:
+        return {"status": "ready", "startup": warmup.report()}
+    failed = warmup.failed
+    if failed:
+        return JSONResponse(status_code=503, content={"status": "error", "error": failed, "startup": warmup.report()})
+    return JSONResponse(status_code=503, content={"status": "warming", "startup": warmup.report()})
+
+
+@app.get("/metrics")
+async def get_metrics(format: str = "prometheus"):
+    """
+    Counters, latency histograms (per span, LLM queue wait, time to first
+    meaningful byte...) and gauges in the Prometheus text format, or as a
+    JSON summary with percentiles with ?format=json.
+    """
+    if format == "json":
+        return metrics.snapshot()
+    return PlainTextResponse(metrics.prometheus(), media_type="text/plain; version=0.0.4")
+
+
+def _admin_denied(token: Optional[str]) -> Optional[JSONResponse]:
+    if ADMIN_TOKEN:
+        if token and hmac.compare_digest(token, ADMIN_TOKEN):
+            return None
+    elif not PRODUCTION:
+        return None
+    return JSONResponse(status_code=403, content={"status": "error", "error": "Admin token required."})
+
+
+@app.get("/admin/log-levels")
+async def get_log_levels(x_admin_token: Optional[str] = Header(None)):
+    """Profile, root level, configured logger levels and records dropped by the log queue."""
+    denied = _admin_denied(x_admin_token)
+    if denied is not None:
+        return denied
+    return get_levels()
+
+
+@app.put("/admin/log-levels")
+async def put_log_level(
+    logger_name: str = Form(..., alias="logger"),
+    level: str = Form(...),
+    x_admin_token: Optional[str] = Header(None),
+):
+    """Change one logger's level ("root" for the root logger) until the next restart."""
+    denied = _admin_denied(x_admin_token)
+    if denied is not None:
+        return denied
+    try:
+        return set_level(logger_name, level)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"status": "error", "error": str(e)})
+
+
+@app.post("/execute")
+async def execute_uploaded_script(
+    script: str = Form(...),
+    files: Optional[List[UploadFile]] = File(None),
+    partition: Optional[bool] = Form(None),
+    x_admin_token: Optional[str] = Header(None),
+):
+    """Run a (generated or edited) script against the uploaded files in the sandbox pool."""
+    # Arbitrary code, so the same gate as /admin
+    denied = _admin_denied(x_admin_token)
+    if denied is not None:
+        return denied
+    not_ready = await _await_warmup("data")
+    if not_ready is not None:
+        return not_ready
+    saved_files = []
+    ingestion = {}
+    try:
+        await _save_uploads(files or [], saved_files)
+        # The script refers to files by the names they were uploaded with
+        script = _use_saved_paths(script, files or [], saved_files)
+        # Converting is quicker than the openpyxl read it replaces, and a workbook seen before is a cache hit
+        ingestion = columnar.ingest(saved_files)
+        with span("columnar_wait"):
+            stores = await run_in_threadpool(columnar.wait, ingestion)
+        with span("execution"):
+            execution = await run_in_threadpool(execute_script, script, saved_files, partition, columnar=stores)
+        if execution["status"] != "ok":
+            return {"status": "error", "error": execution["error"], "execution": execution}
+        return {"status": "success", "execution": execution}
+
+    except UploadTooLarge as e:
+        logger.warning(f"❌ Upload rejected: {e}")
+        return JSONResponse(status_code=413, content={"status": "error", "error": str(e)})
+    except SandboxUnavailable as e:
+        logger.error(f"❌ Sandbox unavailable: {e}")
+        return JSONResponse(status_code=503, content={"status": "error", "error": str(e)}, headers={"Retry-After": "10"})
+    except Exception as e:
+        logger.error(f"Error during execution: {e}")
+        logger.error(traceback.format_exc())
+        return {"status": "error", "error": str(e), "details": traceback.format_exc()}
+    finally:
+        _finish_inputs(ingestion, saved_files, [])
+
+
+def _use_saved_paths(script: str, files: List[UploadFile], saved_files: List[str]) -> str:
+    """
+    Point the spreadsheet paths the script reads at this request's saved
+    uploads: an upload whose file name matches the path's, otherwise the
+    uploads in order (a script from /transform names that request's temp files).
+    """
+    by_name = {getattr(f, "filename", None): path for f, path in zip(files, saved_files)}
+    unmatched = list(saved_files)
+    referenced, targets = [], []
+    for ref in read_paths(script):
+        target = by_name.get(os.path.basename(ref.replace("\\", "/")))
+        if target is None or target not in unmatched:
+            target = unmatched[0] if unmatched else None
+        if target is None:
+            break
+        unmatched.remove(target)
+        referenced.append(ref)
+        targets.append(target)
+    return render(templatize(script, referenced), targets)
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(
+    prompt: str = Form(...),
+    files: Optional[List[UploadFile]] = File(None),
+    bypass_cache: bool = Form(False),
+    preinspect: Optional[bool] = Form(None),
+    static_check: Optional[bool] = Form(None),
+):
+    """Queue a transform job and return its ID immediately."""
+    if not files:
+        return JSONResponse(status_code=400, content={"status": "error", "error": "No files uploaded."})
+
+    try:
+        job_queue.check_capacity()
+    except QueueFull as e:
+        logger.warning(f"❌ Job rejected: {e}")
+        return JSONResponse(status_code=429, content={"status": "error", "error": str(e)}, headers={"Retry-After": "30"})
+
+    job_id = job_queue.new_job_id()
+    files_dir = job_queue.new_job_dir(job_id)
+    saved_files = []
+    try:
+        await _save_uploads(files, saved_files, dir=files_dir)
+        return job_queue.submit(job_id, prompt, saved_files, files_dir, options={
+            "use_cache": not bypass_cache,
+            "preinspect": preinspect,
+            "static_check": static_check,
+        })
+
+    except UploadTooLarge as e:
+        shutil.rmtree(files_dir, ignore_errors=True)
+        logger.warning(f"❌ Upload rejected: {e}")
+        return JSONResponse(status_code=413, content={"status": "error", "error": str(e)})
+    except QueueFull as e:
+        shutil.rmtree(files_dir, ignore_errors=True)
+        logger.warning(f"❌ Job rejected: {e}")
+        return JSONResponse(status_code=429, content={"status": "error", "error": str(e)}, headers={"Retry-After": "30"})
+    except Exception as e:
+        shutil.rmtree(files_dir, ignore_errors=True)
+        logger.error(f"Error queuing job: {e}")
+        logger.error(traceback.format_exc())
+        return JSONResponse(status_code=500, content={"status": "error", "error": str(e)})
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    info = job_queue.status(job_id)
+    if info is None:
+        return JSONResponse(status_code=404, content={"status": "error", "error": f"Unknown job: {job_id}"})
+    return info
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"status": "error", "error": f"Unknown job: {job_id}"})
+    if job["status"] == SUCCEEDED:
+        return {"status": "success", "job_id": job_id, "script": job["result"]}
+    if job["status"] == FAILED:
+        return {"status": "error", "job_id": job_id, "error": job["error"]}
+    return JSONResponse(
+        status_code=409,
+        content={"status": job["status"], "job_id": job_id, "error": "Job has not finished yet."},
+    )
+
+
+def _governed(call):
+    """Run a direct LLM call under the shared rate limits, like the crews' calls."""
+    if llm_governor is None:
+        return call()
+    return llm_governor.call(call, prompt_tokens=10)
 
 
 @app.get("/test-api-key")
 async def test_api_key():
     """Test endpoint to debug API key issues"""
-    import os
-    from dotenv import load_dotenv
-    from litellm import completion
-    
-    # Test 1: Check if .env is loaded
-    load_dotenv()
-    api_key = os.getenv("GEMINI_API_KEY")
+    # Test 1: Check if .env is loaded (at startup) and the provider layer imported
+    not_ready = await _await_warmup("crew")
+    if not_ready is not None:
+        return not_ready
+    if llm_settings is None:
+        return {"success": False, "error": "Server misconfiguration: LLM provider layer not available."}
+    try:
+        settings = llm_settings()
+    except ValueError as e:
+        return {"success": False, "error": str(e)}
+    api_key = settings.api_key
     
     result = {
         "env_loaded": True,
+        "provider": settings.provider,
+        "model": settings.model,
+        "base_url": settings.base_url,
         "api_key_found": bool(api_key),
         "api_key_preview": api_key[:10] + "..." if api_key else "MISSING",
         "api_key_length": len(api_key) if api_key else 0,
@@ -135,19 +733,18 @@ async def test_api_key():
     # Test 2: Try direct API call
     if api_key:
         try:
-            response = completion(
-                model="gemini/gemini-2.5-flash",
-                api_key=api_key,
+            response = await run_in_threadpool(_governed, lambda: completion(
                 messages=[{"role": "user", "content": "Say hello in one word"}],
+                settings=settings,
                 max_tokens=10
-            )
+            ))
             result["test_result"] = response.choices[0].message.content
             result["success"] = True
         except Exception as e:
             result["error"] = str(e)
             result["success"] = False
     else:
-        result["error"] = "No API key found"
+        result["error"] = f"No API key found ({settings.key_source})"
         result["success"] = False
     
     return result
@@ -155,6 +752,9 @@ async def test_api_key():
 @app.get("/test-crew-llm")
 async def test_crew_llm():
     """Test the crew's LLM configuration directly"""
+    not_ready = await _await_warmup("crew")
+    if not_ready is not None:
+        return not_ready
     try:
         from backend.crewai_app.crew import CsvOrganiser
         
@@ -163,7 +763,9 @@ async def test_crew_llm():
         llm = crew._get_llm()
         
         result = {
+            "llm_provider": llm_settings().provider,
             "llm_model": getattr(llm, 'model', 'Unknown'),
+            "llm_base_url": getattr(llm, 'base_url', None),
             "llm_api_key_set": bool(getattr(llm, 'api_key', None)),
             "llm_api_key_preview": getattr(llm, 'api_key', '')[:10] + "..." if getattr(llm, 'api_key', None) else "MISSING",
             "test_result": None,
@@ -173,13 +775,14 @@ async def test_crew_llm():
         # Test the LLM directly
         try:
             # This tests if the LLM object can make calls
-            from litellm import completion
-            test_response = completion(
-                model=llm.model,
-                api_key=llm.api_key,
+            settings = llm_settings()._replace(
+                model=llm.model, api_key=llm.api_key, base_url=getattr(llm, "base_url", None)
+            )
+            test_response = await run_in_threadpool(_governed, lambda: completion(
                 messages=[{"role": "user", "content": "Say 'test successful'"}],
+                settings=settings,
                 max_tokens=10
-            )
+            ))
             result["test_result"] = test_response.choices[0].message.content
             result["success"] = True
         except Exception as e:
@@ -0,0 +1,89 @@
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# How often the sampler polls process RSS while a request is running
+RSS_SAMPLE_INTERVAL = float(os.getenv("RSS_SAMPLE_INTERVAL", "0.05"))
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+def current_rss_bytes():
+    """
+    Return the current resident set size of this process in bytes,
+    or None when it cannot be determined on this platform.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        pass
+
+    try:
+        import psutil  # optional, used on platforms without /proc
+
+        return psutil.Process().memory_info().rss
+    except Exception:
+        return None
+
+
+class PeakRSSMonitor:
+    """
+    Context manager that samples process RSS in a background thread and
+    records the peak seen while the block runs.
+
+    Note: RSS is process-wide, so with concurrent requests the peak
+    includes memory held by the other in-flight requests.
+    """
+
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.start_rss = None
+        self.peak_rss = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = current_rss_bytes()
+        if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+            self.peak_rss = rss
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self.start_rss = current_rss_bytes()
+        self.peak_rss = self.start_rss
+        if self.start_rss is not None:
+            self._thread = threading.Thread(target=self._loop, name="rss-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self._sample()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def summary(self) -> str:
+        if self.start_rss is None or self.peak_rss is None:
+            return "peak RSS unavailable on this platform"
+        mb = 1024 * 1024
+        return (
+            f"peak RSS {self.peak_rss / mb:.1f} MB "
+            f"(start {self.start_rss / mb:.1f} MB, +{(self.peak_rss - self.start_rss) / mb:.1f} MB)"
+        )
@@ -0,0 +1,167 @@
+import os
+import re
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, List, Tuple
+
+# Latency samples kept per metric for the percentiles in GET /metrics?format=json
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "1024"))
+# Prefix of every metric name in the Prometheus exposition
+METRICS_PREFIX = os.getenv("METRICS_PREFIX", "excel_transformer")
+
+# Histogram bucket bounds in seconds, from a cache hit to a slow crew run
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _key(name: str, labels: Labels) -> str:
+    return name + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else "")
+
+
+class Metrics:
+    """
+    In-process counters, latency histograms and gauges, reported by GET /metrics.
+
+    observe() feeds a cumulative histogram (Prometheus) and a window of the
+    last METRICS_WINDOW values (percentiles in the JSON view). Gauges are
+    read from callbacks registered with gauges() when a report is made.
+    Names are dotted (`llm.queue_wait`); labels are keyword arguments.
+    """
+
+    def __init__(self, window: int = METRICS_WINDOW, buckets=LATENCY_BUCKETS):
+        self.window = max(1, window)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._samples: Dict[Tuple[str, Labels], Deque[float]] = {}
+        self._histograms: Dict[Tuple[str, Labels], list] = {}  # -> [bucket counts..., count, sum]
+        self._gauges: Dict[str, Callable[[], Dict[str, float]]] = {}
+
+    def incr(self, name: str, value: float = 1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+                self._histograms[key] = [0] * (len(self.buckets) + 2) + [0.0]
+            samples.append(seconds)
+            histogram = self._histograms[key]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[i] += 1
+            histogram[-3] += 1  # +Inf
+            histogram[-2] += 1
+            histogram[-1] += seconds
+
+    def gauges(self, name: str, read: Callable[[], Dict[str, float]]):
+        """Report read()'s numbers as gauges `<name>.<key>`; None values are skipped."""
+        with self._lock:
+            self._gauges[name] = read
+
+    def _read_gauges(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            readers = dict(self._gauges)
+        values = {}
+        for name, read in readers.items():
+            try:
+                values[name] = read()
+            except Exception:
+                continue
+        return values
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            counters = {_key(name, labels): value for (name, labels), value in self._counters.items()}
+            samples = {key: sorted(values) for key, values in self._samples.items()}
+            totals = {key: (h[-2], h[-1]) for key, h in self._histograms.items()}
+        summaries = {}
+        for key, values in samples.items():
+            count, total = totals[key]
+            summaries[_key(*key)] = {
+                "count": count,
+                "mean": round(total / count, 4),
+                "p50": round(_percentile(values, 0.50), 4),
+                "p95": round(_percentile(values, 0.95), 4),
+                "max": round(values[-1], 4),
+            }
+        return {"counters": counters, "latency_seconds": summaries, **self._read_gauges()}
+
+    def prometheus(self) -> str:
+        """Text exposition format (version 0.0.4)."""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(h) for key, h in self._histograms.items()}
+        lines: List[str] = []
+
+        for name in sorted({name for name, _ in counters}):
+            metric = _metric_name(name) + "_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{metric}{_label_text(labels)} {_number(value)}")
+
+        for name in sorted({name for name, _ in histograms}):
+            metric = _metric_name(name) + "_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for (n, labels), h in sorted(histograms.items()):
+                if n != name:
+                    continue
+                for bound, count in zip(self.buckets, h):
+                    lines.append(f"{metric}_bucket{_label_text(labels + (('le', _number(bound)),))} {count}")
+                lines.append(f"{metric}_bucket{_label_text(labels + (('le', '+Inf'),))} {h[-3]}")
+                lines.append(f"{metric}_count{_label_text(labels)} {h[-2]}")
+                lines.append(f"{metric}_sum{_label_text(labels)} {_number(h[-1])}")
+
+        for group, values in sorted(self._read_gauges().items()):
+            for key, value in sorted(_flatten(values).items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                metric = _metric_name(f"{group}.{key}")
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _flatten(values: Dict, prefix: str = "") -> Dict[str, object]:
+    flat = {}
+    for key, value in values.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", f"{METRICS_PREFIX}_{name}" if METRICS_PREFIX else name)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{re.sub(r"[^a-zA-Z0-9_]", "_", k)}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not float(value).is_integer() else str(int(value))
+
+
+def _percentile(ordered, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+metrics = Metrics()
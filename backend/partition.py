@@ -0,0 +1,703 @@
+"""
+Partitioned execution of row-local scripts.
+
+analyze() decides from the script's AST whether every row of the main
+(largest) input can be processed independently of the others. It does this
+by tracking the DataFrame that pd.read_* returns, and everything derived
+from it, through filters, column derivations, renames, merges against small
+reference tables, row-wise apply and the like. Anything it cannot prove
+row-local makes the script ineligible: sorting, grouping, deduplication,
+reductions, positional indexing, data-dependent control flow, unknown calls.
+
+execute_script() then runs an eligible script in three sandbox steps:
+1. prepare - one worker reads the main input with the script's own read call
+   and pickles it in row ranges (the original index is kept);
+2. partitions - the script runs once per range in parallel, with its read
+   call swapped for the pickle and its outputs redirected;
+3. merge - CSV outputs are concatenated, other outputs are concatenated as
+   frames and written with the script's own arguments.
+Ineligible scripts, small inputs and any failure along the way run the
+script once in a single worker, exactly as SandboxPool.execute does.
+"""
+import os
+import re
+import ast
+import json
+import time
+import shutil
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from backend.sandbox import SandboxPool, sandbox_pool
+from backend.crewai_app.script_cache import templatize, render
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Partitioned execution settings (override via env)
+# -----------------------------------------------------------------------------
+# Default for requests that don't choose: partition eligible scripts (1) or always run single-process (0)
+PARTITION_EXECUTION = os.getenv("PARTITION_EXECUTION", "1").lower() in ("1", "true", "yes")
+# Main inputs smaller than this run single-process; partitioning costs an extra read and merge
+PARTITION_MIN_MB = float(os.getenv("PARTITION_MIN_MB", "5"))
+# Rows per partition never go below this
+PARTITION_MIN_ROWS = int(os.getenv("PARTITION_MIN_ROWS", "50000"))
+# Number of partitions (0 = one per sandbox worker)
+PARTITION_COUNT = int(os.getenv("PARTITION_COUNT", "0"))
+# Other inputs are re-read whole by every partition, so they must be small reference tables
+PARTITION_REFERENCE_MAX_MB = float(os.getenv("PARTITION_REFERENCE_MAX_MB", "20"))
+
+MB = 1024 * 1024
+
+READ_CALLS = {"read_excel", "read_csv", "read_table", "read_parquet"}
+# Keyword arguments of the main read call that change which rows become the frame
+_READ_ROW_KWARGS = {"header", "skiprows", "nrows", "skipfooter", "index_col", "chunksize", "iterator", "names"}
+
+# DataFrame/Series methods that treat every row on its own
+ROW_LOCAL_METHODS = {
+    "assign", "rename", "rename_axis", "astype", "replace", "map", "applymap", "where", "mask",
+    "clip", "round", "abs", "isin", "between", "isna", "notna", "isnull", "notnull", "copy",
+    "filter", "query", "eval", "insert", "set_index", "select_dtypes", "explode", "get",
+    "add_prefix", "add_suffix", "fillna", "dropna", "drop", "reindex", "reset_index",
+    "apply", "merge",
+    "add", "sub", "mul", "div", "truediv", "floordiv", "mod", "pow",
+    "radd", "rsub", "rmul", "rdiv", "rtruediv", "rfloordiv", "rmod", "rpow",
+    "eq", "ne", "lt", "le", "gt", "ge",
+    # Reductions are row-local only across columns (axis=1)
+    "sum", "mean", "min", "max", "count", "prod", "any", "all", "median",
+}
+_AXIS1_ONLY = {"sum", "mean", "min", "max", "count", "prod", "any", "all", "median"}
+# Element-wise accessors; every method behind them is row-local except these
+_ACCESSORS = {"str", "dt"}
+_ACCESSOR_REDUCTIONS = {"cat"}
+# Attributes that are the same in every partition (the schema)
+_INVARIANT_ATTRS = {"columns", "dtypes"}
+# Attributes of the data that are safe to use; anything else (shape, index, iloc, values ...) is not
+_ALLOWED_ATTRS = {"loc", "str", "dt", "columns", "dtypes", "dtype", "name"}
+# Functions that work element-wise on the frames/series they're given
+ROW_LOCAL_FUNCTIONS = {
+    "to_numeric", "to_datetime", "to_timedelta", "isna", "notna", "isnull", "notnull",
+    "where", "select", "isnan", "isfinite", "floor", "ceil", "log", "log1p", "log10", "exp",
+    "sqrt", "maximum", "minimum", "sign", "isinstance",
+    "abs", "expm1", "sin", "cos", "tan", "arcsin", "arccos", "arctan", "arctan2", "sinh", "cosh", "tanh",
+    "arcsinh", "arccosh", "arctanh",
+}
+# Expression strings of DataFrame.query / DataFrame.eval / pd.eval, checked like script code
+_EXPRESSION_METHODS = {"query", "eval"}
+_DISPLAY_CALLS = {"print", "display"}
+# File writes that can't be redirected per partition and merged
+_UNTRACKED_WRITES = {
+    "to_json", "to_pickle", "to_html", "to_xml", "to_feather", "to_hdf", "to_sql", "to_markdown",
+    "to_latex", "to_stata", "save", "savefig", "write", "writerow", "writerows", "dump",
+}
+
+# Outputs: CSV parts are concatenated as text, the rest as frames (via pickles)
+OUTPUT_METHODS = {"to_csv": "csv", "to_excel": "frame", "to_parquet": "frame"}
+_OUTPUT_KWARGS = {
+    "to_csv": {"index", "sep", "encoding", "columns", "na_rep", "float_format", "date_format", "quoting",
+               "quotechar", "lineterminator", "decimal", "header", "escapechar", "doublequote", "index_label"},
+    "to_excel": {"index", "sheet_name", "columns", "na_rep", "float_format", "engine", "freeze_panes",
+                 "index_label"},
+    "to_parquet": {"index", "engine", "compression"},
+}
+_OUTPUT_PATH_KWARGS = {"path_or_buf", "excel_writer", "path"}
+
+
+# -----------------------------------------------------------------------------
+# Analysis
+# -----------------------------------------------------------------------------
+def _dotted(node: ast.AST) -> str:
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+def _string_constants(tree: ast.AST) -> Dict[str, str]:
+    """Names assigned exactly once, to a string constant (input_path = r"...")."""
+    values: Dict[str, List[Any]] = {}
+    for node in ast.walk(tree):
+        targets = []
+        if isinstance(node, ast.Assign):
+            targets = [(t, node.value) for t in node.targets]
+        elif isinstance(node, (ast.AnnAssign, ast.AugAssign)):
+            targets = [(node.target, node.value if isinstance(node, ast.AnnAssign) else None)]
+        elif isinstance(node, (ast.For, ast.comprehension)):
+            targets = [(node.target, None)]
+        for target, value in targets:
+            if isinstance(target, ast.Name):
+                values.setdefault(target.id, []).append(value)
+    return {
+        name: vals[0].value for name, vals in values.items()
+        if len(vals) == 1 and isinstance(vals[0], ast.Constant) and isinstance(vals[0].value, str)
+    }
+
+
+def _literal(node: ast.AST, constants: Dict[str, str]):
+    """Value of a literal or a string-constant name; raises ValueError otherwise."""
+    if isinstance(node, ast.Name) and node.id in constants:
+        return constants[node.id]
+    return ast.literal_eval(node)
+
+
+def _keyword(call: ast.Call, name: str) -> Optional[ast.AST]:
+    for kw in call.keywords:
+        if kw.arg == name:
+            return kw.value
+    return None
+
+
+def _path_arg(call: ast.Call, names: Set[str]) -> Optional[ast.AST]:
+    if call.args:
+        return call.args[0]
+    for kw in call.keywords:
+        if kw.arg in names:
+            return kw.value
+    return None
+
+
+def _norm(path: str) -> str:
+    return os.path.normcase(os.path.normpath(path.replace("\\", "/")))
+
+
+class _Analysis:
+    def __init__(self, script: str, file_paths: List[str]):
+        self.script = script
+        self.file_paths = file_paths
+        self.reasons: List[str] = []
+        self.tree: Optional[ast.Module] = None
+        self.constants: Dict[str, str] = {}
+        self.tainted: Set[str] = set()
+        self.functions: Dict[str, ast.FunctionDef] = {}
+        self.main_input: Optional[str] = None
+        self.main_read: Optional[ast.Call] = None
+        self.outputs: List[Dict[str, Any]] = []
+        self.resets_index = False
+
+    def reject(self, reason: str, node: Optional[ast.AST] = None):
+        line = getattr(node, "lineno", None)
+        self.reasons.append(f"line {line}: {reason}" if line else reason)
+
+    # -- taint ----------------------------------------------------------------
+    def is_tainted(self, node: Optional[ast.AST]) -> bool:
+        """Does the expression depend on the rows of the main input (other than through its schema)?"""
+        if node is None:
+            return False
+        if isinstance(node, ast.Name):
+            return node.id in self.tainted
+        if isinstance(node, ast.Attribute) and node.attr in _INVARIANT_ATTRS:
+            return False
+        return any(self.is_tainted(child) for child in ast.iter_child_nodes(node))
+
+    def propagate(self):
+        """Taint every name assigned from a tainted expression, until nothing changes."""
+        changed = True
+        while changed:
+            changed = False
+            for node in ast.walk(self.tree):
+                new: List[str] = []
+                if isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign)) and self.is_tainted(node.value):
+                    targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                    for target in targets:
+                        new.extend(n.id for n in ast.walk(target) if isinstance(n, ast.Name))
+                elif isinstance(node, ast.NamedExpr) and self.is_tainted(node.value):
+                    new.append(node.target.id)
+                elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in self.functions:
+                    # Parameters of the script's own functions that receive the frame
+                    fn = self.functions[node.func.id]
+                    params = [a.arg for a in fn.args.posonlyargs + fn.args.args]
+                    new.extend(p for p, arg in zip(params, node.args) if self.is_tainted(arg))
+                    new.extend(kw.arg for kw in node.keywords if kw.arg and self.is_tainted(kw.value))
+                for name in new:
+                    if name not in self.tainted:
+                        self.tainted.add(name)
+                        changed = True
+
+    # -- checks ---------------------------------------------------------------
+    def check(self, node: ast.AST):
+        if isinstance(node, ast.Call):
+            self.check_call(node)
+            return
+        if (isinstance(node, ast.Attribute) and self.is_tainted(node.value) and node.attr not in _ALLOWED_ATTRS
+                and not (isinstance(node.value, ast.Attribute) and node.value.attr in _ACCESSORS)):  # .dt.year
+            self.reject(f"'.{node.attr}' depends on the whole input", node)
+        elif isinstance(node, ast.Subscript) and self.is_tainted(node.value):
+            if any(isinstance(n, ast.Slice) for n in ast.walk(node.slice)):
+                self.reject("positional slicing of the input", node)
+        elif isinstance(node, (ast.If, ast.While, ast.IfExp, ast.Assert)) and self.is_tainted(node.test):
+            self.reject("control flow depends on the data", node)
+        elif isinstance(node, (ast.For, ast.AsyncFor, ast.comprehension)) and self.is_tainted(node.iter):
+            self.reject("iterates over the data", getattr(node, "iter", node))
+        for child in ast.iter_child_nodes(node):
+            self.check(child)
+
+    def check_call(self, call: ast.Call):
+        name = _dotted(call.func)
+        short = name.rsplit(".", 1)[-1]
+        if short in _DISPLAY_CALLS or name.startswith(("logger.", "logging.")):
+            return  # output only; each partition's stdout is kept
+
+        func = call.func
+        args = list(call.args) + [kw.value for kw in call.keywords]
+        if short in _UNTRACKED_WRITES or (short == "open" and self.opens_for_writing(call)):
+            self.reject(f"'{short}' writes a file that can't be merged across partitions", call)
+        elif isinstance(func, ast.Attribute) and self.is_tainted(func.value):
+            self.check_method(call, func)
+            self.check(func.value)
+        elif isinstance(func, ast.Attribute) and func.attr in OUTPUT_METHODS:
+            self.reject(f"writes a file that is not derived from the main input ({func.attr})", call)
+        elif name in ("pd.eval", "pandas.eval"):
+            self.check_expression(call, "eval", columns=False)
+        else:
+            if any(self.is_tainted(a) for a in args):
+                if short == "merge":
+                    self.check_merge(call, call.args[0] if call.args else _keyword(call, "left"),
+                                     call.args[1] if len(call.args) > 1 else _keyword(call, "right"))
+                elif isinstance(func, ast.Name) and func.id in self.functions:
+                    pass  # body is checked like the rest of the script
+                elif short not in ROW_LOCAL_FUNCTIONS:
+                    self.reject(f"'{name or short}' is given the data and may combine rows", call)
+            self.check(func)
+        for arg in args:
+            self.check(arg)
+
+    @staticmethod
+    def opens_for_writing(call: ast.Call) -> bool:
+        mode = call.args[1] if len(call.args) > 1 else _keyword(call, "mode")
+        if mode is None:
+            return False
+        return not (isinstance(mode, ast.Constant) and isinstance(mode.value, str) and set(mode.value) <= set("rbt"))
+
+    def check_method(self, call: ast.Call, func: ast.Attribute):
+        method = func.attr
+        receiver = func.value
+        axis = _keyword(call, "axis")
+        axis_value = axis.value if isinstance(axis, ast.Constant) else None
+
+        if isinstance(receiver, ast.Attribute) and receiver.attr in _ACCESSORS:
+            if method in _ACCESSOR_REDUCTIONS:
+                self.reject(f"'.{receiver.attr}.{method}' combines rows", call)
+            return
+        if method in OUTPUT_METHODS:
+            self.add_output(call, method, receiver)
+            return
+        if method not in ROW_LOCAL_METHODS:
+            self.reject(f"'{method}' is not row-local", call)
+        elif method in _AXIS1_ONLY and axis_value not in (1, "columns"):
+            self.reject(f"'{method}' without axis=1 reduces over rows", call)
+        elif method in _EXPRESSION_METHODS:
+            self.check_expression(call, method)
+        elif method == "apply":
+            single_column = isinstance(receiver, ast.Subscript) and isinstance(receiver.slice, ast.Constant)
+            if axis_value not in (1, "columns") and not single_column:
+                self.reject("'apply' on a frame without axis=1 works column by column", call)
+        elif method == "dropna" and axis_value in (1, "columns"):
+            self.reject("'dropna(axis=1)' depends on the whole column", call)
+        elif method == "drop" and _keyword(call, "columns") is None and axis_value not in (1, "columns"):
+            self.reject("'drop' of rows by label", call)
+        elif method == "reindex" and (call.args or _keyword(call, "index") is not None):
+            self.reject("'reindex' of rows", call)
+        elif method == "fillna" and _keyword(call, "method") is not None:
+            self.reject("'fillna(method=...)' carries values between rows", call)
+        elif method == "merge":
+            self.check_merge(call, receiver, call.args[0] if call.args else _keyword(call, "right"))
+        elif method == "reset_index":
+            drop = _keyword(call, "drop")
+            if isinstance(drop, ast.Constant) and drop.value:
+                self.resets_index = True
+
+    def check_expression(self, call: ast.Call, method: str, columns: bool = True):
+        """
+        The expression string of query/eval, parsed and checked like the script.
+        On a frame (columns=True) bare names are its columns and @names the
+        script's variables; in pd.eval every name is a script variable.
+        """
+        node = call.args[0] if call.args else _keyword(call, "expr")
+        try:
+            expr = _literal(node, self.constants) if node is not None else None
+        except ValueError:
+            expr = None
+        if not isinstance(expr, str):
+            self.reject(f"'{method}' expression is not a constant string", call)
+            return
+        source = re.sub(r"`[^`]*`", "_column", expr)  # `column name`
+        variables = set(re.findall(r"@([A-Za-z_]\w*)", source))
+        try:
+            tree = ast.parse(re.sub(r"@(?=[A-Za-z_])", "", source).strip())
+        except SyntaxError:
+            self.reject(f"'{method}' expression can't be analysed", call)
+            return
+        ast.increment_lineno(tree, call.lineno - 1)
+        saved = self.tainted
+        if columns:
+            self.tainted = saved | ({n.id for n in ast.walk(tree) if isinstance(n, ast.Name)} - variables)
+        try:
+            self.check(tree)
+        finally:
+            self.tainted = saved
+
+    def check_merge(self, call: ast.Call, left: Optional[ast.AST], right: Optional[ast.AST]):
+        how = _keyword(call, "how")
+        how_value = how.value if isinstance(how, ast.Constant) else ("inner" if how is None else None)
+        if not self.is_tainted(left) or self.is_tainted(right):
+            self.reject("merge must have the main input on the left and a reference table on the right", call)
+        elif how_value not in ("left", "inner"):
+            self.reject("only left and inner merges keep rows independent", call)
+        self.resets_index = True  # merge results are numbered from 0 in every partition
+
+    def add_output(self, call: ast.Call, method: str, receiver: ast.AST):
+        path_node = _path_arg(call, _OUTPUT_PATH_KWARGS)
+        try:
+            path = _literal(path_node, self.constants) if path_node is not None else None
+        except ValueError:
+            path = None
+        if not isinstance(path, str):
+            self.reject(f"'{method}' target is not a constant path", call)
+            return
+        if os.path.isabs(path) or _norm(path).startswith(".."):
+            self.reject(f"'{method}' writes outside the working directory", call)
+            return
+        kwargs = {}
+        for kw in call.keywords:
+            if kw.arg in _OUTPUT_PATH_KWARGS:
+                continue
+            if kw.arg not in _OUTPUT_KWARGS[method]:
+                self.reject(f"'{method}({kw.arg}=...)' can't be merged", call)
+                return
+            try:
+                kwargs[kw.arg] = _literal(kw.value, self.constants)
+            except ValueError:
+                self.reject(f"'{method}({kw.arg}=...)' is not a literal", call)
+                return
+        if len(call.args) > 1:
+            self.reject(f"'{method}' with positional options", call)
+            return
+        if method == "to_csv" and kwargs.get("header", True) not in (True, False):
+            self.reject("'to_csv(header=[...])' can't be merged", call)
+            return
+        if any(o["path"] == _norm(path) for o in self.outputs):
+            self.reject(f"'{path}' is written more than once", call)
+            return
+        self.outputs.append({
+            "call": call, "method": method, "receiver": receiver, "path": _norm(path),
+            "path_node": path_node, "kwargs": kwargs,
+        })
+
+    # -- entry ----------------------------------------------------------------
+    def run(self) -> "_Analysis":
+        try:
+            self.tree = ast.parse(self.script)
+        except SyntaxError as e:
+            self.reject(f"syntax error: {e.msg}")
+            return self
+        self.constants = _string_constants(self.tree)
+        self.functions = {n.name: n for n in ast.walk(self.tree) if isinstance(n, ast.FunctionDef)}
+
+        inputs = {_norm(p): p for p in self.file_paths}
+        reads: List[Tuple[ast.Call, str]] = []
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.Call) and _dotted(node.func).rsplit(".", 1)[-1] in READ_CALLS | {"ExcelFile", "load_workbook"}:
+                path_node = _path_arg(node, {"io", "filepath_or_buffer", "path", "filename"})
+                try:
+                    path = _literal(path_node, self.constants) if path_node is not None else None
+                except ValueError:
+                    path = None
+                if isinstance(path, str) and _norm(path) in inputs:
+                    reads.append((node, inputs[_norm(path)]))
+                else:
+                    self.reject("an input is read through a path that isn't a constant", node)
+        if not reads:
+            self.reject("no input is read with pd.read_*")
+            return self
+
+        sizes = {p: os.path.getsize(p) for _, p in reads}
+        self.main_input = max(sizes, key=sizes.get)
+        main_reads = [call for call, p in reads if p == self.main_input]
+        if len(main_reads) > 1:
+            self.reject("the main input is read more than once", main_reads[1])
+        self.main_read = main_reads[0]
+        for call, path in reads:
+            if path != self.main_input and sizes[path] > PARTITION_REFERENCE_MAX_MB * MB:
+                self.reject(f"reference table {os.path.basename(path)} is larger than {PARTITION_REFERENCE_MAX_MB:g} MB", call)
+        self.check_main_read()
+        if self.reasons:
+            return self
+
+        self.propagate()
+        self.check(self.tree)
+        if not self.outputs:
+            self.reject("writes no output derived from the main input")
+        if self.resets_index and any(o["kwargs"].get("index", True) is not False for o in self.outputs):
+            self.reject("the index is renumbered (merge or reset_index(drop=True)) and an output writes it")
+        return self
+
+    def check_main_read(self):
+        call = self.main_read
+        name = _dotted(call.func).rsplit(".", 1)[-1]
+        if name not in READ_CALLS:
+            self.reject(f"the main input is opened with {name}", call)
+            return
+        if len(call.args) > 1:
+            self.reject("the main read call has positional options", call)
+        for kw in call.keywords:
+            if kw.arg in _READ_ROW_KWARGS or kw.arg is None:
+                self.reject(f"the main read call uses {kw.arg or '**kwargs'}=", call)
+            elif kw.arg == "sheet_name":
+                try:
+                    sheet = _literal(kw.value, self.constants)
+                except ValueError:
+                    sheet = None
+                if not isinstance(sheet, (str, int)):
+                    self.reject("the main read call must read a single sheet", call)
+            else:
+                try:
+                    _literal(kw.value, self.constants)
+                except ValueError:
+                    self.reject(f"the main read call's {kw.arg}= is not a literal", call)
+        # df = pd.read_excel(...) - the frame has to land in a name we can follow
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.Assign) and node.value is call:
+                if len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+                    self.tainted.add(node.targets[0].id)
+                    return
+        self.reject("the main input is not assigned to a variable", call)
+
+
+def analyze(script: str, file_paths: List[str]) -> Dict[str, Any]:
+    """
+    Can the script be run per row range of its largest input? Returns
+    {"row_local": bool, "reasons": [...], "input": path, "outputs": [paths]}.
+    """
+    analysis = _Analysis(script, file_paths).run()
+    return {
+        "row_local": not analysis.reasons,
+        "reasons": analysis.reasons,
+        "input": analysis.main_input,
+        "outputs": [o["path"] for o in analysis.outputs],
+    }
+
+
+# -----------------------------------------------------------------------------
+# Script rewriting
+# -----------------------------------------------------------------------------
+def _replace_nodes(script: str, replacements: List[Tuple[ast.AST, str]]) -> str:
+    """Replace each node's source span (col offsets are UTF-8 byte offsets)."""
+    data = script.encode("utf-8")
+    line_starts = [0]
+    for line in data.splitlines(keepends=True):
+        line_starts.append(line_starts[-1] + len(line))
+
+    def offset(lineno, col):
+        return line_starts[lineno - 1] + col
+
+    spans = sorted(
+        ((offset(n.lineno, n.col_offset), offset(n.end_lineno, n.end_col_offset), text) for n, text in replacements),
+        reverse=True,
+    )
+    for start, end, text in spans:
+        data = data[:start] + text.encode("utf-8") + data[end:]
+    return data.decode("utf-8")
+
+
+def _segment(script: str, node: ast.AST) -> str:
+    return ast.get_source_segment(script, node)
+
+
+def _prepare_script(analysis: _Analysis, parts_dir: str, count: int) -> str:
+    call = analysis.main_read
+    read = _segment(analysis.script, call.func).rsplit(".", 1)[-1]
+    kwargs = {kw.arg: _literal(kw.value, analysis.constants) for kw in call.keywords}
+    return "\n".join([
+        "import os, json, math",
+        "import pandas as pd",
+        f"df = pd.{read}({analysis.main_input!r}, **{kwargs!r})",
+        f"size = max({PARTITION_MIN_ROWS}, math.ceil(len(df) / {count}))",
+        "starts = list(range(0, len(df), size)) or [0]",
+        "for i, start in enumerate(starts):",
+        f"    df.iloc[start:start + size].to_pickle(os.path.join({parts_dir!r}, f'in_{{i:05d}}.pkl'))",
+        f"with open(os.path.join({parts_dir!r}, 'manifest.json'), 'w') as f:",
+        "    json.dump({'rows': len(df), 'size': size, 'partitions': len(starts)}, f)",
+    ])
+
+
+def _partition_script(analysis: _Analysis, parts_dir: str, index: int) -> str:
+    replacements = [(analysis.main_read, f"__import__('pandas').read_pickle({os.path.join(parts_dir, f'in_{index:05d}.pkl')!r})")]
+    for k, output in enumerate(analysis.outputs):
+        if OUTPUT_METHODS[output["method"]] == "csv":
+            replacements.append((output["path_node"], repr(os.path.join(parts_dir, f"out_{k}_{index:05d}.csv"))))
+        else:
+            receiver = _segment(analysis.script, output["receiver"])
+            target = os.path.join(parts_dir, f"out_{k}_{index:05d}.pkl")
+            replacements.append((output["call"], f"({receiver}).to_pickle({target!r})"))
+    return _replace_nodes(analysis.script, replacements)
+
+
+def _merge_script(analysis: _Analysis, parts_dir: str, count: int, scratch: str) -> Optional[str]:
+    lines = ["import os", "import pandas as pd"]
+    for k, output in enumerate(analysis.outputs):
+        if OUTPUT_METHODS[output["method"]] != "frame":
+            continue
+        parts = [os.path.join(parts_dir, f"out_{k}_{i:05d}.pkl") for i in range(count)]
+        target = os.path.join(scratch, output["path"])
+        lines += [
+            f"os.makedirs(os.path.dirname({target!r}), exist_ok=True)",
+            f"pd.concat([pd.read_pickle(p) for p in {parts!r}]).{output['method']}({target!r}, **{output['kwargs']!r})",
+        ]
+    return "\n".join(lines) if len(lines) > 2 else None
+
+
+def _merge_csv(analysis: _Analysis, parts_dir: str, count: int, scratch: str):
+    """Concatenate CSV parts, keeping the header line (and BOM) of the first part only."""
+    for k, output in enumerate(analysis.outputs):
+        if OUTPUT_METHODS[output["method"]] != "csv":
+            continue
+        header = output["kwargs"].get("header", True) is not False
+        target = os.path.join(scratch, output["path"])
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as out:
+            for i in range(count):
+                with open(os.path.join(parts_dir, f"out_{k}_{i:05d}.csv"), "rb") as part:
+                    if i:
+                        head = part.read(3)
+                        if head != b"\xef\xbb\xbf":
+                            part.seek(0)
+                        if header:
+                            part.readline()
+                    shutil.copyfileobj(part, out, 1024 * 1024)
+
+
+# -----------------------------------------------------------------------------
+# Execution
+# -----------------------------------------------------------------------------
+def execute_script(
+    script: str,
+    file_paths: List[str],
+    partition: Optional[bool] = None,
+    pool: Optional[SandboxPool] = None,
+    columnar: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """
+    SandboxPool.execute, partitioned across the pool's workers when the
+    script is row-local and its main input is large enough. The result has
+    a "partitioning" entry saying whether it was used and, if not, why.
+    `columnar` maps inputs to their columnar stores (see SandboxPool.execute).
+    """
+    pool = pool or sandbox_pool
+    partition = PARTITION_EXECUTION if partition is None else partition
+    rejected = pool.rejection(script, file_paths)
+    if rejected is not None:
+        rejected["partitioning"] = {"used": False, "reasons": ["rejected"]}
+        return rejected
+
+    reasons = ["disabled for this request"] if not partition else []
+    if partition:
+        decision = analyze(script, file_paths)
+        reasons = decision["reasons"]
+        if not reasons and os.path.getsize(decision["input"]) < PARTITION_MIN_MB * MB:
+            reasons = [f"main input is smaller than {PARTITION_MIN_MB:g} MB"]
+    if not reasons:
+        result = _execute_partitioned(pool, script, file_paths, columnar)
+        if result["partitioning"]["used"]:
+            return result
+        reasons = result["partitioning"]["reasons"]
+
+    logger.info(f"🧩 Single-process run: {reasons[0] if reasons else 'not partitioned'}")
+    result = pool.execute(script, file_paths, columnar)
+    result["partitioning"] = {"used": False, "reasons": reasons}
+    return result
+
+
+def _execute_partitioned(
+    pool: SandboxPool, script: str, file_paths: List[str], columnar: Optional[Dict[str, str]]
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    scratch = pool.new_scratch()
+    parts_dir = os.path.join(scratch, ".partitions")
+    try:
+        local_paths = pool.stage_inputs(scratch, file_paths)
+        stores = pool.local_stores(file_paths, local_paths, columnar)
+        script = render(templatize(script, file_paths), local_paths)
+        analysis = _Analysis(script, local_paths).run()
+        if analysis.reasons:  # the path rewrite shouldn't change the verdict, but be sure
+            return _not_used(analysis.reasons)
+        os.makedirs(parts_dir)
+        count = PARTITION_COUNT or pool.size
+
+        # 1. prepare: one read of the main input, pickled per row range
+        prepare_path = os.path.join(parts_dir, "prepare.py")
+        prepared = pool.run_script(
+            _prepare_script(analysis, parts_dir, count), prepare_path, columnar=stores, write_root=scratch
+        )
+        if prepared["status"] != "ok":
+            return _not_used([f"prepare step failed: {prepared['error']}"])
+        with open(os.path.join(parts_dir, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        prepare_seconds = time.perf_counter() - started
+
+        # 2. the script on every range, in parallel
+        def run_part(i: int) -> Dict[str, Any]:
+            run_dir = os.path.join(parts_dir, f"run_{i:05d}")
+            os.makedirs(run_dir)
+            script_path = os.path.join(run_dir, "final_script.py")
+            return pool.run_script(
+                _partition_script(analysis, parts_dir, i), script_path, columnar=stores, write_root=scratch
+            )
+
+        with ThreadPoolExecutor(max_workers=min(pool.size, manifest["partitions"])) as executor:
+            parts = list(executor.map(run_part, range(manifest["partitions"])))
+        failed = [(i, r) for i, r in enumerate(parts) if r["status"] != "ok"]
+        if failed:
+            i, r = failed[0]
+            return _not_used([f"partition {i} failed ({r['status']}): {r['error']}"])
+        partitions_seconds = time.perf_counter() - started - prepare_seconds
+
+        # 3. merge
+        _merge_csv(analysis, parts_dir, manifest["partitions"], scratch)
+        merge = _merge_script(analysis, parts_dir, manifest["partitions"], scratch)
+        if merge is not None:
+            merged = pool.run_script(merge, os.path.join(parts_dir, "merge.py"), write_root=scratch)
+            if merged["status"] != "ok":
+                return _not_used([f"merge step failed: {merged['error']}"])
+        merge_seconds = time.perf_counter() - started - prepare_seconds - partitions_seconds
+
+        shutil.rmtree(parts_dir, ignore_errors=True)
+        outputs = pool.collect_outputs(scratch, skip=local_paths)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    rows, size = manifest["rows"], manifest["size"]
+    stdout = "".join(
+        f"--- partition {i} (rows {i * size}-{min(rows, (i + 1) * size)}) ---\n{r['stdout']}"
+        for i, r in enumerate(parts)
+    )
+    result = {
+        "status": "ok",
+        "exit_code": 0,
+        "error": None,
+        "stdout": stdout,
+        "stderr": "".join(r["stderr"] for r in parts),
+        "outputs": outputs,
+        "timings": {
+            "prepare_seconds": round(prepare_seconds, 3),
+            "partitions_seconds": round(partitions_seconds, 3),
+            "merge_seconds": round(merge_seconds, 3),
+            "cpu_seconds": round(sum(r["timings"]["cpu_seconds"] or 0 for r in parts), 3),
+            "total_ms": round((time.perf_counter() - started) * 1000, 1),
+        },
+        "partitioning": {"used": True, "partitions": manifest["partitions"], "rows": rows, "reasons": []},
+    }
+    logger.info(
+        f"🧩 Partitioned run ok: {rows} rows in {manifest['partitions']} partitions, "
+        f"{result['timings']['total_ms']:.0f} ms (prepare {prepare_seconds:.2f}s, "
+        f"partitions {partitions_seconds:.2f}s, merge {merge_seconds:.2f}s)"
+    )
+    return result
+
+
+def _not_used(reasons: List[str]) -> Dict[str, Any]:
+    logger.warning(f"⚠️ Partitioned run abandoned: {reasons[0]}")
+    return {"partitioning": {"used": False, "reasons": reasons}}
@@ -0,0 +1,453 @@
+import os
+import time
+import queue
+import base64
+import shutil
+import signal
+import logging
+import tempfile
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl  # POSIX only
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+from backend.sandbox_worker import worker_main
+from backend.crewai_app.script_cache import templatize, render
+from backend.crewai_app.static_check import check_script, format_findings
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Script execution sandbox settings (override via env)
+# -----------------------------------------------------------------------------
+SANDBOX_WORKERS = int(os.getenv("SANDBOX_WORKERS", "2"))
+# Start the workers (and their pandas/numpy/openpyxl imports) when the server starts
+SANDBOX_WARM = os.getenv("SANDBOX_WARM", "1").lower() in ("1", "true", "yes")
+# Replace a worker after this many runs so state a script leaves behind can't pile up
+SANDBOX_MAX_RUNS_PER_WORKER = int(os.getenv("SANDBOX_MAX_RUNS_PER_WORKER", "50"))
+SANDBOX_CPU_SECONDS = float(os.getenv("SANDBOX_CPU_SECONDS", "60"))
+SANDBOX_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "2048"))
+SANDBOX_WALL_SECONDS = float(os.getenv("SANDBOX_WALL_SECONDS", "120"))
+# Cap per output file (enforced while writing) and on the output bytes returned per run
+SANDBOX_MAX_OUTPUT_MB = float(os.getenv("SANDBOX_MAX_OUTPUT_MB", "100"))
+SANDBOX_MAX_STDIO_KB = int(os.getenv("SANDBOX_MAX_STDIO_KB", "64"))
+# Parent directory of the per-run scratch directories
+SANDBOX_DIR = os.getenv("SANDBOX_DIR") or None
+
+# Static findings that stop a script from being executed at all
+BLOCKING_FINDINGS = ("syntax", "banned_import", "banned_call", "unknown_file")
+
+_STARTUP_TIMEOUT = 120
+_SCRIPT_NAME = "final_script.py"
+_INPUTS_DIR = "inputs"
+# ioctl that makes a file share another's blocks copy-on-write (btrfs, XFS)
+_FICLONE = 0x40049409
+# The only variables a worker starts with: scripts can read their environment, so no API keys or tokens
+_ENV_KEEP = ("PATH", "HOME", "USER", "LANG", "LANGUAGE", "TZ", "TMPDIR", "TEMP", "TMP",
+             "PYTHONPATH", "PYTHONHOME", "SYSTEMROOT")
+_ENV_KEEP_PREFIXES = ("LC_", "COLUMNAR_")
+_ENV_KEEP_SUFFIXES = ("_NUM_THREADS",)
+_env_lock = threading.Lock()
+
+# Same start method as the inspection pool: safe from a threaded server, works on Windows
+_mp = multiprocessing.get_context("spawn")
+
+
+class SandboxUnavailable(Exception):
+    """Raised when no worker could be started or none became free in time."""
+
+
+def _env_kept(name: str) -> bool:
+    return name in _ENV_KEEP or name.startswith(_ENV_KEEP_PREFIXES) or name.endswith(_ENV_KEEP_SUFFIXES)
+
+
+@contextmanager
+def _scrubbed_environment():
+    """
+    Processes started inside the block inherit only the _ENV_KEEP variables.
+    Only the C-level environment is changed (os.unsetenv/os.putenv), so
+    os.environ stays whole for the server's other threads.
+    """
+    with _env_lock:
+        hidden = {name: value for name, value in os.environ.items() if not _env_kept(name)}
+        for name in hidden:
+            os.unsetenv(name)
+        try:
+            yield
+        finally:
+            for name, value in hidden.items():
+                os.putenv(name, value)
+
+
+class _Worker:
+    def __init__(self, memory_mb: int, max_file_bytes: int):
+        self.conn, child_conn = _mp.Pipe()
+        self.process = _mp.Process(
+            target=worker_main, args=(child_conn, memory_mb, max_file_bytes), name="sandbox-worker", daemon=True
+        )
+        with _scrubbed_environment():
+            self.process.start()
+        child_conn.close()
+        self.runs = 0
+        self.info: Dict[str, Any] = {}
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def wait_ready(self, timeout: float):
+        if not self.conn.poll(timeout):
+            self.kill()
+            raise SandboxUnavailable(f"Sandbox worker did not start within {timeout:.0f}s")
+        try:
+            self.info = self.conn.recv()
+        except EOFError:
+            self.kill()
+            raise SandboxUnavailable(f"Sandbox worker exited during start-up (exit code {self.process.exitcode})")
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=2)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class SandboxPool:
+    """
+    Warm worker processes that execute generated scripts against uploaded files.
+
+    Each run gets a scratch directory holding copies of the inputs; the
+    script's file paths are rewritten to those copies and it runs with the
+    scratch directory as its working directory, so everything it writes can
+    be collected afterwards. Limits: CPU seconds per run (RLIMIT_CPU),
+    address space per worker (RLIMIT_AS), size per written file
+    (RLIMIT_FSIZE) - POSIX only - and wall-clock time, enforced here by
+    killing the worker. A killed or recycled worker is replaced in the
+    background so the pool stays warm.
+    """
+
+    def __init__(
+        self,
+        size: int = SANDBOX_WORKERS,
+        max_runs_per_worker: int = SANDBOX_MAX_RUNS_PER_WORKER,
+        cpu_seconds: float = SANDBOX_CPU_SECONDS,
+        memory_mb: int = SANDBOX_MEMORY_MB,
+        wall_seconds: float = SANDBOX_WALL_SECONDS,
+        max_output_bytes: int = int(SANDBOX_MAX_OUTPUT_MB * 1024 * 1024),
+        max_stdio_chars: int = SANDBOX_MAX_STDIO_KB * 1024,
+        root: Optional[str] = SANDBOX_DIR,
+    ):
+        self.size = max(1, size)
+        self.max_runs_per_worker = max(1, max_runs_per_worker)
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.wall_seconds = wall_seconds
+        self.max_output_bytes = max_output_bytes
+        self.max_stdio_chars = max_stdio_chars
+        self.root = root
+
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._live = 0  # idle + busy + starting
+        self._closed = False
+        self.counters = {"runs": 0, "failed": 0, "killed": 0, "recycled": 0, "started": 0, "run_seconds": 0.0}
+
+    # -------------------------------------------------------------------------
+    # Worker lifecycle
+    # -------------------------------------------------------------------------
+    def _start_worker(self) -> _Worker:
+        started = time.perf_counter()
+        worker = _Worker(self.memory_mb, int(self.max_output_bytes))
+        worker.wait_ready(_STARTUP_TIMEOUT)
+        with self._lock:
+            self.counters["started"] += 1
+        logger.info(
+            f"🧪 Sandbox worker {worker.pid} ready in {time.perf_counter() - started:.2f}s "
+            f"(imports {worker.info.get('import_seconds')}s, limits {worker.info.get('limits')})"
+        )
+        return worker
+
+    def _add_worker(self):
+        """Start one worker into the idle queue; the caller has already counted it in _live."""
+        try:
+            worker = self._start_worker()
+        except Exception as e:
+            with self._lock:
+                self._live -= 1
+            logger.error(f"❌ Could not start sandbox worker: {e}")
+            return
+        if self._closed:
+            worker.stop()
+            with self._lock:
+                self._live -= 1
+            return
+        self._idle.put(worker)
+
+    def warm(self):
+        """Start workers up to the pool size, in parallel, and wait for them."""
+        with self._lock:
+            missing = self.size - self._live
+            self._live += max(0, missing)
+        threads = [threading.Thread(target=self._add_worker, daemon=True) for _ in range(max(0, missing))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        logger.info(f"🧪 Sandbox pool warm: {self._idle.qsize()} idle workers")
+
+    def _replace(self, worker: _Worker, kill: bool):
+        """Retire a worker and start its replacement in the background."""
+        if kill:
+            worker.kill()
+        else:
+            worker.stop()
+        if self._closed:
+            with self._lock:
+                self._live -= 1
+            return
+        threading.Thread(target=self._add_worker, name="sandbox-replace", daemon=True).start()
+
+    def _checkout(self, timeout: float) -> _Worker:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            start_one = self._live < self.size
+            if start_one:
+                self._live += 1
+        if start_one:
+            # Cold pool: this request pays for one worker start
+            threading.Thread(target=self._add_worker, daemon=True).start()
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise SandboxUnavailable(f"No sandbox worker became free within {timeout:.0f}s")
+
+    def shutdown(self):
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stop()
+            with self._lock:
+                self._live -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.counters)
+            stats.update(size=self.size, live=self._live, idle=self._idle.qsize())
+        stats["mean_run_ms"] = round(stats["run_seconds"] / stats["runs"] * 1000, 1) if stats["runs"] else None
+        stats["run_seconds"] = round(stats["run_seconds"], 3)
+        return stats
+
+    # -------------------------------------------------------------------------
+    # Execution
+    # -------------------------------------------------------------------------
+    def execute(self, script: str, file_paths: List[str], columnar: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Run a generated script against copies of file_paths. Returns
+        {"status", "exit_code", "error", "stdout", "stderr", "outputs", "timings"};
+        status is ok, error, rejected, cpu_limit, memory_limit, timeout or crashed.
+        `columnar` maps input paths to their columnar store directories; the
+        script's pd.read_excel calls on those inputs are served from the store.
+        """
+        rejected = self.rejection(script, file_paths)
+        if rejected is not None:
+            return rejected
+
+        started = time.perf_counter()
+        scratch = self.new_scratch()
+        try:
+            local_paths = self.stage_inputs(scratch, file_paths)
+            script_path = os.path.join(scratch, _SCRIPT_NAME)
+            result = self.run_script(
+                render(templatize(script, file_paths), local_paths),
+                script_path,
+                columnar=self.local_stores(file_paths, local_paths, columnar),
+            )
+            result["outputs"] = self.collect_outputs(scratch, skip=[script_path, *local_paths])
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+        result["timings"]["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        icon = "✅" if result["status"] == "ok" else "❌"
+        logger.info(
+            f"{icon} Sandbox run {result['status']} in {result['timings']['total_ms']:.0f} ms "
+            f"({len(result['outputs'])} output files)"
+        )
+        return result
+
+    @staticmethod
+    def rejection(script: str, file_paths: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        A "rejected" result if static_check finds something that must not run,
+        else None. With file_paths, reading any other spreadsheet is blocking too.
+        """
+        report = check_script(script, None, file_paths)
+        blocking = [f for f in report["findings"] if f["code"] in BLOCKING_FINDINGS]
+        if not blocking:
+            return None
+        error_msg = f"Script was not executed:\n{format_findings(blocking)}"
+        logger.warning(f"❌ {error_msg}")
+        return {"status": "rejected", "exit_code": None, "error": error_msg, "findings": blocking,
+                "stdout": "", "stderr": "", "outputs": [], "timings": {}}
+
+    def new_scratch(self) -> str:
+        if self.root:
+            os.makedirs(self.root, exist_ok=True)
+        return tempfile.mkdtemp(prefix="sandbox-", dir=self.root)
+
+    def run_script(
+        self,
+        script: str,
+        script_path: str,
+        columnar: Optional[Dict[str, str]] = None,
+        write_root: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run one script in a worker, with the directory of script_path as its
+        working directory. No staging or output collection; the result has
+        "timings" but no "outputs". `columnar` maps the paths the script
+        reads to columnar store directories. The script may only write under
+        write_root (default: its working directory).
+        """
+        started = time.perf_counter()
+        with open(script_path, "w", encoding="utf-8") as f:
+            f.write(script)  # for traceback source lines
+        job = {
+            "script": script,
+            "script_path": script_path,
+            "cwd": os.path.dirname(script_path),
+            "write_root": write_root or os.path.dirname(script_path),
+            "cpu_seconds": self.cpu_seconds,
+            "max_stdio_chars": self.max_stdio_chars,
+            "columnar": columnar or {},
+        }
+        worker = self._checkout(self.wall_seconds)
+        queued_ms = (time.perf_counter() - started) * 1000
+        result = self._run_on(worker, job)
+        result["timings"] = {
+            "queue_ms": round(queued_ms, 1),
+            "run_seconds": result.pop("seconds", None),
+            "cpu_seconds": result.pop("cpu_seconds", None),
+        }
+        with self._lock:
+            self.counters["runs"] += 1
+            self.counters["run_seconds"] += time.perf_counter() - started
+            if result["status"] != "ok":
+                self.counters["failed"] += 1
+        return result
+
+    def _run_on(self, worker: _Worker, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one job and wait for it under the wall-clock limit; recycles the worker as needed."""
+        try:
+            worker.conn.send(job)
+            if worker.conn.poll(self.wall_seconds):
+                result = worker.conn.recv()
+            else:
+                result = {"status": "timeout", "exit_code": None,
+                          "error": f"Wall-clock limit of {self.wall_seconds:.0f}s exceeded"}
+        except (EOFError, OSError):
+            worker.process.join(timeout=2)
+            exit_code = worker.process.exitcode
+            if exit_code == -getattr(signal, "SIGXCPU", -1):
+                status, error = "cpu_limit", f"CPU time limit of {self.cpu_seconds:.0f}s exceeded"
+            else:
+                status, error = "crashed", f"Sandbox worker exited unexpectedly (exit code {exit_code})"
+            result = {"status": status, "exit_code": exit_code, "error": error}
+
+        worker.runs += 1
+        if "seconds" not in result:
+            # The worker was lost mid-run: kill whatever is left of it
+            with self._lock:
+                self.counters["killed"] += 1
+            logger.warning(f"⚠️ Sandbox worker {worker.pid} killed: {result['error']}")
+            self._replace(worker, kill=True)
+            result.update(stdout="", stderr="")
+        elif result.pop("recycle", False) or worker.runs >= self.max_runs_per_worker:
+            with self._lock:
+                self.counters["recycled"] += 1
+            logger.info(f"♻️ Recycling sandbox worker {worker.pid} after {worker.runs} runs")
+            self._replace(worker, kill=False)
+        else:
+            self._idle.put(worker)
+        return result
+
+    @staticmethod
+    def stage_inputs(scratch: str, file_paths: List[str]) -> List[str]:
+        """
+        Copy each input into scratch/inputs, keeping its file name. The copies
+        are the script's own: writing to one never reaches the original.
+        """
+        inputs_dir = os.path.join(scratch, _INPUTS_DIR)
+        os.makedirs(inputs_dir)
+        local_paths = []
+        for i, path in enumerate(file_paths):
+            name = os.path.basename(path)
+            local = os.path.join(inputs_dir, name if not os.path.exists(os.path.join(inputs_dir, name)) else f"{i}_{name}")
+            _clone_file(path, local)
+            local_paths.append(local)
+        return local_paths
+
+    @staticmethod
+    def local_stores(file_paths: List[str], local_paths: List[str], columnar: Optional[Dict[str, str]]) -> Dict[str, str]:
+        """Re-key {input path: store directory} to the staged copies the script opens."""
+        columnar = columnar or {}
+        return {local: columnar[path] for path, local in zip(file_paths, local_paths) if path in columnar}
+
+    def collect_outputs(self, scratch: str, skip: List[str]) -> List[Dict[str, Any]]:
+        """
+        Files the script wrote anywhere under scratch (including next to the
+        inputs), base64-encoded until max_output_bytes is used up.
+        """
+        outputs = []
+        budget = self.max_output_bytes
+        skip = set(skip)
+        for dirpath, dirnames, filenames in os.walk(scratch):
+            dirnames[:] = sorted(d for d in dirnames if d != "__pycache__")
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                if path in skip:
+                    continue
+                name = os.path.relpath(path, scratch).replace(os.sep, "/")
+                size = os.path.getsize(path)
+                entry = {"name": name, "size": size, "content_base64": None}
+                if size <= budget:
+                    with open(path, "rb") as f:
+                        entry["content_base64"] = base64.b64encode(f.read()).decode("ascii")
+                    budget -= size
+                else:
+                    entry["truncated"] = True
+                outputs.append(entry)
+        return outputs
+
+
+def _clone_file(src: str, dst: str):
+    """Copy src to dst, as a copy-on-write clone where the filesystem supports one."""
+    if fcntl is not None:
+        with open(src, "rb") as source, open(dst, "wb") as target:
+            try:
+                fcntl.ioctl(target.fileno(), _FICLONE, source.fileno())
+                return
+            except OSError:
+                pass
+    shutil.copyfile(src, dst)
+
+
+sandbox_pool = SandboxPool()
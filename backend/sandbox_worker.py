@@ -0,0 +1,305 @@
+"""
+Worker process for backend.sandbox.
+
+Started with the "spawn" method, so only this module is imported before
+worker_main() runs: pandas, numpy and openpyxl are imported once per worker
+and every script run after that starts warm. Scripts run one at a time,
+each in fresh globals with the run's scratch directory as the working
+directory. pd.read_excel is served from the columnar store
+(crewai_app.columnar) for inputs the job lists one for. An audit hook
+refuses writes outside the job's write_root (its scratch directory) and
+reads outside it, its columnar stores and the Python installation.
+"""
+import os
+import io
+import sys
+import time
+import signal
+import sysconfig
+import tempfile
+import traceback
+
+try:
+    import resource  # POSIX only
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+# backend.crewai_app.columnar, imported by worker_main() after the thread settings
+columnar = None
+
+# Libraries every generated script uses; imported before the worker reports ready
+PRELOAD_MODULES = ("numpy", "pandas", "openpyxl")
+
+_WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_APPEND | os.O_CREAT | os.O_TRUNC
+# Audit events that change the file system: (path argument, dir_fd argument) positions
+_PATH_EVENTS = {
+    "os.remove": ((0, 1),),
+    "os.rmdir": ((0, 1),),
+    "os.mkdir": ((0, 2),),
+    "os.chmod": ((0, 2),),
+    "os.chown": ((0, 3),),
+    "os.utime": ((0, 3),),
+    "os.truncate": ((0, None),),
+    "os.rename": ((0, 2), (1, 3)),
+    "os.link": ((1, 3),),
+    "os.symlink": ((1, 2),),
+    "shutil.rmtree": ((0, 1),),
+}
+
+
+def _warm_io():
+    """Round-trip a tiny frame through xlsx and csv so pandas' lazily imported I/O code is loaded too."""
+    import pandas as pd
+
+    frame = pd.DataFrame({"a": [1, 2], "b": ["x", "y"]})
+    buffer = io.BytesIO()
+    frame.to_excel(buffer, index=False)
+    buffer.seek(0)
+    pd.read_excel(buffer)
+    pd.read_csv(io.StringIO(frame.to_csv(index=False)))
+
+
+class CpuLimitExceeded(BaseException):
+    """Raised from the SIGXCPU handler. A BaseException so `except Exception` in a script can't swallow it."""
+
+
+class _CappedText(io.TextIOBase):
+    """stdout/stderr replacement that keeps the first max_chars characters."""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.parts = []
+        self.size = 0
+        self.dropped = 0
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        room = self.max_chars - self.size
+        if room > 0:
+            self.parts.append(text[:room])
+            self.size += min(len(text), room)
+        self.dropped += max(0, len(text) - max(room, 0))
+        return len(text)
+
+    def getvalue(self) -> str:
+        text = "".join(self.parts)
+        if self.dropped:
+            text += f"\n... [{self.dropped} more characters truncated]"
+        return text
+
+
+def _outside(path, dir_fd, roots) -> bool:
+    if isinstance(path, int):  # a descriptor the script already holds
+        return False
+    path = os.fsdecode(os.fspath(path))
+    if dir_fd is not None and dir_fd >= 0 and not os.path.isabs(path):  # os.* events pass -1 for "none"
+        try:
+            path = os.path.join(os.readlink(f"/proc/self/fd/{dir_fd}"), path)
+        except OSError:
+            return True
+    real = os.path.realpath(path)
+    return real != os.devnull and not any(real == root or real.startswith(root + os.sep) for root in roots)
+
+
+def _library_roots() -> tuple:
+    """Directories any job may read: the standard library and site-packages (for lazy imports), time zone data."""
+    paths = sysconfig.get_paths()
+    roots = {paths[key] for key in ("stdlib", "platstdlib", "purelib", "platlib") if key in paths}
+    roots.update(p for p in sys.path if os.path.basename(p) in ("site-packages", "dist-packages", "lib-dynload"))
+    roots.add("/usr/share/zoneinfo")
+    roots.add(f"/proc/{os.getpid()}")
+    return tuple(sorted(os.path.realpath(r) for r in roots))
+
+
+def _file_guard(library_roots=()):
+    """
+    Return (audit hook, confine). confine(write_root, readable) points the
+    hook at a job's directories and confine(None) turns it off between jobs.
+    The directories live in this closure, not in module globals a script
+    could import and reassign.
+    """
+    write_roots, read_roots = (), ()
+
+    def confine(write_root, readable=()):
+        nonlocal write_roots, read_roots
+        if write_root is None:
+            write_roots, read_roots = (), ()
+            return
+        write_roots = (os.path.realpath(write_root),)
+        read_roots = write_roots + tuple(library_roots) + tuple(os.path.realpath(r) for r in readable)
+
+    def audit(event, args):
+        """PermissionError for a write outside write_root, or a read outside the readable roots, while a job runs."""
+        if not write_roots:
+            return
+        if event == "open":
+            path, mode, flags = args
+            writes = any(c in mode for c in "wax+") if isinstance(mode, str) else bool((flags or 0) & _WRITE_FLAGS)
+            if not writes:
+                if path is not None and _outside(path, None, read_roots):
+                    raise PermissionError(f"Scripts may only read their inputs and working directory: {path!r}")
+                return
+            targets = [(path, None)]
+        elif event in _PATH_EVENTS:
+            targets = [(args[i], args[fd] if fd is not None else None) for i, fd in _PATH_EVENTS[event]]
+        else:
+            return
+        for path, dir_fd in targets:
+            if path is not None and _outside(path, dir_fd, write_roots):
+                raise PermissionError(f"Scripts may only write inside their working directory: {path!r}")
+
+    return audit, confine
+
+
+def _on_sigxcpu(signum, frame):
+    raise CpuLimitExceeded()
+
+
+def _cpu_used() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _address_space_bytes():
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _apply_process_limits(memory_mb: int, max_file_bytes: int):
+    """Memory and file-size caps for the lifetime of the worker. Returns what was applied."""
+    applied = {}
+    if resource is None:
+        return applied
+    if memory_mb > 0:
+        # On top of what the preloaded libraries already mapped
+        baseline = _address_space_bytes()
+        if baseline is not None:
+            limit = baseline + memory_mb * 1024 * 1024
+            _, hard = resource.getrlimit(resource.RLIMIT_AS)
+            if hard == resource.RLIM_INFINITY or limit <= hard:
+                resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+                applied["memory_mb"] = memory_mb
+    if max_file_bytes > 0:
+        # Writing past the cap raises OSError(EFBIG) instead of killing the worker
+        signal.signal(signal.SIGXFSZ, signal.SIG_IGN)
+        _, hard = resource.getrlimit(resource.RLIMIT_FSIZE)
+        if hard == resource.RLIM_INFINITY or max_file_bytes <= hard:
+            resource.setrlimit(resource.RLIMIT_FSIZE, (max_file_bytes, hard))
+            applied["max_file_bytes"] = max_file_bytes
+    if hasattr(signal, "SIGXCPU"):
+        signal.signal(signal.SIGXCPU, _on_sigxcpu)
+        applied["cpu"] = True
+    return applied
+
+
+def _set_cpu_limit(seconds):
+    """Soft RLIMIT_CPU at this run's budget; the limit counts the worker's whole lifetime."""
+    if resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if seconds is None or seconds <= 0:
+        soft = hard
+    else:
+        soft = int(_cpu_used() + seconds) + 1
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def run_job(job: dict, confine=None) -> dict:
+    """Execute one script; always returns a result dict. confine comes from _file_guard()."""
+    stdout = _CappedText(job["max_stdio_chars"])
+    stderr = _CappedText(job["max_stdio_chars"])
+    result = {"status": "ok", "exit_code": 0, "error": None, "recycle": False}
+
+    home = os.getcwd()
+    saved_argv, saved_path = sys.argv, list(sys.path)
+    saved_stdout, saved_stderr = sys.stdout, sys.stderr
+    cpu_start = _cpu_used() if resource is not None else time.process_time()
+    started = time.perf_counter()
+    try:
+        os.chdir(job["cwd"])
+        sys.argv = [job["script_path"]]
+        sys.path.insert(0, job["cwd"])
+        sys.stdout, sys.stderr = stdout, stderr
+        if columnar is not None:
+            columnar.set_stores(job.get("columnar"))
+        _set_cpu_limit(job["cpu_seconds"])
+        # Temporary files (e.g. xlsxwriter's) go to scratch too
+        tempfile.tempdir = os.path.realpath(job.get("write_root", job["cwd"]))
+        if confine is not None:
+            confine(tempfile.tempdir, (job.get("columnar") or {}).values())
+
+        code = compile(job["script"], job["script_path"], "exec")
+        exec(code, {"__name__": "__main__", "__file__": job["script_path"], "__builtins__": __builtins__})
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        if e.code is not None and not isinstance(e.code, int):
+            stderr.write(f"{e.code}\n")
+        if exit_code:
+            result.update(status="error", exit_code=exit_code, error=f"Script exited with status {exit_code}")
+    except CpuLimitExceeded:
+        result.update(status="cpu_limit", exit_code=1, error=f"CPU time limit of {job['cpu_seconds']:.0f}s exceeded")
+    except MemoryError:
+        result.update(status="memory_limit", exit_code=1, error="Memory limit exceeded", recycle=True)
+    except BaseException as e:
+        # Drop this module's frame so the traceback starts in the script
+        stderr.write("".join(traceback.format_exception(type(e), e, e.__traceback__.tb_next)))
+        result.update(status="error", exit_code=1, error=f"{type(e).__name__}: {e}")
+    finally:
+        if confine is not None:
+            confine(None)
+        tempfile.tempdir = None
+        _set_cpu_limit(None)
+        if columnar is not None:
+            if job.get("columnar"):
+                result["columnar_reads"] = columnar.read_stats()
+            columnar.set_stores(None)
+        sys.stdout, sys.stderr = saved_stdout, saved_stderr
+        sys.argv, sys.path[:] = saved_argv, saved_path
+        os.chdir(home)
+
+    cpu_end = _cpu_used() if resource is not None else time.process_time()
+    result.update(
+        stdout=stdout.getvalue(),
+        stderr=stderr.getvalue(),
+        seconds=round(time.perf_counter() - started, 4),
+        cpu_seconds=round(cpu_end - cpu_start, 4),
+    )
+    return result
+
+
+def worker_main(conn, memory_mb: int, max_file_bytes: int):
+    """Preload libraries, apply limits, then run jobs from conn until None or EOF."""
+    global columnar
+    # One BLAS/OpenMP thread per worker: the pool provides the parallelism and
+    # per-thread arenas would otherwise eat into the memory limit
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(var, "1")
+
+    started = time.perf_counter()
+    for module in PRELOAD_MODULES:
+        __import__(module)
+    _warm_io()
+    from backend.crewai_app import columnar
+    columnar.install_read_excel()
+    import_seconds = time.perf_counter() - started
+
+    limits = _apply_process_limits(memory_mb, max_file_bytes)
+    audit, confine = _file_guard(_library_roots())
+    sys.addaudithook(audit)
+    conn.send({"ready": os.getpid(), "import_seconds": round(import_seconds, 3), "limits": limits})
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if job is None:
+            return
+        conn.send(run_job(job, confine))
@@ -0,0 +1,99 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, Optional
+
+from backend.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Server-Sent Events settings (override via env)
+# -----------------------------------------------------------------------------
+# A comment line is sent after this many idle seconds so proxies keep the connection open
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
+# Events that carry part of the answer; the first one marks time-to-first-meaningful-byte
+MEANINGFUL_EVENTS = ("token", "script")
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # nginx would otherwise buffer the whole response
+}
+
+
+def format_event(kind: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    """One SSE message: `event:` is the kind, `data:` a single line of JSON."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {kind}")
+    lines.append(f"data: {json.dumps(data, default=str, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class EventStream:
+    """
+    Carries events from a worker thread to a StreamingResponse.
+
+    emit() may be called from any thread; events() is the async generator
+    the response iterates. Every event gets `t`, the seconds since the
+    request started. Time to the first event and to the first meaningful
+    one are recorded in metrics as `<name>.first_byte` and
+    `<name>.first_meaningful_byte`, the whole stream as `<name>.total`.
+    """
+
+    def __init__(self, name: str, started: Optional[float] = None, heartbeat: float = SSE_HEARTBEAT_SECONDS):
+        self.name = name
+        self.started = time.perf_counter() if started is None else started
+        self.heartbeat = heartbeat
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.first_byte = None
+        self.first_meaningful_byte = None
+
+    def emit(self, kind: str, data: Dict[str, Any]):
+        item = (kind, {**data, "t": round(time.perf_counter() - self.started, 3)})
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+        except RuntimeError:
+            pass  # the event loop is gone (server shutting down)
+
+    def close(self):
+        """End the stream once the queued events are sent."""
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, None)
+        except RuntimeError:
+            pass
+
+    async def events(self) -> AsyncIterator[str]:
+        sent = 0
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    break
+                kind, data = item
+                sent += 1
+                if self.first_byte is None:
+                    self.first_byte = data["t"]
+                    metrics.observe(f"{self.name}.first_byte", self.first_byte)
+                if self.first_meaningful_byte is None and kind in MEANINGFUL_EVENTS:
+                    self.first_meaningful_byte = data["t"]
+                    metrics.observe(f"{self.name}.first_meaningful_byte", self.first_meaningful_byte)
+                yield format_event(kind, data, sent)
+        except asyncio.CancelledError:
+            metrics.incr(f"{self.name}.disconnects")
+            logger.info(f"🔌 {self.name}: client disconnected after {sent} events")
+            raise
+        metrics.observe(f"{self.name}.total", time.perf_counter() - self.started)
+        logger.info(
+            f"📡 {self.name}: {sent} events, first byte {self.first_byte}s, "
+            f"first meaningful byte {self.first_meaningful_byte}s"
+        )
@@ -0,0 +1,120 @@
+"""
+Timing spans for requests.
+
+span("inspection") times a block. Its duration always goes to the
+`span` histogram in metrics (label span=<name>, plus any labels= given);
+when a request trace is active it is also added to the trace, with its
+parent span and attributes, for the per-request breakdown (/transform
+with debug=true) and the stage summary logged per request.
+
+The active trace and span live in contextvars, so they follow the request
+into run_in_threadpool. Code running on threads that don't copy the
+context (crewai's agent threads) records spans with record() on a trace it
+was handed; see crewai_app/crew_tracing.py.
+"""
+import time
+import uuid
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from backend.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Trace:
+    """The spans of one request."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, start: float, seconds: float, parent: Optional[str] = None,
+            span_id: Optional[str] = None, **attrs) -> str:
+        span_id = span_id or uuid.uuid4().hex[:8]
+        entry = {
+            "id": span_id,
+            "parent": parent,
+            "name": name,
+            "start": round(start - self.started, 4),
+            "seconds": round(seconds, 4),
+        }
+        entry.update({k: v for k, v in attrs.items() if v is not None})
+        with self._lock:
+            self.spans.append(entry)
+        return span_id
+
+    def breakdown(self) -> Dict[str, Any]:
+        """Total time, summed seconds per span name, and every span in start order."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start"])
+        stages: Dict[str, float] = {}
+        for s in spans:
+            stages[s["name"]] = round(stages.get(s["name"], 0.0) + s["seconds"], 4)
+        return {
+            "total_seconds": round(time.perf_counter() - self.started, 4),
+            "stages": stages,
+            "spans": spans,
+        }
+
+    def summary(self) -> str:
+        stages = self.breakdown()["stages"]
+        return ", ".join(f"{name} {seconds:.2f}s" for name, seconds in stages.items())
+
+
+_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+_span: ContextVar[Optional[str]] = ContextVar("span", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _trace.get()
+
+
+def current_span() -> Optional[str]:
+    return _span.get()
+
+
+@contextmanager
+def start_trace(name: str):
+    """Collect the spans of the code in the block (and the threads it hands its context to)."""
+    trace = Trace(name)
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.reset(token)
+        metrics.observe("request", time.perf_counter() - trace.started, endpoint=name)
+        logger.info(f"⏱️ {name} stages: {trace.summary() or 'none'}")
+
+
+@contextmanager
+def span(name: str, labels: Optional[Dict[str, Any]] = None, **attrs):
+    """
+    Time the block as span `name`. The yielded dict holds the span's
+    attributes; values added to it inside the block are recorded too.
+    """
+    trace = _trace.get()
+    span_id = uuid.uuid4().hex[:8]
+    token = _span.set(span_id)
+    started = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        seconds = time.perf_counter() - started
+        _span.reset(token)
+        metrics.observe("span", seconds, span=name, **(labels or {}))
+        if trace is not None:
+            trace.add(name, started, seconds, parent=_span.get(), span_id=span_id, **attrs)
+
+
+def record(name: str, started: float, seconds: float, trace: Optional[Trace] = None, parent: Optional[str] = None,
+           labels: Optional[Dict[str, Any]] = None, **attrs):
+    """Record a span timed elsewhere (started is a perf_counter() value)."""
+    metrics.observe("span", seconds, span=name, **(labels or {}))
+    if trace is not None:
+        trace.add(name, started, seconds, parent=parent, **attrs)
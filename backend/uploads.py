@@ -0,0 +1,119 @@
+import os
+import tempfile
+import logging
+from typing import Optional
+
+from fastapi import UploadFile
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Upload limits (override via env, values in MB / KB)
+# -----------------------------------------------------------------------------
+MB = 1024 * 1024
+
+MAX_UPLOAD_FILE_BYTES = int(float(os.getenv("MAX_UPLOAD_FILE_MB", "200")) * MB)
+MAX_UPLOAD_REQUEST_BYTES = int(float(os.getenv("MAX_UPLOAD_REQUEST_MB", "1024")) * MB)
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_KB", "1024")) * 1024
+
+# Extensions kept on saved uploads (the crew's scripts and pandas go by them); anything else is saved without one
+UPLOAD_SUFFIXES = (".xlsx", ".xlsm", ".xls", ".csv", ".tsv", ".tab", ".txt", ".parquet")
+
+# Endpoints whose bodies are checked against MAX_UPLOAD_REQUEST_BYTES before parsing
+UPLOAD_PATHS = {"/transform", "/transform/stream", "/jobs", "/execute", "/files"}
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the per-file or per-request size cap."""
+
+
+def upload_suffix(filename: Optional[str]) -> str:
+    """The upload's own extension if it is a supported one, else "" (the format is detected from content)."""
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if ext in UPLOAD_SUFFIXES else ""
+
+
+def _fmt_mb(num_bytes: int) -> str:
+    return f"{num_bytes / MB:.1f} MB"
+
+
+class UploadLimitMiddleware:
+    """
+    Reject oversized upload requests from the Content-Length header,
+    before the multipart body is read or parsed.
+
+    This is only an early exit: a chunked body (no Content-Length) gets
+    past it and is parsed as usual. The caps are enforced while the files
+    are copied - per file in save_upload(), per request by the caller
+    adding up what it returns (main._save_uploads).
+    """
+
+    def __init__(self, app, max_request_bytes: int = MAX_UPLOAD_REQUEST_BYTES):
+        self.app = app
+        self.max_request_bytes = max_request_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope.get("path") in UPLOAD_PATHS:
+            headers = dict(scope.get("headers") or [])
+            content_length = headers.get(b"content-length")
+            if content_length and content_length.isdigit() and int(content_length) > self.max_request_bytes:
+                error_msg = (
+                    f"Request body of {_fmt_mb(int(content_length))} exceeds the "
+                    f"{_fmt_mb(self.max_request_bytes)} per-request upload limit."
+                )
+                logger.warning(f"❌ {error_msg}")
+                response = JSONResponse(status_code=413, content={"status": "error", "error": error_msg})
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+async def save_upload(
+    file: UploadFile,
+    suffix: Optional[str] = None,
+    dir: Optional[str] = None,
+    max_file_bytes: int = MAX_UPLOAD_FILE_BYTES,
+    chunk_size: int = UPLOAD_CHUNK_BYTES,
+    hasher=None,
+) -> tuple:
+    """
+    Copy an UploadFile to a NamedTemporaryFile in bounded chunks.
+    The temp file keeps the upload's extension unless `suffix` is given;
+    a hashlib `hasher` is fed every chunk as it is written.
+    Returns (temp_path, bytes_written). Raises UploadTooLarge if the
+    file exceeds max_file_bytes; the partial temp file is removed.
+    """
+    filename = getattr(file, "filename", None) or "upload"
+    if suffix is None:
+        suffix = upload_suffix(filename)
+
+    # Starlette already knows the spooled size - reject before copying anything
+    known_size = getattr(file, "size", None)
+    if known_size is not None and known_size > max_file_bytes:
+        raise UploadTooLarge(
+            f"File '{filename}' is {_fmt_mb(known_size)}, over the {_fmt_mb(max_file_bytes)} per-file limit."
+        )
+
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=dir)
+    written = 0
+    try:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            written += len(chunk)
+            if written > max_file_bytes:
+                raise UploadTooLarge(
+                    f"File '{filename}' exceeds the {_fmt_mb(max_file_bytes)} per-file limit."
+                )
+            tmp.write(chunk)
+            if hasher is not None:
+                hasher.update(chunk)
+        tmp.flush()
+    except Exception:
+        tmp.close()
+        os.remove(tmp.name)
+        raise
+    tmp.close()
+    return tmp.name, written
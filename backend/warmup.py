@@ -0,0 +1,245 @@
+"""
+Background warm-up and startup profile for the API process.
+
+backend.main imports only what it needs to start serving; the heavy parts -
+pandas for the columnar store, crewai and LiteLLM for the crews, the crew
+pool and the sandbox workers - are loaded by `warmup` in stages on a
+background thread once the app starts. GET /health answers straight away;
+GET /ready answers 200 once every stage has run. A request that needs a
+stage (e.g. /transform needs "crew") waits for it, up to WARMUP_WAIT_SECONDS.
+
+With STARTUP_PROFILE on, `import_profiler` times the first import of every
+top-level package from the moment backend.main starts. Each package is
+charged its own time - not the time of other top-level packages it imports
+- so the report shows which dependencies the cold start is spent on. The
+report (stage times, slowest packages) is logged when warm-up finishes and
+returned by /ready; `python -X importtime` gives the per-module detail.
+"""
+import os
+import sys
+import time
+import logging
+import threading
+import importlib.abc
+import importlib.machinery
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Warm-up settings (override via env)
+# -----------------------------------------------------------------------------
+# Time each top-level package's import for the startup report
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "1").lower() in ("1", "true", "yes")
+# Longest a request waits for the warm-up stage it needs before getting HTTP 503
+WARMUP_WAIT_SECONDS = float(os.getenv("WARMUP_WAIT_SECONDS", "300"))
+# Slowest packages listed in the startup report
+STARTUP_PROFILE_TOP = int(os.getenv("STARTUP_PROFILE_TOP", "15"))
+
+# Reference point for the report: when the backend started importing
+STARTED = time.perf_counter()
+
+
+_FILE_LOADERS = (
+    importlib.machinery.SourceFileLoader,
+    importlib.machinery.SourcelessFileLoader,
+    importlib.machinery.ExtensionFileLoader,
+)
+
+
+class _TimedLoader(importlib.abc.Loader):
+    """Wraps a package's loader to time its exec_module; the module itself sees the real loader."""
+
+    def __init__(self, loader, profiler: "ImportProfiler"):
+        self.loader = loader
+        self.profiler = profiler
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        module.__loader__ = self.loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self.loader
+        self.profiler._timed(module.__name__, self.loader.exec_module, module)
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+
+class ImportProfiler(importlib.abc.MetaPathFinder):
+    """
+    Meta path finder recording the import time of each top-level package
+    (file-backed ones: builtins and frozen modules cost next to nothing).
+    Submodules count towards the package being imported when they load.
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path=None, target=None):
+        if path is not None or "." in fullname:
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if isinstance(spec.loader, _FILE_LOADERS):
+                    spec.loader = _TimedLoader(spec.loader, self)
+                return spec
+        return None
+
+    def _timed(self, name: str, fn: Callable, module):
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)  # time spent in nested top-level imports
+        started = time.perf_counter()
+        try:
+            fn(module)
+        finally:
+            elapsed = time.perf_counter() - started
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with self._lock:
+                self.seconds[name] = self.seconds.get(name, 0.0) + elapsed - nested
+
+    def top(self, n: int = STARTUP_PROFILE_TOP) -> List[Dict[str, Any]]:
+        with self._lock:
+            ranked = sorted(self.seconds.items(), key=lambda item: item[1], reverse=True)[:n]
+        return [{"package": name, "ms": round(seconds * 1000, 1)} for name, seconds in ranked]
+
+    def total(self) -> float:
+        with self._lock:
+            return sum(self.seconds.values())
+
+
+class Warmup:
+    """
+    Named stages run in order on a background thread. A failing required
+    stage stops the ones after it; an optional one only logs a warning.
+    wait(stage) blocks until that stage has finished either way.
+    """
+
+    def __init__(self, profiler: Optional[ImportProfiler] = None):
+        self.profiler = profiler
+        self._stages: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._serving_after: Optional[float] = None
+        self._ready_after: Optional[float] = None
+
+    def stage(self, name: str, fn: Callable[[], Any], required: bool = True):
+        self._stages.append({"name": name, "fn": fn, "required": required, "done": threading.Event()})
+
+    def _get(self, name: str) -> Dict[str, Any]:
+        for stage in self._stages:
+            if stage["name"] == name:
+                return stage
+        raise KeyError(f"Unknown warm-up stage: {name}")
+
+    def start(self):
+        """Run the stages in the background (again, after a finished run - e.g. an app restarted in-process)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self._serving_after is None:
+                self._serving_after = time.perf_counter() - STARTED
+            for stage in self._stages:
+                stage["done"].clear()
+                stage.update(status="pending", seconds=None, modules=None, error=None)
+            self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+            self._thread.start()
+        logger.info(f"🚀 Serving {self._serving_after:.2f}s after import started; warming up in the background")
+
+    def _run(self):
+        failed = None
+        for stage in self._stages:
+            if failed is not None:
+                stage.update(status="skipped", error=f"Skipped: warm-up stage '{failed}' failed")
+                stage["done"].set()
+                continue
+            stage["status"] = "running"
+            modules = len(sys.modules)
+            started = time.perf_counter()
+            try:
+                stage["fn"]()
+                stage["status"] = "done"
+            except Exception as e:
+                stage.update(status="failed", error=str(e))
+                if stage["required"]:
+                    failed = stage["name"]
+                    logger.exception(f"❌ Warm-up stage '{stage['name']}' failed: {e}")
+                else:
+                    logger.warning(f"⚠️ Warm-up stage '{stage['name']}' failed, continuing: {e}")
+            stage["seconds"] = round(time.perf_counter() - started, 3)
+            stage["modules"] = len(sys.modules) - modules
+            stage["done"].set()
+
+        if self._ready_after is None:
+            self._ready_after = time.perf_counter() - STARTED
+            if self.profiler is not None:
+                self.profiler.uninstall()
+        self._log_report()
+
+    def wait(self, name: str, timeout: Optional[float] = WARMUP_WAIT_SECONDS) -> bool:
+        """True once stage `name` has finished (failed or not); False on timeout."""
+        return self._get(name)["done"].wait(timeout)
+
+    def error(self, name: str) -> Optional[str]:
+        """Why stage `name` failed or was skipped; None if it succeeded or hasn't finished."""
+        stage = self._get(name)
+        return stage.get("error") if stage.get("status") in ("failed", "skipped") else None
+
+    @property
+    def ready(self) -> bool:
+        return all(s["done"].is_set() and (s["status"] == "done" or not s["required"]) for s in self._stages)
+
+    @property
+    def failed(self) -> Optional[str]:
+        for s in self._stages:
+            if s.get("status") == "failed" and s["required"]:
+                return f"Warm-up stage '{s['name']}' failed: {s['error']}"
+        return None
+
+    def report(self) -> Dict[str, Any]:
+        report = {
+            "serving_after_seconds": None if self._serving_after is None else round(self._serving_after, 3),
+            "ready_after_seconds": None if self._ready_after is None else round(self._ready_after, 3),
+            "stages": [
+                {k: s.get(k) for k in ("name", "status", "seconds", "modules", "error") if s.get(k) is not None}
+                for s in self._stages
+            ],
+        }
+        if self.profiler is not None:
+            report["import_seconds"] = round(self.profiler.total(), 3)
+            report["slowest_imports"] = self.profiler.top()
+        return report
+
+    def _log_report(self):
+        report = self.report()
+        stages = ", ".join(f"{s['name']} {s.get('seconds', 0):.2f}s ({s['status']})" for s in report["stages"])
+        logger.info(
+            f"🚀 Warm-up finished: serving after {report['serving_after_seconds']}s, "
+            f"ready after {report['ready_after_seconds']}s - {stages}"
+        )
+        if report.get("slowest_imports"):
+            slowest = ", ".join(f"{i['package']} {i['ms']:.0f} ms" for i in report["slowest_imports"][:8])
+            logger.info(f"📦 Slowest imports ({report['import_seconds']:.2f}s in imports): {slowest}")
+
+
+import_profiler = ImportProfiler()
+if STARTUP_PROFILE:
+    import_profiler.install()
+
+warmup = Warmup(import_profiler if STARTUP_PROFILE else None)
@@ -0,0 +1,117 @@
+"""
+Benchmark the columnar store against reading the .xlsx directly.
+
+Writes a synthetic workbook (ints, floats, text of low and high
+cardinality, dates, an int column with gaps) and times, in this process:
+pd.read_excel, the one-off conversion, a full read from the store, a
+two-column read from the store, and the full-column profile streamed from
+the file vs computed from the store. Frames read from the store are
+checked against pd.read_excel. Prints JSON results.
+
+    python -m benchmarks.bench_columnar [--rows 100000] [--repeat 3] [--out results.json]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+
+def _make_workbook(directory: str, rows: int) -> str:
+    rng = np.random.default_rng(0)
+    path = os.path.join(directory, "orders.xlsx")
+    units = rng.integers(1, 50, rows).astype(float)
+    units[rng.random(rows) < 0.05] = np.nan
+    pd.DataFrame({
+        "order_id": np.arange(rows),
+        "region": rng.choice(["North", "South", "East", "West"], rows),
+        "customer": [f"Customer {i % 20000:05d}" for i in range(rows)],
+        "amount": (rng.random(rows) * 1000).round(2),
+        "units": units,
+        "ordered_at": [datetime(2024, 1, 1) + timedelta(minutes=int(m)) for m in rng.integers(0, 525600, rows)],
+    }).to_excel(path, index=False)
+    return path
+
+
+def _best(fn, repeat: int):
+    """(best seconds, last result) over `repeat` calls."""
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 4), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="Write JSON results to this file as well as stdout")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    data_dir = tempfile.mkdtemp(prefix="bench-columnar-")
+    os.environ["COLUMNAR_DIR"] = os.path.join(data_dir, "store")
+    from backend.crewai_app import columnar
+    from backend.crewai_app.cache import file_digest
+    from backend.crewai_app.profiling import profile_columnar, profile_file
+
+    try:
+        path = _make_workbook(data_dir, args.rows)
+        read_seconds, expected = _best(lambda: pd.read_excel(path), args.repeat)
+
+        digest = file_digest(path)
+        started = time.perf_counter()
+        directory = columnar.convert(path, digest)
+        convert_seconds = round(time.perf_counter() - started, 4)
+        sheet = columnar.open_store(digest).sheet(0)
+
+        full_seconds, frame = _best(lambda: sheet.frame(), args.repeat)
+        usecols = ["region", "amount"]
+        subset_seconds, subset = _best(lambda: sheet.frame(usecols), args.repeat)
+        stream_profile_seconds, _ = _best(lambda: profile_file(path, max_seconds=3600), 1)
+        store_profile_seconds, _ = _best(lambda: profile_columnar(sheet), args.repeat)
+
+        identical = frame.equals(expected) and subset.equals(expected[usecols])
+        pd.testing.assert_frame_equal(frame, expected)
+
+        results = {
+            "rows": args.rows,
+            "xlsx_bytes": os.path.getsize(path),
+            "store_bytes": columnar.ColumnarStore(directory).manifest["bytes"],
+            "read_excel_seconds": read_seconds,
+            "convert_seconds": convert_seconds,
+            "store_read_seconds": full_seconds,
+            "store_read_2_columns_seconds": subset_seconds,
+            "profile_stream_seconds": stream_profile_seconds,
+            "profile_store_seconds": store_profile_seconds,
+            "identical_frames": identical,
+            "read_speedup": round(read_seconds / full_seconds, 1),
+            "read_2_columns_speedup": round(read_seconds / subset_seconds, 1),
+            "profile_speedup": round(stream_profile_seconds / store_profile_seconds, 1),
+        }
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    print(f"read_excel {results['read_excel_seconds']}s, store {results['store_read_seconds']}s "
+          f"({results['read_speedup']}x), 2 columns {results['store_read_2_columns_seconds']}s "
+          f"({results['read_2_columns_speedup']}x), one-off conversion {results['convert_seconds']}s; "
+          f"profile {results['profile_speedup']}x", file=sys.stderr)
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark per-request crew setup: a fresh CsvOrganiser per request (the old
+crewmain.run path) against a checkout from crew_pool.
+
+Only setup is measured - building or checking out the crew and writing the
+request inputs into its tasks - so no LLM calls are made and no API key is
+needed. Logging runs at INFO into a null stream so the cost of the build-time
+log lines is included. Also reports memory retained after all requests
+(CrewBase memoizes agents/tasks per instance, so fresh crews are never freed).
+Prints JSON results.
+
+    python -m benchmarks.bench_crew_setup [--requests 200] [--out results.json]
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tracemalloc
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-placeholder")
+
+
+def _inputs(i: int) -> dict:
+    path = f"/tmp/upload_{i}.xlsx"
+    return {"prompt": f"Sum column B by column A ({i})", "files": [path], "files_str": path, "current_year": "2026"}
+
+
+def _summary(samples):
+    samples = sorted(samples)
+    return {
+        "median_ms": samples[len(samples) // 2] * 1000,
+        "p95_ms": samples[int(len(samples) * 0.95) - 1] * 1000,
+        "mean_ms": sum(samples) / len(samples) * 1000,
+    }
+
+
+def run_fresh(requests: int):
+    from backend.crewai_app import crew as crew_module
+
+    samples = []
+    for i in range(requests):
+        start = time.perf_counter()
+        crew_module._llm_cache.clear()  # the old path built new LLM clients per request
+        crew = crew_module.CsvOrganiser().crew()
+        crew._interpolate_inputs(_inputs(i))
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def run_pooled(requests: int):
+    from backend.crewai_app.crew_pool import CrewPool
+
+    pool = CrewPool(max_idle=1)
+    pool.warm()
+    samples = []
+    for i in range(requests):
+        start = time.perf_counter()
+        with pool.checkout() as crew:
+            crew._interpolate_inputs(_inputs(i))
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def measure(fn, requests: int) -> dict:
+    fn(5)  # imports, first LLM client, first pool build
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    fn(requests)
+    retained = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    # Timings without tracemalloc overhead
+    samples = fn(requests)
+    return {**_summary(samples), "retained_kb_per_request": retained / requests / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--out", help="Write JSON results to this file as well as stdout")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=open(os.devnull, "w"))
+
+    results = {
+        "requests": args.requests,
+        "fresh": measure(run_fresh, args.requests),
+        "pooled": measure(run_pooled, args.requests),
+    }
+    results["speedup"] = results["fresh"]["median_ms"] / max(results["pooled"]["median_ms"], 1e-9)
+    print(f"fresh {results['fresh']['median_ms']:.2f} ms, pooled {results['pooled']['median_ms']:.3f} ms "
+          f"({results['speedup']:.0f}x)", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Micro-benchmarks of the inspector and its JSON encoding, per synthetic
+workbook shape (see workbooks.SHAPES):
+
+- inspect_ms: inspect_file() - head read, preview and workbook index;
+- profile_ms: inspect_file(profile=True) - plus the full-column profile
+  streamed from the file;
+- render_<format>_ms: render_inspection() of the inspect_files() result in
+  each output format (what the LLM is sent);
+- encode_ms / encode_mb_per_s: json.dumps(cls=NumpyEncoder) of the first
+  1000 rows as read by pandas - numpy scalars, Timestamps and NaN, the
+  values NumpyEncoder exists for.
+
+Each number is the best of --repeat runs in this process. Prints JSON.
+
+    python -m benchmarks.bench_inspector [--shape small ...] [--repeat 3] [--data-dir DIR] [--out results.json]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+
+import pandas as pd
+
+from benchmarks.workbooks import SHAPES, write_shapes
+
+
+def _best_ms(fn, repeat: int):
+    """(best milliseconds, last result) over `repeat` calls."""
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best * 1000, 2), result
+
+
+def bench_shape(path: str, repeat: int) -> dict:
+    from backend.crewai_app.compact import OUTPUT_FORMATS, render_inspection
+    from backend.crewai_app.inspection import NumpyEncoder, inspect_file
+
+    result = {"file_kb": round(os.path.getsize(path) / 1024, 1)}
+    result["inspect_ms"], inspected = _best_ms(lambda: inspect_file(path), repeat)
+    result["profile_ms"], _ = _best_ms(lambda: inspect_file(path, profile=True), repeat)
+
+    results = {
+        "files_inspected": 1,
+        "files": [{"original_path": path, "resolved_path": path, "status": "success", **inspected}],
+        "errors": [],
+        "success": True,
+    }
+    for output_format in OUTPUT_FORMATS:
+        ms, text = _best_ms(lambda: render_inspection(results, output_format=output_format), repeat)
+        result[f"render_{output_format}_ms"] = ms
+        result[f"render_{output_format}_chars"] = len(text)
+
+    records = pd.read_excel(path, nrows=1000).to_dict("records")
+    ms, encoded = _best_ms(lambda: json.dumps(records, cls=NumpyEncoder), repeat)
+    result["encode_ms"] = ms
+    result["encode_mb_per_s"] = round(len(encoded) / (1024 * 1024) / max(ms / 1000, 1e-9), 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shape", action="append", choices=sorted(SHAPES), help="Shapes to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--data-dir", help="Keep the generated workbooks here and reuse them across runs")
+    parser.add_argument("--out", help="Write JSON results to this file as well as stdout")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="bench-inspector-")
+    try:
+        paths = write_shapes(data_dir, args.shape)
+        results = {"repeat": args.repeat, "shapes": {}}
+        for name, path in paths.items():
+            results["shapes"][name] = bench_shape(path, args.repeat)
+            print(f"{name}: inspect {results['shapes'][name]['inspect_ms']} ms, "
+                  f"profile {results['shapes'][name]['profile_ms']} ms", file=sys.stderr)
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Benchmark request latency under three logging setups:
+
+- sync: the old configuration - root logger at DEBUG writing to a
+  StreamHandler and a FileHandler on the request thread, crew verbose on;
+- queued: log_config in the development profile (same levels and verbose
+  output, but written by the queue's background thread);
+- production: log_config with LOG_PROFILE=production (INFO, quiet crewai,
+  crew verbosity off).
+
+Each setup runs in its own interpreter (crew verbosity is fixed when the
+agents are built) and drives crewmain.run for a synthetic workbook with the
+script cache bypassed, so every request runs the crew. litellm.completion is
+replaced by a canned streamed reply, so no API key is needed and the numbers
+are the framework's own overhead, logging included. Console output goes to
+a file, as under a process manager. Prints JSON results.
+
+    python -m benchmarks.bench_logging [--requests 30] [--out results.json]
+"""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import subprocess
+
+import pandas as pd
+
+SETUPS = {
+    "sync": {"LOG_PROFILE": "development"},
+    "queued": {"LOG_PROFILE": "development"},
+    "production": {"LOG_PROFILE": "production"},
+}
+
+REPLY = (
+    "Thought: I have the inspection\nFinal Answer: ```python\nimport pandas as pd\n"
+    "df = pd.read_excel(r\"{path}\")\nsummary = df.groupby(\"region\", as_index=False)[\"amount\"].sum()\n"
+    "summary.to_excel(\"summary.xlsx\", index=False)\nprint(len(summary))\n```"
+)
+
+
+def _make_workbook(directory: str, rows: int = 200) -> str:
+    path = os.path.join(directory, "sales.xlsx")
+    pd.DataFrame({
+        "region": [f"R{i % 7}" for i in range(rows)],
+        "amount": [i * 1.5 for i in range(rows)],
+    }).to_excel(path, index=False)
+    return path
+
+
+def _fake_completion(**params):
+    """Streamed reply naming the workbook the prompt mentions."""
+    path = re.findall(r"(/[^\s\"\\]+?\.xlsx)", json.dumps(params["messages"]))[0]
+    reply = REPLY.format(path=path)
+    if not params.get("stream"):
+        return {"choices": [{"message": {"content": reply}}]}
+    return iter([{"choices": [{"delta": {"content": reply[i:i + 16]}}]} for i in range(0, len(reply), 16)])
+
+
+def child(setup: str, path: str, log_file: str, requests: int):
+    import litellm
+
+    litellm.completion = _fake_completion
+    if setup == "sync":
+        logging.basicConfig(
+            level=logging.DEBUG,
+            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+            handlers=[logging.StreamHandler(), logging.FileHandler(log_file, mode="a", encoding="utf-8")],
+        )
+        logging.getLogger("crewai").setLevel(logging.DEBUG)
+        logging.getLogger("backend.crewai_app").setLevel(logging.DEBUG)
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        logging.getLogger("httpcore").setLevel(logging.WARNING)
+        logging.getLogger("LiteLLM").setLevel(logging.INFO)
+    else:
+        from backend.log_config import configure_logging
+
+        configure_logging(log_file=log_file)
+
+    from backend.crewai_app.crewmain import run
+    from backend.log_config import shutdown_logging
+
+    run("Sum amount by region", [path], use_cache=False)  # pool build, imports
+    samples = []
+    for i in range(requests):
+        started = time.perf_counter()
+        run(f"Sum amount by region ({i})", [path], use_cache=False)
+        samples.append(time.perf_counter() - started)
+    started = time.perf_counter()
+    shutdown_logging()
+    drain = time.perf_counter() - started
+    samples.sort()
+    return {
+        "median_ms": round(samples[len(samples) // 2] * 1000, 2),
+        "p95_ms": round(samples[max(0, int(len(samples) * 0.95) - 1)] * 1000, 2),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 2),
+        "drain_ms": round(drain * 1000, 2),
+        "log_bytes": os.path.getsize(log_file) if os.path.exists(log_file) else 0,
+    }
+
+
+def run_setup(setup: str, path: str, workdir: str, requests: int) -> dict:
+    log_file = os.path.join(workdir, f"{setup}.log")
+    console = os.path.join(workdir, f"{setup}.console")
+    env = {
+        **os.environ,
+        **SETUPS[setup],
+        "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "benchmark-placeholder"),
+        "CREWAI_DISABLE_TELEMETRY": "true",
+        "OTEL_SDK_DISABLED": "true",
+    }
+    with open(console, "w", encoding="utf-8") as out:
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_logging", "--child", setup, "--path", path,
+             "--log-file", log_file, "--requests", str(requests)],
+            env=env, stdout=subprocess.PIPE, stderr=out, check=True, text=True,
+        )
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["console_bytes"] = os.path.getsize(console)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--out", help="Write JSON results to this file as well as stdout")
+    parser.add_argument("--child", choices=sorted(SETUPS), help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    parser.add_argument("--log-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # crew verbose output goes to stdout: keep it out of the result line
+        real_stdout = sys.stdout
+        sys.stdout = sys.stderr
+        result = child(args.child, args.path, args.log_file, args.requests)
+        print(json.dumps(result), file=real_stdout)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="bench-logging-")
+    try:
+        path = _make_workbook(workdir)
+        results = {"requests": args.requests}
+        for setup in SETUPS:
+            results[setup] = run_setup(setup, path, workdir, args.requests)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    for setup in ("queued", "production"):
+        results[f"{setup}_speedup"] = round(results["sync"]["median_ms"] / max(results[setup]["median_ms"], 1e-9), 2)
+    print(", ".join(f"{s} {results[s]['median_ms']} ms" for s in SETUPS), file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
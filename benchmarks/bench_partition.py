@@ -0,0 +1,110 @@
+"""
+Benchmark partitioned execution of a row-local script against a single
+sandbox run.
+
+Writes a synthetic CSV (the read is cheap, so the row-wise work dominates)
+and runs a typical generated transformation on it: filter, string cleanup,
+a row-wise apply, a merge against a small reference table, CSV output. Both
+modes use the same warm sandbox pool with --workers processes, and the
+outputs are compared byte for byte. Speed-up is bounded by the CPU count.
+Prints JSON results.
+
+    python -m benchmarks.bench_partition [--rows 1000000] [--workers CPUs] [--out results.json]
+"""
+import os
+import sys
+import json
+import time
+import base64
+import shutil
+import logging
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+SCRIPT = """\
+import pandas as pd
+
+input_file = r"{data}"
+df = pd.read_csv(input_file)
+regions = pd.read_csv(r"{ref}")
+
+df = df[df["amount"].notna() & (df["amount"] > 1)]
+df["name"] = df["name"].str.strip().str.title()
+df["band"] = df.apply(lambda row: "high" if row["amount"] * row["units"] > 2500 else "low", axis=1)
+df["net"] = (df["amount"] * (1 - df["discount"])).round(2)
+df = df.merge(regions, on="region", how="left")
+df.to_csv("result.csv", index=False)
+print("wrote", len(df), "rows")
+"""
+
+
+def _make_inputs(directory: str, rows: int):
+    rng = np.random.default_rng(0)
+    data = os.path.join(directory, "sales.csv")
+    pd.DataFrame({
+        "id": np.arange(rows),
+        "region": rng.choice(["N", "S", "E", "W"], rows),
+        "name": [f"  product {i % 5000} " for i in range(rows)],
+        "amount": rng.random(rows) * 100,
+        "units": rng.integers(1, 50, rows),
+        "discount": rng.random(rows) * 0.3,
+    }).to_csv(data, index=False)
+    ref = os.path.join(directory, "regions.csv")
+    pd.DataFrame({"region": ["N", "S", "E", "W"], "manager": ["Ann", "Bob", "Cy", "Di"]}).to_csv(ref, index=False)
+    return data, ref
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--out", help="Write JSON results to this file as well as stdout")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    os.environ["PARTITION_MIN_MB"] = "0"
+    from backend.sandbox import SandboxPool
+    from backend.partition import execute_script
+
+    data_dir = tempfile.mkdtemp(prefix="bench-partition-")
+    pool = SandboxPool(size=args.workers, max_runs_per_worker=1000, cpu_seconds=3600, wall_seconds=3600)
+    try:
+        data, ref = _make_inputs(data_dir, args.rows)
+        script = SCRIPT.format(data=data, ref=ref)
+        pool.warm()
+
+        results = {"rows": args.rows, "workers": args.workers, "cpus": os.cpu_count()}
+        outputs = {}
+        for mode, partition in (("single", False), ("partitioned", True)):
+            started = time.perf_counter()
+            result = execute_script(script, [data, ref], partition=partition, pool=pool)
+            elapsed = time.perf_counter() - started
+            if result["status"] != "ok":
+                raise RuntimeError(f"{mode} run failed: {result['error']}\n{result['stderr']}")
+            outputs[mode] = {o["name"]: o["content_base64"] for o in result["outputs"]}
+            results[mode] = {
+                "seconds": round(elapsed, 2),
+                "timings": result["timings"],
+                "partitioning": result["partitioning"],
+            }
+        results["identical_output"] = outputs["single"] == outputs["partitioned"]
+        results["output_bytes"] = sum(len(base64.b64decode(v)) for v in outputs["single"].values())
+        results["speedup"] = round(results["single"]["seconds"] / results["partitioned"]["seconds"], 2)
+    finally:
+        pool.shutdown()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    print(f"single {results['single']['seconds']}s, partitioned {results['partitioned']['seconds']}s "
+          f"({results['speedup']}x, identical output: {results['identical_output']})", file=sys.stderr)
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
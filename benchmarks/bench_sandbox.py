@@ -0,0 +1,135 @@
+"""
+Benchmark script execution throughput: a fresh `python final_script.py`
+process per run (what running a downloaded script costs) against the warm
+sandbox pool, in runs per second.
+
+A synthetic workbook is written to a temp dir and every run executes the
+same small transformation script against it (read, group, write xlsx), so
+the numbers are dominated by process start-up and imports on the cold path.
+The pool is driven by one client thread per worker. Prints JSON results.
+
+    python -m benchmarks.bench_sandbox [--runs 40] [--workers 2] [--rows 2000] [--out results.json]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+SCRIPT = """\
+import pandas as pd
+
+df = pd.read_excel(r"{path}")
+summary = df.groupby("region", as_index=False)["amount"].sum()
+summary.to_excel("summary.xlsx", index=False)
+print(len(df), "rows ->", len(summary), "groups")
+"""
+
+
+def _make_workbook(directory: str, rows: int) -> str:
+    path = os.path.join(directory, "sales.xlsx")
+    pd.DataFrame({
+        "region": [f"R{i % 7}" for i in range(rows)],
+        "amount": [i * 1.5 for i in range(rows)],
+        "units": list(range(rows)),
+    }).to_excel(path, index=False)
+    return path
+
+
+def run_cold(path: str, runs: int) -> dict:
+    """One interpreter per run, as when the user runs the script themselves."""
+    workdir = tempfile.mkdtemp(prefix="bench-cold-")
+    script_path = os.path.join(workdir, "final_script.py")
+    with open(script_path, "w", encoding="utf-8") as f:
+        f.write(SCRIPT.format(path=path))
+    try:
+        samples = []
+        started = time.perf_counter()
+        for _ in range(runs):
+            t = time.perf_counter()
+            subprocess.run([sys.executable, script_path], cwd=workdir, check=True, capture_output=True)
+            samples.append(time.perf_counter() - t)
+        elapsed = time.perf_counter() - started
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return _summary(samples, runs, elapsed)
+
+
+def run_pool(path: str, runs: int, workers: int) -> dict:
+    from backend.sandbox import SandboxPool
+
+    pool = SandboxPool(size=workers, max_runs_per_worker=max(runs, 1))
+    t = time.perf_counter()
+    pool.warm()
+    warm_seconds = time.perf_counter() - t
+    script = SCRIPT.format(path=path)
+
+    def one(_):
+        t = time.perf_counter()
+        result = pool.execute(script, [path])
+        if result["status"] != "ok":
+            raise RuntimeError(f"Sandbox run failed: {result['error']}\n{result['stderr']}")
+        return time.perf_counter() - t
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            started = time.perf_counter()
+            samples = list(executor.map(one, range(runs)))
+            elapsed = time.perf_counter() - started
+    finally:
+        pool.shutdown()
+    return {**_summary(samples, runs, elapsed), "workers": workers, "warm_seconds": round(warm_seconds, 2)}
+
+
+def _summary(samples, runs: int, elapsed: float) -> dict:
+    samples = sorted(samples)
+    return {
+        "runs": runs,
+        "runs_per_second": round(runs / elapsed, 2),
+        "median_ms": round(samples[len(samples) // 2] * 1000, 1),
+        "p95_ms": round(samples[max(0, int(len(samples) * 0.95) - 1)] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--out", help="Write JSON results to this file as well as stdout")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    data_dir = tempfile.mkdtemp(prefix="bench-sandbox-")
+    try:
+        path = _make_workbook(data_dir, args.rows)
+        results = {
+            "rows": args.rows,
+            "cpus": os.cpu_count(),
+            "cold_process": run_cold(path, args.runs),
+            "warm_pool": run_pool(path, args.runs, args.workers),
+        }
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    results["speedup"] = round(
+        results["warm_pool"]["runs_per_second"] / max(results["cold_process"]["runs_per_second"], 1e-9), 1
+    )
+    print(f"cold {results['cold_process']['runs_per_second']} runs/s, "
+          f"warm pool {results['warm_pool']['runs_per_second']} runs/s ({results['speedup']}x)", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
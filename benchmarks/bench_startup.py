@@ -0,0 +1,108 @@
+"""
+Cold start of the API: time from launching uvicorn to the first healthy
+response, and to readiness.
+
+Each run starts `uvicorn backend.main:app` in a fresh interpreter and polls
+--health-path (default /health) and then --ready-path (default /ready)
+every 20 ms until they answer 200. The server is stopped after each run.
+To compare with a build that has no /health, point --health-path at any
+cheap GET route (e.g. /metrics) and pass --ready-path "".
+
+    python -m benchmarks.bench_startup [--repeat 3] [--health-path /health] [--ready-path /ready] [--out results.json]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import tempfile
+import statistics
+import subprocess
+import urllib.error
+import urllib.request
+from typing import Optional
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(url: str, proc: subprocess.Popen, started: float, timeout: float) -> Optional[float]:
+    """Seconds from `started` until `url` answers 200; None if the server exited or timed out."""
+    while time.perf_counter() - started < timeout:
+        if proc.poll() is not None:
+            return None
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return time.perf_counter() - started
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.02)
+    return None
+
+
+def cold_start(health_path: str, ready_path: str, timeout: float, env: dict) -> dict:
+    port = _free_port()
+    command = [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"]
+    started = time.perf_counter()
+    proc = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        result = {"healthy_seconds": _wait_for(f"http://127.0.0.1:{port}{health_path}", proc, started, timeout)}
+        if ready_path:
+            result["ready_seconds"] = _wait_for(f"http://127.0.0.1:{port}{ready_path}", proc, started, timeout)
+        return result
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--health-path", default="/health")
+    parser.add_argument("--ready-path", default="/ready", help='Readiness route ("" to skip)')
+    parser.add_argument("--timeout", type=float, default=180)
+    parser.add_argument("--out", help="Write JSON results to this file as well as stdout")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-startup-")
+    env = {
+        **os.environ,
+        "LOG_PROFILE": os.environ.get("LOG_PROFILE", "production"),
+        "LOG_FILE": os.environ.get("LOG_FILE", os.path.join(workdir, "backend.log")),
+        "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "benchmark-placeholder"),
+        "CREWAI_DISABLE_TELEMETRY": "true",
+        "OTEL_SDK_DISABLED": "true",
+    }
+    try:
+        runs = []
+        for i in range(args.repeat):
+            runs.append(cold_start(args.health_path, args.ready_path, args.timeout, env))
+            print(f"run {i + 1}: {runs[-1]}", file=sys.stderr)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {"repeat": args.repeat, "health_path": args.health_path, "ready_path": args.ready_path}
+    for key in ("healthy_seconds", "ready_seconds"):
+        values = [r[key] for r in runs if r.get(key) is not None]
+        if values:
+            results[f"{key[:-len('_seconds')]}_median_seconds"] = round(statistics.median(values), 3)
+    results["runs"] = runs
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
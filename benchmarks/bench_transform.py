@@ -0,0 +1,179 @@
+"""
+End-to-end /transform load test through the FastAPI app, offline.
+
+The crew's LLM is benchmarks.fake_llm.FakeLLM (installed through
+CsvOrganiser._get_llm) with a configurable first-token latency and token
+rate, so the numbers are the service's own: upload, inspection, caches,
+coalescing, governor queueing, the crew loop and static check. Requests go
+through fastapi's TestClient from --concurrency client threads, uploading a
+synthetic workbook (see workbooks.SHAPES) each time.
+
+Scenarios:
+- miss: a different prompt per request with bypass_cache - every request
+  runs the crew;
+- hit: the same prompt after one warm-up request - script cache hits;
+- coalesce: the same prompt with bypass_cache, sent in bursts of
+  --concurrency - identical requests share one crew run;
+- stored: "hit" with the workbook uploaded once to POST /files and sent
+  as file_ids - the difference to "hit" is the upload and hashing.
+
+Per scenario: throughput, latency percentiles, LLM calls made, and the
+median of each stage from the requests' debug=true timings. Prints JSON.
+
+With --llm-url the crews talk to an OpenAI-compatible server instead
+(LLM_PROVIDER=local), e.g. benchmarks.llm_server - the same run plus
+LiteLLM's HTTP path, with the server's latency settings.
+
+    python -m benchmarks.bench_transform [--requests 24] [--concurrency 1 --concurrency 4]
+        [--shape small] [--latency 0.5] [--tokens-per-second 200] [--out results.json]
+    python -m benchmarks.bench_transform --llm-url http://127.0.0.1:8001/v1
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+SCENARIOS = ("miss", "hit", "coalesce", "stored")
+
+
+class RemoteCalls:
+    """LLM call count of a benchmarks.llm_server, read from its /v1/stats."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/") + "/stats"
+
+    @property
+    def calls(self) -> int:
+        with urllib.request.urlopen(self.url, timeout=10) as response:
+            return json.load(response)["calls"]
+
+
+def _percentile(ordered, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_scenario(client, llm, scenario: str, data: bytes, filename: str, requests: int, concurrency: int) -> dict:
+    file_id = None
+    if scenario == "stored":
+        file_id = client.post("/files", files=[("files", (filename, data))]).json()["files"][0]["file_id"]
+
+    def send(i: int) -> dict:
+        prompt = f"Combine the rows ({scenario} {i})" if scenario == "miss" else f"Combine the rows ({scenario})"
+        form = {"prompt": prompt, "debug": "true", "bypass_cache": "false" if scenario in ("hit", "stored") else "true"}
+        started = time.perf_counter()
+        if file_id:
+            response = client.post("/transform", data={**form, "file_ids": file_id})
+        else:
+            response = client.post("/transform", data=form, files=[("files", (filename, data))])
+        body = response.json()
+        return {
+            "seconds": time.perf_counter() - started,
+            "ok": body.get("status") == "success",
+            "stages": (body.get("timings") or {}).get("stages", {}),
+        }
+
+    if scenario in ("hit", "stored"):
+        send(-1)  # fills the script cache
+    calls_before = llm.calls
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        if scenario == "coalesce":
+            outcomes = []
+            for burst in range(0, requests, concurrency):
+                outcomes += list(pool.map(send, range(burst, min(requests, burst + concurrency))))
+        else:
+            outcomes = list(pool.map(send, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(o["seconds"] for o in outcomes)
+    stage_names = sorted({name for o in outcomes for name in o["stages"]})
+    return {
+        "requests": requests,
+        "succeeded": sum(o["ok"] for o in outcomes),
+        "requests_per_second": round(requests / elapsed, 2),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1),
+        "llm_calls": llm.calls - calls_before,
+        "stages_p50_ms": {
+            name: round(statistics.median(o["stages"].get(name, 0.0) for o in outcomes) * 1000, 1)
+            for name in stage_names
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=24)
+    parser.add_argument("--concurrency", type=int, action="append", help="Client threads (repeatable; default 1 and 4)")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="Scenarios to run (default: all)")
+    parser.add_argument("--shape", default="small", help="Workbook shape from workbooks.SHAPES")
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake LLM seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200, help="Fake LLM token rate (0 = instant)")
+    parser.add_argument("--llm-url", help="OpenAI-compatible server for the crews (e.g. benchmarks.llm_server) instead of the in-process fake")
+    parser.add_argument("--data-dir", help="Keep the generated workbooks here and reuse them across runs")
+    parser.add_argument("--out", help="Write JSON results to this file as well as stdout")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-transform-")
+    # Settings are read at import: quiet logs in the temp dir, no sandbox warm-up, caches in the temp dir
+    os.environ.setdefault("LOG_PROFILE", "production")
+    os.environ.setdefault("LOG_FILE", os.path.join(workdir, "backend.log"))
+    os.environ.setdefault("SANDBOX_WARM", "0")
+    os.environ.setdefault("SCRIPT_CACHE_DIR", os.path.join(workdir, "script_cache"))
+    os.environ.setdefault("INSPECTION_CACHE_DIR", os.path.join(workdir, "inspection_cache"))
+    os.environ.setdefault("COLUMNAR_DIR", os.path.join(workdir, "columnar"))
+    os.environ.setdefault("FILE_STORE_DIR", os.path.join(workdir, "files"))
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark-placeholder")
+    if args.llm_url:
+        os.environ["LLM_PROVIDER"] = "local"
+        os.environ["LLM_BASE_URL"] = args.llm_url
+
+    from fastapi.testclient import TestClient
+    from benchmarks.fake_llm import FakeLLM, install
+    from benchmarks.workbooks import write_shapes
+
+    if args.llm_url:
+        llm = RemoteCalls(args.llm_url)
+    else:
+        llm = install(FakeLLM(latency=args.latency, tokens_per_second=args.tokens_per_second))
+    from backend.main import app
+
+    data_dir = args.data_dir or os.path.join(workdir, "workbooks")
+    try:
+        path = write_shapes(data_dir, [args.shape])[args.shape]
+        with open(path, "rb") as f:
+            data = f.read()
+        results = {
+            "shape": args.shape,
+            "file_kb": round(len(data) / 1024, 1),
+            "llm": args.llm_url or "fake",
+            "llm_latency": None if args.llm_url else args.latency,
+            "llm_tokens_per_second": None if args.llm_url else args.tokens_per_second,
+            "runs": {},
+        }
+        with TestClient(app) as client:
+            for concurrency in args.concurrency or [1, 4]:
+                for scenario in args.scenario or SCENARIOS:
+                    run = run_scenario(client, llm, scenario, data, os.path.basename(path), args.requests, concurrency)
+                    results["runs"][f"{scenario}@{concurrency}"] = run
+                    print(f"{scenario} x{concurrency}: {run['requests_per_second']} req/s, "
+                          f"p50 {run['p50_ms']} ms, p95 {run['p95_ms']} ms, {run['llm_calls']} LLM calls", file=sys.stderr)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark the streaming .xlsx preview reader against pd.read_excel.
+
+Generates small / large / wide workbooks, then reads a 10-row preview of
+each with both engines. Every measurement runs in a fresh subprocess so
+peak RSS is not polluted by earlier runs. Prints JSON results.
+
+    python -m benchmarks.bench_xlsx_preview [--large-rows 300000] [--out results.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+CASES = {
+    # name: (rows, columns)
+    "small": (1_000, 10),
+    "large": (300_000, 10),
+    "wide": (2_000, 300),
+}
+
+_CHILD = r"""
+import json, sys, time
+try:
+    import resource
+except ImportError:
+    resource = None
+from backend.crewai_app import inspection
+
+def rss_kb():
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage // 1024 if sys.platform == "darwin" else usage
+
+inspection.INSPECTOR_PREVIEW_ENGINE = sys.argv[2]
+before = rss_kb()
+start = time.perf_counter()
+df = inspection.read_head(sys.argv[1], int(sys.argv[3]))
+elapsed = time.perf_counter() - start
+after = rss_kb()
+print(json.dumps({
+    "seconds": elapsed,
+    "peak_rss_delta_mb": None if before is None else (after - before) / 1024,
+    "shape": list(df.shape),
+}))
+"""
+
+
+def generate_workbook(path: str, rows: int, columns: int):
+    """Mixed string/number/date workbook written with openpyxl's write-only mode."""
+    import datetime
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Data")
+    ws.append([f"col_{c}" for c in range(columns)])
+    base = datetime.datetime(2024, 1, 1)
+    for r in range(rows):
+        row = []
+        for c in range(columns):
+            kind = c % 4
+            if kind == 0:
+                row.append(r)
+            elif kind == 1:
+                row.append(f"item-{(r * 7 + c) % 5000}")
+            elif kind == 2:
+                row.append(r * 0.25 + c)
+            else:
+                row.append(base + datetime.timedelta(minutes=r))
+        ws.append(row)
+    wb.save(path)
+
+
+def measure(path: str, engine: str, nrows: int) -> dict:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD, path, engine, str(nrows)],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--large-rows", type=int, default=CASES["large"][0])
+    parser.add_argument("--nrows", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="Write JSON results to this file as well as stdout")
+    args = parser.parse_args()
+
+    cases = dict(CASES, large=(args.large_rows, CASES["large"][1]))
+    results = {"nrows": args.nrows, "repeat": args.repeat, "cases": []}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, (rows, columns) in cases.items():
+            path = os.path.join(tmp, f"{name}.xlsx")
+            gen_start = time.perf_counter()
+            generate_workbook(path, rows, columns)
+            case = {
+                "case": name,
+                "rows": rows,
+                "columns": columns,
+                "file_mb": os.path.getsize(path) / (1024 * 1024),
+                "generate_seconds": time.perf_counter() - gen_start,
+            }
+            for engine in ("pandas", "stream"):
+                runs = [measure(path, engine, args.nrows) for _ in range(args.repeat)]
+                case[engine] = {
+                    "best_seconds": min(r["seconds"] for r in runs),
+                    "peak_rss_delta_mb": max((r["peak_rss_delta_mb"] or 0) for r in runs),
+                    "shape": runs[0]["shape"],
+                }
+            case["speedup"] = case["pandas"]["best_seconds"] / max(case["stream"]["best_seconds"], 1e-9)
+            results["cases"].append(case)
+            print(f"{name}: pandas {case['pandas']['best_seconds']:.3f}s, "
+                  f"stream {case['stream']['best_seconds']:.3f}s ({case['speedup']:.0f}x)", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
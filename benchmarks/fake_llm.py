@@ -0,0 +1,134 @@
+"""
+Deterministic local stand-in for the crew's LLM, for offline benchmarks.
+
+FakeLLM is a GovernedLLM whose provider call is replaced by a canned
+reply, so everything around the provider still runs: the governor's
+queueing and rate limits, crewai's agent loop and event bus (progress
+events, timing spans). The reply depends only on the file paths in the
+prompt:
+
+- when the prompt offers the Excel Data Inspector Tool and has no
+  observation yet, a ReAct tool call for those paths;
+- otherwise a final answer with a script that reads every file and writes
+  them to one workbook - it passes the static check, so the validator does
+  not run.
+
+latency delays the first token and tokens_per_second paces the rest
+(0 = no waiting), to model a provider without calling one.
+
+install(llm) wires it in through CsvOrganiser._get_llm; call it before the
+first crew is built (before the app starts).
+"""
+import os
+import re
+import json
+import time
+import threading
+from typing import Any, List
+
+# Offline: no crewai telemetry export
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from crewai.events import crewai_event_bus
+from crewai.events.types.llm_events import LLMCallType, LLMStreamChunkEvent
+
+from backend.crewai_app.compact import estimate_tokens
+from backend.crewai_app.llm_governor import GovernedLLM
+
+TOOL_NAME = "Excel Data Inspector Tool"
+
+_PATH = re.compile(r"(/[^\s\"'\\,\]\[]+?\.(?:xlsx|xlsm|xls|csv|tsv|tab|txt|parquet))")
+
+SCRIPT = """\
+import pandas as pd
+
+{reads}
+
+combined = pd.concat(frames, ignore_index=True)
+combined.to_excel("output.xlsx", index=False)
+print(len(combined), "rows written to output.xlsx")
+"""
+
+
+def prompt_paths(messages: Any) -> List[str]:
+    """File paths mentioned in the prompt, in order of first mention."""
+    text = messages if isinstance(messages, str) else json.dumps(messages, ensure_ascii=False)
+    text = text.replace("\\\\", "\\")
+    return list(dict.fromkeys(_PATH.findall(text)))
+
+
+def reply_for(messages: Any) -> str:
+    """The canned reply to a prompt; see the module docstring."""
+    text = messages if isinstance(messages, str) else json.dumps(messages, ensure_ascii=False)
+    paths = prompt_paths(messages)
+    if TOOL_NAME in text and "Observation:" not in text:
+        return (
+            "Thought: I need the structure of the files first.\n"
+            f"Action: {TOOL_NAME}\n"
+            f"Action Input: {json.dumps({'file_paths': paths})}"
+        )
+    reads = "\n".join(f'df_{i} = pd.read_excel(r"{path}")' for i, path in enumerate(paths))
+    reads += "\nframes = [" + ", ".join(f"df_{i}" for i in range(len(paths))) + "]"
+    return (
+        "Thought: I now know the final answer.\n"
+        f"Final Answer: ```python\n{SCRIPT.format(reads=reads)}```"
+    )
+
+
+class FakeLLM(GovernedLLM):
+    """GovernedLLM answering with reply_for() after the configured latency."""
+
+    def __init__(self, latency: float = 0.0, tokens_per_second: float = 0.0, stream: bool = True):
+        super().__init__(model="openai/fake-benchmark", api_key="fake", stream=stream)
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+
+    def _reply(self, params):
+        with self._calls_lock:
+            self.calls += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+        return reply_for(params["messages"])
+
+    def _chunks(self, text: str, size: int = 16):
+        for i in range(0, len(text), size):
+            chunk = text[i:i + size]
+            if self.tokens_per_second > 0:
+                time.sleep(estimate_tokens(chunk) / self.tokens_per_second)
+            yield chunk
+
+    def _handle_non_streaming_response(self, params, callbacks=None, available_functions=None,
+                                       from_task=None, from_agent=None):
+        text = "".join(self._chunks(self._reply(params)))
+        self._handle_emit_call_events(
+            response=text, call_type=LLMCallType.LLM_CALL,
+            from_task=from_task, from_agent=from_agent, messages=params["messages"],
+        )
+        return text
+
+    def _handle_streaming_response(self, params, callbacks=None, available_functions=None,
+                                   from_task=None, from_agent=None):
+        parts = []
+        for chunk in self._chunks(self._reply(params)):
+            parts.append(chunk)
+            crewai_event_bus.emit(self, event=LLMStreamChunkEvent(chunk=chunk, from_task=from_task, from_agent=from_agent))
+        text = "".join(parts)
+        self._handle_emit_call_events(
+            response=text, call_type=LLMCallType.LLM_CALL,
+            from_task=from_task, from_agent=from_agent, messages=params["messages"],
+        )
+        return text
+
+
+def install(llm: FakeLLM) -> FakeLLM:
+    """Make every crew built from now on use `llm` (dropping any pooled crews)."""
+    from backend.crewai_app import crew as crew_module
+    from backend.crewai_app import crew_pool
+
+    crew_module.CsvOrganiser._get_llm = lambda self: llm
+    with crew_pool._pools_lock:
+        crew_pool._pools.clear()
+    return llm
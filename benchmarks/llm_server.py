@@ -0,0 +1,210 @@
+"""
+Local OpenAI-compatible stand-in for the LLM provider, for load tests.
+
+Point the backend at it with LLM_PROVIDER=local (LLM_BASE_URL defaults to
+http://127.0.0.1:8001/v1) and the whole request path runs for real -
+upload, inspection, caches, coalescing, the governor, the crew loop and
+LiteLLM's HTTP client - while the provider's part is just a timed reply:
+--latency seconds to the first token, then --tokens-per-second, with
++/- --jitter as a fraction of both. Waiting is async, so one server holds
+as many concurrent calls as the backend sends.
+
+Replies come from --recordings: JSON lines of {"messages", "response"} as
+written by the backend with LLM_RECORD_FILE set (see llm_provider.py). A
+recording matches a call with the same messages once file paths are set
+aside, and its reply gets the new call's paths - so a session recorded
+against the real provider replays for fresh uploads of the same files.
+Calls with no recording get benchmarks.fake_llm.reply_for() (a tool call,
+then a script that concatenates the inputs), or HTTP 404 with --strict.
+
+    LLM_PROVIDER=gemini LLM_RECORD_FILE=recordings.jsonl uvicorn backend.main:app   # record a session
+    python -m benchmarks.llm_server --recordings recordings.jsonl --latency 1.5 --tokens-per-second 80
+    LLM_PROVIDER=local uvicorn backend.main:app                                      # replay against it
+
+Endpoints: POST /v1/chat/completions (plain and streamed), GET /v1/models,
+GET /v1/stats (calls served, replayed and made up).
+"""
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import threading
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from backend.crewai_app.cache import make_key
+from backend.crewai_app.compact import CHARS_PER_TOKEN, estimate_tokens
+from backend.crewai_app.script_cache import render, templatize
+from benchmarks.fake_llm import prompt_paths, reply_for
+
+MODEL_ID = "stand-in"
+CHUNK_CHARS = 16
+
+
+def _messages_text(messages: Any) -> str:
+    """The text content of a conversation, which is what a recording is matched on."""
+    if isinstance(messages, str):
+        return messages
+    parts = []
+    for message in messages or []:
+        content = message.get("content") if isinstance(message, dict) else message
+        if isinstance(content, list):  # content parts
+            content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+        parts.append(f"{message.get('role', '') if isinstance(message, dict) else ''}: {content or ''}")
+    return "\n".join(parts)
+
+
+class Recordings:
+    """Recorded replies keyed by their path-independent messages."""
+
+    def __init__(self, files: Optional[List[str]] = None):
+        self._replies: Dict[str, str] = {}
+        for path in files or []:
+            self.load(path)
+
+    def __len__(self) -> int:
+        return len(self._replies)
+
+    def _key(self, messages: Any, paths: List[str]) -> str:
+        return make_key("llm", templatize(_messages_text(messages), paths))
+
+    def load(self, path: str):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                paths = prompt_paths(entry["messages"])
+                self._replies[self._key(entry["messages"], paths)] = templatize(entry["response"], paths)
+
+    def lookup(self, messages: Any) -> Optional[str]:
+        paths = prompt_paths(messages)
+        template = self._replies.get(self._key(messages, paths))
+        return None if template is None else render(template, paths)
+
+
+def create_app(
+    recordings: Optional[Recordings] = None,
+    latency: float = 0.5,
+    tokens_per_second: float = 100.0,
+    jitter: float = 0.0,
+    strict: bool = False,
+) -> FastAPI:
+    """The stand-in server; see the module docstring."""
+    recordings = recordings or Recordings()
+    stats = {"calls": 0, "replayed": 0, "made_up": 0, "in_progress": 0, "max_in_progress": 0}
+    stats_lock = threading.Lock()
+    app = FastAPI(title="LLM stand-in")
+
+    def _vary(value: float) -> float:
+        return max(0.0, value * (1 + random.uniform(-jitter, jitter))) if jitter else value
+
+    def _chunk_delay(chunk: str, rate: float) -> float:
+        return estimate_tokens(chunk) / rate if rate > 0 else 0.0
+
+    def _usage(messages: Any, text: str) -> Dict[str, int]:
+        prompt_tokens = estimate_tokens(_messages_text(messages))
+        completion_tokens = estimate_tokens(text)
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": MODEL_ID, "object": "model", "owned_by": "benchmarks"}]}
+
+    @app.get("/v1/stats")
+    async def get_stats():
+        with stats_lock:
+            return {**stats, "recordings": len(recordings)}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages") or []
+        text = recordings.lookup(messages)
+        with stats_lock:
+            stats["calls"] += 1
+            stats["replayed" if text is not None else "made_up"] += 1
+        if text is None:
+            if strict:
+                return JSONResponse(status_code=404, content={"error": {
+                    "message": "No recorded response for these messages", "type": "not_found"}})
+            text = reply_for(messages)
+        # max_tokens cuts the reply short, as a provider would
+        finish_reason = "stop"
+        if body.get("max_tokens") and estimate_tokens(text) > body["max_tokens"]:
+            text, finish_reason = text[:body["max_tokens"] * CHARS_PER_TOKEN], "length"
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        model = body.get("model") or MODEL_ID
+        first_token, rate = _vary(latency), _vary(tokens_per_second)
+
+        async def timed():
+            with stats_lock:
+                stats["in_progress"] += 1
+                stats["max_in_progress"] = max(stats["max_in_progress"], stats["in_progress"])
+            try:
+                await asyncio.sleep(first_token)
+                for i in range(0, len(text), CHUNK_CHARS):
+                    chunk = text[i:i + CHUNK_CHARS]
+                    await asyncio.sleep(_chunk_delay(chunk, rate))
+                    yield chunk
+            finally:
+                with stats_lock:
+                    stats["in_progress"] -= 1
+
+        if not body.get("stream"):
+            async for _ in timed():
+                pass
+            return {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": finish_reason}],
+                "usage": _usage(messages, text),
+            }
+
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+        async def events():
+            base = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model}
+            first = True
+            async for chunk in timed():
+                delta = {"role": "assistant", "content": chunk} if first else {"content": chunk}
+                first = False
+                yield f"data: {json.dumps({**base, 'choices': [{'index': 0, 'delta': delta, 'finish_reason': None}]})}\n\n"
+            yield f"data: {json.dumps({**base, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': finish_reason}]})}\n\n"
+            if include_usage:
+                yield f"data: {json.dumps({**base, 'choices': [], 'usage': _usage(messages, text)})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--recordings", action="append", help="JSON lines file from LLM_RECORD_FILE (repeatable)")
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds to the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=100, help="Token rate after the first (0 = instant)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- fraction applied to latency and rate")
+    parser.add_argument("--strict", action="store_true", help="HTTP 404 for calls with no recording")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    recordings = Recordings(args.recordings)
+    print(f"LLM stand-in on http://{args.host}:{args.port}/v1 - {len(recordings)} recorded replies, "
+          f"{args.latency}s to first token, {args.tokens_per_second} tokens/s")
+    app = create_app(recordings, args.latency, args.tokens_per_second, args.jitter, args.strict)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Run the offline benchmark suite and compare results between commits.
+
+Each benchmark runs in its own interpreter (settings are read at import)
+and its JSON output is collected into one document, with the git commit,
+Python version, CPU count and time of the run:
+
+    python -m benchmarks.suite --out results-$(git rev-parse --short HEAD).json
+
+--compare BASELINE.json then lists every number that moved by more than
+--threshold (default 10%) against a previous run. Times (`_ms`, `_seconds`)
+are better lower; rates (`per_s`, `per_second`, `speedup`) are better
+higher; other numbers are not compared. With --fail-on-regression the exit
+status is 1 when anything got worse, for CI.
+
+    python -m benchmarks.suite --quick --compare results-abc123.json --fail-on-regression
+
+No network access or API key is needed: the end-to-end runs use
+benchmarks.fake_llm.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+from typing import Dict, List, Tuple
+
+# name -> (module, arguments, --quick arguments)
+BENCHMARKS = {
+    "inspector": ("benchmarks.bench_inspector", [], ["--shape", "small", "--shape", "wide", "--shape", "merged_header", "--repeat", "1"]),
+    "transform": ("benchmarks.bench_transform", [], ["--requests", "8", "--concurrency", "4"]),
+    "crew_setup": ("benchmarks.bench_crew_setup", [], ["--requests", "50"]),
+    "xlsx_preview": ("benchmarks.bench_xlsx_preview", [], ["--large-rows", "20000", "--repeat", "1"]),
+    "startup": ("benchmarks.bench_startup", [], ["--repeat", "1"]),
+}
+
+LOWER_IS_BETTER = ("_ms", "_seconds")
+HIGHER_IS_BETTER = ("per_s", "per_second", "speedup")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_benchmark(name: str, quick: bool, data_dir: str) -> Dict:
+    module, args, quick_args = BENCHMARKS[name]
+    # Results come back through --out: crewai echoes streamed tokens to stdout
+    fd, out = tempfile.mkstemp(prefix=f"bench-{name}-", suffix=".json")
+    os.close(fd)
+    command = [sys.executable, "-m", module, *(quick_args if quick else args), "--out", out]
+    if name in ("inspector", "transform"):
+        command += ["--data-dir", data_dir]
+    started = time.perf_counter()
+    try:
+        proc = subprocess.run(command, capture_output=True, text=True)
+        if proc.returncode != 0:
+            return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"}
+        with open(out, encoding="utf-8") as f:
+            result = json.load(f)
+    finally:
+        os.remove(out)
+    result["wall_seconds"] = round(time.perf_counter() - started, 1)
+    return result
+
+
+def _flatten(value, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    if isinstance(value, dict):
+        for key, item in value.items():
+            flat.update(_flatten(item, f"{prefix}{key}."))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        flat[prefix[:-1]] = float(value)
+    return flat
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> Tuple[List[str], List[str]]:
+    """(regressions, improvements) beyond `threshold` (a fraction), as printable lines."""
+    now, before = _flatten(current.get("benchmarks", {})), _flatten(baseline.get("benchmarks", {}))
+    regressions, improvements = [], []
+    for key in sorted(now.keys() & before.keys()):
+        leaf = key.rsplit(".", 1)[-1]
+        if leaf == "wall_seconds":
+            continue
+        if leaf.endswith(LOWER_IS_BETTER):
+            sign = 1
+        elif leaf.endswith(HIGHER_IS_BETTER):
+            sign = -1
+        else:
+            continue
+        old, new = before[key], now[key]
+        if old == 0:
+            continue
+        change = (new - old) / abs(old)
+        if abs(change) < threshold:
+            continue
+        line = f"{key}: {old:g} -> {new:g} ({change:+.0%})"
+        (regressions if change * sign > 0 else improvements).append(line)
+    return regressions, improvements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="Benchmarks to run (default: all)")
+    parser.add_argument("--quick", action="store_true", help="Smaller runs, for a fast check")
+    parser.add_argument("--data-dir", help="Keep the generated workbooks here and reuse them across runs")
+    parser.add_argument("--out", help="Write JSON results to this file as well as stdout")
+    parser.add_argument("--compare", help="Baseline results file from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change reported by --compare")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    data_dir = args.data_dir or os.path.join(tempfile.gettempdir(), "excel-transformer-bench-workbooks")
+    results = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "quick": args.quick,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "benchmarks": {},
+    }
+    for name in args.only or list(BENCHMARKS):
+        print(f"▶ {name}", file=sys.stderr)
+        results["benchmarks"][name] = run_benchmark(name, args.quick, data_dir)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions, improvements = compare(results, baseline, args.threshold)
+        print(f"Compared with {baseline.get('commit', args.compare)}:", file=sys.stderr)
+        for line in regressions:
+            print(f"  worse   {line}", file=sys.stderr)
+        for line in improvements:
+            print(f"  better  {line}", file=sys.stderr)
+        if not regressions and not improvements:
+            print(f"  no change beyond {args.threshold:.0%}", file=sys.stderr)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
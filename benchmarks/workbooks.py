@@ -0,0 +1,136 @@
+"""
+Synthetic .xlsx workbooks for the benchmarks.
+
+make_workbook() writes a workbook of a given shape: rows, columns, sheets,
+the share of text columns among numeric ones, null cells, and optionally a
+merged two-row header (a title row merged across the columns, as exported
+reports often have). The content is a function of the arguments and the
+seed, so runs on different commits parse the same bytes.
+
+SHAPES are the named shapes the suite runs; write_shapes() writes them all.
+
+    python -m benchmarks.workbooks --out-dir /tmp/workbooks [--shape wide ...]
+"""
+import os
+import sys
+import json
+import hashlib
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.styles import Alignment, Font
+
+SHAPES: Dict[str, Dict] = {
+    "small": {"rows": 200, "columns": 6},
+    "tall": {"rows": 50_000, "columns": 8},
+    "wide": {"rows": 2_000, "columns": 120},
+    "multi_sheet": {"rows": 5_000, "columns": 10, "sheets": 6},
+    "text_heavy": {"rows": 10_000, "columns": 12, "string_ratio": 0.9},
+    "numeric": {"rows": 20_000, "columns": 12, "string_ratio": 0.0},
+    "sparse": {"rows": 10_000, "columns": 10, "null_ratio": 0.4},
+    "merged_header": {"rows": 2_000, "columns": 10, "merged_header": True},
+}
+
+_WORDS = ["North", "South", "East", "West", "Retail", "Online", "Wholesale", "Partner", "Direct", "Export"]
+
+
+def _column_kinds(columns: int, string_ratio: float, rng) -> List[str]:
+    """Column types: a mix of text, int, float and date in a fixed order for the seed."""
+    kinds = []
+    for i in range(columns):
+        if i == 0:
+            kinds.append("id")
+        elif rng.random() < string_ratio:
+            kinds.append("category" if i % 2 else "text")
+        else:
+            kinds.append(("int", "float", "date")[i % 3])
+    return kinds
+
+
+def _column_values(kind: str, rows: int, rng) -> list:
+    if kind == "id":
+        return list(range(1, rows + 1))
+    if kind == "category":
+        return [_WORDS[j] for j in rng.integers(0, len(_WORDS), rows)]
+    if kind == "text":
+        return [f"{_WORDS[a]} item {b:05d}" for a, b in zip(rng.integers(0, len(_WORDS), rows), rng.integers(0, 50_000, rows))]
+    if kind == "int":
+        return rng.integers(0, 10_000, rows).tolist()
+    if kind == "float":
+        return (rng.random(rows) * 1000).round(2).tolist()
+    start = datetime(2024, 1, 1)
+    return [start + timedelta(minutes=int(m)) for m in rng.integers(0, 525_600, rows)]
+
+
+def make_workbook(
+    path: str,
+    rows: int = 1_000,
+    columns: int = 8,
+    sheets: int = 1,
+    string_ratio: float = 0.4,
+    null_ratio: float = 0.0,
+    merged_header: bool = False,
+    seed: int = 0,
+) -> str:
+    """Write a synthetic workbook to `path` and return the path; see the module docstring."""
+    rng = np.random.default_rng(seed)
+    # Merged cells need the regular (not write-only) workbook
+    wb = Workbook(write_only=not merged_header)
+    if merged_header:
+        wb.remove(wb.active)
+
+    for s in range(sheets):
+        kinds = _column_kinds(columns, string_ratio, rng)
+        names = [f"{kind}_{i}" if kind != "id" else "id" for i, kind in enumerate(kinds)]
+        data = [_column_values(kind, rows, rng) for kind in kinds]
+        if null_ratio > 0:
+            for values, kind in zip(data, kinds):
+                if kind == "id":
+                    continue
+                for r in np.flatnonzero(rng.random(rows) < null_ratio):
+                    values[r] = None
+
+        ws = wb.create_sheet(f"Sheet{s + 1}")
+        if merged_header:
+            ws.append([f"Report {s + 1} - generated data"] + [None] * (columns - 1))
+            ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=columns)
+            ws.cell(row=1, column=1).font = Font(bold=True)
+            ws.cell(row=1, column=1).alignment = Alignment(horizontal="center")
+        ws.append(names)
+        for row in zip(*data):
+            ws.append(list(row))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    wb.save(path)
+    return path
+
+
+def write_shapes(directory: str, names: Optional[List[str]] = None) -> Dict[str, str]:
+    """
+    Write the named SHAPES (all by default) to `directory`; returns name -> path.
+    File names carry a hash of the shape, so a directory kept between runs is
+    reused until a shape changes.
+    """
+    paths = {}
+    for name in names or list(SHAPES):
+        shape = SHAPES[name]
+        digest = hashlib.sha256(json.dumps(shape, sort_keys=True).encode()).hexdigest()[:8]
+        path = os.path.join(directory, f"{name}-{digest}.xlsx")
+        paths[name] = path if os.path.exists(path) else make_workbook(path, **shape)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out-dir", required=True)
+    parser.add_argument("--shape", action="append", choices=sorted(SHAPES), help="Shapes to write (default: all)")
+    args = parser.parse_args()
+    for name, path in write_shapes(args.out_dir, args.shape).items():
+        print(f"{name}: {path} ({os.path.getsize(path) / 1024:.0f} KB)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,202 @@
 import streamlit as st
 import requests
+import hashlib
+import base64
+import json
+import time
 import os
 
 API_URL = os.getenv("API_URL", "http://localhost:8000/transform")  # default to local backend
+STREAM_URL = os.getenv("STREAM_URL", API_URL.rstrip("/") + "/stream")
+FILES_URL = os.getenv("FILES_URL", API_URL.rstrip("/").rsplit("/", 1)[0] + "/files")
 
 st.set_page_config(page_title="CrewAI Excel Transformer", layout="wide")
 st.title("📊 CrewAI Excel Transformer")
 
-uploaded_files = st.file_uploader("Upload Excel files", type=["xlsx"], accept_multiple_files=True)
+uploaded_files = st.file_uploader(
+    "Upload data files", type=["xlsx", "xls", "csv", "tsv", "parquet"], accept_multiple_files=True
+)
 prompt = st.text_area("Enter transformation instructions")
+bypass_cache = st.checkbox("Regenerate (ignore cached scripts)", value=False)
+execute = st.checkbox("Run the script on the uploaded files", value=False)
+stream = st.checkbox("Show progress while generating", value=True)
+
+
+def show_script(script):
+    st.success("✅ Script generated successfully!")
+    st.code(script, language="python")
+
+    # 🔥 Add download button
+    st.download_button(
+        label="💾 Download Script as .py",
+        data=script,
+        file_name="generated_script.py",
+        mime="text/x-python"
+    )
+
+
+def show_execution(execution):
+    if execution.get("status") == "ok":
+        st.success(f"▶️ Script ran in {execution['timings']['run_seconds']:.2f}s")
+    else:
+        st.error(f"❌ Script run failed ({execution.get('status')}): {execution.get('error')}")
+    if execution.get("stdout"):
+        st.text_area("stdout", execution["stdout"], height=150)
+    if execution.get("stderr"):
+        st.text_area("stderr", execution["stderr"], height=150)
+    for output in execution.get("outputs", []):
+        if output.get("content_base64") is None:
+            st.warning(f"{output['name']} ({output['size']} bytes) is too large to return")
+            continue
+        st.download_button(
+            label=f"💾 Download {output['name']}",
+            data=base64.b64decode(output["content_base64"]),
+            file_name=os.path.basename(output["name"]),
+            key=output["name"],
+        )
+
+
+def sse_events(response):
+    """Yield (event, data) pairs from a text/event-stream response."""
+    kind, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if data:
+                yield kind, json.loads("\n".join(data))
+            kind, data = "message", []
+        elif line.startswith("event:"):
+            kind = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].strip())
+        # id: lines and ": keep-alive" comments need no handling
+
+
+def show_inspection(summary):
+    for f in summary["files"]:
+        rows = f"{f['rows']} rows" if f.get("rows") is not None else f["status"]
+        st.markdown(f"**{os.path.basename(f['path'] or '')}** - {rows}, {len(f['columns'])} columns")
+        if f["columns"]:
+            st.dataframe({"column": [c[0] for c in f["columns"]], "dtype": [c[1] for c in f["columns"]]},
+                         hide_index=True)
+        for sheet in f.get("sheets", []):
+            st.caption(f"Sheet {sheet['name']}: {sheet['rows']} rows, {sheet['columns']} columns")
+    for error in summary["errors"]:
+        st.error(error)
+
+
+def stored_file_ids(files, refresh=False):
+    """
+    Server file IDs (SHA-256) for the uploaded files, uploading only those
+    the server doesn't have. Hashes and what the server holds are kept in
+    the session, so clicking again with the same files sends nothing.
+    """
+    digests = st.session_state.setdefault("file_digests", {})
+    on_server = st.session_state.setdefault("files_on_server", set())
+    if refresh:
+        on_server.clear()
+    ids = []
+    for f in files:
+        key = (getattr(f, "file_id", f.name), f.size)
+        if key not in digests:
+            digests[key] = hashlib.sha256(f.getvalue()).hexdigest()
+        ids.append(digests[key])
+
+    unknown = [i for i in ids if i not in on_server]
+    if unknown:
+        response = requests.post(FILES_URL, data={"file_ids": ",".join(unknown)})
+        response.raise_for_status()
+        missing = set(response.json()["missing"])
+        upload = [f for f, i in zip(files, ids) if i in missing]
+        if upload:
+            response = requests.post(FILES_URL, files=[
+                ("files", (f.name, f.getvalue(), f.type or "application/octet-stream")) for f in upload
+            ])
+            response.raise_for_status()
+        on_server.update(unknown)
+    return ids
+
+
+def post_with_files(url, data, files, **kwargs):
+    """POST with the files' IDs; if the server has since dropped one (TTL or disk quota), upload again once."""
+    for refresh in (False, True):
+        ids = stored_file_ids(files, refresh)
+        response = requests.post(url, data={**data, "file_ids": ",".join(ids)}, **kwargs)
+        if response.status_code != 404 or refresh:
+            return response
+        response.close()
+
+
+def run_streaming(data, files):
+    status = st.status("Uploading files...", expanded=True)
+    draft_box = st.empty()
+    draft, drawn_at = "", 0.0
+    with post_with_files(STREAM_URL, data, files, stream=True) as response:
+        if response.status_code != 200:
+            status.update(label="Failed", state="error")
+            st.error(f"❌ HTTP error: {response.status_code} {response.text}")
+            return
+        for kind, event in sse_events(response):
+            if kind == "upload":
+                status.write(f"📁 Using {len(event['files'])} file(s)")
+                status.update(label="Inspecting files...")
+            elif kind == "inspection":
+                with status:
+                    show_inspection(event)
+                status.update(label="Generating script...")
+            elif kind == "cache_hit":
+                status.write("⚡ Reusing a cached script for this schema and prompt")
+            elif kind == "agent_started":
+                status.write(f"🤖 {event['agent']} started")
+                draft = ""
+            elif kind == "token":
+                draft += event["text"]
+                # Redrawing on every token is slow in the browser
+                if time.monotonic() - drawn_at > 0.2:
+                    draft_box.code(draft, language="markdown")
+                    drawn_at = time.monotonic()
+            elif kind == "agent_finished":
+                status.write(f"✔️ {event['agent']} finished")
+                draft_box.code(event["output"], language="markdown")
+            elif kind == "static_check":
+                if event["ok"]:
+                    status.write("✅ Static check passed")
+                else:
+                    status.write(f"🔎 Static check found {len(event['findings'])} problem(s), validating...")
+            elif kind == "script":
+                draft_box.empty()
+                status.update(label=f"Script ready in {event['t']:.1f}s", state="complete", expanded=False)
+                show_script(event["script"])
+                if execute:
+                    st.info("Running the script...")
+            elif kind == "execution":
+                show_execution(event)
+            elif kind == "error":
+                status.update(label="Failed", state="error")
+                st.error(f"❌ Backend error: {event.get('error', 'Unknown error')}")
+
 
 if st.button("Generate Script"):
     if uploaded_files and prompt:
-        files = [
-            ("files", (f.name, f.getvalue(), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"))
-            for f in uploaded_files
-        ]
+        data = {"prompt": prompt, "bypass_cache": str(bypass_cache).lower(), "execute": str(execute).lower()}
         try:
-            with st.spinner("Generating script..."):
-                response = requests.post(API_URL, data={"prompt": prompt}, files=files)
-                
-            if response.status_code == 200:
-                response_data = response.json()
-                if response_data.get("status") == "success":
-                    script = response_data["script"]
-
-                    st.success("✅ Script generated successfully!")
-                    st.code(script, language="python")
-
-                    # 🔥 Add download button
-                    st.download_button(
-                        label="💾 Download Script as .py",
-                        data=script,
-                        file_name="generated_script.py",
-                        mime="text/x-python"
-                    )
-                else:
-                    st.error(f"❌ Backend error: {response_data.get('error', 'Unknown error')}")
+            if stream:
+                run_streaming(data, uploaded_files)
             else:
-                st.error(f"❌ HTTP error: {response.status_code} {response.text}")
-                
+                with st.spinner("Generating script..."):
+                    response = post_with_files(API_URL, data, uploaded_files)
+
+                if response.status_code == 200:
+                    response_data = response.json()
+                    if response_data.get("status") == "success":
+                        show_script(response_data["script"])
+                        execution = response_data.get("execution")
+                        if execution:
+                            show_execution(execution)
+                    else:
+                        st.error(f"❌ Backend error: {response_data.get('error', 'Unknown error')}")
+                else:
+                    st.error(f"❌ HTTP error: {response.status_code} {response.text}")
+
         except requests.exceptions.RequestException as e:
             st.error(f"❌ Connection error: {str(e)}")
     else:
@@ -0,0 +1,22 @@
+"""
+Shared test setup. Backend settings are read from the environment at
+import, so caches, stores and logs are pointed at a throwaway directory
+before any backend module is imported.
+"""
+import os
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="excel-transformer-tests-")
+
+for name, value in {
+    "LOG_FILE": os.path.join(_TMP, "backend.log"),
+    "SCRIPT_CACHE_DIR": os.path.join(_TMP, "script_cache"),
+    "INSPECTION_CACHE_DIR": os.path.join(_TMP, "inspection_cache"),
+    "COLUMNAR_DIR": os.path.join(_TMP, "columnar"),
+    "FILE_STORE_DIR": os.path.join(_TMP, "files"),
+    "STARTUP_PROFILE": "0",
+    "SANDBOX_WARM": "0",
+    "CREWAI_DISABLE_TELEMETRY": "true",
+    "OTEL_SDK_DISABLED": "true",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,93 @@
+import os
+import time
+
+from backend.crewai_app.cache import TieredCache, file_digest, make_key, remember_digest
+
+
+def _key(n: int) -> str:
+    return make_key("entry", n)
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = TieredCache("test", memory_items=2)
+    cache.put(_key(1), "one")
+    cache.put(_key(2), "two")
+    assert cache.get(_key(1)) == "one"  # 2 is now the oldest
+    cache.put(_key(3), "three")
+    assert cache.get(_key(2)) is None
+    assert cache.get(_key(1)) == "one"
+    stats = cache.stats()
+    assert stats["memory_evictions"] == 1
+    assert stats["misses"] == 1
+    assert stats["memory_entries"] == 2
+
+
+def test_disk_tier_serves_entries_evicted_from_memory(tmp_path):
+    cache = TieredCache("test", memory_items=1, disk_dir=str(tmp_path))
+    cache.put(_key(1), {"rows": 1})
+    cache.put(_key(2), {"rows": 2})
+    assert cache.get(_key(1)) == {"rows": 1}
+    assert cache.stats()["disk_hits"] == 1
+    # Promoted back into memory
+    assert cache.get(_key(1)) == {"rows": 1}
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_disk_survives_a_new_instance(tmp_path):
+    TieredCache("test", disk_dir=str(tmp_path)).put(_key(1), [1, 2, 3])
+    assert TieredCache("test", disk_dir=str(tmp_path)).get(_key(1)) == [1, 2, 3]
+
+
+def test_disk_tier_evicts_least_recently_used_past_cap(tmp_path):
+    value = "x" * 1000
+    cache = TieredCache("test", memory_items=0, disk_dir=str(tmp_path), disk_max_bytes=3500)
+    now = time.time()
+    for n in range(3):
+        cache.put(_key(n), value)
+        os.utime(cache._disk_path(_key(n)), (now - 100 + n, now - 100 + n))
+    # Reading 0 makes 1 the least recently used
+    assert cache.get(_key(0)) == value
+    cache.put(_key(3), value)
+    assert cache.get(_key(1)) is None
+    assert cache.get(_key(0)) == value
+    assert cache.get(_key(3)) == value
+    stats = cache.stats()
+    assert stats["disk_evictions"] >= 1
+    assert stats["disk_bytes"] <= 3500 * 0.9
+
+
+def test_expired_entries_are_misses_and_removed(tmp_path):
+    cache = TieredCache("test", disk_dir=str(tmp_path), ttl_seconds=60)
+    cache.put(_key(1), "old")
+    path = cache._disk_path(_key(1))
+    cache._memory[_key(1)]["created_at"] -= 120
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"created_at": %f, "value": "old"}' % (time.time() - 120))
+    assert cache.get(_key(1)) is None
+    assert not os.path.exists(path)
+    assert cache.stats()["expired"] == 1
+
+
+def test_unreadable_disk_entry_is_dropped(tmp_path):
+    cache = TieredCache("test", memory_items=0, disk_dir=str(tmp_path))
+    cache.put(_key(1), "ok")
+    path = cache._disk_path(_key(1))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{not json")
+    assert cache.get(_key(1)) is None
+    assert not os.path.exists(path)
+
+
+def test_make_key_ignores_dict_order():
+    assert make_key({"a": 1, "b": 2}) == make_key({"b": 2, "a": 1})
+    assert make_key("a", 1) != make_key("a", 2)
+
+
+def test_file_digest_is_remembered_until_the_file_changes(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_bytes(b"a,b\n1,2\n")
+    digest = file_digest(str(path))
+    remember_digest(str(path), "remembered")
+    assert file_digest(str(path)) == "remembered"
+    path.write_bytes(b"a,b\n1,2\n3,4\n")
+    assert file_digest(str(path)) not in (digest, "remembered")
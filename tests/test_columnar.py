@@ -0,0 +1,111 @@
+from concurrent.futures import Future
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from backend import main
+from backend.crewai_app import columnar
+
+
+class _Executor:
+    """Queues every job without running it."""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.futures.append(future)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        for future in self.futures:
+            future.cancel()
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    executor = _Executor()
+    monkeypatch.setattr(columnar, "_executor", executor)
+    monkeypatch.setattr(columnar, "_queued", 0)
+    monkeypatch.setattr(columnar, "COLUMNAR_MAX_QUEUED", 2)
+    return executor
+
+
+def _workbooks(tmp_path, count):
+    paths = []
+    for i in range(count):
+        wb = openpyxl.Workbook()
+        wb.active.append(["a", i])
+        path = tmp_path / f"book{i}.xlsx"
+        wb.save(path)
+        paths.append(str(path))
+    return paths
+
+
+def test_ingest_is_bounded(executor, tmp_path):
+    first, second, third = _workbooks(tmp_path, 3)
+    (tmp_path / "notes.csv").write_text("a\n1\n")
+
+    ingestion = columnar.ingest([first, str(tmp_path / "notes.csv"), second, third])
+    assert list(ingestion) == [first, second]  # not a workbook / over the cap
+    assert columnar.ingest([third]) == {}
+
+    # A finished or cancelled conversion frees its place
+    ingestion[first].set_result(None)
+    assert ingestion[second].cancel()
+    assert list(columnar.ingest([third, first])) == [third, first]
+    assert columnar._queued == 2
+
+
+def test_shutdown_releases_queued_places(executor, tmp_path):
+    columnar.ingest(_workbooks(tmp_path, 2))
+    columnar.shutdown()
+    assert columnar._queued == 0
+
+
+def test_conversion_of_a_removed_file_is_skipped(tmp_path):
+    assert columnar._convert_job(str(tmp_path / "gone.xlsx")) is None
+
+
+def test_uploads_are_kept_until_their_conversion_ends(tmp_path, monkeypatch):
+    running, queued = Future(), Future()
+    running.set_running_or_notify_cancel()
+    paths = [tmp_path / "running.xlsx", tmp_path / "queued.xlsx", tmp_path / "plain.csv"]
+    for path in paths:
+        path.write_text("x")
+    ingestion = {str(paths[0]): running, str(paths[1]): queued}
+    stored, released = Future(), []
+    stored.set_running_or_notify_cancel()
+    ingestion["/store/abc.xlsx"] = stored
+    monkeypatch.setattr(main.file_store, "release", released.extend)
+
+    main._finish_inputs(ingestion, [str(p) for p in paths], [("abc", "/store/abc.xlsx")])
+
+    # The queued conversion is cancelled and its file removed; the running one keeps its file
+    assert queued.cancelled()
+    assert [p.exists() for p in paths] == [True, False, False]
+    running.set_result(None)
+    assert not paths[0].exists()
+    # Stored files stay held until their conversion is done
+    assert released == []
+    stored.set_result(None)
+    assert released == ["abc"]
+
+
+def test_whole_numbers_past_int64_read_back_like_read_excel(tmp_path):
+    path = tmp_path / "big.xlsx"
+    pd.DataFrame({
+        "small": [1.0, 2.0, 3.0],
+        "fraction": [1.0, 2.5, 3.0],
+        "huge": [1.0, 2.0, 1e20],
+        "negative": [1.0, 2.0, -1e19],
+        "unsigned": [1.0, 2.0, 2.0 ** 63],
+    }).to_excel(path, index=False)
+
+    frame = columnar.ColumnarStore(columnar.convert(str(path))).sheet(0).frame()
+
+    expected = pd.read_excel(path)
+    assert expected.dtypes.astype(str).tolist() == ["int64", "float64", "object", "object", "uint64"]
+    pd.testing.assert_frame_equal(frame, expected)
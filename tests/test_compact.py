@@ -0,0 +1,101 @@
+import importlib
+import json
+
+from backend.crewai_app import compact
+from backend.crewai_app.compact import _LEVELS, estimate_tokens, render_inspection
+
+
+def _results(columns=30, rows=5, sheets=1, text="value"):
+    names = [f"column_{i}" for i in range(columns)]
+    preview = [{n: f"{text} {r}" for n in names} for r in range(rows)]
+    file_result = {
+        "original_path": "sales.xlsx",
+        "resolved_path": "/tmp/uploads/sales.xlsx",
+        "status": "success",
+        "metadata": {"format": "xlsx", "rows": 1000, "columns": columns, "row_count_source": "dimension",
+                     "sheet_count": sheets, "file_size": 12345, "read_options": {}},
+        "columns": [{"name": n, "dtype": "str", "non_null_count": rows, "sample_values": [f"{text} 0"]} for n in names],
+        "preview": preview,
+        "sheets": [
+            {"name": f"Sheet{i}", "index": i, "rows": 10, "column_count": columns, "row_count_source": "dimension",
+             "columns": [{"name": n, "dtype": "str"} for n in names], "preview": preview[:3]}
+            for i in range(sheets)
+        ],
+    }
+    return {"success": True, "files_inspected": 1, "errors": [], "files": [file_result]}
+
+
+def _report(text):
+    return json.loads(text)["output"]
+
+
+def test_no_budget_keeps_everything():
+    text = render_inspection(_results(), "compact", token_budget=0)
+    data = json.loads(text)
+    report = data["output"]
+    assert "degraded" not in report and report["budget"] is None
+    assert report["estimated_tokens"] == estimate_tokens(text)
+    assert len(data["files"][0]["preview"]) == 5
+    assert len(data["files"][0]["columns"]) == 30
+
+
+def test_degrades_in_order_until_it_fits():
+    results = _results(columns=120, sheets=3)
+    full = _report(render_inspection(results, "compact", token_budget=0))["estimated_tokens"]
+    budget = full // 3
+    text = render_inspection(results, "compact", token_budget=budget)
+    report = _report(text)
+    assert report["estimated_tokens"] <= budget
+    assert report["estimated_tokens"] == estimate_tokens(text)
+    steps = [level["name"] for level in _LEVELS[1:]]
+    assert report["degraded"] == steps[:len(report["degraded"])]
+    assert "over_budget" not in report
+
+
+def test_over_budget_is_reported_after_every_step():
+    text = render_inspection(_results(columns=100), "compact", token_budget=10)
+    report = _report(text)
+    assert report["over_budget"] is True
+    assert report["degraded"] == [level["name"] for level in _LEVELS[1:]]
+    data = json.loads(text)
+    assert len(data["files"][0]["columns"]) == 20
+    assert data["files"][0]["columns_omitted"] == 80
+    assert "preview" not in data["files"][0]
+
+
+def test_long_cells_are_cut():
+    data = json.loads(render_inspection(_results(text="x" * 500), "compact", token_budget=0))
+    cell = data["files"][0]["preview"][0][0]
+    assert len(cell) == 80 and cell.endswith("…")
+
+
+def test_extra_sheets_are_listed_without_repeating_the_first():
+    data = json.loads(render_inspection(_results(sheets=2), "compact", token_budget=0))
+    first, second = data["files"][0]["sheets"]
+    assert "columns" not in first
+    assert second["columns"][0] == ["column_0", "str"] and len(second["preview"]) == 3
+
+
+def test_table_format_trailer():
+    text = render_inspection(_results(columns=100), "table", token_budget=300)
+    trailer = text.splitlines()[-1]
+    assert trailer.startswith("# output: format=table estimated_tokens=")
+    assert "budget=300" in trailer and "degraded=preview_rows=3" in trailer
+    assert "## FILE 1: sales.xlsx [success]" in text
+
+
+def test_json_and_input_errors_are_passed_through():
+    results = _results(columns=3)
+    assert json.loads(render_inspection(results, "json", token_budget=1)) == results
+    error = {"success": False, "error": "No files given"}
+    assert json.loads(render_inspection(error, "compact")) == error
+
+
+def test_default_format_is_the_original_json(monkeypatch):
+    monkeypatch.delenv("INSPECTOR_OUTPUT_FORMAT", raising=False)
+    results = _results(columns=3)
+    assert json.loads(importlib.reload(compact).render_inspection(results)) == results
+
+
+def test_unknown_format_falls_back_to_compact():
+    assert _report(render_inspection(_results(columns=3), "yaml", token_budget=0))["format"] == "compact"
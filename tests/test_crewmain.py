@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+
+from backend.crewai_app import crewmain
+
+
+class _SlowPool:
+    """A cold crew pool: acquire() blocks until the test lets the build finish."""
+
+    def __init__(self):
+        self.entered = threading.Event()
+        self.build = threading.Event()
+        self.released = threading.Event()
+        self.acquired = 0
+
+    def acquire(self):
+        self.entered.set()
+        self.build.wait(10)
+        self.acquired += 1
+        return "crew", 1
+
+    def release(self, crew, generation):
+        assert (crew, generation) == ("crew", 1)
+        self.released.set()
+
+
+@pytest.fixture
+def cold_pool(monkeypatch):
+    pool = _SlowPool()
+    monkeypatch.setattr(crewmain, "get_crew_pool", lambda *args, **kwargs: pool)
+    monkeypatch.setattr(crewmain, "script_cache_key", lambda inspection, prompt, tag: "k" * 64)
+    yield pool
+    pool.build.set()
+
+
+def _inspection(pool, result):
+    # Only once the checkout is under way: one that hasn't started is cancelled, not released
+    def inspect_files(paths):
+        assert pool.entered.wait(5)
+        return result
+    return inspect_files
+
+
+def _run(path, **kwargs):
+    return crewmain._run_crew("add a total column", [path], use_cache=True, preinspect=True, static_check=True, **kwargs)
+
+
+def test_cache_hit_does_not_wait_for_crew_checkout(cold_pool, monkeypatch, tmp_path):
+    path = str(tmp_path / "data.xlsx")
+    monkeypatch.setattr(crewmain, "inspect_files", _inspection(cold_pool, {"success": True, "files": []}))
+    monkeypatch.setattr(crewmain.script_cache, "get", lambda key: "print('cached')")
+    events = []
+
+    result = _run(path, on_event=lambda kind, data: events.append(kind))
+
+    assert result == "print('cached')"
+    assert events == ["inspection", "cache_hit"]
+    assert not cold_pool.released.is_set()
+    # The checkout still finishes in the background and the crew goes back to the pool
+    cold_pool.build.set()
+    assert cold_pool.released.wait(5)
+
+
+def test_failed_inspection_does_not_wait_for_crew_checkout(cold_pool, monkeypatch, tmp_path):
+    monkeypatch.setattr(crewmain, "inspect_files", _inspection(cold_pool, {"success": False, "errors": ["bad file"]}))
+    with pytest.raises(Exception, match="File inspection failed - bad file"):
+        _run(str(tmp_path / "data.xlsx"))
+    cold_pool.build.set()
+    assert cold_pool.released.wait(5)
@@ -0,0 +1,25 @@
+import os
+
+from backend.crewai_app import custom_tool
+
+
+def test_results_do_not_share_state_with_the_cache(tmp_path, monkeypatch):
+    path = tmp_path / "data.xlsx"
+    path.write_bytes(os.urandom(64))  # a digest no other test has cached
+    parsed = []
+
+    def inspect_many(jobs, workers=None):
+        parsed.append(len(jobs))
+        return [("ok", {"columns": [{"name": "a", "sample_values": [1, 2]}], "preview": [{"a": 1}]}) for _ in jobs]
+
+    monkeypatch.setattr(custom_tool, "inspect_many", inspect_many)
+    first = custom_tool.inspect_files([str(path)])["files"][0]
+    first["columns"][0]["sample_values"].append("changed")
+    first["preview"].clear()
+
+    second = custom_tool.inspect_files([str(path)])["files"][0]
+    assert parsed == [1]  # the second call was a cache hit
+    assert second["columns"] == [{"name": "a", "sample_values": [1, 2]}]
+    assert second["preview"] == [{"a": 1}]
+    second["columns"].clear()
+    assert custom_tool.inspect_files([str(path)])["files"][0]["columns"][0]["name"] == "a"
@@ -0,0 +1,128 @@
+import hashlib
+import os
+import stat
+import time
+
+import pytest
+
+from backend import file_store as file_store_module
+from backend.file_store import FileInUse, FileStore, UnknownFile
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FileStore(str(tmp_path / "files"), ttl_seconds=3600, max_bytes=10_000)
+
+
+def _add(store, data: bytes, filename="data.xlsx"):
+    temp = os.path.join(store.directory, f"upload-{os.urandom(4).hex()}.tmp")
+    with open(temp, "wb") as f:
+        f.write(data)
+    file_id = hashlib.sha256(data).hexdigest()
+    info, stored = store.add(temp, file_id, filename)
+    return file_id, info, stored
+
+
+def _age(store, file_id, seconds):
+    """Pretend file_id was last used `seconds` ago."""
+    then = time.time() - seconds
+    os.utime(store._meta_path(file_id), (then, then))
+
+
+def test_add_dedupes_and_stores_read_only(store):
+    file_id, info, stored = _add(store, b"x" * 100, "Sales.XLSX")
+    assert stored and info["file_id"] == file_id and info["filename"] == "Sales.XLSX" and info["bytes"] == 100
+    path, = store.acquire([file_id])
+    assert path.endswith(f"{file_id}.xlsx")
+    assert not os.stat(path).st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+
+    again, _, stored = _add(store, b"x" * 100, "copy.xlsx")
+    assert again == file_id and not stored
+    assert store.info(file_id)["filename"] == "Sales.XLSX"
+    assert store.stats() == {"files": 1, "bytes": 100, "held": 1}  # the duplicate upload was dropped
+
+
+def test_unknown_ids(store):
+    file_id, _, _ = _add(store, b"known")
+    with pytest.raises(UnknownFile):
+        store.acquire([file_id, "f" * 64])
+    # Nothing is held when any ID is unknown
+    assert store.stats()["held"] == 0
+    assert store.info("../../etc/passwd") is None
+    assert store.info("F" * 64) is None  # IDs are lower-case hex
+
+
+def test_expired_files_are_removed_unless_held(store):
+    old, _, _ = _add(store, b"old")
+    busy, _, _ = _add(store, b"busy")
+    store.acquire([busy])
+    _age(store, old, 7200)
+    _age(store, busy, 7200)
+
+    store.sweep()
+    assert store.info(old) is None
+    assert store.info(busy) is not None
+
+    # The TTL counts from the end of the last use
+    store.release([busy])
+    store.sweep()
+    assert store.info(busy) is not None
+
+
+def test_least_recently_used_go_first_when_over_the_cap(store):
+    ids = []
+    for i, age in enumerate([300, 100, 200]):
+        file_id, _, _ = _add(store, bytes([i]) * 4000)
+        _age(store, file_id, age)
+        ids.append(file_id)
+    # The third add put the store at 12000 bytes (cap 10000) but kept the new file
+    assert store.info(ids[0]) is None
+    assert store.info(ids[1]) is not None and store.info(ids[2]) is not None
+
+    newest, _, _ = _add(store, b"z" * 4000)
+    assert store.info(ids[2]) is None  # older use than ids[1]
+    assert store.info(ids[1]) is not None and store.info(newest) is not None
+
+
+def test_held_files_are_not_evicted(store):
+    first, _, _ = _add(store, b"a" * 6000)
+    store.acquire([first])
+    _age(store, first, 1000)
+    second, _, _ = _add(store, b"b" * 6000)
+    assert store.info(first) is not None and store.info(second) is not None
+    store.release([first])
+    store.sweep(keep=second)
+    assert store.info(first) is None and store.info(second) is not None
+
+
+def test_holds_are_counted(store):
+    file_id, _, _ = _add(store, b"shared")
+    store.acquire([file_id])
+    store.acquire([file_id])
+    store.release([file_id])
+    with pytest.raises(FileInUse):
+        store.delete(file_id)
+    store.release([file_id])
+    assert store.delete(file_id) is True
+    assert store.delete(file_id) is False
+    assert store.stats() == {"files": 0, "bytes": 0, "held": 0}
+
+
+def test_broken_and_stale_leftovers_are_cleaned_up(store, monkeypatch):
+    kept, _, _ = _add(store, b"kept")
+    broken, _, _ = _add(store, b"broken")
+    os.remove(os.path.join(store.directory, f"{broken}.xlsx"))  # its data is gone
+    partial = os.path.join(store.directory, "upload-partial.tmp")
+    orphan = os.path.join(store.directory, "a" * 64 + ".xlsx")  # data without its .json
+    for path in (partial, orphan):
+        with open(path, "wb") as f:
+            f.write(b"left behind")
+
+    store.sweep()
+    assert os.path.exists(partial) and os.path.exists(orphan)  # might still be in progress
+    assert not os.path.exists(store._meta_path(broken))
+
+    monkeypatch.setattr(file_store_module, "STALE_UPLOAD_SECONDS", -1)
+    store.sweep()
+    assert not os.path.exists(partial) and not os.path.exists(orphan)
+    assert store.info(kept) is not None
@@ -0,0 +1,104 @@
+import codecs
+
+import openpyxl
+import pytest
+
+from backend.crewai_app import formats
+from backend.crewai_app.formats import detect_format, iter_delimited_rows, read_delimited, sniff_delimited
+
+
+def _write(path, text, encoding="utf-8"):
+    path.write_bytes(text.encode(encoding))
+    return str(path)
+
+
+def test_detect_format_goes_by_content(tmp_path):
+    wb = openpyxl.Workbook()
+    wb.save(tmp_path / "book.csv")
+    assert detect_format(str(tmp_path / "book.csv")) == "xlsx"
+    (tmp_path / "old.bin").write_bytes(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1" + b"\0" * 8)
+    assert detect_format(str(tmp_path / "old.bin")) == "xls"
+    (tmp_path / "data.xlsx").write_bytes(b"PAR1\0\0")
+    assert detect_format(str(tmp_path / "data.xlsx")) == "parquet"
+    assert detect_format(_write(tmp_path / "report.xlsx", "a,b\n1,2\n")) == "csv"
+    assert detect_format(_write(tmp_path / "report.TSV", "a\tb\n1\t2\n")) == "tsv"
+
+
+@pytest.mark.parametrize("encoding, expected", [
+    ("utf-8", "utf-8"),
+    ("utf-8-sig", "utf-8-sig"),
+    ("utf-16", "utf-16"),
+    ("cp1252", "cp1252"),
+])
+def test_encodings(tmp_path, encoding, expected):
+    path = _write(tmp_path / "data.csv", "name,price\nCafé,€5\nNaïve,€7\n", encoding)
+    info = sniff_delimited(path)
+    assert info["read_options"]["encoding"] == expected
+    df, _ = read_delimited(path, nrows=5)
+    assert list(df["name"]) == ["Café", "Naïve"]
+
+
+@pytest.mark.parametrize("sep", [",", ";", "\t", "|"])
+def test_delimiters(tmp_path, sep):
+    rows = [["id", "city", "amount"]] + [[str(i), f"town {i}", f"{i}.5"] for i in range(20)]
+    path = _write(tmp_path / "data.txt", "".join(sep.join(r) + "\n" for r in rows))
+    info = sniff_delimited(path)
+    assert info["read_options"]["sep"] == sep
+    assert (info["rows"], info["row_count_source"]) == (20, "exact")
+
+
+def test_delimiter_falls_back_to_the_header_when_sniffing_fails(tmp_path):
+    # Ragged rows defeat csv.Sniffer; the header's most common candidate wins
+    path = _write(tmp_path / "data.csv", "a;b;c\n1\n2;3\nx;y;z;w;v\n")
+    assert sniff_delimited(path)["read_options"]["sep"] == ";"
+    assert sniff_delimited(_write(tmp_path / "one.csv", "value\n1\n"))["read_options"]["sep"] == ","
+    assert sniff_delimited(_write(tmp_path / "one.tsv", "value\n1\n"), "tsv")["read_options"]["sep"] == "\t"
+
+
+def test_quoted_line_breaks_count_as_one_record(tmp_path):
+    path = _write(tmp_path / "data.csv", 'id,note\n1,"first\nsecond"\n2,plain\n3,"a\r\nb"\n')
+    info = sniff_delimited(path)
+    assert (info["rows"], info["row_count_source"]) == (3, "exact")
+
+
+def test_large_files_get_an_estimate_from_both_ends(tmp_path, monkeypatch):
+    monkeypatch.setattr(formats, "SNIFF_BYTES", 4096)
+    # Records get longer towards the end, so the head alone would over-count
+    lines = ["id,label"] + [f"{i},{'x' * (5 + i // 200)}" for i in range(5000)]
+    path = _write(tmp_path / "data.csv", "\n".join(lines) + "\n")
+    info = sniff_delimited(path)
+    assert info["row_count_source"] == "estimate"
+    assert abs(info["rows"] - 5000) / 5000 < 0.15
+
+
+def test_multibyte_character_cut_at_the_sample_end(tmp_path, monkeypatch):
+    text = "city,n\n" + "".join(f"Zürich,{i}\n" for i in range(40))
+    raw = text.encode("utf-8")
+    cut = raw.index(b"\xc3", 40) + 1  # the sample ends inside an "ü"
+    monkeypatch.setattr(formats, "SNIFF_BYTES", cut)
+    info = sniff_delimited(_write(tmp_path / "data.csv", text))
+    assert info["read_options"] == {"sep": ",", "encoding": "utf-8"}
+
+
+def test_read_delimited_reads_only_the_preview(tmp_path):
+    path = _write(tmp_path / "data.csv", "a;b\n" + "".join(f"{i};{i * 2}\n" for i in range(100)))
+    df, info = read_delimited(path, nrows=3)
+    assert list(df.columns) == ["a", "b"] and len(df) == 3
+    assert df["b"].tolist() == [0, 2, 4]
+    assert info == {"rows": 100, "row_count_source": "exact", "read_options": {"sep": ";", "encoding": "utf-8"}}
+
+
+def test_iter_delimited_rows(tmp_path):
+    path = _write(tmp_path / "data.tsv", "a\tb\n" + "".join(f"{i}\tx{i}\n" for i in range(50)), "utf-8-sig")
+    frames = list(iter_delimited_rows(path, "tsv", max_rows=20, chunk_rows=8))
+    assert frames[0].iloc[0].tolist() == ["a", "b"]  # no BOM in the first name
+    data = frames[1:]
+    assert [len(f) for f in data] == [8, 8, 5]  # one past the cap, so a caller can tell it stopped
+    assert data[0]["a"].tolist()[:3] == [0, 1, 2]
+
+
+def test_bom_detection_skips_fallbacks(tmp_path):
+    # Valid latin-1 too, but the BOM decides
+    path = tmp_path / "data.csv"
+    path.write_bytes(codecs.BOM_UTF8 + "x,y\n1,ä\n".encode("utf-8"))
+    assert sniff_delimited(str(path))["read_options"]["encoding"] == "utf-8-sig"
@@ -0,0 +1,123 @@
+import multiprocessing
+import threading
+
+import pytest
+
+from backend.crewai_app import inspection_pool
+
+
+class _Result:
+    def __init__(self, fn=None, args=(), kwargs=None, hang=False):
+        self._hang = hang
+        self._value = self._error = None
+        if not hang:
+            try:
+                self._value = fn(*args, **(kwargs or {}))
+            except Exception as e:
+                self._error = e
+
+    def ready(self):
+        return not self._hang
+
+    def get(self, timeout=None):
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+class _FakePool:
+    """Runs tasks inline; paths named 'hang*' never finish."""
+
+    started = []
+
+    def __init__(self, processes, warmup_fails=False):
+        self.processes = processes
+        self.warmup_fails = warmup_fails
+        self.terminated = False
+        _FakePool.started.append(self)
+
+    def map_async(self, fn, iterable, chunksize=1):
+        if self.warmup_fails:
+            return _Timeout()
+        return _Result(lambda: [fn(i) for i in iterable])
+
+    def apply_async(self, fn, args=(), kwargs=None):
+        return _Result(fn, args, kwargs, hang=str(args[0]).startswith("hang"))
+
+    def terminate(self):
+        self.terminated = True
+
+    def join(self):
+        pass
+
+
+class _Timeout:
+    def get(self, timeout=None):
+        raise multiprocessing.TimeoutError()
+
+
+class _FakeContext:
+    warmup_fails = False
+
+    def Pool(self, processes):
+        return _FakePool(processes, self.warmup_fails)
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    context = _FakeContext()
+    _FakePool.started = []
+    monkeypatch.setattr(inspection_pool, "_mp", context)
+    monkeypatch.setattr(inspection_pool, "INSPECTOR_WORKERS", 3)
+    monkeypatch.setattr(inspection_pool, "_slots", threading.BoundedSemaphore(3))
+    monkeypatch.setattr(inspection_pool, "_pool", None)
+    monkeypatch.setattr(inspection_pool, "_failed_at", None)
+    monkeypatch.setattr(inspection_pool, "_POLL_SECONDS", 0.001)
+    monkeypatch.setattr(inspection_pool, "inspect_file", lambda path, **params: {"path": path, **params})
+    yield context
+    inspection_pool._pool = None
+
+
+def _jobs(*paths):
+    return [(p, {"nrows": 5}) for p in paths]
+
+
+def test_batches_of_any_size_share_one_pool(fake_pool):
+    assert inspection_pool.inspect_many(_jobs("a", "b")) == [("ok", {"path": p, "nrows": 5}) for p in "ab"]
+    assert inspection_pool.inspect_many(_jobs("a", "b", "c", "d"))[3] == ("ok", {"path": "d", "nrows": 5})
+    assert [p.processes for p in _FakePool.started] == [3]
+    assert not _FakePool.started[0].terminated
+
+
+def test_single_job_runs_inline(fake_pool):
+    assert inspection_pool.inspect_many(_jobs("a")) == [("ok", {"path": "a", "nrows": 5})]
+    assert _FakePool.started == []
+
+
+def test_errors_are_reported_per_file(fake_pool, monkeypatch):
+    def inspect(path, **params):
+        if path == "bad":
+            raise ValueError("not a workbook")
+        return path
+
+    monkeypatch.setattr(inspection_pool, "inspect_file", inspect)
+    assert inspection_pool.inspect_many(_jobs("a", "bad")) == [("ok", "a"), ("error", "not a workbook")]
+
+
+def test_timeout_replaces_pool_and_reports_the_file(fake_pool):
+    results = inspection_pool.inspect_many(_jobs("a", "hang", "b"), timeout=0.01)
+    assert results[0] == ("ok", {"path": "a", "nrows": 5})
+    assert results[1] == ("error", "Inspection timed out after 0s")
+    assert results[2] == ("ok", {"path": "b", "nrows": 5})
+    assert _FakePool.started[0].terminated
+    # Every slot was given back
+    assert all(inspection_pool._slots.acquire(blocking=False) for _ in range(3))
+
+
+def test_warmup_failure_falls_back_to_inline(fake_pool):
+    fake_pool.warmup_fails = True
+    assert inspection_pool.inspect_many(_jobs("a", "b")) == [("ok", {"path": p, "nrows": 5}) for p in "ab"]
+    assert inspection_pool._pool is None
+    # No new start attempt until the retry window has passed
+    inspection_pool.inspect_many(_jobs("a", "b"))
+    assert len(_FakePool.started) == 1
@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from backend.jobs import FAILED, QUEUED, SUCCEEDED, JobQueue, QueueFull
+
+
+def _wait_for(queue: JobQueue, job_id: str, timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job and job["status"] in (SUCCEEDED, FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_runs_jobs_and_removes_their_files():
+    queue = JobQueue(lambda prompt, files, **options: {"prompt": prompt, **options}, workers=1, store_dir=None)
+    queue.start()
+    try:
+        files_dir = queue.new_job_dir("a")
+        queue.submit("a", "do it", [], files_dir, {"execute": True})
+        job = _wait_for(queue, "a")
+    finally:
+        queue.shutdown(wait=True)
+    assert job["status"] == SUCCEEDED
+    assert job["result"] == {"prompt": "do it", "execute": True}
+    assert not os.path.exists(files_dir)
+
+
+def test_runner_error_marks_job_failed():
+    def runner(prompt, files):
+        raise ValueError("boom")
+
+    queue = JobQueue(runner, workers=1, store_dir=None)
+    queue.start()
+    try:
+        queue.submit("a", "p", [], queue.new_job_dir("a"))
+        job = _wait_for(queue, "a")
+    finally:
+        queue.shutdown(wait=True)
+    assert job["status"] == FAILED
+    assert queue.status("a")["error"] == "boom"
+
+
+def test_full_queue_raises_queue_full():
+    # Not started, so nothing leaves the queue
+    queue = JobQueue(lambda prompt, files: None, max_queue=2, store_dir=None)
+    queue.submit("a", "p", [], "")
+    queue.submit("b", "p", [], "")
+    assert queue.status("b")["position"] == 2
+    with pytest.raises(QueueFull):
+        queue.check_capacity()
+    with pytest.raises(QueueFull):
+        queue.submit("c", "p", [], "")
+    assert queue.get("c") is None
+
+
+def test_finished_jobs_free_capacity():
+    release = threading.Event()
+    queue = JobQueue(lambda prompt, files: release.wait(5), workers=1, max_queue=1, store_dir=None)
+    queue.start()
+    try:
+        queue.submit("a", "p", [], "")
+        with pytest.raises(QueueFull):
+            queue.submit("b", "p", [], "")
+        release.set()
+        _wait_for(queue, "a")
+        queue.submit("b", "p", [], "")
+        _wait_for(queue, "b")
+    finally:
+        queue.shutdown(wait=True)
+
+
+def test_restart_requeues_unfinished_jobs(tmp_path):
+    store = str(tmp_path / "jobs")
+    first = JobQueue(lambda prompt, files: None, store_dir=store)
+    os.makedirs(store)
+    first.submit("queued", "p1", ["in.xlsx"], first.new_job_dir("queued"))
+    first.submit("running", "p2", [], first.new_job_dir("running"))
+    # Simulate a crash mid-run
+    path = os.path.join(store, "running", "job.json")
+    with open(path, encoding="utf-8") as f:
+        job = json.load(f)
+    job["status"], job["started_at"] = "running", time.time()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(job, f)
+
+    seen = []
+    second = JobQueue(lambda prompt, files: seen.append((prompt, files)), workers=1, store_dir=store)
+    second.start()
+    try:
+        assert _wait_for(second, "queued")["status"] == SUCCEEDED
+        assert _wait_for(second, "running")["status"] == SUCCEEDED
+    finally:
+        second.shutdown(wait=True)
+    # Re-queued in submission order
+    assert seen == [("p1", ["in.xlsx"]), ("p2", [])]
+
+
+def test_restore_keeps_finished_jobs_and_purges_expired(tmp_path):
+    store = str(tmp_path)
+    now = time.time()
+    for job_id, finished_at in (("recent", now - 10), ("old", now - 1000)):
+        os.makedirs(os.path.join(store, job_id))
+        with open(os.path.join(store, job_id, "job.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "job_id": job_id, "status": SUCCEEDED, "prompt": "p", "files": [], "files_dir": None,
+                "options": {}, "created_at": finished_at - 1, "started_at": finished_at - 1,
+                "finished_at": finished_at, "result": {"ok": True}, "error": None,
+            }, f)
+    # Unreadable job files are skipped
+    os.makedirs(os.path.join(store, "broken"))
+    with open(os.path.join(store, "broken", "job.json"), "w") as f:
+        f.write("{")
+
+    queue = JobQueue(lambda prompt, files: None, store_dir=store, retention_seconds=100)
+    queue.start()
+    queue.shutdown(wait=True)
+    assert queue.get("recent")["result"] == {"ok": True}
+    assert queue.get("old") is None
+    assert not os.path.exists(os.path.join(store, "old"))
+    assert queue.pending_count() == 0
+
+
+def test_status_reports_queue_position():
+    queue = JobQueue(lambda prompt, files: None, store_dir=None)
+    queue.submit("a", "p", [], "")
+    time.sleep(0.001)
+    queue.submit("b", "p", [], "")
+    assert queue.status("a")["status"] == QUEUED
+    assert [queue.status(j)["position"] for j in ("a", "b")] == [1, 2]
+    assert queue.status("missing") is None
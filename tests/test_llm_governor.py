@@ -0,0 +1,160 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from backend.crewai_app import llm_governor
+from backend.crewai_app.llm_governor import BATCH, INTERACTIVE, LLMGovernor, LLMQueueTimeout, TokenBucket
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers={"retry-after": str(retry_after)} if retry_after else {})
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(llm_governor.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def _governor(**kwargs):
+    options = dict(max_concurrency=1, requests_per_minute=0, tokens_per_minute=0, backoff_seconds=1,
+                   backoff_max_seconds=8, queue_timeout=5)
+    options.update(kwargs)
+    return LLMGovernor(**options)
+
+
+def _queued(governor, count):
+    for _ in range(500):
+        if sum(governor.stats()["queued"].values()) == count:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError(f"expected {count} queued calls")
+
+
+def test_interactive_calls_go_before_batch_calls_and_in_arrival_order():
+    governor = _governor()
+    release, order = threading.Event(), []
+    holder = threading.Thread(target=governor.call, args=(lambda: release.wait(5),))
+    holder.start()
+    while governor.stats()["active"] == 0:
+        threading.Event().wait(0.01)
+
+    callers = []
+    for name, priority in [("batch-1", BATCH), ("batch-2", BATCH), ("interactive-1", INTERACTIVE),
+                           ("interactive-2", INTERACTIVE)]:
+        thread = threading.Thread(target=governor.call, args=(lambda name=name: order.append(name),),
+                                  kwargs={"priority": priority})
+        thread.start()
+        callers.append(thread)
+        _queued(governor, len(callers))
+    assert governor.stats()["queued"] == {INTERACTIVE: 2, BATCH: 2}
+
+    release.set()
+    for thread in [holder, *callers]:
+        thread.join(5)
+    assert order == ["interactive-1", "interactive-2", "batch-1", "batch-2"]
+
+
+def test_retryable_errors_back_off_and_retry(sleeps):
+    governor, attempts = _governor(max_retries=3), []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RuntimeError("wrapped") from ProviderError(503)
+        return "ok"
+
+    assert governor.call(flaky) == "ok"
+    assert len(attempts) == 3
+    # Equal jitter: between half and all of 1s, then of 2s
+    assert 0.5 <= sleeps[0] <= 1 and 1 <= sleeps[1] <= 2
+    assert governor.stats()["active"] == 0
+
+
+def test_rate_limit_honours_retry_after_and_holds_back_other_calls(sleeps):
+    governor, attempts = _governor(backoff_seconds=0.01), []
+
+    def limited():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise ProviderError(429, retry_after=0.3)
+        return "ok"
+
+    assert governor.call(limited) == "ok"
+    assert sleeps == [0.3]
+    # time.sleep is stubbed out: the retry waited because the whole governor was paused
+    assert attempts[1] - attempts[0] >= 0.25
+
+    governor._pause(0.2)
+    started = time.monotonic()
+    assert governor.call(lambda: "other") == "other"
+    assert time.monotonic() - started >= 0.15
+
+
+def test_other_errors_and_the_last_attempt_are_raised(sleeps):
+    governor = _governor(max_retries=2)
+    calls = []
+
+    def bad_request():
+        calls.append(1)
+        raise ProviderError(400)
+
+    with pytest.raises(ProviderError):
+        governor.call(bad_request)
+    assert len(calls) == 1 and sleeps == []
+
+    def overloaded():
+        calls.append(1)
+        raise ProviderError(529)
+
+    with pytest.raises(ProviderError):
+        governor.call(overloaded)
+    assert len(calls) == 4 and len(sleeps) == 2
+
+
+def test_backoff_is_capped_but_never_below_retry_after():
+    governor = _governor(backoff_seconds=1, backoff_max_seconds=8)
+    assert all(4 <= governor.backoff(10) <= 8 for _ in range(50))
+    assert governor.backoff(0, retry_after=20) == 20
+
+
+def test_queue_timeout_leaves_the_queue_clean():
+    governor = _governor(queue_timeout=0.05)
+    release = threading.Event()
+    holder = threading.Thread(target=governor.call, args=(lambda: release.wait(5),))
+    holder.start()
+    while governor.stats()["active"] == 0:
+        threading.Event().wait(0.01)
+    try:
+        with pytest.raises(LLMQueueTimeout):
+            governor.call(lambda: "never")
+        assert governor.stats()["queued"] == {INTERACTIVE: 0, BATCH: 0}
+    finally:
+        release.set()
+        holder.join(5)
+    assert governor.call(lambda: "next") == "next"
+
+
+def test_calls_made_while_holding_a_turn_pass_through():
+    governor = _governor(queue_timeout=0.05)
+    # crewai retries inside a governed call; with one slot a nested call must not queue behind itself
+    assert governor.call(lambda: governor.call(lambda: "inner")) == "inner"
+
+
+def test_token_bucket():
+    now = time.monotonic()
+    bucket = TokenBucket(60)
+    bucket.updated = now
+    assert bucket.wait_time(60, now) == 0
+    bucket.take(60, now)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    assert bucket.wait_time(1000, now) == pytest.approx(60.0)  # never more than a full bucket
+    bucket.take(-30, now)  # a correction gives units back
+    assert bucket.wait_time(30, now) == 0
+    assert TokenBucket(0).wait_time(10 ** 9, now) == 0
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.crewai_app import columnar
+from backend.file_store import FileStore
+
+DATA = b"region,amount\nnorth,1\n"
+FILE_ID = hashlib.sha256(DATA).hexdigest()
+
+
+async def _ready(stage):
+    return None
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    store = FileStore(str(tmp_path / "files"))
+    calls = []
+
+    def run(prompt, paths, on_event=None, **options):
+        calls.append({"paths": list(paths), "exist": [os.path.exists(p) for p in paths]})
+        if on_event is not None:
+            on_event("inspection", {"files": len(paths)})
+        return "print('done')"
+
+    monkeypatch.setattr(main, "_await_warmup", _ready)
+    monkeypatch.setattr(main, "columnar", columnar)
+    monkeypatch.setattr(main, "file_store", store)
+    monkeypatch.setattr(main, "run", run)
+    # No lifespan: nothing is warmed up or started
+    return TestClient(main.app), store, calls
+
+
+def _events(response):
+    events = []
+    for message in response.text.split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in message.splitlines() if not line.startswith(":"))
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def _store(client):
+    stored, = client.post("/files", files={"files": ("sales.csv", DATA)}).json()["files"]
+    assert (stored["file_id"], stored["status"]) == (FILE_ID, "stored")
+
+
+def test_files_stores_once_and_reports_missing_ids(server):
+    client, store, _ = server
+    _store(client)
+    again = client.post("/files", files={"files": ("copy.csv", DATA)}).json()
+    assert again["files"][0]["status"] == "exists"
+    asked = client.post("/files", data={"file_ids": f"{FILE_ID},{'0' * 64}"}).json()
+    assert [f["file_id"] for f in asked["files"]] == [FILE_ID]
+    assert asked["missing"] == ["0" * 64]
+    assert store.stats()["files"] == 1
+
+
+def test_stream_with_file_ids_releases_the_stored_file(server):
+    client, store, calls = server
+    _store(client)
+
+    response = client.post("/transform/stream", data={"prompt": "total", "file_ids": FILE_ID},
+                           files={"files": ("extra.csv", b"a\n1\n")})
+
+    events = _events(response)
+    assert [kind for kind, _ in events] == ["upload", "inspection", "script", "done"]
+    upload = events[0][1]["files"]
+    assert upload[0]["file_id"] == FILE_ID and upload[0]["name"] == "sales.csv"
+    assert upload[1]["name"] == "extra.csv"
+    assert calls[0]["exist"] == [True, True]
+    # The upload is removed and the stored file released: it can be deleted again
+    assert not os.path.exists(calls[0]["paths"][1])
+    assert store.stats()["held"] == 0
+    assert client.delete(f"/files/{FILE_ID}").status_code == 200
+
+
+def test_stream_with_an_unknown_id(server):
+    client, store, calls = server
+    response = client.post("/transform/stream", data={"prompt": "total", "file_ids": "f" * 64})
+    assert response.status_code == 404
+    assert calls == [] and store.stats()["held"] == 0
+
+
+def test_stream_set_up_failure_cleans_up(server, monkeypatch):
+    client, store, calls = server
+    _store(client)
+
+    def broken(paths):
+        raise RuntimeError("no columnar store")
+
+    monkeypatch.setattr(columnar, "ingest", broken)
+    saved = []
+    real_save = main._save_uploads
+
+    async def save(files, saved_files, **kwargs):
+        await real_save(files, saved_files, **kwargs)
+        saved.extend(saved_files)
+
+    monkeypatch.setattr(main, "_save_uploads", save)
+    response = client.post("/transform/stream", data={"prompt": "total", "file_ids": FILE_ID, "execute": "true"},
+                           files={"files": ("extra.csv", b"a\n1\n")})
+    assert response.status_code == 500
+    assert calls == []
+    assert saved and not any(os.path.exists(p) for p in saved)
+    assert store.stats()["held"] == 0
+
+
+def test_transform_with_file_ids_releases_the_stored_file(server):
+    client, store, calls = server
+    _store(client)
+    response = client.post("/transform", data={"prompt": "total", "file_ids": FILE_ID})
+    assert response.json() == {"status": "success", "script": "print('done')"}
+    assert calls[0]["exist"] == [True]
+    assert store.stats()["held"] == 0
+
+
+def test_execute_needs_the_admin_token(server, monkeypatch):
+    client, _, _ = server
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "letmein")
+    ran = []
+    monkeypatch.setattr(main, "execute_script", lambda *args, **kwargs: ran.append(args))
+    for headers in ({}, {"X-Admin-Token": "wrong"}):
+        response = client.post("/execute", data={"script": "print(1)"}, headers=headers)
+        assert response.status_code == 403
+    assert ran == []
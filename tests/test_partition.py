@@ -0,0 +1,46 @@
+import pytest
+
+from backend.partition import analyze
+
+
+@pytest.fixture
+def data(tmp_path):
+    path = tmp_path / "sales.csv"
+    path.write_text("region,a,b\nnorth,1,2\n")
+    return str(path)
+
+
+def _analyze(data, body):
+    script = f"import pandas as pd\ndf = pd.read_csv({data!r})\n{body}\ndf.to_csv('out.csv', index=False)\n"
+    return analyze(script, [data])
+
+
+@pytest.mark.parametrize("body", [
+    "df = df[df['a'] > 0]",
+    "df['c'] = df['a'] * 2 + df['b'].abs()",
+    "df = df.rename(columns={'a': 'amount'}).assign(d=lambda x: x['amount'] + 1)",
+    "df['e'] = df[['a', 'b']].sum(axis=1)",
+    "df = df.query('a > 1 and region == \"north\"')",
+    "limit = 5\ndf = df.query('a < @limit or `region` != \"south\"')",
+    "df = df.eval('c = a + b\\nd = sin(c) * 2')",
+    "df['c'] = pd.eval('df[\"a\"] + df[\"b\"]')",
+])
+def test_row_local_scripts(data, body):
+    result = _analyze(data, body)
+    assert result["row_local"], result["reasons"]
+
+
+@pytest.mark.parametrize("body, reason", [
+    ("df = df.sort_values('a')", "'sort_values' is not row-local"),
+    ("df['c'] = df['a'] - df['a'].mean()", "'mean' without axis=1 reduces over rows"),
+    ("df = df.query('a > a.mean()')", "'mean' without axis=1 reduces over rows"),
+    ("df = df.eval('c = a.cumsum()')", "'cumsum' is not row-local"),
+    ("df = df.query('a > @df.a.max()')", "'max' without axis=1 reduces over rows"),
+    ("df['c'] = pd.eval('df.a.cumsum()')", "'cumsum' is not row-local"),
+    ("expr = input()\ndf = df.query(expr)", "'query' expression is not a constant string"),
+    ("df = df.query('a >')", "'query' expression can't be analysed"),
+])
+def test_scripts_that_combine_rows(data, body, reason):
+    result = _analyze(data, body)
+    assert not result["row_local"]
+    assert any(reason in r for r in result["reasons"]), result["reasons"]
@@ -0,0 +1,130 @@
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+import openpyxl
+import pytest
+
+from backend.crewai_app import columnar, profiling
+from backend.crewai_app.profiling import HyperLogLog, _hash64, _hash_array, profile_columnar, profile_file
+from backend.crewai_app.xlsx_stream import XlsxWorkbook
+
+
+def _workbook(path, rows):
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(["id", "region", "amount", "when", "flag", "mixed"])
+    start = datetime(2024, 1, 1)
+    for i in range(rows):
+        ws.append([
+            i,
+            ["north", "south", "east", None][i % 4],
+            None if i % 10 == 0 else i * 0.5,
+            start + timedelta(days=i % 365),
+            i % 3 == 0,
+            "x" if i % 2 else i,
+        ])
+    wb.save(path)
+    return str(path)
+
+
+@pytest.mark.parametrize("kind, values", [
+    ("int", [0, 1, -5, 2 ** 40]),
+    ("float", [0.5, -3.25, 3.0, -0.0]),
+    ("bool", [True, False]),
+])
+def test_array_hashes_match_scalar_hashes(kind, values):
+    expected = [_hash64(v) for v in values]
+    if kind == "float":
+        expected[-1] = _hash64(0.0)
+    assert _hash_array(np.array(values), kind).tolist() == expected
+
+
+def test_hll_array_and_scalar_updates_agree():
+    hashes = [_hash64(i) for i in range(5000)]
+    scalar, vector = HyperLogLog(), HyperLogLog()
+    for h in hashes:
+        scalar.add_hash(h)
+    vector.add_hashes(np.array(hashes, dtype=np.uint64))
+    assert scalar.registers == vector.registers
+    assert abs(vector.count() - 5000) / 5000 < 0.05
+
+
+def test_iter_raw_rows_memory_does_not_grow_with_rows(tmp_path):
+    def peak(rows):
+        path = tmp_path / f"r{rows}.xlsx"
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet()
+        for i in range(rows):
+            ws.append([i, "text", i * 0.5])
+        wb.save(path)
+        with XlsxWorkbook(str(path)) as book:
+            tracemalloc.start()
+            try:
+                for _ in book.iter_raw_rows(0):
+                    pass
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+    small, large = peak(2_000), peak(20_000)
+    assert large < small * 1.5
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(columnar, "COLUMNAR_DIR", str(tmp_path / "store"))
+    path = _workbook(tmp_path / "data.xlsx", 3000)
+    directory = columnar.convert(path)
+    return path, columnar.ColumnarStore(directory).sheet(0)
+
+
+def test_columnar_profile_matches_streaming_profile(store):
+    path, sheet = store
+    streamed = profile_file(path, max_seconds=600)
+    stored = profile_columnar(sheet)
+    assert stored["rows_profiled"] == streamed["rows_profiled"] == 3000
+    assert stored["complete"] and stored["budget"]["max_seconds"] == profiling.PROFILE_MAX_SECONDS
+    for a, b in zip(stored["columns"], streamed["columns"]):
+        assert a["name"] == b["name"]
+        assert a["null_count"] == b["null_count"]
+        assert a["types"] == b["types"]
+        assert (a["min"], a["max"]) == (b["min"], b["max"])
+        assert abs(a["distinct_approx"] - b["distinct_approx"]) <= max(3, 0.05 * b["distinct_approx"])
+        assert len(a["sample_values"]) == len(b["sample_values"])
+    region = stored["columns"][1]
+    assert region["distinct_approx"] == 3
+    assert set(region["sample_values"]) <= {"north", "south", "east"}
+
+
+def test_columnar_profile_row_budget(store):
+    _, sheet = store
+    result = profile_columnar(sheet, max_rows=100)
+    assert result["rows_profiled"] == 100
+    assert result["stopped_by"] == "rows"
+    assert result["columns"][0]["max"] == 99
+
+
+def test_columnar_profile_time_budget(store, monkeypatch):
+    _, sheet = store
+    monkeypatch.setattr(profiling, "_COLUMNAR_BLOCK_ROWS", 500)
+    result = profile_columnar(sheet, max_seconds=0)
+    # The first block always runs; the clock is checked between blocks
+    assert result["rows_profiled"] == 500
+    assert result["stopped_by"] == "time"
+    assert not result["complete"]
+
+
+def test_streaming_profile_stops_at_row_budget(tmp_path):
+    path = _workbook(tmp_path / "data.xlsx", 500)
+    result = profile_file(path, max_rows=200)
+    assert result["rows_profiled"] == 200
+    assert result["stopped_by"] == "rows"
+    assert result["columns"][0]["min"] == 0 and result["columns"][0]["max"] == 199
+
+
+def test_reservoir_sample_is_deterministic(tmp_path):
+    path = _workbook(tmp_path / "data.xlsx", 500)
+    first, second = profile_file(path), profile_file(path)
+    assert first["columns"][0]["sample_values"] == second["columns"][0]["sample_values"]
+    assert len(first["columns"][0]["sample_values"]) == profiling.PROFILE_SAMPLE_SIZE
@@ -0,0 +1,162 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from backend import sandbox, sandbox_worker
+from backend.sandbox import SandboxPool
+
+
+def test_staged_inputs_are_copies(tmp_path):
+    original = tmp_path / "data.csv"
+    original.write_text("a\n1\n")
+    original.chmod(0o444)
+    scratch = tmp_path / "scratch"
+    scratch.mkdir()
+
+    local, = SandboxPool.stage_inputs(str(scratch), [str(original)])
+
+    assert local == str(scratch / "inputs" / "data.csv")
+    with open(local, "a") as f:  # the copy is writable...
+        f.write("2\n")
+    assert original.read_text() == "a\n1\n"  # ...and separate from the original
+    assert os.stat(local).st_ino != original.stat().st_ino
+
+
+def test_inputs_with_the_same_name_are_kept_apart(tmp_path):
+    first, second = tmp_path / "a" / "data.csv", tmp_path / "b" / "data.csv"
+    for path, text in ((first, "first"), (second, "second")):
+        path.parent.mkdir()
+        path.write_text(text)
+    scratch = tmp_path / "scratch"
+    scratch.mkdir()
+
+    paths = SandboxPool.stage_inputs(str(scratch), [str(first), str(second)])
+
+    assert [os.path.basename(p) for p in paths] == ["data.csv", "1_data.csv"]
+    assert [open(p).read() for p in paths] == ["first", "second"]
+
+
+def test_reading_other_files_is_rejected():
+    script = "import pandas as pd\ndf = pd.read_excel('/tmp/in.xlsx')\nother = pd.read_csv('/etc/data.csv')\n"
+    result = SandboxPool.rejection(script, ["/tmp/in.xlsx"])
+    assert result["status"] == "rejected"
+    assert [f["code"] for f in result["findings"]] == ["unknown_file"]
+    # Unused inputs are not a reason to refuse a run
+    assert SandboxPool.rejection("print(1)", ["/tmp/in.xlsx"]) is None
+
+
+def test_processes_started_for_workers_get_only_the_allowed_variables(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "secret")
+    monkeypatch.setenv("OMP_NUM_THREADS", "1")
+    show = "import os; print(os.environ.get('GEMINI_API_KEY'), os.environ.get('OMP_NUM_THREADS'), 'PATH' in os.environ)"
+    with sandbox._scrubbed_environment():
+        child = subprocess.run([sys.executable, "-c", show], capture_output=True, text=True, check=True)
+        assert os.environ["GEMINI_API_KEY"] == "secret"  # the server's own view is unchanged
+    assert child.stdout.split() == ["None", "1", "True"]
+    after = subprocess.run([sys.executable, "-c", show], capture_output=True, text=True, check=True)
+    assert after.stdout.split()[0] == "secret"
+
+
+@pytest.fixture
+def guard(tmp_path, monkeypatch):
+    scratch = tmp_path / "scratch"
+    scratch.mkdir()
+    store = tmp_path / "store"
+    store.mkdir()
+    monkeypatch.chdir(scratch)
+    audit, confine = sandbox_worker._file_guard(sandbox_worker._library_roots())
+    confine(str(scratch), [str(store)])
+    return audit, confine, scratch
+
+
+@pytest.mark.parametrize("event, args", [
+    ("open", ("/tmp/elsewhere.xlsx", "w", 0)),
+    ("open", ("/tmp/elsewhere.xlsx", "r+b", 0)),
+    ("open", ("/tmp/elsewhere.xlsx", None, os.O_WRONLY | os.O_CREAT)),
+    ("os.remove", ("/tmp/elsewhere.xlsx", -1)),
+    ("os.rename", ("out.xlsx", "/tmp/elsewhere.xlsx", None, None)),
+    ("shutil.rmtree", ("..", None)),
+    ("open", ("../store/columns.npy", "wb", 0)),  # readable is not writable
+])
+def test_writes_outside_the_scratch_directory_are_refused(guard, event, args):
+    audit, _, _ = guard
+    with pytest.raises(PermissionError, match="write inside"):
+        audit(event, args)
+
+
+@pytest.mark.parametrize("path", ["/etc/hostname", "../elsewhere.csv", f"/proc/{os.getppid()}/environ"])
+def test_reads_outside_the_job_are_refused(guard, path):
+    audit, _, _ = guard
+    with pytest.raises(PermissionError, match="read their inputs"):
+        audit("open", (path, "r", 0))
+
+
+@pytest.mark.parametrize("event, args", [
+    ("open", ("inputs/data.xlsx", "rb", 0)),
+    ("open", ("../store/columns.npy", "rb", 0)),
+    ("open", (os.__file__, "r", 0)),  # lazy imports
+    ("open", ("/proc/self/statm", "r", 0)),
+    ("open", ("out.xlsx", "wb", 0)),
+    ("open", ("inputs/data.xlsx", None, os.O_RDWR)),
+    ("open", (os.devnull, "w", 0)),
+    ("os.remove", ("inputs/data.xlsx", None)),
+    ("os.mkdir", ("results", 0o777, -1)),
+])
+def test_reads_and_writes_inside_are_allowed(guard, event, args):
+    audit, _, _ = guard
+    audit(event, args)
+
+
+def test_symlinks_out_of_the_scratch_directory_are_followed(guard, tmp_path):
+    audit, _, scratch = guard
+    os.symlink(tmp_path, scratch / "escape")
+    with pytest.raises(PermissionError):
+        audit("open", ("escape/stolen.xlsx", "w", 0))
+
+
+def test_paths_relative_to_a_directory_descriptor(guard, tmp_path):
+    audit, _, scratch = guard
+    outside = os.open(tmp_path, os.O_RDONLY)
+    inside = os.open(scratch, os.O_RDONLY)
+    try:
+        with pytest.raises(PermissionError):
+            audit("os.remove", ("data.xlsx", outside))
+        audit("os.remove", ("data.xlsx", inside))
+    finally:
+        os.close(outside)
+        os.close(inside)
+
+
+def test_no_checks_between_jobs(guard):
+    audit, confine, _ = guard
+    confine(None)
+    audit("open", ("/tmp/elsewhere.xlsx", "w", 0))
+    audit("open", ("/etc/hostname", "r", 0))
+
+
+def test_script_cannot_change_its_input_or_write_elsewhere(tmp_path, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    original = tmp_path / "data.csv"
+    original.write_text("a\n1\n")
+    elsewhere = tmp_path / "elsewhere.txt"
+    script = (
+        f"open({str(original)!r}, 'a').write('2\\n')\n"
+        "open('result.txt', 'w').write('ok')\n"
+        "import os, sys\nprint(os.environ.get('ADMIN_TOKEN'))\n"
+        "sys.modules['backend.sandbox_worker']._write_root = '/'\n"
+        f"open({str(elsewhere)!r}, 'w').write('escaped')\n"
+    )
+    pool = SandboxPool(size=1, root=str(tmp_path / "runs"))
+    try:
+        result = pool.execute(script, [str(original)])
+    finally:
+        pool.shutdown()
+
+    assert original.read_text() == "a\n1\n"
+    assert not elsewhere.exists()
+    assert result["status"] == "error" and result["error"].startswith("PermissionError")
+    assert result["stdout"] == "None\n"
+    names = {o["name"] for o in result["outputs"]}
+    assert "result.txt" in names and "inputs/data.csv" not in names
@@ -0,0 +1,109 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import pytest
+
+from backend.crewai_app.singleflight import SingleFlight
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+class _Run:
+    """fn for SingleFlight.do that blocks until the test lets it finish."""
+
+    def __init__(self, result="script", error=None):
+        self.result, self.error = result, error
+        self.started = threading.Event()
+        self.finish = threading.Event()
+        self.calls = 0
+        self.context = None
+
+    def __call__(self, emit):
+        self.calls += 1
+        self.context = request_id.get()
+        emit("inspection", {"files": 1})
+        self.started.set()
+        assert self.finish.wait(5)
+        emit("script", {})
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def _wait_for_waiters(flights, count):
+    for _ in range(500):
+        if flights.stats()["waiting"] == count:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError(f"expected {count} waiters, have {flights.stats()['waiting']}")
+
+
+def test_concurrent_callers_share_one_run():
+    flights, run = SingleFlight("test"), _Run()
+    events = [[], [], []]
+    with ThreadPoolExecutor(3) as pool:
+        futures = [pool.submit(flights.do, "k", run, lambda kind, data, i=i: events[i].append(kind)) for i in range(3)]
+        _wait_for_waiters(flights, 3)
+        run.finish.set()
+        assert [f.result(5) for f in futures] == ["script"] * 3
+
+    assert run.calls == 1
+    # Every caller sees every event, including the ones emitted before it joined
+    assert events == [["inspection", "script"]] * 3
+    assert flights.stats() == {"runs": 1, "coalesced": 2, "failures": 0, "in_flight": 0, "waiting": 0}
+
+
+def test_error_reaches_every_waiter_and_the_next_call_runs_again():
+    flights, run = SingleFlight("test"), _Run(error=ValueError("crew failed"))
+    with ThreadPoolExecutor(2) as pool:
+        futures = [pool.submit(flights.do, "k", run) for _ in range(2)]
+        _wait_for_waiters(flights, 2)
+        run.finish.set()
+        for future in futures:
+            with pytest.raises(ValueError, match="crew failed"):
+                future.result(5)
+    assert flights.stats()["failures"] == 1 and flights.stats()["in_flight"] == 0
+
+    retry = _Run()
+    retry.finish.set()
+    assert flights.do("k", retry) == "script"
+    assert retry.calls == 1
+
+
+def test_waiter_that_gives_up_does_not_stop_the_run():
+    flights, run = SingleFlight("test"), _Run()
+    leader_events, quitter_events = [], []
+    with ThreadPoolExecutor(1) as pool:
+        leader = pool.submit(flights.do, "k", run, lambda kind, data: leader_events.append(kind))
+        assert run.started.wait(5)
+        # A cancelled job or disconnected client: the waiter times out and leaves
+        with pytest.raises(TimeoutError):
+            flights.do("k", run, lambda kind, data: quitter_events.append(kind), timeout=0.05)
+        assert flights.stats()["waiting"] == 1
+        run.finish.set()
+        assert leader.result(5) == "script"
+
+    assert run.calls == 1
+    assert leader_events == ["inspection", "script"]
+    assert quitter_events == ["inspection"]  # detached before the run finished
+
+
+def test_run_keeps_the_leaders_context():
+    flights, run = SingleFlight("test"), _Run()
+    run.finish.set()
+    token = request_id.set("req-1")
+    try:
+        flights.do("k", run)
+    finally:
+        request_id.reset(token)
+    assert run.context == "req-1"
+
+
+def test_different_keys_run_separately():
+    flights = SingleFlight("test")
+    first, second = _Run("a"), _Run("b")
+    first.finish.set()
+    second.finish.set()
+    assert (flights.do("k1", first), flights.do("k2", second)) == ("a", "b")
+    assert flights.stats()["runs"] == 2 and flights.stats()["coalesced"] == 0
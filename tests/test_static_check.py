@@ -0,0 +1,95 @@
+from backend.crewai_app.static_check import check_script, format_findings, read_paths
+
+INPUT = "/tmp/uploads/sales.xlsx"
+INSPECTION = {
+    "success": True,
+    "files": [{
+        "columns": [{"name": "Region"}, {"name": "Amount"}, {"name": "Order Date"}],
+        "sheets": [{"name": "Q1", "columns": [{"name": "Region"}]}],
+    }],
+}
+
+
+def _codes(script, inspection=INSPECTION, files=(INPUT,)):
+    report = check_script(script, inspection, list(files) if files is not None else None)
+    return [f["code"] for f in report["findings"]], report
+
+
+def _script(body):
+    return f"import pandas as pd\ndf = pd.read_excel({INPUT!r})\n{body}\ndf.to_excel('output.xlsx', index=False)\n"
+
+
+def test_clean_script_passes():
+    codes, report = _codes(_script(
+        "df['Total'] = df['Amount'] * 2\n"
+        "summary = df.groupby('Region').agg(total=('Total', 'sum'))\n"
+        "df = df.rename(columns={'Order Date': 'date'})\n"
+        "df = df.sort_values('date')\n"
+        "q1 = pd.read_excel(" + repr(INPUT) + ", sheet_name='Q1', usecols='A:C')\n"
+    ))
+    assert codes == []
+    assert report["ok"] and report["stats"]["file_reads"] == 2
+
+
+def test_syntax_error():
+    codes, report = _codes("df = pd.read_excel(")
+    assert codes == ["syntax"] and not report["ok"]
+    assert report["findings"][0]["line"] == 1
+
+
+def test_banned_imports_and_calls():
+    codes, _ = _codes(_script("import subprocess\nfrom urllib.request import urlopen\nimport backend.sandbox_worker\n"
+                              "os.system('ls')\neval('1')"))
+    assert codes.count("banned_import") == 3
+    assert codes.count("banned_call") == 2
+
+
+def test_reads_outside_the_inputs_and_unused_inputs():
+    codes, report = _codes("import pandas as pd\ndf = pd.read_csv('/etc/data.csv')\n")
+    assert codes == ["unknown_file", "unused_file"]
+    assert report["findings"][0]["line"] == 2
+
+
+def test_path_spelling_does_not_matter():
+    codes, _ = _codes("import pandas as pd\ndf = pd.read_excel('/tmp/uploads/./sales.xlsx')\n")
+    assert codes == []
+
+
+def test_unknown_column_with_suggestion():
+    codes, report = _codes(_script("df['Regoin'].unique()\ndf['Regoin'].nunique()"))
+    assert codes == ["unknown_column"]  # reported once
+    assert "did you mean 'Region'?" in report["findings"][0]["message"]
+
+
+def test_columns_created_by_the_script_are_known():
+    codes, _ = _codes(_script(
+        "df = df.assign(margin=df['Amount'] * 0.1)\n"
+        "df.insert(0, 'row_id', range(len(df)))\n"
+        "df.columns = ['a', 'b', 'c', 'margin', 'row_id']\n"
+        "print(df[['margin', 'row_id', 'a']])\n"
+    ))
+    assert codes == []
+
+
+def test_dict_lookups_are_not_columns():
+    codes, _ = _codes(_script("totals = {}\ntotals['grand'] = 1\nprint(totals['grand'])"))
+    assert codes == []
+
+
+def test_failed_inspection_only_warns():
+    codes, report = _codes(_script("df['Anything']"), inspection={"success": False})
+    assert codes == ["no_schema"]
+    assert report["ok"]
+
+
+def test_without_inputs_or_inspection_only_banned_constructs_are_checked():
+    codes, _ = _codes("import pandas as pd\ndf = pd.read_excel('other.xlsx')\ndf['x']", inspection=None, files=None)
+    assert codes == []
+
+
+def test_read_paths_and_format_findings():
+    assert read_paths(_script("again = pd.read_excel(" + repr(INPUT) + ")")) == [INPUT]
+    assert read_paths("not python (") == []
+    assert format_findings([]) == "No problems found."
+    _, report = _codes(_script("df['Nope']"))
+    assert format_findings(report["findings"]).startswith("- [error] unknown_column (line 3): Column 'Nope'")
@@ -0,0 +1,77 @@
+import io
+import os
+import asyncio
+
+import pytest
+from fastapi import FastAPI, UploadFile
+from fastapi.testclient import TestClient
+
+from backend.uploads import UploadLimitMiddleware, UploadTooLarge, save_upload, upload_suffix
+
+
+def _upload(data: bytes, filename: str = "data.xlsx") -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename=filename)
+
+
+def test_save_upload_copies_in_chunks_and_keeps_extension(tmp_path):
+    data = os.urandom(10_000)
+    path, written = asyncio.run(save_upload(_upload(data, "sales.CSV"), dir=str(tmp_path), chunk_size=1024))
+    assert written == len(data)
+    assert path.endswith(".csv")
+    with open(path, "rb") as f:
+        assert f.read() == data
+
+
+def test_save_upload_over_file_cap_removes_partial_file(tmp_path):
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(save_upload(_upload(b"x" * 5000), dir=str(tmp_path), max_file_bytes=4096, chunk_size=1024))
+    assert os.listdir(tmp_path) == []
+
+
+def test_save_upload_rejects_known_size_before_copying(tmp_path):
+    upload = UploadFile(io.BytesIO(b"x" * 10), filename="big.xlsx", size=10_000)
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(save_upload(upload, dir=str(tmp_path), max_file_bytes=4096))
+    assert os.listdir(tmp_path) == []
+
+
+def test_upload_suffix():
+    assert upload_suffix("report.XLSX") == ".xlsx"
+    assert upload_suffix("table.parquet") == ".parquet"
+    assert upload_suffix("notes.docx") == ""
+    assert upload_suffix(None) == ""
+
+
+def _limited_app(max_request_bytes: int) -> TestClient:
+    app = FastAPI()
+
+    @app.post("/transform")
+    async def transform():
+        return {"status": "success"}
+
+    @app.post("/other")
+    async def other():
+        return {"status": "success"}
+
+    app.add_middleware(UploadLimitMiddleware, max_request_bytes=max_request_bytes)
+    return TestClient(app)
+
+
+def test_middleware_rejects_large_content_length():
+    client = _limited_app(100)
+    response = client.post("/transform", content=b"x" * 200)
+    assert response.status_code == 413
+    assert response.json()["status"] == "error"
+
+
+def test_middleware_passes_small_bodies_and_other_paths():
+    client = _limited_app(100)
+    assert client.post("/transform", content=b"x" * 50).status_code == 200
+    assert client.post("/other", content=b"x" * 200).status_code == 200
+
+
+def test_middleware_cannot_see_chunked_bodies():
+    # No Content-Length: the early check lets it through; save_upload's caps are what stop it
+    client = _limited_app(100)
+    response = client.post("/transform", content=iter([b"x" * 200]))
+    assert response.status_code == 200
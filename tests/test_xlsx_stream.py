@@ -0,0 +1,65 @@
+from datetime import datetime
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from backend.crewai_app.xlsx_stream import XlsxWorkbook, read_preview
+
+# sheet row number -> cell values from column A
+SHEETS = {
+    "offset_header": {3: ["name", "val"], 4: ["a", 1], 5: ["b", 2]},
+    "title_row": {1: ["Report"], 3: ["name", "val"], 4: ["a", 1]},
+    "blank_rows": {1: ["name", "val"], 2: ["a", 1], 4: ["b", 2], 6: ["c", 3]},
+    "numeric_text": {1: ["id", "flag", "x"], 2: ["001", "NA", "1.5"], 3: ["002", "", "2"]},
+    "mixed": {
+        1: ["a", "a", 2024, None, "e"],
+        2: [1.0, True, datetime(2024, 1, 2), None, 3.5],
+        3: [2, False, datetime(2024, 1, 3), None, None],
+        5: ["", None, None, None, " "],
+    },
+    "empty": {},
+}
+
+
+def _write(path, rows):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for r, values in rows.items():
+        for c, value in enumerate(values, 1):
+            if value is not None:
+                ws.cell(r, c, value)
+    wb.save(path)
+    return str(path)
+
+
+@pytest.mark.parametrize("nrows", [0, 1, 2, 5])
+@pytest.mark.parametrize("name", SHEETS)
+def test_read_preview_matches_read_excel(tmp_path, name, nrows):
+    path = _write(tmp_path / f"{name}.xlsx", SHEETS[name])
+    expected = pd.read_excel(path, nrows=nrows)
+    actual = read_preview(path, nrows)
+    assert list(actual.columns) == list(expected.columns)
+    assert list(actual.dtypes) == list(expected.dtypes)
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+def test_error_cells_read_as_nan(tmp_path):
+    path = tmp_path / "errors.xlsx"
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["x", "y"])
+    ws.append([1, None])
+    ws["B2"].value = "#DIV/0!"
+    ws["B2"].data_type = "e"
+    wb.save(path)
+    pd.testing.assert_frame_equal(read_preview(str(path), 5), pd.read_excel(path, nrows=5))
+
+
+def test_index_counts_rows_from_sheet_row_one(tmp_path):
+    path = _write(tmp_path / "offset.xlsx", {3: ["name", "val"], **{r: ["a", r] for r in range(4, 40)}})
+    with XlsxWorkbook(path) as wb:
+        sheet = wb.index(preview_rows=3)[0]
+    assert sheet["rows"] == len(pd.read_excel(path))
+    assert sheet["source"] == "dimension"
+    assert sheet["head"][0] == []  # the header is sheet row 1, blank here